@@ -50,8 +50,24 @@ app.register_blueprint(common_bp)
 from app.routes_total import total_bp
 app.register_blueprint(total_bp)
 
+# 取込ジョブBlueprintを登録
+from app.routes_import_job import import_job_bp
+app.register_blueprint(import_job_bp)
+
 # ルートのインポート
 from app import routes
 from app import routes_gradation
 from app import routes_master
 
+
+# メトリクス（/metrics）の登録
+from app import metrics
+
+# レスポンス圧縮の登録（送信サイズのメトリクスに圧縮後のサイズを記録するため metrics より後）
+from app import compression
+
+# リクエスト単位のプロファイル取得の登録
+from app import profiler
+
+# CLIコマンドの登録
+from app import startup_report
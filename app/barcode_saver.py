@@ -7,6 +7,7 @@ import traceback
 from app.constants import DatabaseConstants
 from app.database import get_db_session
 from app.models import log_error, BBcdDat
+from app.logger_utils import log_debug, log_info, log_warning
 from app.barcode_generator import BarcodeGenerator
 from app.models_common import CshkDatModel
 from app.models_master import CbcdMstModel
@@ -38,7 +39,7 @@ class ShipmentBarcodeSaver:
         session = get_db_session()
         try:
             # デバッグ情報をログに出力
-            log_error(f"バーコード保存処理開始: 検索条件 base={base}, adp={adp}, lr={lr}, color={color}, proc_type={proc_type}, shipment_date={shipment_date}, destination={destination}, order_no={order_no}, shipment_status={shipment_status}, order_date={order_date}")
+            log_info(f"バーコード保存処理開始: 検索条件 base={base}, adp={adp}, lr={lr}, color={color}, proc_type={proc_type}, shipment_date={shipment_date}, destination={destination}, order_no={order_no}, shipment_status={shipment_status}, order_date={order_date}")
             
             # 出荷データを取得
             query = text("""
@@ -104,8 +105,8 @@ class ShipmentBarcodeSaver:
             query = text(str(query) + " ORDER BY BPRD.BPDD_LOT")
             
             # デバッグ情報をログに出力
-            log_error(f"SQLクエリ: {query}")
-            log_error(f"SQLパラメータ: {params}")
+            log_debug(f"SQLクエリ: {query}")
+            log_debug(f"SQLパラメータ: {params}")
             
             results = session.execute(query, params).fetchall()
             
@@ -113,7 +114,7 @@ class ShipmentBarcodeSaver:
                 return False, "保存対象のデータが見つかりません。"
             
             # デバッグ情報をログに出力
-            log_error(f"バーコード保存処理開始: 取得データ数={len(results)}")
+            log_info(f"バーコード保存処理開始: 取得データ数={len(results)}")
             
             # 出荷先の分布を確認するデバッグクエリ
             debug_query = text("""
@@ -124,15 +125,15 @@ class ShipmentBarcodeSaver:
                 ORDER BY BSHK_TO
             """)
             debug_results = session.execute(debug_query, {'bshk_flg_not_shipped': DatabaseConstants.BSHK_FLG_NOT_SHIPPED}).fetchall()
-            log_error(f"出荷先分布: {[(r.BSHK_TO, r.count) for r in debug_results]}")
+            log_debug(f"出荷先分布: {[(r.BSHK_TO, r.count) for r in debug_results]}")
             
             # 既存のバーコードデータを削除（BBCD_KBN=BFのみ）
             delete_count = session.execute(text("DELETE FROM BBCD_DAT WHERE BBCD_KBN = :bbcd_kbn"), {"bbcd_kbn": DatabaseConstants.BBCD_KBN_BF}).rowcount
-            log_error(f"区分{DatabaseConstants.BBCD_KBN_BF}の既存データ削除: {delete_count}件削除")
+            log_info(f"区分{DatabaseConstants.BBCD_KBN_BF}の既存データ削除: {delete_count}件削除")
             
             # 削除をコミット
             session.commit()
-            log_error(f"区分{DatabaseConstants.BBCD_KBN_BF}の既存データ削除完了")
+            log_debug(f"区分{DatabaseConstants.BBCD_KBN_BF}の既存データ削除完了")
             
             # バーコードデータを保存
             count = 1
@@ -163,7 +164,7 @@ class ShipmentBarcodeSaver:
                 
                 # デバッグ: 最初の数件のデータ詳細をログに出力
                 if count <= 5:
-                    log_error(f"処理データ{count}: LOT={lot}, 出荷先={syukasaki}, 製品ID={product_id}")
+                    log_debug(f"処理データ{count}: LOT={lot}, 出荷先={syukasaki}, 製品ID={product_id}")
                 
                 # 出荷先別のカウント
                 if int(syukasaki) == DatabaseConstants.ORDER_CMP_COLUMBUS:
@@ -220,7 +221,7 @@ class ShipmentBarcodeSaver:
                     count += 1
             
             # デバッグ情報をログに出力
-            log_error(f"バーコード保存処理完了: 保存件数={saved_count}, コロンバス={columbus_count}, ダラス={dallas_count}, ヤンガー={younger_count}, その他={other_count}")
+            log_info(f"バーコード保存処理完了: 保存件数={saved_count}, コロンバス={columbus_count}, ダラス={dallas_count}, ヤンガー={younger_count}, その他={other_count}")
             
             
             return True, f"バーコードデータを{saved_count}件保存しました。"
@@ -260,7 +261,7 @@ class ShipmentBarcodeSaver:
 
             # 既存のバーコードデータを削除（BBCD_KBN=一般のみ）
             delete_count = session.execute(text("DELETE FROM BBCD_DAT WHERE BBCD_KBN = :bbcd_kbn"), {"bbcd_kbn": DatabaseConstants.BBCD_KBN_COMMON}).rowcount
-            log_error(f"区分{DatabaseConstants.BBCD_KBN_COMMON}の既存データ削除: {delete_count}件削除")
+            log_info(f"区分{DatabaseConstants.BBCD_KBN_COMMON}の既存データ削除: {delete_count}件削除")
             session.commit()
 
             # バーコードデータを生成して保存
@@ -299,7 +300,7 @@ class ShipmentBarcodeSaver:
                                 session.commit()
                     else:
                         error_count += 1
-                        log_error(f"バーコードマスタデータなし: PRD_ID={shipment.get('CSHK_PRD_ID')}, TO={shipment.get('CSHK_TO')}")
+                        log_warning(f"バーコードマスタデータなし: PRD_ID={shipment.get('CSHK_PRD_ID')}, TO={shipment.get('CSHK_TO')}")
                 except Exception as e:
                     error_count += 1
                     log_error(f"バーコード生成エラー: {str(e)}")
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""レスポンスの圧縮（gzip / brotli）
+
+HTML・JSON などテキスト系のレスポンスを Accept-Encoding に応じて brotli
+（brotli パッケージがある場合）または gzip で圧縮する。ファイル送信・ストリーミング
+出力（PDF・CSV/Excel出力）は対象外。/metrics の送信サイズに圧縮後のサイズを
+記録するため、metrics より後に登録する。
+"""
+
+import gzip
+import os
+
+from flask import request
+
+from app import app
+from app.constants import HttpCacheConstants
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _get_int_env(name, default):
+    """整数の環境変数を取得する（不正な値は既定値）"""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+COMPRESS_MIN_SIZE = _get_int_env('HTTP_COMPRESS_MIN_SIZE', HttpCacheConstants.DEFAULT_COMPRESS_MIN_SIZE)
+
+
+def _choose_encoding():
+    """Accept-Encoding から圧縮方式を選ぶ（対応していなければ None）"""
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+@app.after_request
+def _compress_response(response):
+    if response.mimetype not in HttpCacheConstants.COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200 or request.method == 'HEAD'
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(data, quality=HttpCacheConstants.BROTLI_QUALITY))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=HttpCacheConstants.GZIP_LEVEL))
+    response.headers['Content-Encoding'] = encoding
+    # 圧縮後は内容が変わるため、ETagは弱い比較のみとする
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -110,6 +110,16 @@ class DatabaseConstants:
     PRD_FILM_COLOR_MAX_LENGTH = 20 # 膜カラー最大文字数
     PRD_DSP_NM_MAX_LENGTH = 70 # 表示名最大文字数
 
+    # 一括処理の設定（SQL Serverのパラメータ上限2100未満に収める）
+    SQL_IN_CHUNK = 1000        # IN句に渡す件数
+    SQL_MAX_PARAMS = 2000      # 複数行INSERT 1文あたりのパラメータ数の上限
+    SQL_MAX_VALUES_ROWS = 1000 # 複数行INSERT 1文あたりの行数の上限（SQL ServerのVALUES句は1000行まで）
+    BATCH_API_MAX_IDS = 1000   # 一括取得APIで1回に指定できるIDの件数
+    SQL_STREAM_ROWS = 500      # ストリーミング取得で1回に読み込む行数
+
+    # 一覧画面の表示件数（キーセット方式のページング）
+    PROCESS_REQUEST_PAGE_SIZE = 100  # 加工依頼一覧
+
     SHIPMENT_STATUS_LABELS = {
         BSHK_FLG_NOT_SHIPPED: "未出荷",
         BSHK_FLG_SHIPPED: "出荷済",
@@ -178,6 +188,17 @@ class CsvConstants:
     """CSV処理関連の定数"""
     # ノンコートCSVの列数
     CSV_NON_COAT_COLUMN_COUNT = 75
+    # バーコードCSVの列数（BBCD_ID, BBCD_NO, BBCD_NM）
+    CSV_BARCODE_COLUMN_COUNT = 3
+
+    # 文字コードの候補（判別は先頭から順に試す）
+    ENCODINGS = ['utf-8-sig', 'utf-8', 'shift-jis', 'cp932']
+    # 文字コード判別に使う先頭部分のサイズ（バイト）
+    ENCODING_SAMPLE_BYTES = 64 * 1024
+
+    # 一括登録の設定
+    IMPORT_COMMIT_ROWS = 1000   # コミット・進捗出力の間隔（行）
+    IMPORT_LOOKUP_CHUNK = 1000  # 既存データ検索のIN句に渡す件数（SQL Serverのパラメータ上限2100未満）
 
 # =============================================================================
 # PDF関連定数
@@ -214,6 +235,249 @@ class PdfConstants:
     LABEL_ORDER_NO = '注文番号'
     LABEL_SHIPMENT_STATUS = '出荷状況'
 
+    # 加工依頼書の一括出力（加工先ごとのPDFを並列で作成してZIPにまとめる）
+    DEFAULT_EXPORT_WORKERS = 0  # 並列数の既定値（0: CPUコア数、環境変数 PDF_EXPORT_WORKERS で変更）
+    PROCESS_REQUEST_ZIP_NAME = 'process_request.zip'
+
+# =============================================================================
+# DB接続関連定数
+# =============================================================================
+class DbEngineConstants:
+    """接続先データベースの種類（環境変数DB_ENGINEで切り替え）"""
+    ENGINE_MSSQL = 'mssql'    # SQL Server（本番）
+    ENGINE_SQLITE = 'sqlite'  # SQLite（ローカル検証・ベンチマーク用）
+    DEFAULT_SQLITE_PATH = ':memory:'  # DB_SQLITE_PATH 未指定時はインメモリ
+
+    # 集計用（参照専用）の接続先。DB_REPORT_SERVER（SQLiteは DB_REPORT_SQLITE_PATH）指定時のみ使用
+    DEFAULT_REPORT_POOL_SIZE = 3       # DB_REPORT_POOL_SIZE
+    DEFAULT_REPORT_MAX_OVERFLOW = 5    # DB_REPORT_MAX_OVERFLOW
+    REPORT_LOGIN_TIMEOUT = 5           # 接続できない場合に本番DBへ切り替えるまでの秒数
+
+# =============================================================================
+# ログ関連定数
+# =============================================================================
+class LogConstants:
+    """ログ出力関連の定数（.envで上書き可能）"""
+    LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    DEFAULT_LOG_FILE = 'app.log'           # LOG_FILE
+    DEFAULT_PER_PROCESS = 'true'           # LOG_PER_PROCESS（プロセスごとのファイルに出力するか）
+    DEFAULT_MAX_BYTES = 10 * 1024 * 1024   # LOG_MAX_BYTES（ローテーションサイズ）
+    DEFAULT_BACKUP_COUNT = 5               # LOG_BACKUP_COUNT（世代数）
+    DEFAULT_ROW_SAMPLE_FIRST = 5           # LOG_ROW_SAMPLE_FIRST（詳細を出力する先頭行数）
+    DEFAULT_ROW_SAMPLE_EVERY = 500         # LOG_ROW_SAMPLE_EVERY（以降の詳細出力間隔）
+
+    # LOG_LEVEL の値とログレベルの対応
+    LOG_LEVELS = {
+        'debug': 10,
+        'info': 20,
+        'warning': 30,
+        'error': 40,
+        'critical': 50
+    }
+
+# =============================================================================
+# キャッシュ関連定数
+# =============================================================================
+class CacheConstants:
+    """集計キャッシュ関連の定数"""
+    # 加工状況マトリックス（グラデーション）
+    GRADATION_MATRIX_CACHE_FILE = 'gradation_matrix_cache.json'      # 計算結果
+    # 参照するテーブル（TableVersion のデータバージョンでキャッシュの鮮度を判定する）
+    GRADATION_MATRIX_TABLES = ('GPRR_DAT', 'GPRC_DAT', 'GSHK_DAT', 'KBN_MST')
+    # 最大保持秒数（0は無期限、環境変数GRADATION_MATRIX_MAX_AGEで上書き）
+    # データバージョンは本アプリからの更新でのみ更新されるため、SQL・他システムからの
+    # 更新も一定時間で反映されるよう有限にする
+    GRADATION_MATRIX_DEFAULT_MAX_AGE = 600
+
+# =============================================================================
+# 条件付きGET・圧縮関連定数
+# =============================================================================
+class HttpCacheConstants:
+    """一覧画面・APIの条件付きGET（ETag/Last-Modified）とレスポンス圧縮の定数（.envで上書き可能）"""
+    TABLE_VERSION_DIR = 'table_versions'  # テーブルごとのデータバージョン（app/data 配下）
+    # HTTP_CACHE_MAX_AGE（秒）。この間隔でETagを切り替える。本アプリ以外からの更新の反映と、
+    # 画面に埋め込んだCSRFトークンの有効期限（3600秒）切れを防ぐため、3600秒より短くする
+    DEFAULT_MAX_AGE = 1800
+    DEFAULT_COMPRESS_MIN_SIZE = 500       # HTTP_COMPRESS_MIN_SIZE（これより小さいレスポンスは圧縮しない）
+    GZIP_LEVEL = 6
+    BROTLI_QUALITY = 5                    # brotli パッケージがある場合のみ使用
+    COMPRESSIBLE_MIMETYPES = {
+        'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+        'application/javascript', 'application/json'
+    }
+
+# =============================================================================
+# 一覧出力（CSV・Excel）関連定数
+# =============================================================================
+class ExportConstants:
+    """一覧のCSV・Excelストリーミング出力関連の定数"""
+    FORMAT_CSV = 'csv'
+    FORMAT_XLSX = 'xlsx'
+    MIMETYPES = {
+        FORMAT_CSV: 'text/csv',
+        FORMAT_XLSX: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    }
+    CSV_ENCODING = 'utf-8-sig'         # Excelで文字化けしないようBOM付きUTF-8
+    STREAM_CHUNK_BYTES = 64 * 1024     # レスポンスに書き出す単位（バイト）
+
+    # 出力列（見出し, 行のキー）
+    SHIPMENT_LIST_COLUMNS = [
+        ('出荷ID', 'CSHK_ID'),
+        ('出荷日', 'CSHK_DT'),
+        ('手配日', 'CSHK_ORD_DT'),
+        ('出荷先', 'SHIPMENT_TO_NAME'),
+        ('製品名', 'PRD_DSP_NM'),
+        ('製品ID', 'CSHK_PRD_ID'),
+        ('LOT', 'CPDD_LOT_TEXT'),
+        ('ランク', 'RANK_NAME'),
+        ('出荷数量', 'CSHK_QTY'),
+    ]
+    CPRD_LIST_COLUMNS = [
+        ('入庫ID', 'CPDD_ID'),
+        ('製品ID', 'CPDD_PRD_ID'),
+        ('製品名', 'PRD_DSP_NM'),
+        ('LOT', 'CPDD_LOT'),
+        ('分割1', 'CPDD_SPRIT1'),
+        ('分割2', 'CPDD_SPRIT2'),
+        ('ランク', 'RANK_NAME'),
+        ('入庫数量', 'CPDD_QTY'),
+        ('在庫残', 'ZAIKO_ZAN'),
+    ]
+    STOCK_SUMMARY_COLUMNS = [
+        ('製品ID', 'CPDD_PRD_ID'),
+        ('製品名', 'PRD_DSP_NM'),
+        ('ランク', 'RANK_NAME'),
+        ('在庫件数', 'STOCK_COUNT'),
+        ('在庫残数合計', 'TOTAL_ZAIKO_ZAN'),
+    ]
+
+    # ファイル名（ASCII名, 日本語名）とシート名
+    SHIPMENT_LIST_FILE = ('shipment_list', '出荷一覧')
+    CPRD_LIST_FILE = ('cprd_list', '入庫データ一覧')
+    STOCK_SUMMARY_FILE = ('stock_summary', '在庫集計')
+
+# =============================================================================
+# 取込ジョブ関連定数
+# =============================================================================
+class ImportJobConstants:
+    """CSV・Excel取込の非同期ジョブ関連の定数（.envで上書き可能）"""
+    DEFAULT_JOB_DIR = 'import_jobs'   # IMPORT_JOB_DIR（app/data 配下）
+    DEFAULT_WORKERS = 2               # IMPORT_JOB_WORKERS（1プロセスあたりの同時実行数）
+    DEFAULT_MAX_HISTORY = 100         # IMPORT_JOB_MAX_HISTORY（保持する履歴の件数）
+    PROGRESS_INTERVAL_SEC = 0.5       # 進捗ファイルの更新間隔（秒）
+    PROGRESS_ROWS = 200               # 取込処理から進捗を通知する間隔（行）
+    RECENT_ERROR_COUNT = 5            # 進捗に含める直近のエラー件数
+    HEARTBEAT_INTERVAL_SEC = 10       # 待機中・実行中ジョブの heartbeat_at の更新間隔（秒）
+    HEARTBEAT_TIMEOUT_SEC = 60        # heartbeat_at の更新がこの秒数途絶えたジョブは失敗とする
+
+    # ジョブの状態
+    STATUS_QUEUED = 'queued'          # 待機中
+    STATUS_RUNNING = 'running'        # 実行中
+    STATUS_COMPLETED = 'completed'    # 完了
+    STATUS_FAILED = 'failed'          # 失敗
+    STATUS_LABELS = {
+        STATUS_QUEUED: '待機中',
+        STATUS_RUNNING: '実行中',
+        STATUS_COMPLETED: '完了',
+        STATUS_FAILED: '失敗'
+    }
+
+    # ジョブの種類（取込処理）と表示名・戻り先
+    KIND_NONCOAT_CSV = 'noncoat_csv'
+    KIND_BARCODE_CSV = 'barcode_csv'
+    KIND_COMMON_CSV = 'common_csv'
+    KIND_HARDCOAT_EXCEL = 'hardcoat_excel'
+    KIND_LABELS = {
+        KIND_NONCOAT_CSV: 'ノンコートCSV取込',
+        KIND_BARCODE_CSV: 'バーコードCSV取込',
+        KIND_COMMON_CSV: '一般CSV取込',
+        KIND_HARDCOAT_EXCEL: 'ハードコート在庫Excel取込'
+    }
+    KIND_RETURN_ENDPOINTS = {
+        KIND_NONCOAT_CSV: 'import_csv',
+        KIND_BARCODE_CSV: 'barcode_import',
+        KIND_COMMON_CSV: 'common.csv_import_common',
+        KIND_HARDCOAT_EXCEL: 'hardcoat_read_excel'
+    }
+
+# =============================================================================
+# 受注取込関連定数
+# =============================================================================
+class OrderImportConstants:
+    """受注ファイル（CSV・Excel）取込の定数"""
+    DEFAULT_UPLOAD_DIR = 'order_import'  # 確認中のファイルの保存先（app/data 配下）
+    UPLOAD_MAX_AGE_SEC = 24 * 60 * 60    # 取込実行されなかったファイルを削除するまでの秒数
+
+    # 列の位置（0始まり）
+    COL_ORDER_DATE = 0   # 受注日
+    COL_ORDER_NO = 1     # 注文番号
+    COL_SHIP_TO = 2      # 出荷先ID（CZTR_ID）
+    COL_PROC = 3         # 加工区分（0/1 または NC/HC）
+    COL_PRD_CODE = 4     # 製品コード（製品ID・サンレー品番・ヤンガーBCD/GTIN、空欄ならベース以降で特定）
+    COL_BASE = 5         # ベース
+    COL_ADP = 6          # 加入度数
+    COL_LR = 7           # L/R
+    COL_CLR = 8          # 色
+    COL_QTY = 9          # 数量（0は既存明細の削除）
+    COLUMN_COUNT = 10
+
+    # 加工区分の表記
+    PROC_ALIASES = {
+        '0': 0, 'NC': 0, 'ノンコート': 0,
+        '1': 1, 'HC': 1, 'ハードコート': 1
+    }
+
+    # 明細ごとの処理内容
+    ACTION_INSERT = 'insert'        # 新規登録
+    ACTION_UPDATE = 'update'        # 数量変更
+    ACTION_DELETE = 'delete'        # 削除
+    ACTION_UNCHANGED = 'unchanged'  # 変更なし
+    ACTION_ERROR = 'error'          # エラー（取り込まない）
+    ACTION_LABELS = {
+        ACTION_INSERT: '新規',
+        ACTION_UPDATE: '変更',
+        ACTION_DELETE: '削除',
+        ACTION_UNCHANGED: '変更なし',
+        ACTION_ERROR: 'エラー'
+    }
+
+# =============================================================================
+# メトリクス関連定数
+# =============================================================================
+class MetricsConstants:
+    """/metrics（Prometheus形式）関連の定数"""
+    METRIC_PREFIX = 'bfzaiko'
+
+    # 画面の種類ごとのレイテンシ区間（秒）。エンドポイント名に含まれる語で分類する
+    GROUP_DEFAULT = 'page'
+    GROUP_KEYWORDS = [
+        ('matrix', 'matrix'),   # 集計マトリックス
+        ('pdf', 'pdf'),         # PDF出力
+        ('import', 'import'),   # CSV・Excel取込
+    ]
+    LATENCY_BUCKETS = {
+        'page': (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+        'matrix': (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0),
+        'pdf': (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0),
+        'import': (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+    }
+    DB_TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    STATEMENT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+    SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# =============================================================================
+# プロファイル関連定数
+# =============================================================================
+class ProfileConstants:
+    """リクエスト単位のプロファイル取得の定数（.envで上書き可能）"""
+    DEFAULT_PROFILE_DIR = 'profiles'  # PROFILE_DIR（プロジェクト直下）
+    DEFAULT_SAMPLE_RATE = 0.0         # PROFILE_SAMPLE_RATE（0〜1。0は自動取得しない）
+    DEFAULT_MAX_FILES = 200           # PROFILE_MAX_FILES（超えた分は古い順に削除）
+    # PROFILE_ADMIN_USERS（カンマ区切りのユーザーID）のユーザーは以下で取得を指示できる
+    REQUEST_HEADER = 'X-Profile'      # ヘッダー（値が1）
+    QUERY_PARAM = '_profile'          # クエリ文字列（?_profile=1）
+    FILE_EXTENSION = '.prof'          # pstats形式
+
 # =============================================================================
 # フォーム選択肢定数
 # =============================================================================
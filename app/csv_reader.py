@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""CSV取込の共通読み込み処理
+
+文字コードはファイル先頭の一部（CsvConstants.ENCODING_SAMPLE_BYTES）だけで判別し、
+本体は1行ずつ変換しながら読み進める（ファイル全体を候補の文字コードごとに
+読み直さない）。先頭がASCIIのみで途中から日本語が現れる場合など、判別した
+文字コードで変換できない行があれば、候補の後ろの文字コードに切り替えて読み続ける。
+
+使用例:
+    with CsvReader(file_path, has_header=True, min_columns=3) as reader:
+        for record in reader:
+            if record.error:
+                ...  # 列数不足・文字コード不正の行
+            bcd_id = record.text(0)
+"""
+
+import codecs
+import csv
+
+from app.constants import CsvConstants
+from app.logger_utils import log_warning
+
+
+class CsvReadError(Exception):
+    """CSVファイル全体が読み込めない場合のエラー"""
+
+
+class CsvRecord:
+    """CSVの1行分のデータ"""
+
+    __slots__ = ('row_no', 'values', 'error')
+
+    def __init__(self, row_no, values, error=None):
+        self.row_no = row_no    # データ行の番号（ヘッダー行を除き1始まり）
+        self.values = values    # 列の値（文字列のリスト）
+        self.error = error      # 列数不足・文字コード不正の場合のエラーメッセージ
+
+    def __len__(self):
+        return len(self.values)
+
+    def text(self, index, default=''):
+        """列の値を前後の空白を除いて返す（列がない場合は既定値）"""
+        if index >= len(self.values) or self.values[index] is None:
+            return default
+        return self.values[index].strip()
+
+    def int(self, index, default='0'):
+        """列の値を整数で返す（数値でない場合は ValueError）"""
+        return int(self.text(index, default))
+
+
+def detect_encoding(sample, encodings=None):
+    """ファイル先頭のバイト列から文字コードを判別する
+
+    Args:
+        sample (bytes): ファイル先頭のバイト列
+        encodings (list): 文字コードの候補（先頭から順に試す）
+
+    Returns:
+        str: 文字コード（判別できない場合はNone）
+    """
+    encodings = encodings or CsvConstants.ENCODINGS
+    for encoding in encodings:
+        try:
+            # 末尾で途切れた多バイト文字はエラーにしない（final=False）
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+class CsvReader:
+    """文字コードを判別し、1行ずつ変換しながらCSVを読み込む
+
+    Args:
+        file_path (str): CSVファイルのパス
+        has_header (bool): 1行目がヘッダー行かどうか
+        min_columns (int): 必要な列数（不足する行は error 付きで返す）
+        encodings (list): 文字コードの候補
+    """
+
+    def __init__(self, file_path, has_header=False, min_columns=0, encodings=None):
+        self.file_path = file_path
+        self.has_header = has_header
+        self.min_columns = min_columns
+        self.encodings = list(encodings or CsvConstants.ENCODINGS)
+        self.encoding = None
+        self._file = None
+        self._invalid_line = False
+
+    def __enter__(self):
+        self._file = open(self.file_path, 'rb')
+        sample = self._file.read(CsvConstants.ENCODING_SAMPLE_BYTES)
+        if len(sample) == CsvConstants.ENCODING_SAMPLE_BYTES and b'\n' in sample:
+            # 判別は完結した行までで行う
+            sample = sample[:sample.rindex(b'\n') + 1]
+        self.encoding = detect_encoding(sample, self.encodings)
+        if not self.encoding:
+            self.close()
+            raise CsvReadError("CSVファイルのエンコーディングを判別できませんでした")
+        self._file.seek(0)
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _decode_lines(self):
+        """1行ずつ文字列に変換する（対象の文字コードでは改行コードが他の文字の一部にならない）"""
+        first = True
+        for line in self._file:
+            if first and self.encoding == 'utf-8-sig':
+                line = line[len(codecs.BOM_UTF8):] if line.startswith(codecs.BOM_UTF8) else line
+            first = False
+            try:
+                yield line.decode(self._line_encoding())
+                continue
+            except UnicodeDecodeError:
+                pass
+            decoded = self._switch_encoding(line)
+            if decoded is None:
+                self._invalid_line = True
+                decoded = line.decode(self._line_encoding(), errors='replace')
+            yield decoded
+
+    def _line_encoding(self):
+        # BOMは先頭行で取り除くため、以降の行は utf-8 として変換する
+        return 'utf-8' if self.encoding == 'utf-8-sig' else self.encoding
+
+    def _switch_encoding(self, line):
+        """変換できない行があれば、候補の後ろの文字コードで変換できるものに切り替える"""
+        start = self.encodings.index(self.encoding) + 1 if self.encoding in self.encodings else 0
+        for encoding in self.encodings[start:]:
+            try:
+                decoded = line.decode(encoding)
+            except UnicodeDecodeError:
+                continue
+            log_warning(f"CSVの文字コードを {self.encoding} から {encoding} に切り替えました")
+            self.encoding = encoding
+            return decoded
+        return None
+
+    def __iter__(self):
+        if self._file is None:
+            raise CsvReadError("CSVファイルが開かれていません")
+        csv_reader = csv.reader(self._decode_lines())
+
+        # ヘッダー行をスキップ
+        if self.has_header:
+            try:
+                next(csv_reader)
+            except StopIteration:
+                raise CsvReadError("CSVファイルにデータがありません")
+            self._invalid_line = False
+
+        for i, row in enumerate(csv_reader):
+            error = None
+            if self._invalid_line:
+                error = f"行 {i+1}: 文字コードを変換できない文字が含まれています"
+                self._invalid_line = False
+            elif len(row) < self.min_columns:
+                error = f"行 {i+1}: 必要な列数がありません（{len(row)}列、最低{self.min_columns}列必要）"
+            yield CsvRecord(i + 1, row, error)
@@ -1,12 +1,16 @@
 import os
 import sys
+import inspect
+from contextvars import ContextVar
+from functools import wraps
 from dotenv import load_dotenv
 import logging
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
 
-from app.constants import ErrorMessages
+from app.constants import ErrorMessages, DatabaseConstants, DbEngineConstants
 
 # 環境変数を読み込む
 if getattr(sys, 'frozen', False):
@@ -16,37 +20,82 @@ if getattr(sys, 'frozen', False):
 else:
     load_dotenv()
 
-# データベース接続設定
-server = os.getenv('DB_SERVER')
-database = os.getenv('DB_NAME')
-username = os.getenv('DB_USER')
-password = os.getenv('DB_PASSWORD')
-
-# 必要な設定が揃っているか確認
-if not all([server, database, username, password]):
-    raise ValueError(ErrorMessages.DB_CONFIG_INCOMPLETE)
+# 接続先の種類（mssql: SQL Server、sqlite: ローカル検証用のSQLite）
+db_engine = os.getenv('DB_ENGINE', DbEngineConstants.ENGINE_MSSQL).strip().lower()
 
 # SQLAlchemy用のベースクラス
 Base = declarative_base()
 
-# SQLAlchemy接続エンジンの作成
-connection_string = f"mssql+pymssql://{username}:{password}@{server}/{database}"
+if db_engine == DbEngineConstants.ENGINE_SQLITE:
+    # SQL Server なしでモデルのメソッドを実行・計測するための代替DB
+    from app.sqlite_standin import create_sqlite_engine
+    engine = create_sqlite_engine(os.getenv('DB_SQLITE_PATH', DbEngineConstants.DEFAULT_SQLITE_PATH))
+else:
+    # データベース接続設定
+    server = os.getenv('DB_SERVER')
+    database = os.getenv('DB_NAME')
+    username = os.getenv('DB_USER')
+    password = os.getenv('DB_PASSWORD')
+
+    # 必要な設定が揃っているか確認
+    if not all([server, database, username, password]):
+        raise ValueError(ErrorMessages.DB_CONFIG_INCOMPLETE)
+
+    # SQLAlchemy接続エンジンの作成
+    connection_string = f"mssql+pymssql://{username}:{password}@{server}/{database}"
+
+    engine = create_engine(
+        connection_string,
+        echo=False,
+        pool_size=5, 
+        max_overflow=10,
+        pool_recycle=3600,
+        connect_args={'charset': 'UTF-8', 'autocommit': False}
+    )
 
-engine = create_engine(
-    connection_string,
-    echo=False,
-    pool_size=5, 
-    max_overflow=10,
-    pool_recycle=3600,
-    connect_args={'charset': 'UTF-8', 'autocommit': False}
-)
+# 集計用（参照専用）の接続先。未設定の場合は本番の接続先を使う
+report_engine = None
+if db_engine == DbEngineConstants.ENGINE_SQLITE:
+    report_sqlite_path = os.getenv('DB_REPORT_SQLITE_PATH')
+    if report_sqlite_path:
+        report_engine = create_sqlite_engine(report_sqlite_path)
+elif os.getenv('DB_REPORT_SERVER'):
+    # 読み取りレプリカ等。DB名・ユーザー・パスワードは未指定なら本番と同じ
+    report_connection_string = (
+        f"mssql+pymssql://{os.getenv('DB_REPORT_USER', username)}:{os.getenv('DB_REPORT_PASSWORD', password)}"
+        f"@{os.getenv('DB_REPORT_SERVER')}/{os.getenv('DB_REPORT_NAME', database)}"
+    )
+
+    # 集計の同時実行が出荷登録などの接続を使い切らないよう、別の接続プールにする
+    report_engine = create_engine(
+        report_connection_string,
+        echo=False,
+        pool_size=int(os.getenv('DB_REPORT_POOL_SIZE', DbEngineConstants.DEFAULT_REPORT_POOL_SIZE)),
+        max_overflow=int(os.getenv('DB_REPORT_MAX_OVERFLOW', DbEngineConstants.DEFAULT_REPORT_MAX_OVERFLOW)),
+        pool_recycle=3600,
+        pool_pre_ping=True,
+        connect_args={'charset': 'UTF-8', 'autocommit': False,
+                      'login_timeout': DbEngineConstants.REPORT_LOGIN_TIMEOUT}
+    )
 
 # セッションファクトリの作成
 session_factory = sessionmaker(bind=engine)
 Session = scoped_session(session_factory)
+ReportSession = scoped_session(sessionmaker(bind=report_engine)) if report_engine is not None else None
+
+# use_report_db を付けたメソッドの実行中かどうか
+_use_report_db = ContextVar('use_report_db', default=False)
 
 def get_db_session():
-    """データベースセッションを取得する"""
+    """データベースセッションを取得する
+
+    use_report_db を付けたメソッドの中では集計用の接続先のセッションを返す。
+    集計用の接続先が未設定、または接続できない場合は本番の接続先を使う。
+    """
+    if _use_report_db.get() and ReportSession is not None:
+        session = get_report_session()
+        if session is not None:
+            return session
     try:
         session = Session()
         return session
@@ -55,6 +104,155 @@ def get_db_session():
         Session.remove()
         raise Exception(f"{ErrorMessages.DB_SESSION_ERROR}: {str(e)}")
 
+def get_report_session():
+    """集計用の接続先のセッションを取得する（接続できない場合は None）"""
+    try:
+        session = ReportSession()
+        # 接続できるかをここで確認し、だめなら呼び出し元で本番の接続先に切り替える
+        session.connection()
+        return session
+    except OperationalError as e:
+        logging.warning(f"集計用データベースに接続できないため本番データベースを使用します: {str(e)}")
+        ReportSession.remove()
+        return None
+
+def use_report_db(func):
+    """参照専用の集計メソッドを集計用の接続先で実行するデコレータ
+
+    実行中に get_db_session() で取得するセッションが集計用の接続先になる。
+    ジェネレータの場合は、行を読み込んでいる間だけ切り替える。
+    集計用の接続先は本番より遅れて反映される場合があるため、データバージョンを
+    キーにして結果を保持するもの（加工状況マトリックスのキャッシュ、
+    cache_by_data_version の画面・API）の集計には使わない。
+    """
+    if inspect.isgeneratorfunction(func):
+        @wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            rows = func(*args, **kwargs)
+            try:
+                while True:
+                    token = _use_report_db.set(True)
+                    try:
+                        row = next(rows)
+                    except StopIteration:
+                        return
+                    finally:
+                        _use_report_db.reset(token)
+                    yield row
+            finally:
+                rows.close()
+        return generator_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _use_report_db.set(True)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _use_report_db.reset(token)
+    return wrapper
+
 def get_db_connection():
     """従来のpymssql接続と互換性のある関数（非推奨）"""
-    return engine.raw_connection() 
\ No newline at end of file
+    return engine.raw_connection()
+
+def in_clause_params(prefix, values):
+    """IN句のプレースホルダーとパラメータを作成する
+    
+    Args:
+        prefix (str): パラメータ名の接頭辞
+        values (list): IN句に渡す値（DatabaseConstants.SQL_IN_CHUNK 件以下）
+    
+    Returns:
+        tuple: (":prefix0, :prefix1, ..." の文字列, パラメータのdict)
+    """
+    params = {f"{prefix}{n}": value for n, value in enumerate(values)}
+    return ', '.join(':' + name for name in params), params
+
+def insert_rows(session, table_name, rows):
+    """複数行INSERTでまとめて登録する（パラメータ数の上限ごとに文を分ける）
+    
+    Args:
+        session: データベースセッション
+        table_name (str): テーブル名
+        rows (list): 登録する行（列名→値のdict、全行で同じ列）
+    """
+    if not rows:
+        return
+    columns = list(rows[0])
+    rows_per_statement = max(1, min(DatabaseConstants.SQL_MAX_VALUES_ROWS,
+                                    DatabaseConstants.SQL_MAX_PARAMS // len(columns)))
+    for offset in range(0, len(rows), rows_per_statement):
+        chunk = rows[offset:offset + rows_per_statement]
+        params = {f"{column}_{n}": row[column] for n, row in enumerate(chunk) for column in columns}
+        values = ', '.join(
+            '(' + ', '.join(f":{column}_{n}" for column in columns) + ')' for n in range(len(chunk)))
+        session.execute(text(f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES {values}"), params)
+
+def insert_returning_ids(session, table_name, id_column, rows):
+    """登録と採番されたIDの取得を1文で行う（複数行の場合は登録順のIDを返す）
+    
+    SQL Server は INSERT ... OUTPUT INSERTED.<ID列> を使う。複数行の場合、OUTPUT の
+    出力順は保証されないため、MERGE で行番号を一緒に出力して登録順に並べ直す。
+    SQLite（検証用）は RETURNING を使い、1文内で昇順に採番されるIDを並べ直す。
+    IDENT_CURRENT と違い、他の接続による同時登録の影響を受けない。
+    
+    Args:
+        session: データベースセッション
+        table_name (str): テーブル名
+        id_column (str): IDENTITY列の列名
+        rows (list): 登録する行（列名→値のdict、全行で同じ列）
+    
+    Returns:
+        list: 採番されたID（rows と同じ順）
+    """
+    if not rows:
+        return []
+    columns = list(rows[0])
+    column_list = ', '.join(columns)
+    is_mssql = session.get_bind().dialect.name == DbEngineConstants.ENGINE_MSSQL
+    # 行番号の列の分も含めてパラメータ数の上限に収める
+    rows_per_statement = max(1, min(DatabaseConstants.SQL_MAX_VALUES_ROWS,
+                                    DatabaseConstants.SQL_MAX_PARAMS // (len(columns) + 1)))
+    ids = []
+    for offset in range(0, len(rows), rows_per_statement):
+        chunk = rows[offset:offset + rows_per_statement]
+        params = {f"{column}_{n}": row[column] for n, row in enumerate(chunk) for column in columns}
+        if is_mssql and len(chunk) > 1:
+            values = ', '.join(
+                '(' + ', '.join([f":{column}_{n}" for column in columns] + [str(n)]) + ')'
+                for n in range(len(chunk)))
+            sql = f"""
+                MERGE INTO {table_name}
+                USING (VALUES {values}) AS SRC ({column_list}, ROW_SEQ)
+                ON 1 = 0
+                WHEN NOT MATCHED THEN
+                    INSERT ({column_list})
+                    VALUES ({', '.join('SRC.' + column for column in columns)})
+                OUTPUT SRC.ROW_SEQ, INSERTED.{id_column};
+            """
+            result = sorted(session.execute(text(sql), params).fetchall(), key=lambda r: r[0])
+            ids.extend(int(r[1]) for r in result)
+            continue
+        values = ', '.join(
+            '(' + ', '.join(f":{column}_{n}" for column in columns) + ')' for n in range(len(chunk)))
+        if is_mssql:
+            sql = f"INSERT INTO {table_name} ({column_list}) OUTPUT INSERTED.{id_column} VALUES {values}"
+        else:
+            sql = f"INSERT INTO {table_name} ({column_list}) VALUES {values} RETURNING {id_column}"
+        ids.extend(sorted(int(r[0]) for r in session.execute(text(sql), params).fetchall()))
+    return ids
+
+def insert_returning_id(session, table_name, id_column, row):
+    """1行を登録し、採番されたIDを返す
+    
+    Args:
+        session: データベースセッション
+        table_name (str): テーブル名
+        id_column (str): IDENTITY列の列名
+        row (dict): 登録する行（列名→値）
+    
+    Returns:
+        int: 採番されたID
+    """
+    return insert_returning_ids(session, table_name, id_column, [row])[0]
@@ -1,7 +1,5 @@
 import os
 from dotenv import load_dotenv
-import openpyxl
-from openpyxl.utils import get_column_letter
 import shutil
 from datetime import datetime
 import traceback
@@ -17,6 +15,9 @@ def write_to_proc_excel(shipment_date, data, output_dir=None):
         data: 書き込むデータ
         output_dir: 出力先ディレクトリ（指定がない場合は日付フォルダに保存）
     """
+    # openpyxlは読み込みが重いため、使用時に読み込む
+    import openpyxl
+
     try:
         # .envファイルの読み込み
         load_dotenv()
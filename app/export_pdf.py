@@ -1,15 +1,17 @@
 from reportlab.pdfgen import canvas
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.platypus import Table, TableStyle, SimpleDocTemplate, Paragraph, Spacer, PageBreak, PageTemplate, Frame, NextPageTemplate
 from reportlab.lib.units import mm
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from io import BytesIO
+import multiprocessing
 import os
-import platform
+import threading
 import traceback
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 
 from app.models import log_error
@@ -18,6 +20,7 @@ from app.models_common import CshkDatModel
 from app.models_master import CztrMstModel
 from app.document_number_manager import DocumentNumberManager
 from app.shipment_common import ShipmentCommon
+from process_request_pdf import get_japanese_font, render_process_request_pdf
 
 
 def create_header_footer_template(header_info, doc_number, font_name, total_pages=None):
@@ -79,64 +82,6 @@ def create_header_footer_template(header_info, doc_number, font_name, total_page
     
     return header_footer
 
-def get_japanese_font():
-    """プラットフォームに応じて日本語フォントを取得する"""
-    system = platform.system()
-    
-    # フォント候補リスト（日本語対応のもののみ）
-    font_candidates = []
-    
-    if system == "Windows":
-        font_candidates = [
-            ('C:\\Windows\\Fonts\\msgothic.ttc', 'MSGothic'),
-            ('C:\\Windows\\Fonts\\msgothic.ttf', 'MSGothic'),
-            ('C:\\Windows\\Fonts\\yugothic.ttf', 'YuGothic'),
-            ('C:\\Windows\\Fonts\\yugothib.ttf', 'YuGothic'),
-            ('C:\\Windows\\Fonts\\meiryo.ttc', 'Meiryo'),
-        ]
-    elif system == "Darwin":  # macOS
-        font_candidates = [
-            ('/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc', 'HiraginoSans'),
-            ('/Library/Fonts/ヒラギノ角ゴ ProN W3.otf', 'HiraginoSans'),
-            ('/System/Library/Fonts/Arial Unicode MS.ttf', 'ArialUnicodeMS'),
-        ]
-    else:  # Linux and others
-        font_candidates = [
-            # Noto CJK フォント（日本語対応）
-            ('/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc', 'NotoSansCJK'),
-            ('/usr/share/fonts/truetype/noto-cjk/NotoSansCJK-Regular.ttc', 'NotoSansCJK'),
-            ('/usr/share/fonts/opentype/noto/NotoSerifCJK-Regular.ttc', 'NotoSerifCJK'),
-            # IPAフォント（日本語対応）- インストール済み
-            ('/usr/share/fonts/truetype/fonts-japanese-gothic.ttf', 'IPAGothic'),
-            ('/usr/share/fonts/opentype/ipafont-gothic/ipag.ttf', 'IPAGothic'),
-            ('/usr/share/fonts/opentype/ipafont-mincho/ipam.ttf', 'IPAMincho'),
-            # その他の日本語フォント候補
-            ('/usr/share/fonts/truetype/vlgothic/VL-Gothic-Regular.ttf', 'VLGothic'),
-        ]
-    
-    # フォントファイルの存在確認と登録
-    for font_path, font_name in font_candidates:
-        if os.path.exists(font_path):
-            try:
-                pdfmetrics.registerFont(TTFont(font_name, font_path))
-                print(f"日本語フォントを登録しました: {font_name} ({font_path})")
-                return font_name
-            except Exception as e:
-                print(f"フォント登録に失敗: {font_name} - {str(e)}")
-                continue
-    
-    # 日本語フォントが見つからない場合はエラーを発生
-    error_msg = f"日本語対応フォントが見つかりません。プラットフォーム: {system}"
-    print(error_msg)
-    
-    if system == "Linux":
-        print("以下のコマンドで日本語フォントをインストールしてください:")
-        print("Ubuntu/Debian: sudo apt-get install fonts-noto-cjk fonts-ipafont-gothic")
-        print("CentOS/RHEL: sudo yum install google-noto-cjk-fonts ipa-gothic-fonts")
-        print("または: sudo dnf install google-noto-cjk-fonts ipa-gothic-fonts")
-    
-    raise Exception(f"日本語対応フォントが利用できません。適切なフォントをインストールしてください。({system})")
-
 def shipment_export_pdf(shipments):
     """出荷データをPDFで出力する"""
     try:
@@ -433,11 +378,28 @@ def hardcoat_stock_export_pdf(stocks):
         
         raise Exception(f'PDFファイルの作成に失敗しました: {str(e)}')
 
+def _process_request_detail(req):
+    """加工依頼一覧の1行を加工依頼書の明細に変換する"""
+    return {
+        'CPRC_PRD_NM': req.get('CPRC_PRD_NM', ''),
+        'CPDD_LOT': req.get('CPDD_LOT', ''),
+        'CSHK_QTY': req.get('CSHK_QTY', 0),
+        'CPRC_NM': req.get('CPRC_NM', '')
+    }
+
+def _process_request_header_info(req):
+    """加工依頼一覧の1行から加工依頼書のヘッダー用の取引先情報を取得する"""
+    return {
+        'CZTR_FULL_NM': req.get('PRC_TO_FULL_NM', ''),
+        'CZTR_TANTO_NM': req.get('PRC_TO_TANTO_NM', '')
+    }
+
 def process_request_export_pdf(date_from=None, date_to=None, prd_id=None, prc_id=None, cztr_id=None, return_status=None):
     """加工依頼書PDFを出力する"""
     try:
-        # 検索条件に基づいて明細データ取得（PDF出力用）
-        process_request_list = ShipmentCommon.get_process_request_list_for_pdf(
+        # 検索条件に基づいて明細データを1行ずつ読み込み、PDF用に整形する
+        # （取引先のチェック・ヘッダー情報の取得も同じ読み込みの中で行う）
+        process_requests = ShipmentCommon.iter_process_request_list_for_pdf(
             date_from=date_from,
             date_to=date_to,
             prd_id=prd_id,
@@ -446,204 +408,135 @@ def process_request_export_pdf(date_from=None, date_to=None, prd_id=None, prc_id
             return_status=return_status
         )
         
-        # 複数の取引先にまたがる場合のバリデーション
-        if process_request_list:
-            # 最初の取引先IDを取得
-            first_cztr_id = process_request_list[0].get('CZTR_ID')
-            
-            # 全てのデータが同じ取引先IDかチェック
-            for req in process_request_list:
-                if req.get('CZTR_ID') != first_cztr_id:
-                    raise Exception('複数の取引先にまたがる加工依頼書は出力できません。検索条件を絞り込んでください。')
-        
-        # 取引先情報の取得（ヘッダー用）
         header_info = {}
-        if process_request_list:
-            header_info = {
-                'CZTR_FULL_NM': process_request_list[0].get('PRC_TO_FULL_NM', ''),
-                'CZTR_TANTO_NM': process_request_list[0].get('PRC_TO_TANTO_NM', '')
-            }
+        first_cztr_id = None
+        details = []
+        for req in process_requests:
+            if not details:
+                # 最初の行から取引先情報を取得（ヘッダー用）
+                first_cztr_id = req.get('CZTR_ID')
+                header_info = _process_request_header_info(req)
+            elif req.get('CZTR_ID') != first_cztr_id:
+                # 複数の取引先にまたがる場合のバリデーション
+                process_requests.close()
+                raise Exception('複数の取引先にまたがる加工依頼書は出力できません。検索条件を絞り込んでください。')
+            details.append(_process_request_detail(req))
         
         # ドキュメント番号を生成
         doc_number = DocumentNumberManager().get_next_number('process_request')
         
-        # PDF用データ整形
-        details = []
-        for req in process_request_list:
-            details.append({
-                'CPRC_PRD_NM': req.get('CPRC_PRD_NM', ''),
-                'CPDD_LOT': req.get('CPDD_LOT', ''),
-                'CSHK_QTY': req.get('CSHK_QTY', 0),
-                'CPRC_NM': req.get('CPRC_NM', '')
-            })
-        
-        font_name = get_japanese_font()
-        # --- 見た目重視の寸法調整 ---
-        PAGE_WIDTH = 210 * mm
-        LEFT_MARGIN = 15 * mm
-        RIGHT_MARGIN = 15 * mm
-        TOP_MARGIN = 15 * mm
-        BOTTOM_MARGIN = 15 * mm
-        TABLE_WIDTH = PAGE_WIDTH - LEFT_MARGIN - RIGHT_MARGIN  # 約180mm
-        # 列幅（品名, LOT, 数量, 加工内容）
-        col_widths = [70*mm, 30*mm, 25*mm, 55*mm]
-        row_height = 10*mm
-        # --- PDFドキュメント設定（ヘッダー・フッター付き） ---
-        buffer = BytesIO()
-        
-        # 通常のPDFドキュメント設定（ページテンプレートなし）
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=A4,
-            rightMargin=RIGHT_MARGIN/mm,
-            leftMargin=LEFT_MARGIN/mm,
-            topMargin=TOP_MARGIN/mm,
-            bottomMargin=BOTTOM_MARGIN/mm
-        )
-        
-        styles = getSampleStyleSheet()
-        elements = []
-        # ページング機能付き明細テーブル
-        headers = ['品名', '', '数量', '加工内容']
-        col_widths = [80*mm, 20*mm, 30*mm, 50*mm]
-        row_height = 12*mm
-        max_rows_per_page = 16  # 1ページあたりの最大行数（ヘッダー行含む）
-        
-        # データを行ごとに分割
-        all_data_rows = []
-        for d in details:
-            row = [
-                Paragraph(str(d.get('CPRC_PRD_NM', '')), ParagraphStyle(name='TableCell', fontName=font_name, fontSize=11)),
-                Paragraph(str(d.get('CPDD_LOT', '')), ParagraphStyle(name='TableCell', fontName=font_name, fontSize=11)),
-                Paragraph(str(d.get('CSHK_QTY', '')), ParagraphStyle(name='TableCell', fontName=font_name, fontSize=11, alignment=2)),
-                Paragraph(str(d.get('CPRC_NM', '')), ParagraphStyle(name='TableCell', fontName=font_name, fontSize=11)),
-            ]
-            all_data_rows.append(row)
-        
-        # 合計計算
-        total_qty = sum(int(d.get('CSHK_QTY', 0) or 0) for d in details)
-        
-        # ページ分割処理（各ページにヘッダー・フッターを手動追加）
-        current_page = 1
-        total_pages = (len(all_data_rows) + max_rows_per_page - 1) // max_rows_per_page  # 切り上げ
-        
-        for page_start in range(0, len(all_data_rows), max_rows_per_page - 1):  # ヘッダー行を除く
-            page_end = min(page_start + max_rows_per_page - 1, len(all_data_rows))
-            page_data = all_data_rows[page_start:page_end]
-            
-            # 全ページにヘッダーを追加
-            # ヘッダーテーブル（会社名とNo.）
-            cztr_full_nm = header_info.get('CZTR_FULL_NM', '')
-            cztr_tanto_nm = header_info.get('CZTR_TANTO_NM', '')
-            if cztr_tanto_nm:
-                cztr_full_nm = cztr_full_nm + ' 御中' + ' ' + cztr_tanto_nm + '様'
-            else:
-                cztr_full_nm = cztr_full_nm + ' 御中'
-            
-            company_table = Table([
-                [Paragraph(f"{cztr_full_nm}", ParagraphStyle(name='Header1', fontName=font_name, fontSize=14, alignment=1))]
-            ], colWidths=[80*mm], hAlign='LEFT')
-            company_table.setStyle(TableStyle([
-                ('LINEBELOW', (0,0), (0,0), 0.7, colors.black),
-                ('BOTTOMPADDING', (0,0), (0,0), 2*mm),
-                ('LEFTPADDING', (0,0), (0,0), 0),
-                ('RIGHTPADDING', (0,0), (0,0), 0),
-            ]))
-            
-            no_table = Table([
-                [Paragraph("No.", ParagraphStyle(name='Header1', fontName=font_name, fontSize=12, alignment=0)),
-                 Paragraph(doc_number, ParagraphStyle(name='Header1', fontName=font_name, fontSize=12, alignment=0))]
-            ], colWidths=[10*mm, 40*mm], hAlign='RIGHT')
-            no_table.setStyle(TableStyle([
-                ('LINEBELOW', (0,0), (1,0), 0.7, colors.black),
-                ('BOTTOMPADDING', (0,0), (1,0), 0.5*mm),
-                ('LEFTPADDING', (0,0), (1,0), 0),
-                ('RIGHTPADDING', (0,0), (1,0), 0),
-            ]))
-            
-            header_table = Table([
-                [company_table, no_table]
-            ], colWidths=[120*mm, 60*mm])
-            header_table.setStyle(TableStyle([
-                ('ALIGN', (0,0), (0,0), 'LEFT'),
-                ('ALIGN', (1,0), (1,0), 'RIGHT'),
-                ('LEFTPADDING', (0,0), (1,0), 0),
-                ('RIGHTPADDING', (0,0), (1,0), 0),
-                ('TOPPADDING', (0,0), (1,0), 0),
-                ('BOTTOMPADDING', (0,0), (1,0), 0),
-            ]))
-            
-            elements.append(header_table)
-            elements.append(Spacer(1, 5*mm))
-            
-            # タイトル
-            elements.append(Table([
-                [Paragraph('加　工　依　頼　書', ParagraphStyle(name='Title', fontName=font_name, fontSize=18, alignment=1, leading=22))]
-            ], colWidths=[70*mm], style=TableStyle([
-                ('ALIGN', (0,0), (0,0), 'CENTER'),
-                ('LINEBELOW', (0,0), (0,0), 1, colors.black),
-                ('BOTTOMPADDING', (0,0), (0,0), 2*mm),
-            ])))
-            elements.append(Spacer(1, 15*mm))
-            
-            # ヘッダー行を追加
-            table_data = [[Paragraph(h, ParagraphStyle(name='TableHeader', fontName=font_name, fontSize=12, alignment=1)) for h in headers]]
-            table_data.extend(page_data)
-            
-            # 最後のページまたは16行未満の場合は空行を追加
-            if len(table_data) < max_rows_per_page:
-                empty_rows_needed = max_rows_per_page - len(table_data) - 1  # 合計行分を引く
-                for _ in range(empty_rows_needed):
-                    table_data.append(['', '', '', ''])
-                
-                # 合計行を追加
-                table_data.append([
-                    Paragraph('合計', ParagraphStyle(name='TotalLabel', fontName=font_name, fontSize=12, alignment=2)),
-                    '',
-                    Paragraph(str(total_qty), ParagraphStyle(name='TotalValue', fontName=font_name, fontSize=12, alignment=2)),
-                    ''
-                ])
-            
-            # テーブルを作成
-            table = Table(table_data, colWidths=col_widths, rowHeights=[row_height]*len(table_data), repeatRows=1)
-            table.setStyle(TableStyle([
-                ('GRID', (0, 0), (-1, -1), 0.7, colors.black),
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 2*mm),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 2*mm),
-                ('TOPPADDING', (0, 0), (-1, -1), 1*mm),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 1*mm),
-            ]))
-            
-            elements.append(table)
-            
-            # フッター部分（各ページに追加）
-            elements.append(Spacer(1, 2*mm))
-            elements.append(Paragraph('備考：', ParagraphStyle(name='Biko', fontName=font_name, fontSize=12, alignment=0, spaceAfter=2*mm)))
-            elements.append(Spacer(1, 8*mm))
-            elements.append(Paragraph('株式会社　ホプニック研究所', ParagraphStyle(name='Footer', fontName=font_name, fontSize=13, alignment=1)))
-            
-            # ページ番号（右下）
-            page_text = f"ページ {current_page} / {total_pages}"
-            elements.append(Paragraph(page_text, ParagraphStyle(name='PageNumber', fontName=font_name, fontSize=8, alignment=2)))
-            
-            # ページ分割（最後のページ以外）
-            if current_page < total_pages:
-                elements.append(PageBreak())
-            
-            current_page += 1
-        doc.build(elements)
-        # バッファの内容を取得
-        pdf = buffer.getvalue()
-        buffer.close()
-        return pdf
+        return render_process_request_pdf(details, header_info, doc_number)
     except Exception as e:
         print(f"加工依頼書PDF出力中にエラー: {str(e)}")
         print(traceback.format_exc())
         log_error(f"加工依頼書PDF出力中にエラー: {str(e)}\n{traceback.format_exc()}")
         raise Exception(f'PDFファイルの作成に失敗しました: {str(e)}')
 
+# 加工依頼書の一括出力でPDFを作成するプロセスプール（初回の一括出力時に作成）
+_pdf_executor = None
+_pdf_executor_lock = threading.Lock()
+
+def _get_pdf_export_workers():
+    """一括出力の並列数（環境変数 PDF_EXPORT_WORKERS、0または不正な値はCPUコア数）"""
+    try:
+        workers = int(os.getenv('PDF_EXPORT_WORKERS', PdfConstants.DEFAULT_EXPORT_WORKERS))
+    except ValueError:
+        workers = 0
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+def _get_pdf_executor():
+    """プロセスプールを取得する
+
+    取込ジョブ等のスレッドが動作中のプロセスからfork すると停止することがあるため、spawn で起動する
+    （各プロセスは app パッケージを読み込まない process_request_pdf のみ読み込む）
+    """
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is None:
+            _pdf_executor = ProcessPoolExecutor(
+                max_workers=_get_pdf_export_workers(),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pdf_executor
+
+def _render_process_request_pdfs(jobs):
+    """加工依頼書PDFを並列で作成する
+
+    Args:
+        jobs (list): render_process_request_pdf の引数 (details, header_info, doc_number) のリスト
+
+    Returns:
+        list: PDFの内容（jobs と同じ順）
+    """
+    global _pdf_executor
+    if len(jobs) <= 1 or _get_pdf_export_workers() <= 1:
+        return [render_process_request_pdf(*job) for job in jobs]
+    executor = _get_pdf_executor()
+    try:
+        futures = [executor.submit(render_process_request_pdf, *job) for job in jobs]
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        # プロセスが異常終了した場合は、次回の出力で作り直す
+        with _pdf_executor_lock:
+            if _pdf_executor is executor:
+                _pdf_executor = None
+        executor.shutdown(wait=False)
+        raise
+
+def process_request_export_pdf_zip(date_from=None, date_to=None, prd_id=None, prc_id=None, cztr_id=None, return_status=None):
+    """加工依頼書PDFを加工先ごとに作成し、ZIPにまとめて出力する
+
+    検索条件に一致する加工依頼を加工先（CZTR）ごとに分け、各PDFにドキュメント番号を採番したうえで
+    プロセスプールで並列に作成する。
+
+    Returns:
+        bytes: ZIPの内容
+    """
+    try:
+        # 加工先ごとに明細をまとめる（検索結果の並び順のまま）
+        groups = {}
+        for req in ShipmentCommon.iter_process_request_list_for_pdf(
+            date_from=date_from,
+            date_to=date_to,
+            prd_id=prd_id,
+            prc_id=prc_id,
+            cztr_id=cztr_id,
+            return_status=return_status
+        ):
+            group = groups.get(req.get('CZTR_ID'))
+            if group is None:
+                group = groups[req.get('CZTR_ID')] = {
+                    'header_info': _process_request_header_info(req),
+                    'details': []
+                }
+            group['details'].append(_process_request_detail(req))
+
+        if not groups:
+            raise Exception('出力対象の加工依頼がありません。')
+
+        # ドキュメント番号は番号が重複しないよう、このプロセスで加工先ごとに採番する
+        number_manager = DocumentNumberManager()
+        jobs = []
+        filenames = []
+        for group_cztr_id, group in groups.items():
+            doc_number = number_manager.get_next_number('process_request')
+            jobs.append((group['details'], group['header_info'], doc_number))
+            filenames.append(f"process_request_{group_cztr_id if group_cztr_id is not None else 'none'}_{doc_number}.pdf")
+
+        pdfs = _render_process_request_pdfs(jobs)
+
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for filename, pdf in zip(filenames, pdfs):
+                zf.writestr(filename, pdf)
+        return buffer.getvalue()
+
+    except Exception as e:
+        print(f"加工依頼書PDF一括出力中にエラー: {str(e)}")
+        print(traceback.format_exc())
+        log_error(f"加工依頼書PDF一括出力中にエラー: {str(e)}\n{traceback.format_exc()}")
+        raise Exception(f'PDFファイルの作成に失敗しました: {str(e)}')
+
 def shipment_list_export_pdf(shipments):
     """出荷一覧画面用のPDFを出力する（横向き）"""
     try:
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""一覧のCSV・Excel(xlsx)ストリーミング出力
+
+行を1件ずつ受け取り、ExportConstants.STREAM_CHUNK_BYTES ごとに出力データを返すジェネレータを提供する。
+レスポンスに順次書き出すため、件数が多くてもメモリ使用量は一定で、ダウンロードはすぐに始まる。
+xlsx は openpyxl では保存時まで出力できないため、必要最小限のパーツを zipfile で直接書き出す。
+"""
+
+import codecs
+import csv
+import io
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape, quoteattr
+
+from app.constants import ExportConstants
+
+# XMLに含められない制御文字
+_XML_ILLEGAL_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name={sheet_name} sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# 標準（0）と見出し用の太字（1）の2つの書式
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+# 見出し行を固定表示する
+_XLSX_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0">'
+    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+    '</sheetView></sheetViews>'
+    '<sheetData>'
+)
+_XLSX_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+def stream_csv(columns, rows):
+    """CSVを順次出力する
+
+    Args:
+        columns (list): 出力列（見出し, 行のキー）のリスト
+        rows (iterable): 行（dict）
+
+    Yields:
+        bytes: CSVのデータ（ExportConstants.CSV_ENCODING）
+    """
+    encoder = codecs.getincrementalencoder(ExportConstants.CSV_ENCODING)(errors='replace')
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\r\n')
+    writer.writerow([label for label, _ in columns])
+    for row in rows:
+        writer.writerow(['' if row.get(key) is None else row.get(key) for _, key in columns])
+        if buffer.tell() >= ExportConstants.STREAM_CHUNK_BYTES:
+            yield encoder.encode(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+    yield encoder.encode(buffer.getvalue(), final=True)
+
+
+class _ChunkSink:
+    """ZipFile の書き込み先（書き込まれたデータを溜めておき、ジェネレータから取り出す）
+
+    tell/seek を持たないため、ZipFile はシークせずに順次書き込む形式で出力する
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+def _xlsx_cell(value, style=None):
+    """セル1つ分のXML（数値は数値、それ以外は文字列として出力）"""
+    style_attr = f' s="{style}"' if style is not None else ''
+    if value is None or value == '':
+        return f'<c{style_attr}/>'
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        number = format(value, 'f') if isinstance(value, Decimal) else repr(value)
+        return f'<c{style_attr}><v>{number}</v></c>'
+    text = escape(_XML_ILLEGAL_CHARS.sub('', str(value)))
+    return f'<c{style_attr} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def stream_xlsx(columns, rows, sheet_name):
+    """Excel(xlsx)を順次出力する
+
+    Args:
+        columns (list): 出力列（見出し, 行のキー）のリスト
+        rows (iterable): 行（dict）
+        sheet_name (str): シート名
+
+    Yields:
+        bytes: xlsxのデータ
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _XLSX_ROOT_RELS)
+        zf.writestr('xl/workbook.xml', _XLSX_WORKBOOK.format(sheet_name=quoteattr(sheet_name)))
+        zf.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+        zf.writestr('xl/styles.xml', _XLSX_STYLES)
+        with zf.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(_XLSX_SHEET_HEAD.encode('utf-8'))
+            header = ''.join(_xlsx_cell(label, style=1) for label, _ in columns)
+            sheet.write(f'<row>{header}</row>'.encode('utf-8'))
+            for row in rows:
+                cells = ''.join(_xlsx_cell(row.get(key)) for _, key in columns)
+                sheet.write(f'<row>{cells}</row>'.encode('utf-8'))
+                if sink.size >= ExportConstants.STREAM_CHUNK_BYTES:
+                    yield sink.take()
+            sheet.write(_XLSX_SHEET_TAIL.encode('utf-8'))
+    yield sink.take()
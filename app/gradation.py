@@ -3,8 +3,13 @@ from sqlalchemy.types import Numeric
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
 from datetime import datetime
 from sqlalchemy.orm import relationship
-from app.database import Base, get_db_session
+from app.database import Base, get_db_session, insert_returning_id
 from app.models import log_error
+from app.gradation_cache import GradationMatrixCache
+from app.gradation_balance import (
+    GRD_PRC_ZAN_SQL, GRD_SHK_ZAN_SQL, GRD_FINAL_SHK_ZAN_SQL, GSHK_GPRC_DIFF_SQL,
+    join_grd_prc_zan, join_grd_shk_zan, join_grd_final_shk_zan, join_gshk_gprc_diff
+)
 
 class GprrDatModel(Base):
     """グラデ加工依頼データテーブルのSQLAlchemyモデル"""
@@ -101,15 +106,16 @@ class Gradation:
         session = get_db_session()
         try:
             # 基本SQLクエリ
-            sql = """
+            sql = f"""
                 SELECT 
-                    GPRR_ID,
+                    GPRR_DAT.GPRR_ID,
                     KBN1.KBN_NM AS GPRR_SPEC,
                     KBN2.KBN_NM AS GPRR_COLOR,
                     GPRR_REQ_DATE,
                     GPRR_QTY,
-                    dbo.Get_GRD_PRC_ZAN_Qty(GPRR_ID) AS GPRR_PRC_ZAN_QTY
+                    PRC_ZAN.ZAN_QTY AS GPRR_PRC_ZAN_QTY
                 FROM GPRR_DAT
+                {join_grd_prc_zan('GPRR_DAT.GPRR_ID')}
                 LEFT JOIN KBN_MST KBN1 ON GPRR_SPEC = KBN1.KBN_NO
                 AND KBN1.KBN_ID = 'GSPEC'
                 LEFT JOIN KBN_MST KBN2 ON GPRR_COLOR = KBN2.KBN_NO
@@ -133,12 +139,12 @@ class Gradation:
                 sql += " AND GPRR_REQ_DATE <= :req_date_to"
                 params['req_date_to'] = req_date_to
             if flg == '0':
-                sql += " AND dbo.Get_GRD_PRC_ZAN_Qty(GPRR_ID) >= 0"
+                sql += " AND PRC_ZAN.ZAN_QTY >= 0"
             elif flg == '1':
-                sql += " AND dbo.Get_GRD_PRC_ZAN_Qty(GPRR_ID) = 0"
+                sql += " AND PRC_ZAN.ZAN_QTY = 0"
 
             
-            sql += " ORDER BY GPRR_ID DESC"
+            sql += " ORDER BY GPRR_DAT.GPRR_ID DESC"
             
             gprr_list = session.execute(text(sql), params).fetchall()
             return gprr_list
@@ -159,8 +165,10 @@ class Gradation:
                 raise Exception("指定された依頼データが見つかりません")
             
             # 加工残数の確認
-            current_zan_qty = session.execute(text("""
-                SELECT dbo.Get_GRD_PRC_ZAN_Qty(:req_id) AS zan_qty
+            current_zan_qty = session.execute(text(f"""
+                SELECT PRC_ZAN.ZAN_QTY AS zan_qty
+                FROM ({GRD_PRC_ZAN_SQL}) PRC_ZAN
+                WHERE PRC_ZAN.GPRR_ID = :req_id
             """), {'req_id': req_id}).fetchone()
             
             if current_zan_qty and current_zan_qty.zan_qty < qty:
@@ -275,22 +283,23 @@ class Gradation:
         """GPRC作成用のGPRRデータを取得する"""
         session = get_db_session()
         try:
-            sql = """
+            sql = f"""
                 SELECT 
-                    GPRR_ID,
+                    GPRR_DAT.GPRR_ID,
                     KBN1.KBN_NM AS GPRR_SPEC_NM,
                     KBN2.KBN_NM AS GPRR_COLOR_NM,
                     GPRR_SPEC,
                     GPRR_COLOR,
                     GPRR_REQ_DATE,
                     GPRR_QTY,
-                    dbo.Get_GRD_PRC_ZAN_Qty(GPRR_ID) AS GPRR_PRC_ZAN_QTY
+                    PRC_ZAN.ZAN_QTY AS GPRR_PRC_ZAN_QTY
                 FROM GPRR_DAT
+                {join_grd_prc_zan('GPRR_DAT.GPRR_ID')}
                 LEFT JOIN KBN_MST KBN1 ON GPRR_SPEC = KBN1.KBN_NO
                 AND KBN1.KBN_ID = 'GSPEC'
                 LEFT JOIN KBN_MST KBN2 ON GPRR_COLOR = KBN2.KBN_NO
                 AND KBN2.KBN_ID = 'GCOLOR'
-                WHERE GPRR_ID = :gprr_id
+                WHERE GPRR_DAT.GPRR_ID = :gprr_id
             """
             result = session.execute(text(sql), {'gprr_id': gprr_id}).fetchone()
             return result
@@ -397,8 +406,10 @@ class Gradation:
         """指定された依頼IDの加工残数を取得する"""
         session = get_db_session()
         try:
-            result = session.execute(text("""
-                SELECT dbo.Get_GRD_PRC_ZAN_Qty(:gprr_id) AS zan_qty
+            result = session.execute(text(f"""
+                SELECT PRC_ZAN.ZAN_QTY AS zan_qty
+                FROM ({GRD_PRC_ZAN_SQL}) PRC_ZAN
+                WHERE PRC_ZAN.GPRR_ID = :gprr_id
             """), {'gprr_id': gprr_id}).fetchone()
             
             # 数値変換を確実に行う
@@ -491,9 +502,9 @@ class Gradation:
         session = get_db_session()
         try:
             # 基本SQLクエリ
-            sql = """
+            sql = f"""
                 SELECT 
-                    GPRC_ID,
+                    GPRC_DAT.GPRC_ID,
                     GPRC_REQ_ID,
                     KBN1.KBN_NM AS GPRR_SPEC_NM,
                     KBN2.KBN_NM AS GPRR_COLOR_NM,
@@ -503,8 +514,9 @@ class Gradation:
                     GPRC_INS_NG_QTY,
                     GPRC_PASS_QTY,
                     GPRC_STS,
-                    dbo.Get_GRD_SHK_ZAN_Qty(GPRC_ID) AS STOCK_QTY
+                    SHK_ZAN.ZAN_QTY AS STOCK_QTY
                 FROM GPRC_DAT
+                {join_grd_shk_zan('GPRC_DAT.GPRC_ID')}
                 LEFT JOIN GPRR_DAT ON GPRC_REQ_ID = GPRR_ID
                 LEFT JOIN KBN_MST KBN1 ON GPRR_SPEC = KBN1.KBN_NO
                 AND KBN1.KBN_ID = 'GSPEC'
@@ -529,12 +541,12 @@ class Gradation:
                 sql += " AND GPRC_DATE <= :date_to"
                 params['date_to'] = date_to
             if stock_status == '0':
-                sql += " AND dbo.Get_GRD_SHK_ZAN_Qty(GPRC_ID) = 0"
+                sql += " AND SHK_ZAN.ZAN_QTY = 0"
             elif stock_status == '1':
-                sql += " AND dbo.Get_GRD_SHK_ZAN_Qty(GPRC_ID) > 0"
+                sql += " AND SHK_ZAN.ZAN_QTY > 0"
 
             
-            sql += " ORDER BY GPRC_ID DESC"
+            sql += " ORDER BY GPRC_DAT.GPRC_ID DESC"
             
             gprc_list = session.execute(text(sql), params).fetchall()
             return gprc_list
@@ -549,10 +561,10 @@ class Gradation:
         """ニデック加工データ一覧を取得する（GPRC_REQ_TO=2のみ）"""
         session = get_db_session()
         try:
-            # 基本SQLクエリ（在庫数は除外）
-            sql = """
+            # 基本SQLクエリ（在庫数はニデック加工専用の出荷可能数）
+            sql = f"""
                 SELECT 
-                    GPRC_ID,
+                    GPRC_DAT.GPRC_ID,
                     GPRC_REQ_ID,
                     KBN1.KBN_NM AS GPRR_SPEC_NM,
                     KBN2.KBN_NM AS GPRR_COLOR_NM,
@@ -561,8 +573,10 @@ class Gradation:
                     GPRC_RET_NG_QTY,
                     GPRC_INS_NG_QTY,
                     GPRC_PASS_QTY,
-                    GPRC_STS
+                    GPRC_STS,
+                    FINAL_ZAN.ZAN_QTY AS STOCK_QTY
                 FROM GPRC_DAT
+                {join_grd_final_shk_zan('GPRC_DAT.GPRC_ID')}
                 LEFT JOIN GPRR_DAT ON GPRC_REQ_ID = GPRR_ID
                 LEFT JOIN KBN_MST KBN1 ON GPRR_SPEC = KBN1.KBN_NO
                 AND KBN1.KBN_ID = 'GSPEC'
@@ -586,24 +600,18 @@ class Gradation:
             if date_to:
                 sql += " AND GPRC_DATE <= :date_to"
                 params['date_to'] = date_to
+            if stock_status == '0':
+                sql += " AND FINAL_ZAN.ZAN_QTY = 0"
+            elif stock_status == '1':
+                sql += " AND FINAL_ZAN.ZAN_QTY > 0"
 
-            sql += " ORDER BY GPRC_ID DESC"
+            sql += " ORDER BY GPRC_DAT.GPRC_ID DESC"
             
             gprc_list = session.execute(text(sql), params).fetchall()
             
-            # 在庫数を計算して追加
             result_list = []
             for row in gprc_list:
-                # ニデック加工専用の出荷可能数を計算
-                stock_qty = Gradation.get_nidec_available_qty(row.GPRC_ID)
-                
-                # 在庫状況フィルター
-                if stock_status == '0' and stock_qty > 0:
-                    continue
-                elif stock_status == '1' and stock_qty == 0:
-                    continue
-                
-                # 結果に在庫数を追加
+                stock_qty = int(row.STOCK_QTY) if row.STOCK_QTY is not None else 0
                 row_dict = {
                     'GPRC_ID': row.GPRC_ID,
                     'GPRC_REQ_ID': row.GPRC_REQ_ID,
@@ -631,9 +639,9 @@ class Gradation:
         """GPRCデータの詳細を取得する"""
         session = get_db_session()
         try:
-            sql = """
+            sql = f"""
                 SELECT 
-                    GPRC_ID,
+                    GPRC_DAT.GPRC_ID,
                     GPRC_REQ_ID,
                     GPRC_REQ_TO,
                     GPRC_DATE,
@@ -641,17 +649,18 @@ class Gradation:
                     GPRC_RET_NG_QTY,
                     GPRC_INS_NG_QTY,
                     GPRC_PASS_QTY,
-                    dbo.Get_GRD_SHK_ZAN_Qty(GPRC_ID) AS STOCK_QTY,
+                    SHK_ZAN.ZAN_QTY AS STOCK_QTY,
                     GPRC_SHK_ID,
                     KBN1.KBN_NM AS GPRR_SPEC_NM,
                     KBN2.KBN_NM AS GPRR_COLOR_NM
                 FROM GPRC_DAT
+                {join_grd_shk_zan('GPRC_DAT.GPRC_ID')}
                 INNER JOIN GPRR_DAT GPRR ON GPRC_REQ_ID = GPRR.GPRR_ID
                 LEFT JOIN KBN_MST KBN1 ON GPRR.GPRR_SPEC = KBN1.KBN_NO
                 AND KBN1.KBN_ID = 'GSPEC'
                 LEFT JOIN KBN_MST KBN2 ON GPRR.GPRR_COLOR = KBN2.KBN_NO
                 AND KBN2.KBN_ID = 'GCOLOR'
-                WHERE GPRC_ID = :gprc_id
+                WHERE GPRC_DAT.GPRC_ID = :gprc_id
             """
             
             result = session.execute(text(sql), {'gprc_id': gprc_id}).fetchone()
@@ -692,35 +701,16 @@ class Gradation:
         """指定されたGPRC_IDの出庫可能数を取得する"""
         session = get_db_session()
         try:
-            # GPRCデータの合格数を取得
-            gprc_result = session.execute(text("""
-                SELECT GPRC_PASS_QTY
-                FROM GPRC_DAT
-                WHERE GPRC_ID = :gprc_id
+            # 出荷可能数 = 合格数 - 既最終出荷数(GSHK_TO=3)
+            result = session.execute(text(f"""
+                SELECT FINAL_ZAN.ZAN_QTY AS available_qty
+                FROM ({GRD_FINAL_SHK_ZAN_SQL}) FINAL_ZAN
+                WHERE FINAL_ZAN.GPRC_ID = :gprc_id
             """), {'gprc_id': gprc_id}).fetchone()
             
-            if not gprc_result:
+            if not result or result.available_qty is None:
                 return 0
-            
-            # 数値変換を確実に行う
-            pass_qty_raw = gprc_result.GPRC_PASS_QTY
-            pass_qty = int(pass_qty_raw) if pass_qty_raw is not None else 0
-            
-            # 既に出荷済みの数量を取得（最終出荷：GSHK_TO=3）
-            shipped_qty_result = session.execute(text("""
-                SELECT COALESCE(SUM(GSHK_QTY), 0) AS shipped_qty
-                FROM GSHK_DAT
-                WHERE GSHK_STC_ID = :gprc_id
-                AND GSHK_TO = 3
-            """), {'gprc_id': gprc_id}).fetchone()
-            
-            # 数値変換を確実に行う
-            shipped_qty_raw = shipped_qty_result.shipped_qty if shipped_qty_result else 0
-            shipped_qty = int(shipped_qty_raw) if shipped_qty_raw is not None else 0
-            
-            # 出庫可能数 = 合格数 - 既出庫数
-            available_qty = max(0, pass_qty - shipped_qty)
-            return available_qty
+            return int(result.available_qty)
             
         except Exception as e:
             log_error(f"出庫可能数取得中にエラーが発生しました: {str(e)}")
@@ -751,38 +741,17 @@ class Gradation:
             if int(shipping_qty) > available_qty:
                 return {'success': False, 'error': f'出庫数量は出庫可能数({available_qty})以下で入力してください'}
             
-            # 出庫データを作成（IDは自動生成）
-            session.execute(text("""
-                INSERT INTO GSHK_DAT (
-                    GSHK_STC_ID,
-                    GSHK_REQ_ID,
-                    GSHK_DT,
-                    GSHK_ORD_DT,
-                    GSHK_QTY,
-                    GSHK_TO,
-                    GSHK_FLG
-                ) VALUES (
-                    :gprc_id,
-                    :req_id,
-                    :shipping_date,
-                    :ord_date,
-                    :qty,
-                    :shipping_to,
-                    0
-                )
-            """), {
-                'gprc_id': gprc_id,
-                'req_id': gprc_data.GPRC_REQ_ID,
-                'shipping_date': shipping_date,
-                'ord_date': ord_date,
-                'qty': shipping_qty,
-                'shipping_to': shipping_to
+            # 出庫データを作成（IDは自動生成、同じ文で取得）
+            shipping_id = insert_returning_id(session, 'GSHK_DAT', 'GSHK_ID', {
+                'GSHK_STC_ID': gprc_id,
+                'GSHK_REQ_ID': gprc_data.GPRC_REQ_ID,
+                'GSHK_DT': shipping_date,
+                'GSHK_ORD_DT': ord_date,
+                'GSHK_QTY': shipping_qty,
+                'GSHK_TO': shipping_to,
+                'GSHK_FLG': 0
             })
             
-            # 生成されたIDを取得
-            shipping_id_result = session.execute(text("SELECT SCOPE_IDENTITY() AS shipping_id")).fetchone()
-            shipping_id = int(shipping_id_result.shipping_id)
-            
             session.commit()
             
             return {
@@ -829,11 +798,13 @@ class Gradation:
 
     @staticmethod
     def get_grd_shk_zan_qty(gprc_id):
-        """Get_GRD_SHK_ZAN_Qtyプロシージャを呼び出して在庫数を取得する"""
+        """在庫数（Get_GRD_SHK_ZAN_Qty相当）を取得する"""
         session = get_db_session()
         try:
-            result = session.execute(text("""
-                SELECT dbo.Get_GRD_SHK_ZAN_Qty(:gprc_id) AS zan_qty
+            result = session.execute(text(f"""
+                SELECT SHK_ZAN.ZAN_QTY AS zan_qty
+                FROM ({GRD_SHK_ZAN_SQL}) SHK_ZAN
+                WHERE SHK_ZAN.GPRC_ID = :gprc_id
             """), {'gprc_id': gprc_id}).fetchone()
             
             # 数値変換を確実に行う
@@ -858,7 +829,7 @@ class Gradation:
         session = get_db_session()
         try:
             # 基本SQLクエリ
-            sql = """
+            sql = f"""
                 SELECT 
                     GSHK.GSHK_ID,
                     GSHK.GSHK_TO,
@@ -868,10 +839,11 @@ class Gradation:
                     GSHK.GSHK_QTY,
                     GSHK.GSHK_FLG,
                     GSHK.GSHK_ORD_DT,
-                    dbo.Get_GSHK_GPRC_Diff(GSHK.GSHK_ID) AS GSHK_DIFF_QTY,
+                    GSHK_DIFF.DIFF_QTY AS GSHK_DIFF_QTY,
                     KBN1.KBN_NM AS GPRR_SPEC_NM,
                     KBN2.KBN_NM AS GPRR_COLOR_NM
                 FROM GSHK_DAT GSHK
+                {join_gshk_gprc_diff('GSHK.GSHK_ID')}
                 left join GPRR_DAT GPRR on GSHK.GSHK_REQ_ID = GPRR.GPRR_ID
                 LEFT JOIN KBN_MST KBN1 ON GPRR.GPRR_SPEC = KBN1.KBN_NO AND KBN1.KBN_ID = 'GSPEC'
                 LEFT JOIN KBN_MST KBN2 ON GPRR.GPRR_COLOR = KBN2.KBN_NO AND KBN2.KBN_ID = 'GCOLOR'
@@ -888,9 +860,9 @@ class Gradation:
                 sql += " AND GSHK.GSHK_DT <= :date_to"
                 params['date_to'] = date_to
             if flg == '0':
-                sql += " AND dbo.Get_GSHK_GPRC_Diff(GSHK.GSHK_ID) > 0"
+                sql += " AND GSHK_DIFF.DIFF_QTY > 0"
             elif flg == '1':
-                sql += " AND dbo.Get_GSHK_GPRC_Diff(GSHK.GSHK_ID) = 0"
+                sql += " AND GSHK_DIFF.DIFF_QTY = 0"
 
             sql += " ORDER BY GSHK.GSHK_DT DESC, GSHK.GSHK_ID DESC"
             
@@ -907,9 +879,9 @@ class Gradation:
         """指定されたGSHK_IDのデータを取得する"""
         session = get_db_session()
         try:
-            sql = """
+            sql = f"""
                 SELECT 
-                    GSHK_ID,
+                    GSHK_DAT.GSHK_ID,
                     GSHK_TO,
                     GSHK_STC_ID,
                     GSHK_REQ_ID,
@@ -917,9 +889,10 @@ class Gradation:
                     GSHK_QTY,
                     GSHK_FLG,
                     GSHK_ORD_DT,
-                    dbo.Get_GSHK_GPRC_Diff(GSHK_ID) AS GSHK_DIFF_QTY
+                    GSHK_DIFF.DIFF_QTY AS GSHK_DIFF_QTY
                 FROM GSHK_DAT
-                WHERE GSHK_ID = :gshk_id
+                {join_gshk_gprc_diff('GSHK_DAT.GSHK_ID')}
+                WHERE GSHK_DAT.GSHK_ID = :gshk_id
             """
             
             result = session.execute(text(sql), {'gshk_id': gshk_id}).fetchone()
@@ -1215,8 +1188,10 @@ class Gradation:
         """GSHKデータとGPRCデータの差分を取得する"""
         session = get_db_session()
         try:
-            result = session.execute(text("""
-                SELECT dbo.Get_GSHK_GPRC_Diff(:gshk_id) AS diff_qty
+            result = session.execute(text(f"""
+                SELECT GSHK_DIFF.DIFF_QTY AS diff_qty
+                FROM ({GSHK_GPRC_DIFF_SQL}) GSHK_DIFF
+                WHERE GSHK_DIFF.GSHK_ID = :gshk_id
             """), {'gshk_id': gshk_id}).fetchone()
             
             # 数値変換を確実に行う
@@ -1236,20 +1211,44 @@ class Gradation:
             session.close()
 
     @staticmethod
-    def get_processing_matrix():
-        """加工状況マトリックス表のデータを取得する（GPRC_STS別集計対応）"""
+    def get_processing_matrix(force_refresh=False):
+        """加工状況マトリックス表のデータを取得する（共有キャッシュ経由）
+
+        Args:
+            force_refresh (bool): キャッシュを無視して再計算するかどうか
+
+        Returns:
+            dict: マトリックスデータ（computed_at に集計日時を含む）
+        """
+        return GradationMatrixCache.get(Gradation.compute_processing_matrix, force_refresh)
+
+    @staticmethod
+    def refresh_processing_matrix():
+        """加工状況マトリックスを再計算してキャッシュを更新する"""
+        return GradationMatrixCache.refresh(Gradation.compute_processing_matrix)
+
+    @staticmethod
+    def compute_processing_matrix():
+        """加工状況マトリックス表のデータを集計する（GPRC_STS別集計対応）"""
         session = get_db_session()
         try:
-            # 規格と色の選択肢を取得
-            spec_choices = Gradation.get_kbn_choices('GSPEC', 0)
-            color_choices = Gradation.get_kbn_choices('GCOLOR', 0)
+            # 規格と色の選択肢を同一セッションで一括取得
+            kbn_rows = session.execute(text("""
+                SELECT KBN_ID, KBN_NO, KBN_NM
+                FROM KBN_MST
+                WHERE KBN_ID IN ('GSPEC', 'GCOLOR')
+                AND KBN_FLG = 0
+                ORDER BY KBN_ID, KBN_NO
+            """)).fetchall()
+            spec_choices = [(str(r.KBN_NO), r.KBN_NM) for r in kbn_rows if r.KBN_ID == 'GSPEC']
+            color_choices = [(str(r.KBN_NO), r.KBN_NM) for r in kbn_rows if r.KBN_ID == 'GCOLOR']
             
             # コンベックス加工状況を取得（在庫有りのみに最適化）
-            convex_data = session.execute(text("""
+            convex_data = session.execute(text(f"""
                 SELECT 
                     GPRR.GPRR_SPEC,
                     GPRR.GPRR_COLOR,
-                    (SELECT SUM(dbo.Get_GRD_PRC_ZAN_Qty(GPRR_SUB.GPRR_ID)) FROM GPRR_DAT GPRR_SUB WHERE GPRR_SUB.GPRR_SPEC = GPRR.GPRR_SPEC AND GPRR_SUB.GPRR_COLOR = GPRR.GPRR_COLOR AND GPRR_SUB.GPRR_REQ_TO = 1) AS TOTAL_NOT_RETURNED,
+                    NOT_RET.TOTAL_NOT_RETURNED,
                     SUM(CASE WHEN GPRC.GPRC_STS = 0 THEN GPRC.GPRC_PASS_QTY ELSE 0 END) AS TOTAL_PROC_BEFORE_INSPECT,
                     ISNULL(STOCK_SUM.TOTAL_STOCK, 0) AS TOTAL_PROC_AFTER_INSPECT
                 FROM GPRR_DAT GPRR
@@ -1258,29 +1257,35 @@ class Gradation:
                     SELECT 
                         GPRR_SUB.GPRR_SPEC,
                         GPRR_SUB.GPRR_COLOR,
-                        SUM(dbo.Get_GRD_SHK_ZAN_Qty(GPRC_SUB.GPRC_ID)) AS TOTAL_STOCK
+                        SUM(PRC_ZAN.ZAN_QTY) AS TOTAL_NOT_RETURNED
+                    FROM GPRR_DAT GPRR_SUB
+                    {join_grd_prc_zan('GPRR_SUB.GPRR_ID')}
+                    WHERE GPRR_SUB.GPRR_REQ_TO = 1
+                    GROUP BY GPRR_SUB.GPRR_SPEC, GPRR_SUB.GPRR_COLOR
+                ) NOT_RET ON GPRR.GPRR_SPEC = NOT_RET.GPRR_SPEC AND GPRR.GPRR_COLOR = NOT_RET.GPRR_COLOR
+                LEFT JOIN (
+                    SELECT 
+                        GPRR_SUB.GPRR_SPEC,
+                        GPRR_SUB.GPRR_COLOR,
+                        SUM(SHK_ZAN.ZAN_QTY) AS TOTAL_STOCK
                     FROM GPRC_DAT GPRC_SUB
                     INNER JOIN GPRR_DAT GPRR_SUB ON GPRC_SUB.GPRC_REQ_ID = GPRR_SUB.GPRR_ID
+                    {join_grd_shk_zan('GPRC_SUB.GPRC_ID')}
                     WHERE GPRC_SUB.GPRC_REQ_TO = 1 
                     AND GPRC_SUB.GPRC_STS = 1
-                    AND dbo.Get_GRD_SHK_ZAN_Qty(GPRC_SUB.GPRC_ID) > 0
+                    AND SHK_ZAN.ZAN_QTY > 0
                     GROUP BY GPRR_SUB.GPRR_SPEC, GPRR_SUB.GPRR_COLOR
                 ) STOCK_SUM ON GPRR.GPRR_SPEC = STOCK_SUM.GPRR_SPEC AND GPRR.GPRR_COLOR = STOCK_SUM.GPRR_COLOR
                 WHERE GPRR.GPRR_REQ_TO = 1
-                GROUP BY GPRR.GPRR_SPEC, GPRR.GPRR_COLOR, STOCK_SUM.TOTAL_STOCK
+                GROUP BY GPRR.GPRR_SPEC, GPRR.GPRR_COLOR, NOT_RET.TOTAL_NOT_RETURNED, STOCK_SUM.TOTAL_STOCK
             """)).fetchall()
             
             # ニデック加工状況を取得（在庫有りのみに最適化）
-            nidec_data = session.execute(text("""
+            nidec_data = session.execute(text(f"""
                 SELECT 
                     GPRR.GPRR_SPEC,
                     GPRR.GPRR_COLOR,
-                    (SELECT SUM(dbo.Get_GSHK_GPRC_Diff(GSHK_SUB.GSHK_ID)) 
-                     FROM GSHK_DAT GSHK_SUB 
-                     INNER JOIN GPRR_DAT GPRR_SUB ON GSHK_SUB.GSHK_REQ_ID = GPRR_SUB.GPRR_ID
-                     WHERE GPRR_SUB.GPRR_SPEC = GPRR.GPRR_SPEC 
-                     AND GPRR_SUB.GPRR_COLOR = GPRR.GPRR_COLOR 
-                     AND GSHK_SUB.GSHK_TO = 2) AS TOTAL_NOT_RETURNED,
+                    NOT_RET.TOTAL_NOT_RETURNED,
                     SUM(CASE WHEN GPRC.GPRC_STS = 0 THEN GPRC.GPRC_PASS_QTY ELSE 0 END) AS TOTAL_PROC_BEFORE_INSPECT,
                     ISNULL(STOCK_SUM.TOTAL_STOCK, 0) AS TOTAL_PROC_AFTER_INSPECT
                 FROM GPRR_DAT GPRR
@@ -1290,16 +1295,28 @@ class Gradation:
                     SELECT 
                         GPRR_SUB.GPRR_SPEC,
                         GPRR_SUB.GPRR_COLOR,
-                        SUM(dbo.Get_GRD_SHK_ZAN_Qty(GPRC_SUB.GPRC_ID)) AS TOTAL_STOCK
+                        SUM(GSHK_DIFF.DIFF_QTY) AS TOTAL_NOT_RETURNED
+                    FROM GSHK_DAT GSHK_SUB
+                    INNER JOIN GPRR_DAT GPRR_SUB ON GSHK_SUB.GSHK_REQ_ID = GPRR_SUB.GPRR_ID
+                    {join_gshk_gprc_diff('GSHK_SUB.GSHK_ID')}
+                    WHERE GSHK_SUB.GSHK_TO = 2
+                    GROUP BY GPRR_SUB.GPRR_SPEC, GPRR_SUB.GPRR_COLOR
+                ) NOT_RET ON GPRR.GPRR_SPEC = NOT_RET.GPRR_SPEC AND GPRR.GPRR_COLOR = NOT_RET.GPRR_COLOR
+                LEFT JOIN (
+                    SELECT 
+                        GPRR_SUB.GPRR_SPEC,
+                        GPRR_SUB.GPRR_COLOR,
+                        SUM(SHK_ZAN.ZAN_QTY) AS TOTAL_STOCK
                     FROM GPRC_DAT GPRC_SUB
                     INNER JOIN GSHK_DAT GSHK_SUB ON GPRC_SUB.GPRC_SHK_ID = GSHK_SUB.GSHK_ID
                     INNER JOIN GPRR_DAT GPRR_SUB ON GSHK_SUB.GSHK_REQ_ID = GPRR_SUB.GPRR_ID
+                    {join_grd_shk_zan('GPRC_SUB.GPRC_ID')}
                     WHERE GPRC_SUB.GPRC_REQ_TO = 2 
                     AND GPRC_SUB.GPRC_STS = 1
-                    AND dbo.Get_GRD_SHK_ZAN_Qty(GPRC_SUB.GPRC_ID) > 0
+                    AND SHK_ZAN.ZAN_QTY > 0
                     GROUP BY GPRR_SUB.GPRR_SPEC, GPRR_SUB.GPRR_COLOR
                 ) STOCK_SUM ON GPRR.GPRR_SPEC = STOCK_SUM.GPRR_SPEC AND GPRR.GPRR_COLOR = STOCK_SUM.GPRR_COLOR
-                GROUP BY GPRR.GPRR_SPEC, GPRR.GPRR_COLOR, STOCK_SUM.TOTAL_STOCK
+                GROUP BY GPRR.GPRR_SPEC, GPRR.GPRR_COLOR, NOT_RET.TOTAL_NOT_RETURNED, STOCK_SUM.TOTAL_STOCK
                 HAVING SUM(CASE WHEN GSHK.GSHK_TO = 2 THEN GSHK.GSHK_QTY ELSE 0 END) > 0
             """)).fetchall()
             
@@ -1505,35 +1522,16 @@ class Gradation:
         """指定されたGPRC_IDのニデック加工出荷可能数を取得する（最終出荷専用）"""
         session = get_db_session()
         try:
-            # GPRCデータの合格数を取得
-            gprc_result = session.execute(text("""
-                SELECT GPRC_PASS_QTY
-                FROM GPRC_DAT
-                WHERE GPRC_ID = :gprc_id
+            # 出荷可能数 = 合格数 - 既最終出荷数(GSHK_TO=3)
+            result = session.execute(text(f"""
+                SELECT FINAL_ZAN.ZAN_QTY AS available_qty
+                FROM ({GRD_FINAL_SHK_ZAN_SQL}) FINAL_ZAN
+                WHERE FINAL_ZAN.GPRC_ID = :gprc_id
             """), {'gprc_id': gprc_id}).fetchone()
             
-            if not gprc_result:
+            if not result or result.available_qty is None:
                 return 0
-            
-            # 数値変換を確実に行う
-            pass_qty_raw = gprc_result.GPRC_PASS_QTY
-            pass_qty = int(pass_qty_raw) if pass_qty_raw is not None else 0
-            
-            # 既に最終出荷済みの数量を取得（GSHK_TO=3）
-            shipped_qty_result = session.execute(text("""
-                SELECT COALESCE(SUM(GSHK_QTY), 0) AS shipped_qty
-                FROM GSHK_DAT
-                WHERE GSHK_STC_ID = :gprc_id
-                AND GSHK_TO = 3
-            """), {'gprc_id': gprc_id}).fetchone()
-            
-            # 数値変換を確実に行う
-            shipped_qty_raw = shipped_qty_result.shipped_qty if shipped_qty_result else 0
-            shipped_qty = int(shipped_qty_raw) if shipped_qty_raw is not None else 0
-            
-            # 出荷可能数 = 合格数 - 既最終出荷数
-            available_qty = max(0, pass_qty - shipped_qty)
-            return available_qty
+            return int(result.available_qty)
             
         except Exception as e:
             log_error(f"ニデック出荷可能数取得中にエラーが発生しました: {str(e)}")
@@ -1547,21 +1545,22 @@ class Gradation:
         session = get_db_session()
         try:
             # 出荷対象のGPRCデータを取得（GPRC_DATEの古い順）
-            target_gprc_list = session.execute(text("""
+            target_gprc_list = session.execute(text(f"""
                 SELECT 
-                    GPRC_ID,
+                    GPRC_DAT.GPRC_ID,
                     GPRC_REQ_ID,
                     GPRC_DATE,
                     GPRC_PASS_QTY,
-                    dbo.Get_GRD_SHK_ZAN_Qty(GPRC_ID) AS STOCK_QTY
+                    SHK_ZAN.ZAN_QTY AS STOCK_QTY
                 FROM GPRC_DAT
+                {join_grd_shk_zan('GPRC_DAT.GPRC_ID')}
                 LEFT JOIN GPRR_DAT ON GPRC_REQ_ID = GPRR_ID
                 WHERE GPRC_REQ_TO = 2
                 AND GPRC_STS = 1
                 AND GPRR_SPEC = :spec
                 AND GPRR_COLOR = :color
-                AND dbo.Get_GRD_SHK_ZAN_Qty(GPRC_ID) > 0
-                ORDER BY GPRC_DATE ASC, GPRC_ID ASC
+                AND SHK_ZAN.ZAN_QTY > 0
+                ORDER BY GPRC_DATE ASC, GPRC_DAT.GPRC_ID ASC
             """), {'spec': spec, 'color': color}).fetchall()
             
             if not target_gprc_list:
@@ -1650,17 +1649,18 @@ class Gradation:
         session = get_db_session()
         try:
             # 出荷可能なGPRCデータの合計を取得
-            result = session.execute(text("""
+            result = session.execute(text(f"""
                 SELECT 
-                    SUM(dbo.Get_GRD_SHK_ZAN_Qty(GPRC_ID)) AS TOTAL_AVAILABLE_QTY,
+                    SUM(SHK_ZAN.ZAN_QTY) AS TOTAL_AVAILABLE_QTY,
                     COUNT(*) AS RECORD_COUNT
                 FROM GPRC_DAT
+                {join_grd_shk_zan('GPRC_DAT.GPRC_ID')}
                 LEFT JOIN GPRR_DAT ON GPRC_REQ_ID = GPRR_ID
                 WHERE GPRC_REQ_TO = 2
                 AND GPRC_STS = 1
                 AND GPRR_SPEC = :spec
                 AND GPRR_COLOR = :color
-                AND dbo.Get_GRD_SHK_ZAN_Qty(GPRC_ID) > 0
+                AND SHK_ZAN.ZAN_QTY > 0
             """), {'spec': spec, 'color': color}).fetchone()
             
             # 数値変換を確実に行う
@@ -1676,4 +1676,159 @@ class Gradation:
             log_error(f"出荷可能数量取得中にエラーが発生しました: {str(e)}")
             raise
         finally:
-            session.close()
\ No newline at end of file
+            session.close()
+
+    @staticmethod
+    def execute_auto_shipping_batch(lines, order_date, shipping_date, dry_run=False):
+        """複数の規格・色をまとめて自動出荷する（GPRC_DATEの古い順に引当）
+
+        出荷候補の在庫を1回のクエリで取得し、メモリ上で引当計画を作成した後、
+        全ての出荷データを1トランザクションでまとめて登録する。
+        同じ規格・色が複数行ある場合は、前の行の引当後の残在庫から引き当てる。
+
+        Args:
+            lines (list): [{'spec': int, 'color': int, 'qty': int}, ...]
+            order_date (datetime): 手配日
+            shipping_date (datetime): 出荷日
+            dry_run (bool): Trueの場合は引当計画のみ返し、登録しない
+
+        Returns:
+            dict: 行ごとの引当計画（plan）と出荷合計
+        """
+        session = get_db_session()
+        try:
+            keys = sorted({(line['spec'], line['color']) for line in lines})
+            if not keys:
+                return {'success': False, 'error': '出荷明細がありません'}
+
+            # 対象の規格・色を条件に展開（パラメータ化）
+            key_conditions = []
+            params = {}
+            for i, (spec, color) in enumerate(keys):
+                key_conditions.append(f"(GPRR_SPEC = :spec_{i} AND GPRR_COLOR = :color_{i})")
+                params[f'spec_{i}'] = spec
+                params[f'color_{i}'] = color
+
+            # 出荷候補の在庫を一括取得（GPRC_DATEの古い順）
+            stock_rows = session.execute(text(f"""
+                SELECT 
+                    GPRC_DAT.GPRC_ID,
+                    GPRC_REQ_ID,
+                    GPRC_DATE,
+                    GPRR_SPEC,
+                    GPRR_COLOR,
+                    SHK_ZAN.ZAN_QTY AS STOCK_QTY
+                FROM GPRC_DAT
+                {join_grd_shk_zan('GPRC_DAT.GPRC_ID')}
+                LEFT JOIN GPRR_DAT ON GPRC_REQ_ID = GPRR_ID
+                WHERE GPRC_REQ_TO = 2
+                AND GPRC_STS = 1
+                AND SHK_ZAN.ZAN_QTY > 0
+                AND ({' OR '.join(key_conditions)})
+                ORDER BY GPRC_DATE ASC, GPRC_DAT.GPRC_ID ASC
+            """), params).fetchall()
+
+            # 規格・色ごとの在庫キュー（残数はメモリ上で減算する）
+            stock_by_key = {key: [] for key in keys}
+            for row in stock_rows:
+                stock_by_key[(int(row.GPRR_SPEC), int(row.GPRR_COLOR))].append({
+                    'gprc_id': row.GPRC_ID,
+                    'req_id': row.GPRC_REQ_ID,
+                    'gprc_date': row.GPRC_DATE.strftime('%Y-%m-%d') if row.GPRC_DATE else '',
+                    'stock_qty': int(row.STOCK_QTY),
+                    'remaining': int(row.STOCK_QTY)
+                })
+
+            # 行ごとに引当計画を作成
+            plan = []
+            insert_params = []
+            total_shipped = 0
+            for line_no, line in enumerate(lines, start=1):
+                remaining_qty = line['qty']
+                shipped_records = []
+                for stock in stock_by_key[(line['spec'], line['color'])]:
+                    if remaining_qty <= 0:
+                        break
+                    ship_qty = min(remaining_qty, stock['remaining'])
+                    if ship_qty <= 0:
+                        continue
+                    stock['remaining'] -= ship_qty
+                    remaining_qty -= ship_qty
+                    shipped_records.append({
+                        'gprc_id': stock['gprc_id'],
+                        'gprc_date': stock['gprc_date'],
+                        'shipped_qty': ship_qty,
+                        'stock_qty': stock['stock_qty']
+                    })
+                    insert_params.append({
+                        'gprc_id': stock['gprc_id'],
+                        'req_id': stock['req_id'],
+                        'shipping_date': shipping_date,
+                        'order_date': order_date,
+                        'qty': ship_qty
+                    })
+
+                line_shipped = line['qty'] - remaining_qty
+                total_shipped += line_shipped
+                plan.append({
+                    'line_no': line_no,
+                    'spec': line['spec'],
+                    'color': line['color'],
+                    'qty': line['qty'],
+                    'shipped_qty': line_shipped,
+                    'remaining_qty': remaining_qty,
+                    'shipped_records': shipped_records
+                })
+
+            if total_shipped == 0:
+                return {
+                    'success': False,
+                    'error': '出荷可能なデータがありませんでした',
+                    'plan': plan
+                }
+
+            if not dry_run:
+                # 出荷データを一括登録（executemany）
+                session.execute(text("""
+                    INSERT INTO GSHK_DAT (
+                        GSHK_STC_ID,
+                        GSHK_REQ_ID,
+                        GSHK_DT,
+                        GSHK_ORD_DT,
+                        GSHK_QTY,
+                        GSHK_TO,
+                        GSHK_FLG
+                    ) VALUES (
+                        :gprc_id,
+                        :req_id,
+                        :shipping_date,
+                        :order_date,
+                        :qty,
+                        3,
+                        0
+                    )
+                """), insert_params)
+                session.commit()
+
+            short_lines = sum(1 for p in plan if p['remaining_qty'] > 0)
+            message = f'出荷が完了しました。出荷数量: {total_shipped}（{len(insert_params)}件）'
+            if dry_run:
+                message = f'引当計画を作成しました。出荷予定数量: {total_shipped}（{len(insert_params)}件）'
+            if short_lines:
+                message += f'　在庫不足の明細: {short_lines}行'
+
+            return {
+                'success': True,
+                'dry_run': dry_run,
+                'message': message,
+                'total_shipped': total_shipped,
+                'record_count': len(insert_params),
+                'plan': plan
+            }
+
+        except Exception as e:
+            session.rollback()
+            log_error(f"一括自動出荷実行中にエラーが発生しました: {str(e)}")
+            raise
+        finally:
+            session.close()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+グラデーション在庫残数のSQL部品
+
+スカラー関数 Get_GRD_PRC_ZAN_Qty / Get_GRD_SHK_ZAN_Qty / Get_GSHK_GPRC_Diff と
+同じ値を GROUP BY 結合の派生テーブルで求めるためのSQL断片を提供する。
+行ごとに関数を評価する代わりに、子テーブルを一度だけ集計して結合する。
+
+各派生テーブルは「キー列 + 残数列」を返すため、任意のクエリに
+LEFT JOIN して SELECT 句・WHERE 句の両方から参照できる。
+
+    sql = f\"\"\"
+        SELECT GPRR_DAT.GPRR_ID, {PRC_ZAN}.ZAN_QTY
+        FROM GPRR_DAT
+        {join_grd_prc_zan('GPRR_DAT.GPRR_ID')}
+        WHERE {PRC_ZAN}.ZAN_QTY > 0
+    \"\"\"
+
+本モジュールはDB接続に依存しないため、SQLite上の整合性検証
+（gradation_parity_check.py）からも直接利用できる。
+"""
+
+# 既定の結合エイリアス
+PRC_ZAN = 'PRC_ZAN'          # 加工残数（Get_GRD_PRC_ZAN_Qty）
+SHK_ZAN = 'SHK_ZAN'          # 出庫残数（Get_GRD_SHK_ZAN_Qty）
+FINAL_SHK_ZAN = 'FINAL_ZAN'  # 最終出荷残数（GSHK_TO=3のみ差し引き）
+GSHK_DIFF = 'GSHK_DIFF'      # 出庫と加工戻りの差分（Get_GSHK_GPRC_Diff）
+
+# Get_GRD_PRC_ZAN_Qty 相当: GPRR_QTY - コンベックス戻り数(GPRC_REQ_TO=1)の合計
+GRD_PRC_ZAN_SQL = """
+    SELECT
+        GPRR_Z.GPRR_ID,
+        GPRR_Z.GPRR_QTY - COALESCE(GPRC_Z.SUM_QTY, 0) AS ZAN_QTY
+    FROM GPRR_DAT GPRR_Z
+    LEFT JOIN (
+        SELECT GPRC_REQ_ID, SUM(GPRC_QTY) AS SUM_QTY
+        FROM GPRC_DAT
+        WHERE GPRC_REQ_TO = 1
+        GROUP BY GPRC_REQ_ID
+    ) GPRC_Z ON GPRC_Z.GPRC_REQ_ID = GPRR_Z.GPRR_ID
+"""
+
+# Get_GRD_SHK_ZAN_Qty 相当: 合格数 - 全出庫数(GSHK_STC_ID単位)の合計
+GRD_SHK_ZAN_SQL = """
+    SELECT
+        GPRC_Z.GPRC_ID,
+        COALESCE(GPRC_Z.GPRC_PASS_QTY, 0) - COALESCE(GSHK_Z.SUM_QTY, 0) AS ZAN_QTY
+    FROM GPRC_DAT GPRC_Z
+    LEFT JOIN (
+        SELECT GSHK_STC_ID, SUM(GSHK_QTY) AS SUM_QTY
+        FROM GSHK_DAT
+        GROUP BY GSHK_STC_ID
+    ) GSHK_Z ON GSHK_Z.GSHK_STC_ID = GPRC_Z.GPRC_ID
+"""
+
+# get_nidec_available_qty 相当: 合格数 - 最終出荷数(GSHK_TO=3)の合計（0未満は0）
+GRD_FINAL_SHK_ZAN_SQL = """
+    SELECT
+        GPRC_Z.GPRC_ID,
+        CASE
+            WHEN COALESCE(GPRC_Z.GPRC_PASS_QTY, 0) - COALESCE(GSHK_Z.SUM_QTY, 0) > 0
+            THEN COALESCE(GPRC_Z.GPRC_PASS_QTY, 0) - COALESCE(GSHK_Z.SUM_QTY, 0)
+            ELSE 0
+        END AS ZAN_QTY
+    FROM GPRC_DAT GPRC_Z
+    LEFT JOIN (
+        SELECT GSHK_STC_ID, SUM(GSHK_QTY) AS SUM_QTY
+        FROM GSHK_DAT
+        WHERE GSHK_TO = 3
+        GROUP BY GSHK_STC_ID
+    ) GSHK_Z ON GSHK_Z.GSHK_STC_ID = GPRC_Z.GPRC_ID
+"""
+
+# Get_GSHK_GPRC_Diff 相当: GSHK_QTY - 加工戻り数(GPRC_SHK_ID単位)の合計
+GSHK_GPRC_DIFF_SQL = """
+    SELECT
+        GSHK_Z.GSHK_ID,
+        GSHK_Z.GSHK_QTY - COALESCE(GPRC_Z.SUM_QTY, 0) AS DIFF_QTY
+    FROM GSHK_DAT GSHK_Z
+    LEFT JOIN (
+        SELECT GPRC_SHK_ID, SUM(GPRC_QTY) AS SUM_QTY
+        FROM GPRC_DAT
+        GROUP BY GPRC_SHK_ID
+    ) GPRC_Z ON GPRC_Z.GPRC_SHK_ID = GSHK_Z.GSHK_ID
+"""
+
+
+def _left_join(fragment, key_column, on_column, alias):
+    """派生テーブルをLEFT JOINする句を組み立てる"""
+    return f"LEFT JOIN ({fragment}) {alias} ON {alias}.{key_column} = {on_column}"
+
+
+def join_grd_prc_zan(on_column, alias=PRC_ZAN):
+    """加工残数（{alias}.ZAN_QTY）を GPRR_ID で結合する
+
+    Args:
+        on_column (str): 結合元の GPRR_ID 列（例: 'GPRR_DAT.GPRR_ID'）
+        alias (str): 派生テーブルのエイリアス
+    """
+    return _left_join(GRD_PRC_ZAN_SQL, 'GPRR_ID', on_column, alias)
+
+
+def join_grd_shk_zan(on_column, alias=SHK_ZAN):
+    """出庫残数（{alias}.ZAN_QTY）を GPRC_ID で結合する
+
+    Args:
+        on_column (str): 結合元の GPRC_ID 列（例: 'GPRC_DAT.GPRC_ID'）
+        alias (str): 派生テーブルのエイリアス
+    """
+    return _left_join(GRD_SHK_ZAN_SQL, 'GPRC_ID', on_column, alias)
+
+
+def join_grd_final_shk_zan(on_column, alias=FINAL_SHK_ZAN):
+    """最終出荷残数（{alias}.ZAN_QTY）を GPRC_ID で結合する
+
+    Args:
+        on_column (str): 結合元の GPRC_ID 列（例: 'GPRC_DAT.GPRC_ID'）
+        alias (str): 派生テーブルのエイリアス
+    """
+    return _left_join(GRD_FINAL_SHK_ZAN_SQL, 'GPRC_ID', on_column, alias)
+
+
+def join_gshk_gprc_diff(on_column, alias=GSHK_DIFF):
+    """出庫と加工戻りの差分（{alias}.DIFF_QTY）を GSHK_ID で結合する
+
+    Args:
+        on_column (str): 結合元の GSHK_ID 列（例: 'GSHK.GSHK_ID'）
+        alias (str): 派生テーブルのエイリアス
+    """
+    return _left_join(GSHK_GPRC_DIFF_SQL, 'GSHK_ID', on_column, alias)
@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+from datetime import datetime
+from app.constants import CacheConstants
+from app.http_cache import TableVersion
+from app.models import log_error, log_info
+
+class GradationMatrixCache:
+    """加工状況マトリックスの共有キャッシュ管理クラス
+
+    マトリックスの計算結果を app/data 配下のJSONファイルに保存し、
+    全ワーカーで共有する。参照するテーブルのデータバージョン（TableVersion。
+    コミット時に自動で更新される）が変わった場合は、次回参照時（または手動更新時）に再計算する。
+    """
+    _lock = threading.Lock()
+    _data_dir = os.path.join(os.path.dirname(__file__), 'data')
+    _cache_path = os.path.join(_data_dir, CacheConstants.GRADATION_MATRIX_CACHE_FILE)
+
+    @classmethod
+    def _read_json(cls, path):
+        """JSONファイルを読み込む（存在しない・壊れている場合はNone）"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError) as e:
+            log_error(f"キャッシュファイルの読み込みに失敗しました({path}): {str(e)}")
+            return None
+
+    @classmethod
+    def _write_json(cls, path, data):
+        """JSONファイルを一時ファイル経由で置き換える（他ワーカーに途中状態を見せない）"""
+        os.makedirs(cls._data_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def get_data_version():
+        """マトリックスが参照するテーブルのデータバージョンを取得する"""
+        versions = TableVersion.get(CacheConstants.GRADATION_MATRIX_TABLES)
+        return ':'.join(v['version'] for v in versions)
+
+    @staticmethod
+    def _serialize(matrix):
+        """マトリックスをJSON保存可能な形式に変換する"""
+        def encode(data_dict):
+            # 規格・色が未設定(None)の行も合計に含まれるため、空文字として保存する
+            return {
+                f"{'' if spec is None else int(spec)}:{'' if color is None else int(color)}": values
+                for (spec, color), values in data_dict.items()
+            }
+        return {
+            'spec_choices': [list(c) for c in matrix['spec_choices']],
+            'color_choices': [list(c) for c in matrix['color_choices']],
+            'convex_data': encode(matrix['convex_data']),
+            'nidec_data': encode(matrix['nidec_data'])
+        }
+
+    @staticmethod
+    def _deserialize(data):
+        """JSONからマトリックス形式に戻す（キーは(規格, 色)のタプル。未設定はNone）"""
+        def decode(data_dict):
+            result = {}
+            for key, values in data_dict.items():
+                spec, color = key.split(':')
+                result[(int(spec) if spec else None, int(color) if color else None)] = values
+            return result
+        return {
+            'spec_choices': [tuple(c) for c in data['spec_choices']],
+            'color_choices': [tuple(c) for c in data['color_choices']],
+            'convex_data': decode(data['convex_data']),
+            'nidec_data': decode(data['nidec_data'])
+        }
+
+    @staticmethod
+    def _max_age():
+        """キャッシュの最大保持秒数を取得する（0以下は無期限）"""
+        try:
+            return int(os.getenv('GRADATION_MATRIX_MAX_AGE', CacheConstants.GRADATION_MATRIX_DEFAULT_MAX_AGE))
+        except ValueError:
+            return CacheConstants.GRADATION_MATRIX_DEFAULT_MAX_AGE
+
+    @classmethod
+    def _is_fresh(cls, cached, version):
+        """キャッシュが現在のデータバージョンかつ保持期限内か判定する"""
+        if not cached or cached.get('version') != version:
+            return False
+        max_age = cls._max_age()
+        if max_age > 0:
+            computed_at = datetime.strptime(cached['computed_at'], '%Y-%m-%d %H:%M:%S')
+            if (datetime.now() - computed_at).total_seconds() > max_age:
+                return False
+        return True
+
+    @classmethod
+    def refresh(cls, compute_func):
+        """マトリックスを再計算してキャッシュに保存する
+
+        Args:
+            compute_func (callable): マトリックスを計算する関数
+
+        Returns:
+            dict: マトリックスデータ（computed_at を含む）
+        """
+        # 計算前のバージョンを記録する（計算中に更新があれば次回再計算される）
+        version = cls.get_data_version()
+        matrix = compute_func()
+        computed_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            with cls._lock:
+                cls._write_json(cls._cache_path, {
+                    'version': version,
+                    'computed_at': computed_at,
+                    'matrix': cls._serialize(matrix)
+                })
+            log_info(f"加工状況マトリックスのキャッシュを更新しました: {computed_at}")
+        except Exception as e:
+            log_error(f"加工状況マトリックスのキャッシュ保存に失敗しました: {str(e)}")
+        matrix['computed_at'] = computed_at
+        return matrix
+
+    @classmethod
+    def get(cls, compute_func, force_refresh=False):
+        """キャッシュ済みのマトリックスを取得する（古い場合は再計算）
+
+        Args:
+            compute_func (callable): マトリックスを計算する関数
+            force_refresh (bool): キャッシュを無視して再計算するかどうか
+
+        Returns:
+            dict: マトリックスデータ（computed_at を含む）
+        """
+        if not force_refresh:
+            cached = cls._read_json(cls._cache_path)
+            try:
+                if cls._is_fresh(cached, cls.get_data_version()):
+                    matrix = cls._deserialize(cached['matrix'])
+                    matrix['computed_at'] = cached['computed_at']
+                    return matrix
+            except (KeyError, ValueError, TypeError) as e:
+                log_error(f"加工状況マトリックスのキャッシュが不正なため再計算します: {str(e)}")
+        return cls.refresh(compute_func)
@@ -16,9 +16,9 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 # プロジェクトのルートディレクトリをパスに追加
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.database import get_db_session
+from app.database import get_db_session, insert_returning_id
 from app.gradation import GprrDatModel, GprcDatModel, GshkDatModel
-from app.models_common import CprdDatModel, CshkDatModel, CprcDatModel
+from app.models_common import CprdDatModel, CshkDatModel
 
 # ログ設定
 logging.basicConfig(
@@ -150,21 +150,16 @@ class GradationMigration:
             split2 = max_split2 + 1
             
             # CPRD_DATレコードを作成
-            cprd_record = CprdDatModel(
-                CPDD_PRD_ID=prd_id,
-                CPDD_LOT=lot,
-                CPDD_SPRIT1=99,
-                CPDD_SPRIT2=split2,
-                CPDD_RANK=1,
-                CPDD_QTY=qty,
-                CPDD_FLG=0,
-                CPDD_PCD_ID=0
-            )
-            
-            self.session.add(cprd_record)
-            self.session.flush()  # IDを取得するためにフラッシュ
-            
-            return cprd_record.CPDD_ID
+            return insert_returning_id(self.session, 'CPRD_DAT', 'CPDD_ID', {
+                'CPDD_PRD_ID': prd_id,
+                'CPDD_LOT': lot,
+                'CPDD_SPRIT1': 99,
+                'CPDD_SPRIT2': split2,
+                'CPDD_RANK': 1,
+                'CPDD_QTY': qty,
+                'CPDD_FLG': 0,
+                'CPDD_PCD_ID': 0
+            })
             
         except Exception as e:
             logger.error(f"CPRD_DAT作成エラー: {str(e)}")
@@ -186,23 +181,18 @@ class GradationMigration:
                 raise ValueError(f"無効なSPEC/COLOR組み合わせ: SPEC={spec}, COLOR={color}")
             
             # CSHK_DATレコードを作成
-            cshk_record = CshkDatModel(
-                CSHK_KBN=1,
-                CSHK_TO=604,
-                CSHK_PRC_ID=prc_id,
-                CSHK_PRD_ID=prd_id,
-                CSHK_DT=req_date,
-                CSHK_ORD_DT=req_date,
-                CSHK_PDD_ID=cpdd_id,
-                CSHK_RCP_ID=None,
-                CSHK_QTY=qty,
-                CSHK_FLG=0
-            )
-            
-            self.session.add(cshk_record)
-            self.session.flush()  # IDを取得するためにフラッシュ
-            
-            return cshk_record.CSHK_ID
+            return insert_returning_id(self.session, 'CSHK_DAT', 'CSHK_ID', {
+                'CSHK_KBN': 1,
+                'CSHK_TO': 604,
+                'CSHK_PRC_ID': prc_id,
+                'CSHK_PRD_ID': prd_id,
+                'CSHK_DT': req_date,
+                'CSHK_ORD_DT': req_date,
+                'CSHK_PDD_ID': cpdd_id,
+                'CSHK_RCP_ID': None,
+                'CSHK_QTY': qty,
+                'CSHK_FLG': 0
+            })
             
         except Exception as e:
             logger.error(f"CSHK_DAT作成エラー: {str(e)}")
@@ -288,19 +278,14 @@ class GradationMigration:
         """CPRC_DATレコードを作成"""
         try:
             # CPRC_DATレコードを作成
-            cprc_record = CprcDatModel(
-                CPCD_SHK_ID=cshk_id,
-                CPCD_DATE=gprc_record.GPRC_DATE,
-                CPCD_QTY=gprc_record.GPRC_QTY,
-                CPCD_RET_NG_QTY=gprc_record.GPRC_RET_NG_QTY,
-                CPCD_INS_NG_QTY=gprc_record.GPRC_INS_NG_QTY,
-                CPCD_PASS_QTY=gprc_record.GPRC_PASS_QTY
-            )
-            
-            self.session.add(cprc_record)
-            self.session.flush()  # IDを取得するためにフラッシュ
-            
-            return cprc_record.CPCD_ID
+            return insert_returning_id(self.session, 'CPRC_DAT', 'CPCD_ID', {
+                'CPCD_SHK_ID': cshk_id,
+                'CPCD_DATE': gprc_record.GPRC_DATE,
+                'CPCD_QTY': gprc_record.GPRC_QTY,
+                'CPCD_RET_NG_QTY': gprc_record.GPRC_RET_NG_QTY,
+                'CPCD_INS_NG_QTY': gprc_record.GPRC_INS_NG_QTY,
+                'CPCD_PASS_QTY': gprc_record.GPRC_PASS_QTY
+            })
             
         except Exception as e:
             logger.error(f"CPRC_DAT作成エラー: {str(e)}")
@@ -327,21 +312,16 @@ class GradationMigration:
             split2 = max_split2 + 1
             
             # CPRD_DATレコードを作成
-            cprd_record = CprdDatModel(
-                CPDD_PRD_ID=prd_id,
-                CPDD_LOT=lot,
-                CPDD_SPRIT1=99,
-                CPDD_SPRIT2=split2,
-                CPDD_RANK=1,
-                CPDD_QTY=pass_qty,
-                CPDD_FLG=0,
-                CPDD_PCD_ID=cpcd_id
-            )
-            
-            self.session.add(cprd_record)
-            self.session.flush()  # IDを取得するためにフラッシュ
-            
-            return cprd_record.CPDD_ID
+            return insert_returning_id(self.session, 'CPRD_DAT', 'CPDD_ID', {
+                'CPDD_PRD_ID': prd_id,
+                'CPDD_LOT': lot,
+                'CPDD_SPRIT1': 99,
+                'CPDD_SPRIT2': split2,
+                'CPDD_RANK': 1,
+                'CPDD_QTY': pass_qty,
+                'CPDD_FLG': 0,
+                'CPDD_PCD_ID': cpcd_id
+            })
             
         except Exception as e:
             logger.error(f"GPRC用CPRD_DAT作成エラー: {str(e)}")
@@ -410,21 +390,16 @@ class GradationMigration:
             split2 = max_split2 + 1
             
             # CPRD_DATレコードを作成
-            cprd_record = CprdDatModel(
-                CPDD_PRD_ID=prd_id,
-                CPDD_LOT=lot,
-                CPDD_SPRIT1=99,
-                CPDD_SPRIT2=split2,
-                CPDD_RANK=1,
-                CPDD_QTY=pass_qty,
-                CPDD_FLG=0,
-                CPDD_PCD_ID=cpcd_id
-            )
-            
-            self.session.add(cprd_record)
-            self.session.flush()  # IDを取得するためにフラッシュ
-            
-            return cprd_record.CPDD_ID
+            return insert_returning_id(self.session, 'CPRD_DAT', 'CPDD_ID', {
+                'CPDD_PRD_ID': prd_id,
+                'CPDD_LOT': lot,
+                'CPDD_SPRIT1': 99,
+                'CPDD_SPRIT2': split2,
+                'CPDD_RANK': 1,
+                'CPDD_QTY': pass_qty,
+                'CPDD_FLG': 0,
+                'CPDD_PCD_ID': cpcd_id
+            })
             
         except Exception as e:
             logger.error(f"GPRC_REQ_TO=2用CPRD_DAT作成エラー: {str(e)}")
@@ -495,23 +470,18 @@ class GradationMigration:
             prd_id, prc_id = mapping_result
             
             # CSHK_DATレコードを作成
-            cshk_record = CshkDatModel(
-                CSHK_KBN=1,
-                CSHK_TO=602,
-                CSHK_PRC_ID=prc_id,
-                CSHK_PRD_ID=prd_id,
-                CSHK_DT=gshk_record.GSHK_DT,
-                CSHK_ORD_DT=gshk_record.GSHK_ORD_DT,
-                CSHK_PDD_ID=cpdd_id,
-                CSHK_RCP_ID=None,
-                CSHK_QTY=shk_qty,
-                CSHK_FLG=0
-            )
-            
-            self.session.add(cshk_record)
-            self.session.flush()  # IDを取得するためにフラッシュ
-            
-            return cshk_record.CSHK_ID
+            return insert_returning_id(self.session, 'CSHK_DAT', 'CSHK_ID', {
+                'CSHK_KBN': 1,
+                'CSHK_TO': 602,
+                'CSHK_PRC_ID': prc_id,
+                'CSHK_PRD_ID': prd_id,
+                'CSHK_DT': gshk_record.GSHK_DT,
+                'CSHK_ORD_DT': gshk_record.GSHK_ORD_DT,
+                'CSHK_PDD_ID': cpdd_id,
+                'CSHK_RCP_ID': None,
+                'CSHK_QTY': shk_qty,
+                'CSHK_FLG': 0
+            })
             
         except Exception as e:
             logger.error(f"GSHK用CSHK_DAT作成エラー: {str(e)}")
@@ -530,23 +500,18 @@ class GradationMigration:
                 raise ValueError(f"無効なSPEC/COLOR組み合わせ: SPEC={spec}, COLOR={color}")
             
             # CSHK_DATレコードを作成
-            cshk_record = CshkDatModel(
-                CSHK_KBN=0,
-                CSHK_TO=501,
-                CSHK_PRC_ID=0,
-                CSHK_PRD_ID=prd_id,
-                CSHK_DT=gshk_record.GSHK_DT,
-                CSHK_ORD_DT=gshk_record.GSHK_ORD_DT,
-                CSHK_PDD_ID=cpdd_id,
-                CSHK_RCP_ID=None,
-                CSHK_QTY=shk_qty,
-                CSHK_FLG=0
-            )
-            
-            self.session.add(cshk_record)
-            self.session.flush()  # IDを取得するためにフラッシュ
-            
-            return cshk_record.CSHK_ID
+            return insert_returning_id(self.session, 'CSHK_DAT', 'CSHK_ID', {
+                'CSHK_KBN': 0,
+                'CSHK_TO': 501,
+                'CSHK_PRC_ID': 0,
+                'CSHK_PRD_ID': prd_id,
+                'CSHK_DT': gshk_record.GSHK_DT,
+                'CSHK_ORD_DT': gshk_record.GSHK_ORD_DT,
+                'CSHK_PDD_ID': cpdd_id,
+                'CSHK_RCP_ID': None,
+                'CSHK_QTY': shk_qty,
+                'CSHK_FLG': 0
+            })
             
         except Exception as e:
             logger.error(f"GSHK_TO=3用CSHK_DAT作成エラー: {str(e)}")
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""一覧画面・マスタAPIの条件付きGET（ETag/Last-Modified）
+
+テーブルごとのデータバージョンを app/data/table_versions に保存し、全ワーカーで共有する。
+本アプリからの INSERT/UPDATE/DELETE/MERGE は発行したSQLから対象テーブルを判定し、
+コミット後にそのテーブルのバージョンを更新する（各更新処理での呼び出しは不要）。
+
+cache_by_data_version を付けた画面・APIは、参照するテーブルのバージョン・ユーザー・URLから
+ETagを作成し、ブラウザの持つ結果から変わっていなければ画面の作成・SQLの実行をせずに
+304 Not Modified を返す。本アプリ以外からDBを更新した場合に備えて、ETagは
+HTTP_CACHE_MAX_AGE 秒ごとに切り替わる（すぐに反映する場合は flask data-version-bump）。
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import wraps
+
+import click
+from flask import make_response, request, session
+from flask.globals import request_ctx
+from sqlalchemy import event
+
+from app import app
+from app.constants import AppConstants, HttpCacheConstants
+from app.database import engine
+from app.logger_utils import log_error
+
+
+def _get_int_env(name, default):
+    """整数の環境変数を取得する（不正な値は既定値）"""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+MAX_AGE = max(1, _get_int_env('HTTP_CACHE_MAX_AGE', HttpCacheConstants.DEFAULT_MAX_AGE))
+
+# 更新系SQLの対象テーブル（[dbo].[テーブル名] 形式を含む）
+WRITE_TABLE_PATTERN = re.compile(
+    r'\b(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|DELETE|MERGE\s+INTO|MERGE)\s+(?:\[?dbo\]?\.)?\[?(\w+)',
+    re.IGNORECASE
+)
+
+
+class TableVersion:
+    """テーブルごとのデータバージョン管理クラス
+
+    バージョンはテーブルごとのJSONファイルを一意な値で上書きするため、
+    複数ワーカーから同時に更新されても読み込み→更新の競合は発生しない。
+    """
+    _lock = threading.Lock()
+    _data_dir = os.path.join(os.path.dirname(__file__), 'data', HttpCacheConstants.TABLE_VERSION_DIR)
+
+    @classmethod
+    def _path(cls, table):
+        return os.path.join(cls._data_dir, f"{table.upper()}.json")
+
+    @classmethod
+    def get(cls, tables):
+        """テーブルのバージョンを取得する（未作成のテーブルはここで作成する）
+
+        Returns:
+            list: テーブル順の {'version', 'updated_at'}
+        """
+        versions = []
+        for table in tables:
+            try:
+                with open(cls._path(table), 'r', encoding='utf-8') as f:
+                    versions.append(json.load(f))
+            except (OSError, ValueError):
+                versions.append(cls.bump([table])[0])
+        return versions
+
+    @classmethod
+    def bump(cls, tables):
+        """テーブルのバージョンを更新する
+
+        Returns:
+            list: 更新後の {'version', 'updated_at'}
+        """
+        versions = []
+        with cls._lock:
+            os.makedirs(cls._data_dir, exist_ok=True)
+            for table in tables:
+                data = {
+                    'version': uuid.uuid4().hex,
+                    'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                }
+                path = cls._path(table)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, path)
+                versions.append(data)
+        return versions
+
+    @classmethod
+    def all_tables(cls):
+        """バージョンを保存済みのテーブル名の一覧"""
+        if not os.path.isdir(cls._data_dir):
+            return []
+        return sorted(name[:-len('.json')] for name in os.listdir(cls._data_dir) if name.endswith('.json'))
+
+
+@event.listens_for(engine, 'after_cursor_execute')
+def _collect_changed_tables(conn, cursor, statement, parameters, context, executemany):
+    tables = WRITE_TABLE_PATTERN.findall(statement)
+    if tables:
+        conn.info.setdefault('changed_tables', set()).update(t.upper() for t in tables)
+
+
+@event.listens_for(engine, 'commit')
+def _on_commit(conn):
+    # この時点ではまだコミット前のため、接続がプールに戻ったとき（コミット後）に更新する
+    changed = conn.info.pop('changed_tables', None)
+    if changed:
+        conn.info.setdefault('committed_tables', set()).update(changed)
+
+
+@event.listens_for(engine, 'rollback')
+def _on_rollback(conn):
+    conn.info.pop('changed_tables', None)
+
+
+@event.listens_for(engine.pool, 'checkin')
+def _bump_committed_tables(dbapi_connection, connection_record):
+    if connection_record is None:
+        return
+    committed = connection_record.info.pop('committed_tables', None)
+    if not committed:
+        return
+    try:
+        TableVersion.bump(sorted(committed))
+    except Exception as e:
+        # バージョン更新の失敗で業務処理を止めない（ETagは HTTP_CACHE_MAX_AGE 秒で切り替わる）
+        log_error(f"データバージョンの更新に失敗しました({', '.join(sorted(committed))}): {str(e)}")
+
+
+def _has_messages(response):
+    """画面に表示する（表示した）メッセージやエラーを含むかどうか"""
+    if request_ctx.flashes or session.get('_flashes'):
+        return True
+    if response.is_json:
+        body = response.get_json(silent=True)
+        return isinstance(body, dict) and ('error' in body or body.get('success') is False)
+    return False
+
+
+def cache_by_data_version(*tables):
+    """参照するテーブルが更新されていなければ 304 Not Modified を返すデコレータ
+
+    Args:
+        tables: 画面・APIの結果が依存するテーブル名（集計関数が参照するテーブルも含める）
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # 未表示のメッセージがある場合は画面を作成し直す
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return f(*args, **kwargs)
+
+            # バージョンは結果の取得より前に読む（取得中の更新は次回のリクエストで反映される）
+            versions = TableVersion.get(tables)
+            bucket = int(time.time()) // MAX_AGE
+            key = json.dumps([AppConstants.VERSION, session.get('user_id'), request.full_path,
+                              bucket, [v['version'] for v in versions]])
+            etag = hashlib.sha1(key.encode('utf-8')).hexdigest()
+            last_modified = max(
+                [datetime.strptime(v['updated_at'], '%Y-%m-%d %H:%M:%S') for v in versions]
+                + [datetime.fromtimestamp(bucket * MAX_AGE)]
+            ).astimezone()
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = (request.if_modified_since is not None
+                                and last_modified <= request.if_modified_since)
+
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed or _has_messages(response):
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            # ブラウザには保存させるが、表示のたびに確認させる
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return decorated_function
+    return decorator
+
+
+@app.cli.command('data-version-bump')
+@click.argument('tables', nargs=-1)
+def data_version_bump_command(tables):
+    """テーブルのデータバージョンを更新する（本アプリ以外からDBを更新した後に使用。省略時は全テーブル）"""
+    targets = [t.upper() for t in tables] or TableVersion.all_tables()
+    TableVersion.bump(targets)
+    print(f"データバージョンを更新しました: {', '.join(targets) if targets else 'なし'}")
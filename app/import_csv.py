@@ -1,14 +1,19 @@
-import csv
+import time
 import traceback
 from sqlalchemy import text
 
-from app.constants import CsvConstants, DatabaseConstants
-from app.database import get_db_session
-from app.models import BfspMstModel, log_error, process_text_to_db, BprdMeiModel, PrdDatModel, CprdDatModel
+from app.constants import CsvConstants, DatabaseConstants, ImportJobConstants
+from app.csv_reader import CsvReader, CsvReadError
+from app.database import get_db_session, insert_rows
+from app.models import BfspMstModel, log_error, process_text_to_db, BprdMeiModel, PrdDatModel
+from app.logger_utils import log_debug, log_info, RowLogSampler
 from app.models_master import PrdMstModel, CtpdMstModel, CprcMstModel
 
-def import_csv_nonecoat(file_path, has_header=False):
-    """CSVファイルからデータを取り込みPRD_DATテーブルに登録する"""
+def import_csv_nonecoat(file_path, has_header=False, progress=None):
+    """CSVファイルからデータを取り込みPRD_DATテーブルに登録する
+
+    progress を指定すると、一定行数ごとに progress(処理済み行数, エラー一覧) を呼ぶ。
+    """
     
     session = None
     result = {
@@ -22,54 +27,28 @@ def import_csv_nonecoat(file_path, has_header=False):
     
     try:
         session = get_db_session()
+        row_log = RowLogSampler('ノンコートCSV取込')
         
-        # 複数のエンコーディングを試行
-        encodings = ['utf-8-sig', 'utf-8', 'shift-jis', 'cp932']
-        encoding_used = None
-        
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as test_file:
-                    test_file.read()
-                encoding_used = encoding
-                break
-            except UnicodeDecodeError:
-                continue
-        
-        if not encoding_used:
-            error_msg = "CSVファイルのエンコーディングを判別できませんでした"
-            result["errors"].append(error_msg)
-            log_error(error_msg)
-            return result
-        
-        with open(file_path, 'r', encoding=encoding_used) as csvfile:
-            csv_reader = csv.reader(csvfile)
-            
-            # ヘッダー行をスキップ
-            if has_header:
-                try:
-                    next(csv_reader)
-                except StopIteration:
-                    error_msg = "CSVファイルにデータがありません"
-                    result["errors"].append(error_msg)
-                    log_error(error_msg)
-                    return result
-            
-            for i, row in enumerate(csv_reader):
+        # 文字コードは先頭部分で判別し、1行ずつ変換しながら読み込む
+        with CsvReader(file_path, has_header, CsvConstants.CSV_NON_COAT_COLUMN_COUNT) as reader:
+            for record in reader:
+                i = record.row_no - 1
+                if progress and record.row_no % ImportJobConstants.PROGRESS_ROWS == 0:
+                    progress(result["total"], result["errors"])
                 try:
                     result["total"] += 1
                     
-                    # 必要な列数があるか確認
-                    if len(row) < CsvConstants.CSV_NON_COAT_COLUMN_COUNT:  # 76列目をチェックするため最低76列必要
+                    # 必要な列数・文字コードの確認
+                    if record.error:
                         result["skipped"] += 1
-                        error_msg = f"行 {i+1}: 必要な列数がありません（{len(row)}列、最低76列必要）"
+                        error_msg = record.error
                         result["errors"].append(error_msg)
                         log_error(error_msg)
                         continue
                     
                     # 1列目の値を取得し必要な文字を抽出
-                    col1_value = row[0].strip() if row else ""
-                    log_error(f"行 {i+1}: 1列目の値: {col1_value}")
+                    col1_value = record.text(0)
+                    row_log.debug(i + 1, f"行 {i+1}: 1列目の値: {col1_value}")
                     
                     col1_split = col1_value.split("-")
                     if len(col1_split) > 10:
@@ -102,18 +81,18 @@ def import_csv_nonecoat(file_path, has_header=False):
                         continue
                     
                     # 75列目（0始まりなので74）の値を取得して処理
-                    qty_value_75 = row[74].strip() if len(row) > 74 else "0"
-                    log_error(f"行 {i+1}: 75列目の値: {qty_value_75}")
+                    qty_value_75 = record.text(74, "0")
+                    row_log.debug(i + 1, f"行 {i+1}: 75列目の値: {qty_value_75}")
                                             
                     # 数値変換とチェック
                     try:
                         qty_numeric_75 = int(qty_value_75)
                         
-                        log_error(f"行 {i+1}: 75列目の数値: {qty_numeric_75}")
+                        row_log.debug(i + 1, f"行 {i+1}: 75列目の数値: {qty_numeric_75}")
                         
                         if qty_numeric_75 == 0:
                             result["skipped"] += 1
-                            log_error(f"行 {i+1}: 75列目が0のためスキップします")
+                            row_log.debug(i + 1, f"行 {i+1}: 75列目が0のためスキップします")
                             continue
                     except ValueError:
                         result["skipped"] += 1
@@ -129,7 +108,7 @@ def import_csv_nonecoat(file_path, has_header=False):
                             prd_dat_data_75 = common_data.copy()
                             prd_dat_data_75['BPDD_QTY'] = qty_numeric_75  # 数値をそのまま使用
                             
-                            log_error(f"行 {i+1}: 75列目のデータ処理開始: {prd_dat_data_75}")
+                            row_log.debug(i + 1, f"行 {i+1}: 75列目のデータ処理開始: {prd_dat_data_75}")
                             
                             # 75列目用の一意性制約チェック
                             duplicate_check_75 = session.execute(
@@ -147,7 +126,7 @@ def import_csv_nonecoat(file_path, has_header=False):
                                 }
                             ).scalar()
                             
-                            log_error(f"行 {i+1}: 75列目の重複チェック結果: {duplicate_check_75}")
+                            row_log.debug(i + 1, f"行 {i+1}: 75列目の重複チェック結果: {duplicate_check_75}")
                             
                             if duplicate_check_75 > 0:
                                 result["duplicate"] += 1
@@ -164,10 +143,10 @@ def import_csv_nonecoat(file_path, has_header=False):
                                 if existing_prd:
                                     # 既存データがある場合は数量を加算
                                     existing_prd.BPDD_QTY += qty_numeric_75
-                                    log_error(f"行 {i+1}: 既存データの数量を更新: {existing_prd.BPDD_QTY}")
+                                    row_log.debug(i + 1, f"行 {i+1}: 既存データの数量を更新: {existing_prd.BPDD_QTY}")
                                 else:
                                     # 新規データ作成
-                                    log_error(f"行 {i+1}: 新規データを作成します")
+                                    row_log.debug(i + 1, f"行 {i+1}: 新規データを作成します")
                                     processed_data_75 = {k: process_text_to_db(v) for k, v in prd_dat_data_75.items()}
                                     new_record_75 = PrdDatModel(**processed_data_75)
                                     session.add(new_record_75)
@@ -185,11 +164,11 @@ def import_csv_nonecoat(file_path, has_header=False):
                                 # 更新日時情報を設定
                                 session.flush()
                                 result["success"] += 1
-                                log_error(f"行 {i+1}: 75列目データ登録成功")
+                                row_log.debug(i + 1, f"行 {i+1}: 75列目データ登録成功")
                                 
                                 # 75列目処理の個別コミット
                                 session.commit()
-                                log_error(f"行 {i+1}: 75列目データのコミット成功")
+                                row_log.debug(i + 1, f"行 {i+1}: 75列目データのコミット成功")
                         except Exception as e:
                             session.rollback()
                             result["error"] += 1
@@ -199,7 +178,7 @@ def import_csv_nonecoat(file_path, has_header=False):
                             log_error(f"{error_msg}\n{tb}")
                             log_error(f"行 {i+1}: 75列目データ処理でエラー発生、ロールバックしました")
                     else:
-                        log_error(f"行 {i+1}: 75列目の値が0または負数のためスキップします: {qty_numeric_75}")
+                        row_log.debug(i + 1, f"行 {i+1}: 75列目の値が0または負数のためスキップします: {qty_numeric_75}")
                     
                 
                 except Exception as e:
@@ -214,7 +193,7 @@ def import_csv_nonecoat(file_path, has_header=False):
             try:
                 # 全ての処理が終わったらコミット
                 session.commit()
-                log_error(f"CSV取り込み完了: 合計{result['total']}行、"
+                log_info(f"CSV取り込み完了: 合計{result['total']}行、"
                             f"スキップ:{result['skipped']}行、"
                             f"重複:{result['duplicate']}行、"
                             f"エラー:{result['error']}行")
@@ -228,6 +207,12 @@ def import_csv_nonecoat(file_path, has_header=False):
             
             return result
             
+    except CsvReadError as e:
+        if session:
+            session.rollback()
+        result["errors"].append(str(e))
+        log_error(str(e))
+        return result
     except Exception as e:
         if session:
             session.rollback()
@@ -239,11 +224,16 @@ def import_csv_nonecoat(file_path, has_header=False):
     finally:
         if session:
             session.close()
-            log_error("セッションをクローズしました")
+            log_debug("セッションをクローズしました")
+
 
+def import_from_barcode(file_path, has_header=False, bbcd_kbn=1, progress=None):
+    """CSVファイルからバーコードデータをインポートする
 
-def import_from_barcode(file_path, has_header=False, bbcd_kbn=1):
-    """CSVファイルからバーコードデータをインポートする"""
+    CSV全体を読み込んで検証した後、区分の既存データの削除と新しいデータの登録を
+    1トランザクションで行う（取込中にバーコード読取画面から空・途中の一覧が見えない）。
+    progress を指定すると、一定行数ごとに progress(処理済み行数, エラー一覧) を呼ぶ。
+    """
     
     session = None
     result = {
@@ -252,73 +242,41 @@ def import_from_barcode(file_path, has_header=False, bbcd_kbn=1):
         "error": 0,
         "skipped": 0,
         "duplicate": 0,
-        "errors": []
+        "errors": [],
+        "elapsed_sec": 0.0,
+        "rows_per_sec": 0.0
     }
     
     try:
+        start_time = time.perf_counter()
         session = get_db_session()
+        row_log = RowLogSampler('バーコードCSV取込')
         
-        # 既存データの削除（区分指定）
-        try:
-            log_error(f"区分{bbcd_kbn}の既存バーコードデータを削除します")
-            session.execute(text("DELETE FROM BBCD_DAT WHERE BBCD_KBN = :bbcd_kbn"), {"bbcd_kbn": bbcd_kbn})
-            session.commit()
-            log_error("既存データの削除が完了しました")
-        except Exception as e:
-            session.rollback()
-            error_msg = f"既存データの削除中にエラーが発生しました: {str(e)}"
-            result["errors"].append(error_msg)
-            log_error(error_msg)
-            raise Exception(error_msg)
+        # 1. CSV全体を読み込み、検証済みのデータを作成（DBはまだ変更しない）
+        staged = []
+        staged_ids = set()
         
-        # 複数のエンコーディングを試行
-        encodings = ['utf-8-sig', 'utf-8', 'shift-jis', 'cp932']
-        encoding_used = None
-        
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as test_file:
-                    test_file.read()
-                encoding_used = encoding
-                break
-            except UnicodeDecodeError:
-                continue
-        
-        if not encoding_used:
-            error_msg = "CSVファイルのエンコーディングを判別できませんでした"
-            result["errors"].append(error_msg)
-            log_error(error_msg)
-            return result
-        
-        with open(file_path, 'r', encoding=encoding_used) as csvfile:
-            csv_reader = csv.reader(csvfile)
-            
-            # ヘッダー行をスキップ
-            if has_header:
-                try:
-                    next(csv_reader)
-                except StopIteration:
-                    error_msg = "CSVファイルにデータがありません"
-                    result["errors"].append(error_msg)
-                    log_error(error_msg)
-                    return result
-            
-            for i, row in enumerate(csv_reader):
+        # 文字コードは先頭部分で判別し、1行ずつ変換しながら読み込む
+        with CsvReader(file_path, has_header, CsvConstants.CSV_BARCODE_COLUMN_COUNT) as reader:
+            for record in reader:
+                i = record.row_no - 1
+                if progress and record.row_no % ImportJobConstants.PROGRESS_ROWS == 0:
+                    progress(result["total"], result["errors"])
                 try:
                     result["total"] += 1
                     
-                    # 必要な列数があるか確認
-                    if len(row) < 3:  # BBCD_ID, BBCD_NO, BBCD_NMの3列必要
+                    # 必要な列数・文字コードの確認
+                    if record.error:
                         result["skipped"] += 1
-                        error_msg = f"行 {i+1}: 必要な列数がありません（{len(row)}列、最低3列必要）"
+                        error_msg = record.error
                         result["errors"].append(error_msg)
                         log_error(error_msg)
                         continue
                     
                     # データの取得とクリーニング
-                    bcd_id = row[0].strip() if row[0] else ""
-                    bcd_no = row[1].strip() if row[1] else ""
-                    bcd_nm = row[2].strip() if row[2] else ""
+                    bcd_id = record.text(0)
+                    bcd_no = record.text(1)
+                    bcd_nm = record.text(2)
                     
                     # データの検証
                     if not bcd_id:
@@ -352,52 +310,22 @@ def import_from_barcode(file_path, has_header=False, bbcd_kbn=1):
                         log_error(error_msg)
                         continue
                     
-                    # 重複チェック（区分も含めて）
-                    duplicate_check = session.execute(
-                        text("""
-                            SELECT COUNT(*) 
-                            FROM BBCD_DAT 
-                            WHERE BBCD_ID = :bcd_id AND BBCD_KBN = :bbcd_kbn
-                        """),
-                        {
-                            "bcd_id": bcd_id,
-                            "bbcd_kbn": bbcd_kbn
-                        }
-                    ).scalar()
-                    
-                    if duplicate_check > 0:
+                    # 重複チェック（区分内の既存データは置き換えるため、ファイル内の重複のみ）
+                    if bcd_id in staged_ids:
                         result["duplicate"] += 1
                         error_msg = f"行 {i+1}: 重複データが存在します。BBCD_ID: {bcd_id}, 区分: {bbcd_kbn}"
                         result["errors"].append(error_msg)
                         log_error(error_msg)
                         continue
                     
-                    try:
-                        # データの挿入
-                        stmt = text("""
-                            INSERT INTO BBCD_DAT (BBCD_ID, BBCD_NO, BBCD_NM, BBCD_KBN)
-                            VALUES (:bcd_id, :bcd_no, :bcd_nm, :bbcd_kbn)
-                        """)
-                        session.execute(stmt, {
-                            'bcd_id': bcd_id,
-                            'bcd_no': bcd_no,
-                            'bcd_nm': bcd_nm,
-                            'bbcd_kbn': bbcd_kbn
-                        })
-                        
-                        # 個別コミット
-                        session.commit()
-                        result["success"] += 1
-                        log_error(f"行 {i+1}: データ登録成功")
-                        
-                    except Exception as e:
-                        session.rollback()
-                        result["error"] += 1
-                        tb = traceback.format_exc()
-                        error_msg = f"行 {i+1}: データ登録エラー: {str(e)}"
-                        result["errors"].append(error_msg)
-                        log_error(f"{error_msg}\n{tb}")
-                        continue
+                    staged_ids.add(bcd_id)
+                    staged.append({
+                        'BBCD_ID': bcd_id,
+                        'BBCD_NO': bcd_no,
+                        'BBCD_NM': bcd_nm,
+                        'BBCD_KBN': bbcd_kbn
+                    })
+                    row_log.debug(i + 1, f"行 {i+1}: データ検証OK")
                     
                 except Exception as e:
                     result["error"] += 1
@@ -406,25 +334,47 @@ def import_from_barcode(file_path, has_header=False, bbcd_kbn=1):
                     result["errors"].append(error_msg)
                     log_error(f"{error_msg}\n{tb}")
                     continue
-            
-            try:
-                # 全ての処理が終わったらコミット
-                session.commit()
-                log_error(f"CSV取り込み完了: 合計{result['total']}行、"
-                            f"成功:{result['success']}行、"
-                            f"スキップ:{result['skipped']}行、"
-                            f"重複:{result['duplicate']}行、"
-                            f"エラー:{result['error']}行")
-            except Exception as e:
-                session.rollback()
-                tb = traceback.format_exc()
-                error_msg = f"コミット処理でエラーが発生しました: {str(e)}"
-                result["errors"].append(error_msg)
-                log_error(f"{error_msg}\n{tb}")
-                raise
-            
+        
+        if not staged:
+            error_msg = "取り込めるデータがないため、既存のバーコードデータは変更しません"
+            result["errors"].append(error_msg)
+            log_error(error_msg)
             return result
+        
+        # 2. 既存データの削除と登録を1トランザクションで入れ替え
+        try:
+            log_info(f"区分{bbcd_kbn}のバーコードデータを入れ替えます（{len(staged)}件）")
+            session.execute(text("DELETE FROM BBCD_DAT WHERE BBCD_KBN = :bbcd_kbn"), {"bbcd_kbn": bbcd_kbn})
+            insert_rows(session, 'BBCD_DAT', staged)
+            session.commit()
+            result["success"] = len(staged)
+        except Exception as e:
+            session.rollback()
+            result["error"] += len(staged)
+            tb = traceback.format_exc()
+            error_msg = f"バーコードデータの入れ替え中にエラーが発生しました（既存データは変更していません）: {str(e)}"
+            result["errors"].append(error_msg)
+            log_error(f"{error_msg}\n{tb}")
+            raise Exception(error_msg)
+        
+        elapsed = time.perf_counter() - start_time
+        result["elapsed_sec"] = round(elapsed, 2)
+        result["rows_per_sec"] = round(result["total"] / elapsed, 1) if elapsed > 0 else 0.0
+        log_info(f"CSV取り込み完了: 合計{result['total']}行、"
+                    f"成功:{result['success']}行、"
+                    f"スキップ:{result['skipped']}行、"
+                    f"重複:{result['duplicate']}行、"
+                    f"エラー:{result['error']}行、"
+                    f"{result['rows_per_sec']}行/秒")
+        
+        return result
             
+    except CsvReadError as e:
+        if session:
+            session.rollback()
+        result["errors"].append(str(e))
+        log_error(str(e))
+        return result
     except Exception as e:
         if session:
             session.rollback()
@@ -436,11 +386,16 @@ def import_from_barcode(file_path, has_header=False, bbcd_kbn=1):
     finally:
         if session:
             session.close()
-            log_error("セッションをクローズしました")
+            log_debug("セッションをクローズしました")
 
 
-def import_csv_common(file_path, has_header=False):
-    """CSVファイルからデータを取り込みCPRD_DATテーブルに登録する"""
+def import_csv_common(file_path, has_header=False, progress=None):
+    """CSVファイルからデータを取り込みCPRD_DATテーブルに登録する
+
+    製品マスタは最初に一括で読み込み、既存データはファイル内のLOTについて
+    まとめて検索する。新規データは複数行INSERTで一定行数ごとに登録・コミットする。
+    progress を指定すると、一定行数ごとに progress(処理済み行数, エラー一覧) を呼ぶ。
+    """
     
     session = None
     result = {
@@ -454,54 +409,35 @@ def import_csv_common(file_path, has_header=False):
     
     try:
         session = get_db_session()
+        row_log = RowLogSampler('コートCSV取込')
         
-        # 複数のエンコーディングを試行
-        encodings = ['utf-8-sig', 'utf-8', 'shift-jis', 'cp932']
-        encoding_used = None
-        
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as test_file:
-                    test_file.read()
-                encoding_used = encoding
-                break
-            except UnicodeDecodeError:
-                continue
+        # 製品マスタ（製品ID → 商品分類）を一括で取得
+        prd_kbn_map = PrdMstModel.get_kbn_map()
         
-        if not encoding_used:
-            error_msg = "CSVファイルのエンコーディングを判別できませんでした"
-            result["errors"].append(error_msg)
-            log_error(error_msg)
-            return result
+        # 1. CSVを読み込み、登録候補（75列目=ランク1、76列目=ランク2）を作成
+        candidates = []
+        lots = set()
         
-        with open(file_path, 'r', encoding=encoding_used) as csvfile:
-            csv_reader = csv.reader(csvfile)
-            
-            # ヘッダー行をスキップ
-            if has_header:
-                try:
-                    next(csv_reader)
-                except StopIteration:
-                    error_msg = "CSVファイルにデータがありません"
-                    result["errors"].append(error_msg)
-                    log_error(error_msg)
-                    return result
-            
-            for i, row in enumerate(csv_reader):
+        # 文字コードは先頭部分で判別し、1行ずつ変換しながら読み込む
+        with CsvReader(file_path, has_header, CsvConstants.CSV_NON_COAT_COLUMN_COUNT) as reader:
+            for record in reader:
+                i = record.row_no - 1
+                if progress and record.row_no % ImportJobConstants.PROGRESS_ROWS == 0:
+                    progress(result["total"], result["errors"])
                 try:
                     result["total"] += 1
                     
-                    # 必要な列数があるか確認
-                    if len(row) < CsvConstants.CSV_NON_COAT_COLUMN_COUNT:  # 76列目をチェックするため最低76列必要
+                    # 必要な列数・文字コードの確認
+                    if record.error:
                         result["skipped"] += 1
-                        error_msg = f"行 {i+1}: 必要な列数がありません（{len(row)}列、最低76列必要）"
+                        error_msg = record.error
                         result["errors"].append(error_msg)
                         log_error(error_msg)
                         continue
                     
                     # 1列目の値を取得し必要な文字を抽出
-                    col1_value = row[0].strip() if row else ""
-                    log_error(f"行 {i+1}: 1列目の値: {col1_value}")
+                    col1_value = record.text(0)
+                    row_log.debug(i + 1, f"行 {i+1}: 1列目の値: {col1_value}")
                     
                     prd_id = ""
                     lot = ""
@@ -514,15 +450,15 @@ def import_csv_common(file_path, has_header=False):
                         prd_id = col1_split[0][:5]
                         lot = col1_split[0][5:11]
                     
-                    prd_mst = PrdMstModel.get_by_prd_id(prd_id)
-                    if not prd_mst:
+                    prd_kbn = prd_kbn_map.get(prd_id)
+                    if prd_kbn is None:
                         result["skipped"] += 1
                         error_msg = f"行 {i+1}: 製品IDが存在しません。1列目: {prd_id}"
                         result["errors"].append(error_msg)
                         log_error(error_msg)
                         continue
                     
-                    if prd_mst.PRD_KBN != 1:
+                    if prd_kbn != 1:
                         result["skipped"] += 1
                         # 製品区分が1ではない場合はスキップ エラーは表示しない
                         continue
@@ -533,45 +469,19 @@ def import_csv_common(file_path, has_header=False):
                     else:
                         sprit2 = 0
                     
-                    # 共通のデータを作成（CPRD_DAT用）
-                    common_data = {
-                        'CPDD_PRD_ID': prd_id,
-                        'CPDD_LOT': lot,
-                        'CPDD_SPRIT1': sprit1,
-                        'CPDD_SPRIT2': sprit2,
-                        'CPDD_RANK': 1,  # デフォルトランク
-                        'CPDD_QTY': 0,
-                        'CPDD_FLG': 0,
-                        'CPDD_PCD_ID': 0,  # 加工ID（デフォルト0）
-                    }
-                    
-                    # データの検証
-                    if not common_data['CPDD_PRD_ID']:
-                        result["skipped"] += 1
-                        error_msg = f"行 {i+1}: 製品IDを取得できません。1列目: {col1_value}"
-                        result["errors"].append(error_msg)
-                        log_error(error_msg)
-                        continue
-                    
-                    # 75列目（0始まりなので74）の値を取得して処理
-                    qty_value_75 = row[74].strip() if len(row) > 74 else "0"
-                    log_error(f"行 {i+1}: 75列目の値: {qty_value_75}")
+                    # 75列目（0始まりなので74）・76列目（75）の値を取得して処理
+                    qty_value_75 = record.text(74, "0")
+                    qty_value_76 = record.text(75, "0")
+                    row_log.debug(i + 1, f"行 {i+1}: 75列目の値: {qty_value_75}、76列目の値: {qty_value_76}")
                     
-                    # 76列目（0始まりなので75）の値を取得して処理
-                    qty_value_76 = row[75].strip() if len(row) > 75 else "0"
-                    log_error(f"行 {i+1}: 76列目の値: {qty_value_76}")
-                                            
                     # 数値変換とチェック
                     try:
                         qty_numeric_75 = int(qty_value_75)
                         qty_numeric_76 = int(qty_value_76)
                         
-                        log_error(f"行 {i+1}: 75列目の数値: {qty_numeric_75}")
-                        log_error(f"行 {i+1}: 76列目の数値: {qty_numeric_76}")
-                        
                         if qty_numeric_75 == 0 and qty_numeric_76 == 0:
                             result["skipped"] += 1
-                            log_error(f"行 {i+1}: 75列目と76列目の両方が0のためスキップします")
+                            row_log.debug(i + 1, f"行 {i+1}: 75列目と76列目の両方が0のためスキップします")
                             continue
                     except ValueError:
                         result["skipped"] += 1
@@ -580,165 +490,22 @@ def import_csv_common(file_path, has_header=False):
                         log_error(error_msg)
                         continue
                     
-                    # --- 75列目の処理 ---
-                    if qty_numeric_75 > 0:
-                        try:
-                            # 75列目用のデータを作成
-                            cprd_dat_data_75 = common_data.copy()
-                            cprd_dat_data_75['CPDD_QTY'] = qty_numeric_75  # 数値をそのまま使用
-                            
-                            log_error(f"行 {i+1}: 75列目のデータ処理開始: {cprd_dat_data_75}")
-                            
-                            # 75列目用の一意性制約チェック
-                            duplicate_check_75 = session.execute(
-                                text("""
-                                    SELECT COUNT(*) 
-                                    FROM CPRD_DAT 
-                                    WHERE CPDD_PRD_ID = :prd_id
-                                    AND CPDD_LOT = :lot
-                                    AND CPDD_SPRIT1 = :sprit1
-                                    AND CPDD_SPRIT2 = :sprit2
-                                    AND CPDD_RANK = :rank
-                                """),
-                                {
-                                    "prd_id": cprd_dat_data_75['CPDD_PRD_ID'],
-                                    "lot": cprd_dat_data_75['CPDD_LOT'],
-                                    "sprit1": cprd_dat_data_75['CPDD_SPRIT1'],
-                                    "sprit2": cprd_dat_data_75['CPDD_SPRIT2'],
-                                    "rank": cprd_dat_data_75['CPDD_RANK']
-                                }
-                            ).scalar()
-                            
-                            log_error(f"行 {i+1}: 75列目の重複チェック結果: {duplicate_check_75}")
-                            
-                            if duplicate_check_75 > 0:
-                                result["duplicate"] += 1
-                                error_msg = (f"行 {i+1}: 75列目データの一意性制約違反 - 同じ組み合わせのデータが既に存在します。")
-                                result["errors"].append(error_msg)
-                                log_error(error_msg)
-                            else:
-                                # CprdDatModelの既存データをチェック
-                                existing_cprd = session.query(CprdDatModel).filter(
-                                    CprdDatModel.CPDD_PRD_ID == cprd_dat_data_75['CPDD_PRD_ID'],
-                                    CprdDatModel.CPDD_LOT == cprd_dat_data_75['CPDD_LOT'],
-                                    CprdDatModel.CPDD_SPRIT1 == cprd_dat_data_75['CPDD_SPRIT1'],
-                                    CprdDatModel.CPDD_SPRIT2 == cprd_dat_data_75['CPDD_SPRIT2'],
-                                    CprdDatModel.CPDD_RANK == cprd_dat_data_75['CPDD_RANK']
-                                ).first()
-
-                                if existing_cprd:
-                                    # 既存データがある場合はスキップ
-                                    result["duplicate"] += 1
-                                    result["skipped"] += 1
-                                    error_msg = f"行 {i+1}: 75列目データは既に存在するためスキップします"
-                                    result["errors"].append(error_msg)
-                                    log_error(error_msg)
-                                else:
-                                    # 新規データ作成
-                                    log_error(f"行 {i+1}: 新規データを作成します")
-                                    processed_data_75 = {k: process_text_to_db(v) for k, v in cprd_dat_data_75.items()}
-                                    new_record_75 = CprdDatModel(**processed_data_75)
-                                    session.add(new_record_75)
-
-                                # 更新日時情報を設定
-                                session.flush()
-                                result["success"] += 1
-                                log_error(f"行 {i+1}: 75列目データ登録成功")
-                                
-                                # 75列目処理の個別コミット
-                                session.commit()
-                                log_error(f"行 {i+1}: 75列目データのコミット成功")
-                        except Exception as e:
-                            session.rollback()
-                            result["error"] += 1
-                            tb = traceback.format_exc()
-                            error_msg = f"行 {i+1}: 75列目データ処理エラー: {str(e)}"
-                            result["errors"].append(error_msg)
-                            log_error(f"{error_msg}\n{tb}")
-                            log_error(f"行 {i+1}: 75列目データ処理でエラー発生、ロールバックしました")
-                    else:
-                        log_error(f"行 {i+1}: 75列目の値が0または負数のためスキップします: {qty_numeric_75}")
-                    
-                    # --- 76列目の処理 ---
-                    if qty_numeric_76 > 0:
-                        try:
-                            # 76列目用のデータを作成
-                            cprd_dat_data_76 = common_data.copy()
-                            cprd_dat_data_76['CPDD_RANK'] = 2  # ランク=2（76列目用）
-                            cprd_dat_data_76['CPDD_QTY'] = qty_numeric_76  # 数値をそのまま使用
-                            
-                            log_error(f"行 {i+1}: 76列目のデータ処理開始: {cprd_dat_data_76}")
-                            
-                            # 76列目用の一意性制約チェック
-                            duplicate_check_76 = session.execute(
-                                text("""
-                                    SELECT COUNT(*) 
-                                    FROM CPRD_DAT 
-                                    WHERE CPDD_PRD_ID = :prd_id
-                                    AND CPDD_LOT = :lot
-                                    AND CPDD_SPRIT1 = :sprit1
-                                    AND CPDD_SPRIT2 = :sprit2
-                                    AND CPDD_RANK = :rank
-                                """),
-                                {
-                                    "prd_id": cprd_dat_data_76['CPDD_PRD_ID'],
-                                    "lot": cprd_dat_data_76['CPDD_LOT'],
-                                    "sprit1": cprd_dat_data_76['CPDD_SPRIT1'],
-                                    "sprit2": cprd_dat_data_76['CPDD_SPRIT2'],
-                                    "rank": cprd_dat_data_76['CPDD_RANK']
-                                }
-                            ).scalar()
-                            
-                            log_error(f"行 {i+1}: 76列目の重複チェック結果: {duplicate_check_76}")
-                            
-                            if duplicate_check_76 > 0:
-                                result["duplicate"] += 1
-                                error_msg = (f"行 {i+1}: 76列目データの一意性制約違反 - 同じ組み合わせのデータが既に存在します。")
-                                result["errors"].append(error_msg)
-                                log_error(error_msg)
-                            else:
-                                # CprdDatModelの既存データをチェック
-                                existing_cprd_76 = session.query(CprdDatModel).filter(
-                                    CprdDatModel.CPDD_PRD_ID == cprd_dat_data_76['CPDD_PRD_ID'],
-                                    CprdDatModel.CPDD_LOT == cprd_dat_data_76['CPDD_LOT'],
-                                    CprdDatModel.CPDD_SPRIT1 == cprd_dat_data_76['CPDD_SPRIT1'],
-                                    CprdDatModel.CPDD_SPRIT2 == cprd_dat_data_76['CPDD_SPRIT2'],
-                                    CprdDatModel.CPDD_RANK == cprd_dat_data_76['CPDD_RANK']
-                                ).first()
-
-                                if existing_cprd_76:
-                                    # 既存データがある場合はスキップ
-                                    result["duplicate"] += 1
-                                    result["skipped"] += 1
-                                    error_msg = f"行 {i+1}: 76列目データは既に存在するためスキップします"
-                                    result["errors"].append(error_msg)
-                                    log_error(error_msg)
-                                else:
-                                    # 新規データ作成
-                                    log_error(f"行 {i+1}: 新規データを作成します")
-                                    processed_data_76 = {k: process_text_to_db(v) for k, v in cprd_dat_data_76.items()}
-                                    new_record_76 = CprdDatModel(**processed_data_76)
-                                    session.add(new_record_76)
-
-                                # 更新日時情報を設定
-                                session.flush()
-                                result["success"] += 1
-                                log_error(f"行 {i+1}: 76列目データ登録成功")
-                                
-                                # 76列目処理の個別コミット
-                                session.commit()
-                                log_error(f"行 {i+1}: 76列目データのコミット成功")
-                        except Exception as e:
-                            session.rollback()
-                            result["error"] += 1
-                            tb = traceback.format_exc()
-                            error_msg = f"行 {i+1}: 76列目データ処理エラー: {str(e)}"
-                            result["errors"].append(error_msg)
-                            log_error(f"{error_msg}\n{tb}")
-                            log_error(f"行 {i+1}: 76列目データ処理でエラー発生、ロールバックしました")
-                    else:
-                        log_error(f"行 {i+1}: 76列目の値が0または負数のためスキップします: {qty_numeric_76}")
-                    
+                    lot_no = int(lot)
+                    lots.add(lot_no)
+                    for column_name, rank, qty in (('75列目', 1, qty_numeric_75), ('76列目', 2, qty_numeric_76)):
+                        if qty > 0:
+                            candidates.append((i + 1, column_name, {
+                                'CPDD_PRD_ID': prd_id,
+                                'CPDD_LOT': lot_no,
+                                'CPDD_SPRIT1': sprit1,
+                                'CPDD_SPRIT2': sprit2,
+                                'CPDD_RANK': rank,
+                                'CPDD_QTY': qty,
+                                'CPDD_FLG': 0,
+                                'CPDD_PCD_ID': 0,  # 加工ID（デフォルト0）
+                            }))
+                        else:
+                            row_log.debug(i + 1, f"行 {i+1}: {column_name}の値が0または負数のためスキップします: {qty}")
                 
                 except Exception as e:
                     result["error"] += 1
@@ -746,27 +513,67 @@ def import_csv_common(file_path, has_header=False):
                     error_msg = f"行 {i+1}: 処理エラー: {str(e)}"
                     result["errors"].append(error_msg)
                     log_error(f"{error_msg}\n{tb}")
-                    log_error(f"行 {i+1}: 全体処理でエラー発生: {str(e)}")
                     continue
-            
+        
+        # 2. ファイル内のLOTについて既存データのキーをまとめて取得
+        existing_keys = set()
+        lot_list = sorted(lots)
+        for start in range(0, len(lot_list), CsvConstants.IMPORT_LOOKUP_CHUNK):
+            chunk = lot_list[start:start + CsvConstants.IMPORT_LOOKUP_CHUNK]
+            params = {f"lot{n}": lot_no for n, lot_no in enumerate(chunk)}
+            rows = session.execute(text(f"""
+                SELECT CPDD_PRD_ID, CPDD_LOT, CPDD_SPRIT1, CPDD_SPRIT2, CPDD_RANK
+                FROM CPRD_DAT
+                WHERE CPDD_LOT IN ({', '.join(':' + name for name in params)})
+            """), params).fetchall()
+            existing_keys.update(
+                (r.CPDD_PRD_ID, int(r.CPDD_LOT), int(r.CPDD_SPRIT1), int(r.CPDD_SPRIT2), int(r.CPDD_RANK))
+                for r in rows
+            )
+        
+        # 3. 一意性制約チェック（ファイル内の重複も含む）
+        new_records = []
+        for row_no, column_name, data in candidates:
+            key = (data['CPDD_PRD_ID'], data['CPDD_LOT'], data['CPDD_SPRIT1'], data['CPDD_SPRIT2'], data['CPDD_RANK'])
+            if key in existing_keys:
+                result["duplicate"] += 1
+                error_msg = f"行 {row_no}: {column_name}データの一意性制約違反 - 同じ組み合わせのデータが既に存在します。"
+                result["errors"].append(error_msg)
+                log_error(error_msg)
+                continue
+            existing_keys.add(key)
+            new_records.append((row_no, column_name, data))
+        
+        # 4. 新規データを一定行数ごとに一括登録・コミット
+        for start in range(0, len(new_records), CsvConstants.IMPORT_COMMIT_ROWS):
+            batch = new_records[start:start + CsvConstants.IMPORT_COMMIT_ROWS]
             try:
-                # 全ての処理が終わったらコミット
+                insert_rows(session, 'CPRD_DAT', [data for _, _, data in batch])
                 session.commit()
-                log_error(f"CSV取り込み完了: 合計{result['total']}行、"
-                            f"成功:{result['success']}行、"
-                            f"スキップ:{result['skipped']}行、"
-                            f"重複:{result['duplicate']}行、"
-                            f"エラー:{result['error']}行")
+                result["success"] += len(batch)
+                log_info(f"コートCSV取込: {start + len(batch)}/{len(new_records)}件を登録しました")
             except Exception as e:
                 session.rollback()
+                result["error"] += len(batch)
                 tb = traceback.format_exc()
-                error_msg = f"コミット処理でエラーが発生しました: {str(e)}"
+                error_msg = f"行 {batch[0][0]}～{batch[-1][0]}: データ登録エラー: {str(e)}"
                 result["errors"].append(error_msg)
                 log_error(f"{error_msg}\n{tb}")
-                raise
-            
-            return result
+        
+        log_info(f"CSV取り込み完了: 合計{result['total']}行、"
+                    f"成功:{result['success']}件、"
+                    f"スキップ:{result['skipped']}行、"
+                    f"重複:{result['duplicate']}件、"
+                    f"エラー:{result['error']}件")
+        
+        return result
             
+    except CsvReadError as e:
+        if session:
+            session.rollback()
+        result["errors"].append(str(e))
+        log_error(str(e))
+        return result
     except Exception as e:
         if session:
             session.rollback()
@@ -778,4 +585,4 @@ def import_csv_common(file_path, has_header=False):
     finally:
         if session:
             session.close()
-            log_error("セッションをクローズしました")
+            log_debug("セッションをクローズしました")
@@ -1,38 +1,36 @@
 
-import tempfile
-import os
-import pandas as pd
-import openpyxl
 from datetime import datetime
-import traceback
 
-from flask import flash, redirect, url_for
 from sqlalchemy import text
 
-from app.constants import DatabaseConstants, ExcelConstants
+from app.constants import DatabaseConstants, ExcelConstants, ImportJobConstants
 from app.database import get_db_session
-        
-def import_excel_hardcoat(file):
-    temp_dir = tempfile.gettempdir()
-    temp_path = os.path.join(temp_dir, file.filename)
-    file.save(temp_path)
-    
-    # ファイルサイズをチェック
-    if os.path.getsize(temp_path) == 0:
-        os.remove(temp_path)
-        flash('ファイルが空です', 'error')
-        return redirect(url_for('hardcoat_read_excel'))
-        
-    # Excelファイルの処理
-    
+
+def import_excel_hardcoat_file(file_path, progress=None):
+    """ハードコート指図Excelを取り込みBPRD_DATに登録する
+
+    Args:
+        file_path (str): Excelファイルのパス
+        progress (callable): 進捗通知 progress(処理済み行数, エラー一覧, 総行数)
+
+    Returns:
+        dict: 取込結果（total/success/error/errors）
+    """
+    # openpyxlは読み込みが重いため、使用時に読み込む
+    import openpyxl
+
     # Excelファイルを読み込む
-    wb = openpyxl.load_workbook(temp_path)
+    wb = openpyxl.load_workbook(file_path)
     
     # データを処理
     session = get_db_session()
     processed_count = 0
     error_count = 0
     error_messages = []
+    row_count = 0
+    # 進捗表示用の総行数（各シートの最終行までの概算）
+    total_estimate = sum(max(0, wb[name].max_row - ExcelConstants.WRITE_START_ROW + 1)
+                         for name in wb.sheetnames if name != ExcelConstants.TEMPLATE_SHEET_NAME)
     
     try:
         # 製品マスタデータを一括取得
@@ -72,6 +70,9 @@ def import_excel_hardcoat(file):
 
             # データを一括で処理
             for row in data_rows:
+                row_count += 1
+                if progress and row_count % ImportJobConstants.PROGRESS_ROWS == 0:
+                    progress(row_count, error_messages, total_estimate)
                 try:
                     lot = str(sheet[f'{ExcelConstants.COLUMN_LOT}{row}'].value)  # 数値を文字列に変換
                     base = int(sheet[f'{ExcelConstants.COLUMN_BASE}{row}'].value)
@@ -177,36 +178,16 @@ def import_excel_hardcoat(file):
         # 最終コミット
         if processed_count > 0:
             session.commit()
-            
-        # 結果メッセージの構築
-        if processed_count > 0 and error_count == 0:
-            flash(f'ファイルのインポートが完了しました。処理件数: {processed_count}件', 'success')
-        elif processed_count > 0 and error_count > 0:
-            flash(f'部分的なインポートが完了しました。成功: {processed_count}件, エラー: {error_count}件', 'warning')
-        else:
-            flash(f'インポートに失敗しました。エラー件数: {error_count}件', 'error')
-            
-        # エラーメッセージがある場合は詳細を表示
-        if error_messages:
-            error_details = '\n'.join(error_messages[:10])  # 最初の10件のみ表示
-            if len(error_messages) > 10:
-                error_details += f'\n... 他 {len(error_messages) - 10}件のエラーがあります'
-            flash(f'エラー詳細:\n{error_details}', 'error')
-            
-        return redirect(url_for('hardcoat_read_excel'))
+        
+        return {
+            'total': row_count,
+            'success': processed_count,
+            'error': error_count,
+            'errors': error_messages
+        }
 
-    except Exception as e:
+    except Exception:
         session.rollback()
-        tb = traceback.format_exc()
-        flash(f'Excelファイルのインポート中にエラーが発生しました: {str(e)}', 'error')
-        flash(f'エラー詳細:\n{tb}', 'error')
-        return redirect(url_for('hardcoat_read_excel'))
+        raise
     finally:
         session.close()
-        # 一時ファイルを削除（元のまま）
-        try:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-        except Exception as e:
-            print(f"一時ファイルの削除に失敗: {str(e)}")
-
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""CSV・Excel取込の非同期ジョブ管理
+
+アップロードされたファイルをジョブごとのディレクトリに保存し、スレッドプールで
+取込処理を実行する。ジョブの状態・進捗は app/data 配下のJSONファイルに保存するため、
+どのワーカーに進捗の問い合わせが来ても同じ内容を返せる。
+エラーの全件は errors.txt に保存し、履歴は IMPORT_JOB_MAX_HISTORY 件まで保持する。
+待機中・実行中のジョブは登録したプロセスが一定間隔で heartbeat_at を更新し、
+更新が途絶えたジョブ（ワーカーの再起動等）は失敗として扱う。
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from werkzeug.utils import secure_filename
+
+from app.constants import ImportJobConstants
+from app.import_csv import import_csv_common, import_csv_nonecoat, import_from_barcode
+from app.import_excel import import_excel_hardcoat_file
+from app.logger_utils import log_error, log_info
+
+JOB_FILE = 'job.json'
+ERRORS_FILE = 'errors.txt'
+
+
+def _get_int_env(name, default):
+    """整数の環境変数を取得する（不正な値は既定値）"""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _heartbeat_stale(job):
+    """ジョブの heartbeat_at が途絶えているかどうか"""
+    heartbeat_at = job.get('heartbeat_at') or job['created_at']
+    elapsed = (datetime.now() - datetime.strptime(heartbeat_at, '%Y-%m-%d %H:%M:%S')).total_seconds()
+    return elapsed > ImportJobConstants.HEARTBEAT_TIMEOUT_SEC
+
+
+# ジョブの種類ごとの取込処理: runner(ファイルパス, オプション, 進捗通知) → 取込結果のdict
+RUNNERS = {
+    ImportJobConstants.KIND_NONCOAT_CSV: lambda path, options, progress: import_csv_nonecoat(
+        path, options.get('has_header', False), progress=progress),
+    ImportJobConstants.KIND_BARCODE_CSV: lambda path, options, progress: import_from_barcode(
+        path, options.get('has_header', False), options.get('bbcd_kbn'), progress=progress),
+    ImportJobConstants.KIND_COMMON_CSV: lambda path, options, progress: import_csv_common(
+        path, options.get('has_header', False), progress=progress),
+    ImportJobConstants.KIND_HARDCOAT_EXCEL: lambda path, options, progress: import_excel_hardcoat_file(
+        path, progress=progress),
+}
+
+
+class JobProgress:
+    """取込処理から呼ばれる進捗通知（一定間隔でジョブファイルに書き込む）"""
+
+    def __init__(self, job_id, total=None):
+        self.job_id = job_id
+        self.total = total
+        self._last_write = 0.0
+
+    def __call__(self, processed, errors, total=None):
+        """進捗を通知する
+
+        Args:
+            processed (int): 処理済みの行数
+            errors (list): これまでのエラーメッセージ
+            total (int): 総行数（判明した場合）
+        """
+        if total is not None:
+            self.total = total
+        now = time.monotonic()
+        if now - self._last_write < ImportJobConstants.PROGRESS_INTERVAL_SEC:
+            return
+        self._last_write = now
+        ImportJobManager.update(
+            self.job_id,
+            heartbeat_at=_now(),
+            processed=processed,
+            total=self.total,
+            error_count=len(errors),
+            recent_errors=errors[-ImportJobConstants.RECENT_ERROR_COUNT:]
+        )
+
+
+class ImportJobManager:
+    """取込ジョブの登録・実行・状態管理クラス"""
+    _lock = threading.Lock()
+    _executor = None
+    _active_jobs = set()
+    _heartbeat_thread = None
+    _job_root = os.path.join(os.path.dirname(__file__), 'data',
+                             os.getenv('IMPORT_JOB_DIR', ImportJobConstants.DEFAULT_JOB_DIR))
+
+    @classmethod
+    def _get_executor(cls):
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=_get_int_env('IMPORT_JOB_WORKERS', ImportJobConstants.DEFAULT_WORKERS),
+                    thread_name_prefix='import-job'
+                )
+                cls._heartbeat_thread = threading.Thread(
+                    target=cls._heartbeat_loop, name='import-job-heartbeat', daemon=True
+                )
+                cls._heartbeat_thread.start()
+            return cls._executor
+
+    @classmethod
+    def _heartbeat_loop(cls):
+        """このプロセスの待機中・実行中ジョブの heartbeat_at を更新し続ける
+
+        進捗通知のない処理（Excelの読み込み・コミット等）が長引いても途絶えないよう、
+        取込処理とは別のスレッドで更新する。
+        """
+        while True:
+            time.sleep(ImportJobConstants.HEARTBEAT_INTERVAL_SEC)
+            with cls._lock:
+                job_ids = list(cls._active_jobs)
+            for job_id in job_ids:
+                try:
+                    cls.update(job_id, heartbeat_at=_now())
+                except Exception as e:
+                    log_error(f"ジョブの heartbeat 更新に失敗しました({job_id}): {str(e)}")
+
+    @classmethod
+    def _job_dir(cls, job_id):
+        return os.path.join(cls._job_root, secure_filename(job_id))
+
+    @classmethod
+    def _read_job(cls, job_id):
+        try:
+            with open(os.path.join(cls._job_dir(job_id), JOB_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError) as e:
+            log_error(f"ジョブファイルの読み込みに失敗しました({job_id}): {str(e)}")
+            return None
+
+    @classmethod
+    def _write_job(cls, job):
+        """ジョブファイルを一時ファイル経由で置き換える（他ワーカーに途中状態を見せない）"""
+        path = os.path.join(cls._job_dir(job['id']), JOB_FILE)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def submit(cls, kind, file, user_id, options=None):
+        """アップロードファイルを保存してジョブを登録する
+
+        Args:
+            kind (str): ジョブの種類
+            file (FileStorage): アップロードファイル
+            user_id (str): 登録したユーザー
+            options (dict): 取込処理に渡すオプション（ヘッダー有無など）
+
+        Returns:
+            str: ジョブID
+        """
+        if kind not in RUNNERS:
+            raise ValueError(f"未登録の取込ジョブです: {kind}")
+        job_id = datetime.now().strftime('%Y%m%d%H%M%S') + '_' + uuid.uuid4().hex[:8]
+        job_dir = cls._job_dir(job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        # 日本語のファイル名は secure_filename で消えるため、拡張子のみ引き継ぐ
+        filename = 'upload' + os.path.splitext(file.filename)[1].lower()
+        file_path = os.path.join(job_dir, filename)
+        file.save(file_path)
+
+        job = {
+            'id': job_id,
+            'kind': kind,
+            'filename': file.filename,
+            'stored_file': filename,
+            'user_id': user_id,
+            'options': options or {},
+            'status': ImportJobConstants.STATUS_QUEUED,
+            'created_at': _now(),
+            'heartbeat_at': _now(),
+            'started_at': None,
+            'finished_at': None,
+            'elapsed_sec': None,
+            'processed': 0,
+            'total': cls._estimate_total(file_path),
+            'error_count': 0,
+            'recent_errors': [],
+            'result': None,
+            'message': None,
+        }
+        cls._write_job(job)
+        executor = cls._get_executor()
+        with cls._lock:
+            cls._active_jobs.add(job_id)
+        executor.submit(cls._run, job_id)
+        log_info(f"取込ジョブを登録しました: {job_id}（{ImportJobConstants.KIND_LABELS.get(kind, kind)}、{file.filename}）")
+        cls._remove_old_jobs()
+        return job_id
+
+    @staticmethod
+    def _estimate_total(file_path):
+        """CSVの行数（改行数）を数える。Excel等は取込処理から通知する"""
+        if not file_path.lower().endswith('.csv'):
+            return None
+        count = 0
+        last = b''
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                count += chunk.count(b'\n')
+                last = chunk
+        return count + (1 if last and not last.endswith(b'\n') else 0)
+
+    @classmethod
+    def update(cls, job_id, **fields):
+        """ジョブの状態を更新する"""
+        with cls._lock:
+            job = cls._read_job(job_id)
+            if job is None:
+                return None
+            job.update(fields)
+            cls._write_job(job)
+            return job
+
+    @classmethod
+    def _run(cls, job_id):
+        """ジョブを実行する（スレッドプール上で動作）"""
+        job = cls._read_job(job_id)
+        if job is None:
+            with cls._lock:
+                cls._active_jobs.discard(job_id)
+            return
+        start = time.perf_counter()
+        cls.update(job_id, status=ImportJobConstants.STATUS_RUNNING, started_at=_now(), heartbeat_at=_now())
+        progress = JobProgress(job_id, job.get('total'))
+        file_path = os.path.join(cls._job_dir(job_id), job['stored_file'])
+        try:
+            result = RUNNERS[job['kind']](file_path, job['options'], progress)
+            errors = result.get('errors', [])
+            cls._write_errors(job_id, errors)
+            summary = {k: v for k, v in result.items() if k != 'errors'}
+            cls.update(
+                job_id,
+                status=ImportJobConstants.STATUS_COMPLETED,
+                processed=result.get('total', progress.total or 0),
+                total=result.get('total', progress.total),
+                error_count=len(errors),
+                recent_errors=errors[:ImportJobConstants.RECENT_ERROR_COUNT],
+                result=summary,
+                heartbeat_at=_now(),
+                finished_at=_now(),
+                elapsed_sec=round(time.perf_counter() - start, 2),
+            )
+            log_info(f"取込ジョブが完了しました: {job_id} {summary}")
+        except Exception as e:
+            tb = traceback.format_exc()
+            log_error(f"取込ジョブでエラーが発生しました({job_id}): {str(e)}\n{tb}")
+            cls._write_errors(job_id, [str(e)])
+            cls.update(
+                job_id,
+                status=ImportJobConstants.STATUS_FAILED,
+                message=str(e),
+                heartbeat_at=_now(),
+                finished_at=_now(),
+                elapsed_sec=round(time.perf_counter() - start, 2),
+            )
+        finally:
+            with cls._lock:
+                cls._active_jobs.discard(job_id)
+            # 取込済みのアップロードファイルは残さない（エラー一覧・結果のみ保持）
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+    @classmethod
+    def _write_errors(cls, job_id, errors):
+        with open(os.path.join(cls._job_dir(job_id), ERRORS_FILE), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(errors))
+
+    @classmethod
+    def get(cls, job_id):
+        """ジョブの状態を取得する（進捗率・残り時間を付加）"""
+        job = cls._read_job(job_id)
+        if job is None:
+            return None
+        active = (ImportJobConstants.STATUS_QUEUED, ImportJobConstants.STATUS_RUNNING)
+        if job['status'] in active and _heartbeat_stale(job):
+            # 実行していたワーカーが再起動された場合
+            job = cls.update(job_id, status=ImportJobConstants.STATUS_FAILED,
+                             message='取込処理を実行していたプロセスが終了しました', finished_at=_now())
+        job['status_label'] = ImportJobConstants.STATUS_LABELS.get(job['status'], job['status'])
+        job['kind_label'] = ImportJobConstants.KIND_LABELS.get(job['kind'], job['kind'])
+        job['percent'] = None
+        job['eta_sec'] = None
+        if job['status'] == ImportJobConstants.STATUS_COMPLETED:
+            job['percent'] = 100
+        elif job.get('total') and job['started_at']:
+            job['percent'] = min(99, int(job['processed'] * 100 / job['total']))
+            elapsed = (datetime.now() - datetime.strptime(job['started_at'], '%Y-%m-%d %H:%M:%S')).total_seconds()
+            if job['processed'] > 0 and elapsed > 0:
+                rate = job['processed'] / elapsed
+                job['eta_sec'] = max(0, int((job['total'] - job['processed']) / rate))
+        return job
+
+    @classmethod
+    def list_jobs(cls):
+        """ジョブ履歴を新しい順に取得する"""
+        if not os.path.isdir(cls._job_root):
+            return []
+        jobs = []
+        for job_id in sorted(os.listdir(cls._job_root), reverse=True):
+            job = cls.get(job_id)
+            if job is not None:
+                jobs.append(job)
+        return jobs
+
+    @classmethod
+    def get_errors_path(cls, job_id):
+        """エラー一覧ファイルのパス（存在しない場合はNone）"""
+        path = os.path.join(cls._job_dir(job_id), ERRORS_FILE)
+        return path if os.path.exists(path) else None
+
+    @classmethod
+    def _remove_old_jobs(cls):
+        """保持件数を超えた古いジョブを削除する（実行中のものは残す）"""
+        max_history = _get_int_env('IMPORT_JOB_MAX_HISTORY', ImportJobConstants.DEFAULT_MAX_HISTORY)
+        job_ids = sorted(os.listdir(cls._job_root), reverse=True)
+        for job_id in job_ids[max_history:]:
+            job = cls._read_job(job_id)
+            if job and job['status'] in (ImportJobConstants.STATUS_QUEUED, ImportJobConstants.STATUS_RUNNING):
+                continue
+            shutil.rmtree(cls._job_dir(job_id), ignore_errors=True)
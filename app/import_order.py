@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""受注ファイル（CSV・Excel）の一括取込
+
+得意先から届く受注ファイルを読み込み、BRCP_DAT に登録・更新・削除する。
+
+1. 製品はBF規格マスタを1回で読み込んだインデックスで特定する
+   （製品ID・サンレー品番・ヤンガーBCD/GTIN、またはベース/加入度数/LR/色）
+2. ファイル内の受注の既存明細と受注残をまとめて取得し、明細ごとの処理内容を決める
+   （取込確認画面ではここまでを実行し、差分を表示する）
+3. 取込実行時は最新の状態で計画し直し、エラー行を除いた明細を1トランザクションで反映する
+
+列の並びは OrderImportConstants を参照。
+"""
+
+import os
+import re
+import time
+import uuid
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from app.constants import DatabaseConstants, HtmlConstants, OrderImportConstants
+from app.csv_reader import CsvReader
+from app.database import get_db_session, in_clause_params
+from app.logger_utils import log_error, log_info
+from app.models import BrcpDat
+
+UPLOAD_DIR = os.path.join(os.path.dirname(__file__), 'data', OrderImportConstants.DEFAULT_UPLOAD_DIR)
+UPLOAD_EXTENSIONS = ('.csv', '.xlsx')
+TOKEN_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+# =============================================================================
+# アップロードファイルの保存（取込確認 → 取込実行の間）
+# =============================================================================
+def save_upload(file):
+    """アップロードファイルを保存し、取込実行時に指定するトークンを返す"""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    _remove_expired_uploads()
+    token = uuid.uuid4().hex
+    file.save(os.path.join(UPLOAD_DIR, token + os.path.splitext(file.filename)[1].lower()))
+    return token
+
+
+def get_upload_path(token):
+    """トークンに対応する保存ファイルのパス（存在しない場合はNone）"""
+    if not token or not TOKEN_PATTERN.match(token):
+        return None
+    for ext in UPLOAD_EXTENSIONS:
+        path = os.path.join(UPLOAD_DIR, token + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def remove_upload(token):
+    path = get_upload_path(token)
+    if path:
+        os.remove(path)
+
+
+def _remove_expired_uploads():
+    """取込実行されずに残ったファイルを削除する"""
+    limit = time.time() - OrderImportConstants.UPLOAD_MAX_AGE_SEC
+    for name in os.listdir(UPLOAD_DIR):
+        path = os.path.join(UPLOAD_DIR, name)
+        try:
+            if os.path.getmtime(path) < limit:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+# =============================================================================
+# ファイルの読み込み
+# =============================================================================
+def _cell_text(value):
+    """Excelのセル値を文字列にする"""
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _read_rows(file_path, has_header):
+    """ファイルを1行ずつ読み込む
+
+    Yields:
+        tuple: (行番号, 列の値のリスト, 読み込みエラー)
+    """
+    if file_path.lower().endswith('.xlsx'):
+        # openpyxlは読み込みが重いため、使用時に読み込む
+        import openpyxl
+        wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            if has_header:
+                next(rows, None)
+            for i, row in enumerate(rows):
+                values = [_cell_text(value) for value in row]
+                if not any(values):
+                    continue  # 空行
+                error = None
+                if len(values) < OrderImportConstants.COLUMN_COUNT:
+                    error = f"行 {i+1}: 必要な列数がありません（{len(values)}列、最低{OrderImportConstants.COLUMN_COUNT}列必要）"
+                yield i + 1, values, error
+        finally:
+            wb.close()
+    else:
+        with CsvReader(file_path, has_header=has_header, min_columns=OrderImportConstants.COLUMN_COUNT) as reader:
+            for record in reader:
+                if not any(value.strip() for value in record.values):
+                    continue  # 空行
+                yield record.row_no, [record.text(i) for i in range(len(record))], record.error
+
+
+def _parse_date(value):
+    """受注日を YYYY-MM-DD にする（YYYY-MM-DD・YYYY/MM/DD・YYYYMMDD）"""
+    for fmt in ('%Y-%m-%d', '%Y/%m/%d', '%Y%m%d'):
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    raise ValueError(f"受注日の形式が正しくありません: {value}")
+
+
+# =============================================================================
+# 製品の特定
+# =============================================================================
+class ProductIndex:
+    """BF規格マスタのメモリ上の索引"""
+
+    CODE_COLUMNS = ('BFSP_PRD_ID', 'BFSP_S_NC', 'BFSP_S_HC', 'BFSP_Y_BCD', 'BFSP_Y_GTIN')
+
+    def __init__(self, rows):
+        self.by_code = {}
+        self.by_attributes = {}
+        for row in rows:
+            for column in self.CODE_COLUMNS:
+                code = getattr(row, column)
+                if code is not None and str(code).strip():
+                    self.by_code.setdefault(str(code).strip().upper(), row.BFSP_PRD_ID)
+            attributes = (row.BFSP_BASE, row.BFSP_ADP, row.BFSP_LR, row.BFSP_CLR)
+            # 規格が未設定の行は規格では特定できないため、コードの索引のみに登録する
+            if any(value is None for value in attributes):
+                continue
+            self.by_attributes.setdefault(self._attribute_key(*attributes), row.BFSP_PRD_ID)
+
+    @classmethod
+    def load(cls, session):
+        rows = session.execute(text(f"""
+            SELECT {', '.join(cls.CODE_COLUMNS)}, BFSP_BASE, BFSP_ADP, BFSP_LR, BFSP_CLR
+            FROM BFSP_MST
+        """)).fetchall()
+        return cls(rows)
+
+    @staticmethod
+    def _attribute_key(base, adp, lr, clr):
+        return (str(int(base)), str(int(adp)), str(lr).strip().upper(), str(clr).strip().zfill(2))
+
+    def find(self, code, base, adp, lr, clr):
+        """製品IDを返す（見つからない場合はNone）"""
+        if code:
+            return self.by_code.get(code.strip().upper())
+        try:
+            return self.by_attributes.get(self._attribute_key(base, adp, lr, clr))
+        except (TypeError, ValueError):
+            return None
+
+
+# =============================================================================
+# 取込計画（差分）の作成と反映
+# =============================================================================
+def _new_line(row_no):
+    return {
+        'row_no': row_no,
+        'order_date': None,
+        'order_no': None,
+        'ship_to': None,
+        'ship_to_name': '',
+        'proc': None,
+        'proc_name': '',
+        'prd_id': None,
+        'qty': None,
+        'current_qty': None,
+        'shipped_qty': None,
+        'brcp_id': None,
+        'action': OrderImportConstants.ACTION_ERROR,
+        'message': ''
+    }
+
+
+def _parse_line(row_no, values, products, destinations):
+    """1行を解析する（エラーの場合は message を設定）"""
+    line = _new_line(row_no)
+    try:
+        line['order_date'] = _parse_date(values[OrderImportConstants.COL_ORDER_DATE])
+        line['order_no'] = int(values[OrderImportConstants.COL_ORDER_NO])
+        line['ship_to'] = int(values[OrderImportConstants.COL_SHIP_TO])
+        line['qty'] = int(values[OrderImportConstants.COL_QTY] or '0')
+    except ValueError as e:
+        line['message'] = f"行 {row_no}: {str(e)}"
+        return line
+    if line['qty'] < 0:
+        line['message'] = f"行 {row_no}: 数量が負の値です"
+        return line
+
+    proc = OrderImportConstants.PROC_ALIASES.get(values[OrderImportConstants.COL_PROC].upper())
+    if proc is None:
+        line['message'] = f"行 {row_no}: 加工区分が正しくありません: {values[OrderImportConstants.COL_PROC]}"
+        return line
+    line['proc'] = proc
+    line['proc_name'] = HtmlConstants.PROC_TYPE_DISPLAY.get(proc, '')
+
+    if line['ship_to'] not in destinations:
+        line['message'] = f"行 {row_no}: 出荷先が見つかりません: {line['ship_to']}"
+        return line
+    line['ship_to_name'] = destinations[line['ship_to']]
+
+    code = values[OrderImportConstants.COL_PRD_CODE]
+    attributes = values[OrderImportConstants.COL_BASE:OrderImportConstants.COL_CLR + 1]
+    line['prd_id'] = products.find(code, *attributes)
+    if line['prd_id'] is None:
+        line['message'] = f"行 {row_no}: 製品が見つかりません: {code or '/'.join(attributes)}"
+        return line
+
+    line['action'] = None
+    return line
+
+
+def _get_existing_orders(session, order_nos):
+    """注文番号ごとの既存明細と受注残を取得する
+
+    Returns:
+        dict: (受注日, 注文番号, 加工区分, 製品ID) → 既存明細（同じキーが複数ある場合は最初の1件）
+    """
+    existing = {}
+    order_no_list = sorted(order_nos)
+    for start in range(0, len(order_no_list), DatabaseConstants.SQL_IN_CHUNK):
+        placeholders, params = in_clause_params(
+            'order_no', order_no_list[start:start + DatabaseConstants.SQL_IN_CHUNK])
+        rows = session.execute(text(f"""
+            SELECT
+                BRCP_ID,
+                BRCP_DT,
+                BRCP_ORDER_NO,
+                BRCP_PROC,
+                BRCP_PRD_ID,
+                BRCP_ORDER_CMP,
+                BRCP_QTY,
+                ISNULL(dbo.Get_ODR_ZAN_Qty_BF(BRCP_ID), 0) as ZAN_QTY
+            FROM BRCP_DAT
+            WHERE BRCP_ORDER_NO IN ({placeholders})
+            ORDER BY BRCP_ID
+        """), params).fetchall()
+        for row in rows:
+            order_date = row.BRCP_DT if isinstance(row.BRCP_DT, str) else row.BRCP_DT.strftime('%Y-%m-%d')
+            key = (order_date[:10], int(row.BRCP_ORDER_NO), int(row.BRCP_PROC), row.BRCP_PRD_ID)
+            existing.setdefault(key, row)
+    return existing
+
+
+def _decide_action(line, current):
+    """既存明細と比較して処理内容を決める"""
+    if current is None:
+        if line['qty'] == 0:
+            line['action'] = OrderImportConstants.ACTION_UNCHANGED
+            line['message'] = '数量0の新規明細は登録しません'
+        else:
+            line['action'] = OrderImportConstants.ACTION_INSERT
+        return
+
+    line['brcp_id'] = current.BRCP_ID
+    line['current_qty'] = int(current.BRCP_QTY)
+    line['shipped_qty'] = int(current.BRCP_QTY) - int(current.ZAN_QTY)
+    if int(current.BRCP_ORDER_CMP) != line['ship_to']:
+        line['action'] = OrderImportConstants.ACTION_ERROR
+        line['message'] = f"行 {line['row_no']}: 既存の受注と出荷先が異なります（既存: {int(current.BRCP_ORDER_CMP)}）"
+    elif line['qty'] == line['current_qty']:
+        line['action'] = OrderImportConstants.ACTION_UNCHANGED
+    elif line['qty'] < line['shipped_qty']:
+        line['action'] = OrderImportConstants.ACTION_ERROR
+        line['message'] = f"行 {line['row_no']}: 出荷済の数量（{line['shipped_qty']}）より少なくできません"
+    elif line['qty'] == 0:
+        line['action'] = OrderImportConstants.ACTION_DELETE
+    else:
+        line['action'] = OrderImportConstants.ACTION_UPDATE
+
+
+def plan_order_import(file_path, has_header=False, session=None):
+    """受注ファイルを読み込み、明細ごとの処理内容（差分）を作成する
+
+    Args:
+        file_path (str): 受注ファイル（.csv / .xlsx）のパス
+        has_header (bool): 1行目がヘッダー行かどうか
+        session: データベースセッション（省略時は新規に作成）
+
+    Returns:
+        dict: lines（明細ごとの処理内容）、summary（処理内容ごとの件数）、
+              orders（受注の件数）、errors（エラーメッセージ）
+    """
+    own_session = session is None
+    if own_session:
+        session = get_db_session()
+    try:
+        products = ProductIndex.load(session)
+        destinations = {
+            int(row.CZTR_ID): row.CZTR_NM
+            for row in session.execute(text("""
+                SELECT CZTR_ID, CZTR_NM FROM CZTR_MST WHERE CZTR_TYP = :cztr_type_bf
+            """), {'cztr_type_bf': DatabaseConstants.CZTR_TYPE_BF}).fetchall()
+        }
+
+        # 1. 読み込み・製品の特定
+        lines = []
+        for row_no, values, error in _read_rows(file_path, has_header):
+            if error:
+                line = _new_line(row_no)
+                line['message'] = error
+            else:
+                line = _parse_line(row_no, values, products, destinations)
+            lines.append(line)
+
+        # 2. ファイル内の重複チェック・既存明細との比較
+        existing = _get_existing_orders(
+            session, {line['order_no'] for line in lines if line['action'] is None})
+        seen = {}
+        for line in lines:
+            if line['action'] is not None:
+                continue
+            key = (line['order_date'], line['order_no'], line['proc'], line['prd_id'])
+            if key in seen:
+                line['message'] = f"行 {line['row_no']}: 行 {seen[key]} と同じ受注・製品の明細です"
+                line['action'] = OrderImportConstants.ACTION_ERROR
+                continue
+            seen[key] = line['row_no']
+            _decide_action(line, existing.get(key))
+
+        summary = {action: 0 for action in OrderImportConstants.ACTION_LABELS}
+        for line in lines:
+            summary[line['action']] += 1
+        orders = {(line['order_date'], line['order_no'], line['proc'])
+                  for line in lines if line['action'] != OrderImportConstants.ACTION_ERROR}
+        return {
+            'lines': lines,
+            'summary': summary,
+            'orders': len(orders),
+            'errors': [line['message'] for line in lines if line['action'] == OrderImportConstants.ACTION_ERROR]
+        }
+    finally:
+        if own_session:
+            session.close()
+
+
+def apply_order_import(file_path, has_header=False):
+    """受注ファイルを取り込む（最新の状態で計画し直し、エラー行を除いて反映する）
+
+    Returns:
+        dict: plan_order_import の結果に success（反映した明細数）、
+              elapsed_sec、orders_per_sec を加えたもの
+    """
+    session = get_db_session()
+    start = time.perf_counter()
+    try:
+        plan = plan_order_import(file_path, has_header, session)
+        inserts = []
+        updates = []
+        delete_ids = []
+        for line in plan['lines']:
+            if line['action'] == OrderImportConstants.ACTION_INSERT:
+                inserts.append({
+                    'BRCP_DT': line['order_date'],
+                    'BRCP_PRD_ID': line['prd_id'],
+                    'BRCP_PROC': line['proc'],
+                    'BRCP_ORDER_NO': line['order_no'],
+                    'BRCP_ORDER_CMP': line['ship_to'],
+                    'BRCP_QTY': line['qty'],
+                    'BRCP_FLG': DatabaseConstants.BRCP_FLG_NOT_SHIPPED
+                })
+            elif line['action'] == OrderImportConstants.ACTION_UPDATE:
+                # 出荷済の数量と同じになった受注は出荷済にする
+                flg = (DatabaseConstants.BRCP_FLG_SHIPPED if line['qty'] == line['shipped_qty']
+                       else DatabaseConstants.BRCP_FLG_NOT_SHIPPED)
+                updates.append({'BRCP_ID': line['brcp_id'], 'BRCP_QTY': line['qty'], 'BRCP_FLG': flg})
+            elif line['action'] == OrderImportConstants.ACTION_DELETE:
+                delete_ids.append(line['brcp_id'])
+
+        BrcpDat.apply_changes(session, inserts, updates, delete_ids)
+        session.commit()
+
+        elapsed = time.perf_counter() - start
+        plan['success'] = len(inserts) + len(updates) + len(delete_ids)
+        plan['elapsed_sec'] = round(elapsed, 2)
+        plan['orders_per_sec'] = round(plan['orders'] / elapsed, 1) if elapsed > 0 else 0
+        log_info(f"受注ファイル取込: 受注{plan['orders']}件、新規{len(inserts)}件、変更{len(updates)}件、"
+                 f"削除{len(delete_ids)}件、エラー{plan['summary'][OrderImportConstants.ACTION_ERROR]}件"
+                 f"（{plan['elapsed_sec']}秒、{plan['orders_per_sec']}受注/秒）")
+        return plan
+    except Exception as e:
+        session.rollback()
+        log_error(f"受注ファイル取込中にエラーが発生しました: {str(e)}")
+        raise
+    finally:
+        session.close()
@@ -1,15 +1,94 @@
+import os
+import atexit
 import logging
+import logging.handlers
+import queue
 import traceback
+from dotenv import load_dotenv
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
 
+from app.constants import LogConstants
+
+load_dotenv()
+
+
+def _get_int_env(name, default):
+    """整数の環境変数を取得する（不正な値は既定値）"""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _log_file_path():
+    """ログファイルのパスを取得する
+
+    gunicorn のワーカーや IIS の複数プロセスが同じファイルをローテーションすると、
+    名前の変更が競合する（Windowsでは開いている他プロセスがあるため毎回失敗する）。
+    LOG_PER_PROCESS が有効な場合はプロセスIDを付けたファイル（app.<pid>.log）に出力し、
+    各プロセスが自分のファイルだけをローテーションする。
+    """
+    path = os.getenv('LOG_FILE', LogConstants.DEFAULT_LOG_FILE)
+    per_process = os.getenv('LOG_PER_PROCESS', LogConstants.DEFAULT_PER_PROCESS).strip().lower()
+    if per_process in ('0', 'false', 'no', 'off'):
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{os.getpid()}{ext}"
+
+
+def _create_output_handlers():
+    """実際に出力するハンドラー（ローテーションファイル + コンソール）を作成する"""
+    formatter = logging.Formatter(LogConstants.LOG_FORMAT)
+    file_handler = logging.handlers.RotatingFileHandler(
+        _log_file_path(),
+        maxBytes=_get_int_env('LOG_MAX_BYTES', LogConstants.DEFAULT_MAX_BYTES),
+        backupCount=_get_int_env('LOG_BACKUP_COUNT', LogConstants.DEFAULT_BACKUP_COUNT),
+        encoding='utf-8'
+    )
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    return file_handler, stream_handler
+
+
+def _start_listener():
+    """ログ出力スレッド（QueueListener）を開始する"""
+    listener = logging.handlers.QueueListener(
+        _log_queue, *_create_output_handlers(), respect_handler_level=True
+    )
+    listener.start()
+    return listener
+
+
+def _restart_listener_after_fork():
+    """fork後の子プロセスでログ出力スレッドを作り直す（gunicorn --preload 対策）"""
+    global _listener
+    _listener = _start_listener()
+
+
+def _stop_listener():
+    """終了時に未出力のログを書き出してスレッドを停止する"""
+    if _listener is not None:
+        _listener.stop()
+
+
 # ロギングの設定
+# 呼び出し元はキューに積むだけで戻り、ファイル・コンソールへの書き込みは
+# 別スレッドで行う（取込処理などのスループットがログI/Oに左右されない）
+_log_queue = queue.SimpleQueue()
+_listener = _start_listener()
+atexit.register(_stop_listener)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+# 書式は出力側のハンドラーで付けるため、キューにはメッセージのみを積む
+# （既定の書式のままだと「ERROR:root:」が二重に付く）
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter('%(message)s'))
+
 logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ],
+    level=LogConstants.LOG_LEVELS.get(os.getenv('LOG_LEVEL', '').strip().lower(), logging.INFO),
+    handlers=[_queue_handler],
     force=True  # 既存の設定を強制的に上書き
 )
 
@@ -37,6 +116,46 @@ def log_debug(debug_message):
     """デバッグメッセージをログに記録する"""
     logging.debug(debug_message)
 
+def log_warning(warning_message):
+    """警告メッセージをログに記録する"""
+    logging.warning(warning_message)
+
+class RowLogSampler:
+    """行単位の処理ログを間引いて出力するクラス
+
+    取込処理など1行ごとにログを出すと件数分の出力が発生するため、
+    詳細ログは先頭の数行と一定間隔の行のみDEBUGレベルで出力する。
+    件数は各取込処理の結果（result）で集計し、完了時に1行で出力する。
+
+    Example:
+        sampler = RowLogSampler('CSV取込')
+        for i, row in enumerate(rows):
+            sampler.debug(i + 1, f"行 {i+1}: 1列目の値: {row[0]}")
+    """
+
+    def __init__(self, name, first=None, every=None):
+        """
+        Args:
+            name (str): 処理名（詳細ログの先頭に付ける）
+            first (int, optional): 詳細を出力する先頭行数
+            every (int, optional): 以降に詳細を出力する行間隔
+        """
+        self.name = name
+        self.first = first if first is not None else _get_int_env('LOG_ROW_SAMPLE_FIRST', LogConstants.DEFAULT_ROW_SAMPLE_FIRST)
+        self.every = every if every is not None else _get_int_env('LOG_ROW_SAMPLE_EVERY', LogConstants.DEFAULT_ROW_SAMPLE_EVERY)
+        self._enabled = logging.getLogger().isEnabledFor(logging.DEBUG)
+
+    def should_log(self, row_no):
+        """指定行の詳細ログを出力するかどうか"""
+        if not self._enabled:
+            return False
+        return row_no <= self.first or (self.every > 0 and row_no % self.every == 0)
+
+    def debug(self, row_no, message):
+        """行の詳細ログを出力する（間引き対象外の行のみ）"""
+        if self.should_log(row_no):
+            logging.debug(f"{self.name}: {message}")
+
 def handle_database_error(exception, operation_name="データベース操作"):
     """データベースエラーを処理し、適切なエラーメッセージを返す
     
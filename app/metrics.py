@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""リクエスト・DBのメトリクス収集と /metrics（Prometheus形式）の出力
+
+エンドポイントごとのレイテンシ・ステータス件数・処理中リクエスト数・DB処理時間・
+SQL発行数・送受信サイズを記録する。集計マトリックス・PDF出力・取込はレイテンシの
+区間を別に持ち、遅い画面を特定しやすくしている。
+
+gunicorn の複数ワーカーで動かす場合は、環境変数 PROMETHEUS_MULTIPROC_DIR に共有の
+ディレクトリを指定する（gunicorn.conf.py で設定済み）。/metrics は全ワーカー分を合算して返す。
+"""
+
+import hmac
+import os
+import time
+
+from flask import Response, g, has_request_context, request, session
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+                               Histogram, generate_latest, multiprocess)
+from sqlalchemy import event
+
+from app import app
+from app.constants import MetricsConstants
+from app.database import engine, report_engine
+
+PREFIX = MetricsConstants.METRIC_PREFIX
+
+# 計測対象外のエンドポイント
+EXCLUDED_ENDPOINTS = {'metrics', 'static'}
+
+REQUEST_LATENCY = {
+    group: Histogram(
+        f"{PREFIX}_{group}_request_duration_seconds",
+        f"リクエスト処理時間（{group}）",
+        ['endpoint', 'method'],
+        buckets=buckets
+    )
+    for group, buckets in MetricsConstants.LATENCY_BUCKETS.items()
+}
+REQUEST_COUNT = Counter(
+    f"{PREFIX}_http_requests_total", 'リクエスト件数', ['endpoint', 'method', 'status']
+)
+IN_FLIGHT = Gauge(
+    f"{PREFIX}_http_requests_in_flight", '処理中のリクエスト数', ['group'], multiprocess_mode='livesum'
+)
+DB_TIME = Histogram(
+    f"{PREFIX}_db_time_seconds", '1リクエストあたりのDB処理時間', ['endpoint'],
+    buckets=MetricsConstants.DB_TIME_BUCKETS
+)
+DB_STATEMENTS = Histogram(
+    f"{PREFIX}_db_statements", '1リクエストあたりのSQL発行数', ['endpoint'],
+    buckets=MetricsConstants.STATEMENT_BUCKETS
+)
+REQUEST_SIZE = Histogram(
+    f"{PREFIX}_http_request_size_bytes", 'リクエストのサイズ', ['endpoint'],
+    buckets=MetricsConstants.SIZE_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    f"{PREFIX}_http_response_size_bytes", 'レスポンスのサイズ', ['endpoint'],
+    buckets=MetricsConstants.SIZE_BUCKETS
+)
+
+
+def endpoint_group(endpoint):
+    """エンドポイント名からレイテンシ区間の種類を判定する"""
+    name = endpoint.lower()
+    for keyword, group in MetricsConstants.GROUP_KEYWORDS:
+        if keyword in name:
+            return group
+    return MetricsConstants.GROUP_DEFAULT
+
+
+def _endpoint():
+    # 存在しないURLはエンドポイント名がないため、1つにまとめる（ラベルの増加防止）
+    return request.endpoint or 'not_found'
+
+
+def _is_target():
+    return _endpoint() not in EXCLUDED_ENDPOINTS
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get('metrics_start')
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+    if has_request_context() and 'metrics_start' in g:
+        g.metrics_db_time += elapsed
+        g.metrics_statements += 1
+
+
+# 集計用の接続先（設定時）のSQLも同じリクエストの処理時間・発行数に含める
+for _engine in (engine, report_engine):
+    if _engine is not None:
+        event.listen(_engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(_engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+@app.before_request
+def _start_request_metrics():
+    if not _is_target():
+        return
+    g.metrics_start = time.perf_counter()
+    g.metrics_db_time = 0.0
+    g.metrics_statements = 0
+    g.metrics_recorded = False
+    IN_FLIGHT.labels(endpoint_group(_endpoint())).inc()
+
+
+def _record(status):
+    endpoint = _endpoint()
+    REQUEST_LATENCY[endpoint_group(endpoint)].labels(endpoint, request.method).observe(
+        time.perf_counter() - g.metrics_start)
+    REQUEST_COUNT.labels(endpoint, request.method, str(status)).inc()
+    DB_TIME.labels(endpoint).observe(g.metrics_db_time)
+    DB_STATEMENTS.labels(endpoint).observe(g.metrics_statements)
+    if request.content_length:
+        REQUEST_SIZE.labels(endpoint).observe(request.content_length)
+    g.metrics_recorded = True
+
+
+@app.after_request
+def _record_request_metrics(response):
+    if 'metrics_start' in g:
+        _record(response.status_code)
+        # ストリーミング出力はサイズが確定しないため記録しない
+        if response.content_length is not None:
+            RESPONSE_SIZE.labels(_endpoint()).observe(response.content_length)
+    return response
+
+
+@app.teardown_request
+def _finish_request_metrics(exception):
+    if 'metrics_start' not in g:
+        return
+    if not g.metrics_recorded:
+        # 未処理の例外で after_request が呼ばれなかった場合
+        _record(500)
+    IN_FLIGHT.labels(endpoint_group(_endpoint())).dec()
+
+
+def _authorized():
+    """ログイン済み、または METRICS_TOKEN と一致する Bearer トークンがあれば許可する"""
+    if 'user_id' in session:
+        return True
+    token = os.environ.get('METRICS_TOKEN')
+    auth_header = request.headers.get('Authorization', '')
+    if token and auth_header.startswith('Bearer '):
+        return hmac.compare_digest(auth_header[len('Bearer '):], token)
+    return False
+
+
+@app.route('/metrics')
+def metrics():
+    """メトリクスをPrometheus形式で出力する"""
+    if not _authorized():
+        return Response('Unauthorized', status=401, headers={'WWW-Authenticate': 'Bearer'})
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # 全ワーカーの記録を合算する
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -5,12 +5,11 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
 from datetime import datetime
 from sqlalchemy.orm import relationship
 from flask import jsonify
-import pandas as pd
 from io import BytesIO
 import unicodedata
 import traceback
 
-from app.database import Base, get_db_session, get_db_connection
+from app.database import Base, get_db_session, get_db_connection, in_clause_params, insert_rows, use_report_db
 from app.constants import DatabaseConstants
 from app.models_common import CprdDatModel
 from app.logger_utils import log_error, log_info
@@ -255,71 +254,80 @@ class BrcpDat:
     
     @staticmethod
     def save(data):
-        """受注データを保存する"""
+        """受注データを保存する
+        
+        受注（受注日・注文番号・加工区分）の既存明細を1回で取得し、明細ごとの
+        登録・更新・削除を振り分けてから、それぞれまとめて実行する。
+        同じ製品の明細が複数ある場合は後の明細を優先する。
+        
+        Returns:
+            dict: success と、明細ごとの処理結果 results
+                  （action: insert / update / delete / none / superseded）
+        """
         session = get_db_session()
         try:
             # トランザクション開始
             session.begin()
             
-            # 既存データを更新
-            for detail in data['details']:
-                # 既存データを検索
-                sql = text("""
-                    SELECT BRCP_ID 
-                    ,BRCP_QTY
-                    ,dbo.Get_ODR_ZAN_Qty_BF(BRCP_ID) as ZAN_QTY
-                    FROM BRCP_DAT 
-                    WHERE BRCP_DT = :order_date 
-                    AND BRCP_ORDER_NO = :customer_order_no 
-                    AND BRCP_PROC = :process
-                    AND BRCP_PRD_ID = :prd_id
-                """)
-                
-                existing = session.execute(sql, {
-                    'order_date': data['orderDate'],
-                    'customer_order_no': data['customerOrderNo'],
-                    'process': data['process'],
-                    'prd_id': detail['BRCP_PRD_ID']
-                }).first()
-                
-                if existing:
-                    if detail['BRCP_QTY'] > 0:
-                        sql = text("""
-                            UPDATE BRCP_DAT 
-                            SET BRCP_QTY = :qty 
-                            WHERE BRCP_ID = :id
-                        """)
-                        session.execute(sql, {
-                            'qty': detail['BRCP_QTY'],
-                            'id': existing.BRCP_ID
-                        })
+            # 1. 受注の既存明細をまとめて取得（製品ごとに最初の1件を対象とする）
+            existing_rows = session.execute(text("""
+                SELECT BRCP_ID, BRCP_PRD_ID, BRCP_QTY
+                FROM BRCP_DAT 
+                WHERE BRCP_DT = :order_date 
+                AND BRCP_ORDER_NO = :customer_order_no 
+                AND BRCP_PROC = :process
+                ORDER BY BRCP_ID
+            """), {
+                'order_date': data['orderDate'],
+                'customer_order_no': data['customerOrderNo'],
+                'process': data['process']
+            }).fetchall()
+            existing_by_prd = {}
+            for row in existing_rows:
+                existing_by_prd.setdefault(row.BRCP_PRD_ID, row)
+            
+            # 2. 明細ごとに登録・更新・削除を振り分け
+            last_index = {detail['BRCP_PRD_ID']: i for i, detail in enumerate(data['details'])}
+            results = []
+            inserts = []
+            updates = []
+            delete_ids = []
+            for i, detail in enumerate(data['details']):
+                prd_id = detail['BRCP_PRD_ID']
+                qty = detail['BRCP_QTY']
+                existing = existing_by_prd.get(prd_id)
+                result = {'BRCP_PRD_ID': prd_id, 'BRCP_QTY': qty,
+                          'BRCP_ID': existing.BRCP_ID if existing else None}
+                if last_index[prd_id] != i:
+                    result['action'] = 'superseded'
+                elif existing:
+                    if qty > 0:
+                        result['action'] = 'update'
+                        updates.append({'BRCP_ID': existing.BRCP_ID, 'BRCP_QTY': qty})
                     else:
-                        sql = text("""
-                            DELETE FROM BRCP_DAT 
-                            WHERE BRCP_ID = :id
-                        """)
-                        session.execute(sql, {'id': existing.BRCP_ID})
+                        result['action'] = 'delete'
+                        delete_ids.append(existing.BRCP_ID)
+                elif qty > 0:
+                    result['action'] = 'insert'
+                    inserts.append({
+                        'BRCP_DT': data['orderDate'],
+                        'BRCP_PRD_ID': prd_id,
+                        'BRCP_PROC': data['process'],
+                        'BRCP_ORDER_NO': data['customerOrderNo'],
+                        'BRCP_ORDER_CMP': data['shipTo'],
+                        'BRCP_QTY': qty,
+                        'BRCP_FLG': DatabaseConstants.BRCP_FLG_NOT_SHIPPED
+                    })
                 else:
-                    # 新規データを登録
-                    if detail['BRCP_QTY'] > 0:
-                        sql = text("""
-                            INSERT INTO BRCP_DAT 
-                            (BRCP_DT, BRCP_PRD_ID, BRCP_PROC, BRCP_ORDER_NO, BRCP_ORDER_CMP, BRCP_QTY, BRCP_FLG) 
-                            VALUES (:order_date, :prd_id, :process, :customer_order_no, :ship_to, :qty, :flg_not_shipped)
-                        """)
-                        session.execute(sql, {
-                            'order_date': data['orderDate'],
-                            'prd_id': detail['BRCP_PRD_ID'],
-                            'process': data['process'],
-                            'customer_order_no': data['customerOrderNo'],
-                            'ship_to': data['shipTo'],
-                            'qty': detail['BRCP_QTY'],
-                            'flg_not_shipped': DatabaseConstants.BRCP_FLG_NOT_SHIPPED
-                        })
+                    result['action'] = 'none'
+                results.append(result)
+            
+            # 3. 更新・削除・登録をまとめて実行
+            BrcpDat.apply_changes(session, inserts, updates, delete_ids)
             
             # コミット
             session.commit()
-            return {'success': True}
+            return {'success': True, 'results': results}
         except Exception as e:
             session.rollback()
             log_error(f"受注データ保存中にエラーが発生しました: {str(e)}")
@@ -328,6 +336,40 @@ class BrcpDat:
             session.close()
 
     @staticmethod
+    def apply_changes(session, inserts, updates, delete_ids):
+        """受注明細の登録・更新・削除をまとめて実行する（コミットは呼び出し元）
+        
+        Args:
+            session: データベースセッション
+            inserts (list): 登録する行（列名→値のdict）
+            updates (list): 更新する行（BRCP_ID と更新する列のdict、全行で同じ列）
+            delete_ids (list): 削除する受注ID
+        """
+        if updates:
+            columns = [column for column in updates[0] if column != 'BRCP_ID']
+            # 1行あたり (列数 + 1) 個のパラメータ
+            rows_per_statement = max(1, DatabaseConstants.SQL_MAX_PARAMS // (len(columns) + 1))
+            for start in range(0, len(updates), rows_per_statement):
+                chunk = updates[start:start + rows_per_statement]
+                placeholders, params = in_clause_params('id', [row['BRCP_ID'] for row in chunk])
+                assignments = []
+                for column in columns:
+                    params.update({f"{column}_{n}": row[column] for n, row in enumerate(chunk)})
+                    cases = ' '.join(f"WHEN :id{n} THEN :{column}_{n}" for n in range(len(chunk)))
+                    assignments.append(f"{column} = CASE BRCP_ID {cases} END")
+                session.execute(text(f"""
+                    UPDATE BRCP_DAT 
+                    SET {', '.join(assignments)}
+                    WHERE BRCP_ID IN ({placeholders})
+                """), params)
+        for start in range(0, len(delete_ids), DatabaseConstants.SQL_IN_CHUNK):
+            placeholders, params = in_clause_params(
+                'id', delete_ids[start:start + DatabaseConstants.SQL_IN_CHUNK])
+            session.execute(text(f"DELETE FROM BRCP_DAT WHERE BRCP_ID IN ({placeholders})"), params)
+        insert_rows(session, 'BRCP_DAT', inserts)
+
+    @staticmethod
+    @use_report_db
     def get_order_summary():
         """取引先・加工IDごとの受注残と在庫数を取得する"""
         session = get_db_session()
@@ -6,12 +6,11 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
 from datetime import datetime
 from sqlalchemy.orm import relationship
 from flask import jsonify
-import pandas as pd
 from io import BytesIO
 import unicodedata
 import traceback
 
-from app.database import Base, get_db_session, get_db_connection
+from app.database import Base, get_db_session, get_db_connection, in_clause_params, insert_returning_id
 from app.constants import DatabaseConstants, KbnConstants
 from app.models_master import PrdMstModel
 from app.logger_utils import log_error, log_info
@@ -497,14 +496,42 @@ class CprdDatModel(Base):
     @staticmethod
     def get_zaiko_zan(cpdd_id):
         """指定された入庫IDの在庫残数量を取得する"""
+        return CprdDatModel.get_zaiko_zan_map([cpdd_id])[int(cpdd_id)]
+    
+    @staticmethod
+    def get_zaiko_zan_map(cpdd_ids):
+        """複数の入庫IDの在庫残数量をまとめて取得する
+        
+        Args:
+            cpdd_ids (list): 入庫IDのリスト
+        
+        Returns:
+            dict: 入庫ID → 在庫残数量（存在しない入庫IDは0）
+        """
+        zaiko_zan_map = {int(cpdd_id): 0 for cpdd_id in cpdd_ids}
+        id_list = sorted(zaiko_zan_map)
         session = get_db_session()
         try:
-            sql = text("SELECT dbo.Get_CPRD_ZAN_Qty(:cpdd_id) AS zaiko_zan")
-            result = session.execute(sql, {'cpdd_id': cpdd_id}).fetchone()
-            return result.zaiko_zan if result else 0
+            for start in range(0, len(id_list), DatabaseConstants.SQL_IN_CHUNK):
+                placeholders, params = in_clause_params('id', id_list[start:start + DatabaseConstants.SQL_IN_CHUNK])
+                # Get_CPRD_ZAN_Qty 相当（入庫数量 - 出荷数量の合計）を行ごとの関数呼び出しなしで集計する
+                results = session.execute(text(f"""
+                    SELECT c.CPDD_ID, c.CPDD_QTY - ISNULL(shk.SHK_QTY, 0) AS zaiko_zan
+                    FROM CPRD_DAT c
+                    LEFT JOIN (
+                        SELECT CSHK_PDD_ID, SUM(CSHK_QTY) AS SHK_QTY
+                        FROM CSHK_DAT
+                        WHERE CSHK_PDD_ID IN ({placeholders})
+                        GROUP BY CSHK_PDD_ID
+                    ) shk ON shk.CSHK_PDD_ID = c.CPDD_ID
+                    WHERE c.CPDD_ID IN ({placeholders})
+                """), params).fetchall()
+                for r in results:
+                    zaiko_zan_map[int(r.CPDD_ID)] = r.zaiko_zan or 0
+            return zaiko_zan_map
         except Exception as e:
-            logging.error(f"在庫残数量の取得中にエラーが発生: {str(e)}")
-            return 0
+            logging.error(f"在庫残数量の一括取得中にエラーが発生: {str(e)}")
+            raise
         finally:
             session.close()
     
@@ -570,8 +597,8 @@ class CprdDatModel(Base):
             session.close()
     
     @staticmethod
-    def search_with_zaiko_zan(prd_id=None, prd_name=None, prd_monomer=None, prd_kbn=None, lot=None, rank=None, stock_status=None, flg=None):
-        """入庫データを在庫残数量付きで検索する"""
+    def iter_with_zaiko_zan(prd_id=None, prd_name=None, prd_monomer=None, prd_kbn=None, lot=None, rank=None, stock_status=None, flg=None):
+        """入庫データを在庫残数量付きで1行ずつ返す（DatabaseConstants.SQL_STREAM_ROWS 行ずつ読み込む）"""
         session = get_db_session()
         try:
             sql = f"""
@@ -630,9 +657,9 @@ class CprdDatModel(Base):
             # 並び順を設定
             sql += " ORDER BY c.CPDD_ID DESC"
             
-            results = session.execute(text(sql), params).fetchall()
+            results = session.execute(
+                text(sql).execution_options(yield_per=DatabaseConstants.SQL_STREAM_ROWS), params)
             
-            result = []
             for r in results:
                 cprd = {
                     'CPDD_ID': r.CPDD_ID,
@@ -648,8 +675,7 @@ class CprdDatModel(Base):
                     'RANK_NAME': r.RANK_NAME,
                     'ZAIKO_ZAN': r.ZAIKO_ZAN if r.ZAIKO_ZAN is not None else 0
                 }
-                result.append(cprd)
-            return result
+                yield cprd
             
         except Exception as e:
             log_error("入庫データの検索中にエラーが発生", e)
@@ -657,6 +683,11 @@ class CprdDatModel(Base):
         finally:
             session.close()
     
+    @staticmethod
+    def search_with_zaiko_zan(prd_id=None, prd_name=None, prd_monomer=None, prd_kbn=None, lot=None, rank=None, stock_status=None, flg=None):
+        """入庫データを在庫残数量付きで検索する"""
+        return list(CprdDatModel.iter_with_zaiko_zan(prd_id, prd_name, prd_monomer, prd_kbn, lot, rank, stock_status, flg))
+
     @staticmethod
     def get_stock_detail(prd_id, rank):
         """指定された製品IDとランクの在庫詳細データを取得する"""
@@ -722,8 +753,8 @@ class CprdDatModel(Base):
             session.close()
     
     @staticmethod
-    def get_stock_summary(prd_id=None, rank=None):
-        """製品IDとランクで在庫を集計した一覧を取得する"""
+    def iter_stock_summary(prd_id=None, rank=None):
+        """製品IDとランクで在庫を集計した一覧を1行ずつ返す（DatabaseConstants.SQL_STREAM_ROWS 行ずつ読み込む）"""
         session = get_db_session()
         try:
             sql = """
@@ -761,9 +792,9 @@ class CprdDatModel(Base):
             sql += " GROUP BY c.CPDD_PRD_ID, c.CPDD_RANK, p.PRD_DSP_NM, k.KBN_NM"
             sql += " ORDER BY c.CPDD_PRD_ID, c.CPDD_RANK"
             
-            results = session.execute(text(sql), params).fetchall()
+            results = session.execute(
+                text(sql).execution_options(yield_per=DatabaseConstants.SQL_STREAM_ROWS), params)
             
-            result = []
             for r in results:
                 stock_summary = {
                     'CPDD_PRD_ID': r.CPDD_PRD_ID,
@@ -774,8 +805,7 @@ class CprdDatModel(Base):
                     'TOTAL_IN_QTY': r.TOTAL_IN_QTY,
                     'TOTAL_ZAIKO_ZAN': r.TOTAL_ZAIKO_ZAN or 0
                 }
-                result.append(stock_summary)
-            return result
+                yield stock_summary
             
         except Exception as e:
             logging.error(f"在庫集計の取得中にエラーが発生: {str(e)}")
@@ -783,6 +813,11 @@ class CprdDatModel(Base):
         finally:
             session.close()
 
+    @staticmethod
+    def get_stock_summary(prd_id=None, rank=None):
+        """製品IDとランクで在庫を集計した一覧を取得する"""
+        return list(CprdDatModel.iter_stock_summary(prd_id, rank))
+
 
 class CshkDatModel(Base):
     """出荷データテーブルのSQLAlchemyモデル"""
@@ -908,27 +943,15 @@ class CprcDatModel(Base):
                 log_error(error_msg)
                 raise ValueError(error_msg)
 
-            # SQL直接実行で新規データを作成
-            insert_sql = text("""
-                INSERT INTO CPRC_DAT (CPCD_SHK_ID, CPCD_DATE, CPCD_QTY, CPCD_RET_NG_QTY, CPCD_INS_NG_QTY, CPCD_PASS_QTY)
-                VALUES (:shk_id, :date, :qty, :ret_ng_qty, :ins_ng_qty, :pass_qty)
-            """)
-            
-            insert_params = {
-                'shk_id': shk_id,
-                'date': date,
-                'qty': qty,
-                'ret_ng_qty': ret_ng_qty,
-                'ins_ng_qty': ins_ng_qty,
-                'pass_qty': pass_qty
-            }
-            
-            session.execute(insert_sql, insert_params)
-            
-            # 作成されたIDを取得
-            id_sql = text("SELECT IDENT_CURRENT('CPRC_DAT') as CPCD_ID")
-            id_result = session.execute(id_sql).fetchone()
-            new_cprc_id = int(id_result.CPCD_ID)
+            # 新規データを作成し、採番されたIDを同じ文で取得
+            new_cprc_id = insert_returning_id(session, 'CPRC_DAT', 'CPCD_ID', {
+                'CPCD_SHK_ID': shk_id,
+                'CPCD_DATE': date,
+                'CPCD_QTY': qty,
+                'CPCD_RET_NG_QTY': ret_ng_qty,
+                'CPCD_INS_NG_QTY': ins_ng_qty,
+                'CPCD_PASS_QTY': pass_qty
+            })
             
             # 合格数が0より大きい場合、CPRD_DATを作成
             if pass_qty > 0:
@@ -1043,40 +1066,56 @@ class CprcDatModel(Base):
         finally:
             session.close()
     
+    @staticmethod
+    def _to_dict(r):
+        """加工データの行を辞書にする"""
+        return {
+            'CPCD_ID': r.CPCD_ID,
+            'CPCD_SHK_ID': r.CPCD_SHK_ID,
+            'CPCD_DATE': r.CPCD_DATE.strftime('%Y-%m-%d') if r.CPCD_DATE else '',
+            'CPCD_QTY': r.CPCD_QTY,
+            'CPCD_RET_NG_QTY': r.CPCD_RET_NG_QTY,
+            'CPCD_INS_NG_QTY': r.CPCD_INS_NG_QTY,
+            'CPCD_PASS_QTY': r.CPCD_PASS_QTY
+        }
+
     @staticmethod
     def get_by_shk_id(shk_id):
         """指定された出荷IDの加工データ一覧を取得する"""
+        return CprcDatModel.get_by_shk_ids([shk_id])[int(shk_id)]
+
+    @staticmethod
+    def get_by_shk_ids(shk_ids):
+        """複数の出荷IDの加工データ一覧をまとめて取得する
+        
+        Args:
+            shk_ids (list): 出荷IDのリスト
+        
+        Returns:
+            dict: 出荷ID → 加工データのリスト（加工ID降順、データがない出荷IDは空リスト）
+        """
+        cprc_map = {int(shk_id): [] for shk_id in shk_ids}
+        id_list = sorted(cprc_map)
         session = get_db_session()
         try:
-            sql = text("""
-                SELECT 
-                    CPCD_ID,
-                    CPCD_SHK_ID,
-                    CPCD_DATE,
-                    CPCD_QTY,
-                    CPCD_RET_NG_QTY,
-                    CPCD_INS_NG_QTY,
-                    CPCD_PASS_QTY
-                FROM CPRC_DAT
-                WHERE CPCD_SHK_ID = :shk_id
-                ORDER BY CPCD_ID DESC
-            """)
-            
-            results = session.execute(sql, {'shk_id': shk_id}).fetchall()
-            
-            result = []
-            for r in results:
-                cprc = {
-                    'CPCD_ID': r.CPCD_ID,
-                    'CPCD_SHK_ID': r.CPCD_SHK_ID,
-                    'CPCD_DATE': r.CPCD_DATE.strftime('%Y-%m-%d') if r.CPCD_DATE else '',
-                    'CPCD_QTY': r.CPCD_QTY,
-                    'CPCD_RET_NG_QTY': r.CPCD_RET_NG_QTY,
-                    'CPCD_INS_NG_QTY': r.CPCD_INS_NG_QTY,
-                    'CPCD_PASS_QTY': r.CPCD_PASS_QTY
-                }
-                result.append(cprc)
-            return result
+            for start in range(0, len(id_list), DatabaseConstants.SQL_IN_CHUNK):
+                placeholders, params = in_clause_params('id', id_list[start:start + DatabaseConstants.SQL_IN_CHUNK])
+                results = session.execute(text(f"""
+                    SELECT 
+                        CPCD_ID,
+                        CPCD_SHK_ID,
+                        CPCD_DATE,
+                        CPCD_QTY,
+                        CPCD_RET_NG_QTY,
+                        CPCD_INS_NG_QTY,
+                        CPCD_PASS_QTY
+                    FROM CPRC_DAT
+                    WHERE CPCD_SHK_ID IN ({placeholders})
+                    ORDER BY CPCD_SHK_ID, CPCD_ID DESC
+                """), params).fetchall()
+                for r in results:
+                    cprc_map[int(r.CPCD_SHK_ID)].append(CprcDatModel._to_dict(r))
+            return cprc_map
             
         except Exception as e:
             logging.error(f"加工データ一覧の取得中にエラーが発生: {str(e)}")
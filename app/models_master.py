@@ -428,7 +428,25 @@ class PrdMstModel(Base):
             raise Exception(error_msg)
         finally:
             session.close()
-    
+
+    @staticmethod
+    def get_kbn_map():
+        """製品IDと商品分類の対応を取得する（有効なもののみ。取込時の一括参照用）"""
+        session = get_db_session()
+        try:
+            results = session.execute(text("""
+                SELECT PRD_ID, PRD_KBN
+                FROM PRD_MST
+                WHERE PRD_FLG = :prd_flg_active
+            """), {'prd_flg_active': DatabaseConstants.FLG_ACTIVE}).fetchall()
+            return {r.PRD_ID: r.PRD_KBN for r in results}
+        except SQLAlchemyError as e:
+            error_msg = "データベースの操作中にエラーが発生しました。"
+            logging.error(f"SQLエラー: {str(e)}\n{traceback.format_exc()}")
+            raise Exception(error_msg)
+        finally:
+            session.close()
+
     @staticmethod
     def get_all():
         """すべての製品マスタデータを取得する（有効なもののみ）"""
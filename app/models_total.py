@@ -5,12 +5,11 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
 from datetime import datetime
 from sqlalchemy.orm import relationship
 from flask import jsonify
-import pandas as pd
 from io import BytesIO
 import unicodedata
 import traceback
 
-from app.database import Base, get_db_session, get_db_connection
+from app.database import Base, get_db_session, get_db_connection, use_report_db
 from app.constants import DatabaseConstants, KbnConstants
 from app.logger_utils import log_error
 
@@ -30,6 +29,7 @@ class CprgMstModel(Base):
     CPRG_ROW_KEY = Column(Numeric(2, 0))  # 行キー
     
     @staticmethod
+    @use_report_db
     def get_processing_matrix_data(cprg_id):
         """加工集計グループマスタをベースにしたマトリックスデータを取得する"""
         session = get_db_session()
@@ -476,6 +476,7 @@ class CttlMstModel(Base):
             session.close()
     
     @staticmethod
+    @use_report_db
     def get_stock_matrix_data(cttl_id):
         """在庫集計マスタをベースにしたマトリックスデータを取得する"""
         session = get_db_session()
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""リクエスト単位のプロファイル取得（cProfile）
+
+管理者（PROFILE_ADMIN_USERS）がヘッダー X-Profile: 1 またはクエリ ?_profile=1 を
+付けたリクエストと、PROFILE_SAMPLE_RATE の割合で抽出したリクエストについて、
+テンプレート描画を含むリクエスト全体の cProfile を取得し、PROFILE_DIR に
+pstats 形式（.prof）で保存する。保存したファイルは /profiles から一覧・ダウンロードできる。
+
+解析例:
+    python -m pstats profiles/20250101_120000_123456_common.stock_summary_850ms.prof
+    snakeviz profiles/xxx.prof
+"""
+
+import cProfile
+import os
+import random
+import re
+import time
+from datetime import datetime
+from functools import wraps
+
+from flask import abort, flash, g, redirect, render_template, request, send_from_directory, session, url_for
+
+from app import app
+from app.constants import ProfileConstants
+from app.logger_utils import log_error, log_info
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           os.getenv('PROFILE_DIR', ProfileConstants.DEFAULT_PROFILE_DIR))
+
+# 計測対象外のエンドポイント
+EXCLUDED_ENDPOINTS = {'static', 'profile_list', 'profile_download'}
+
+
+def _get_float_env(name, default):
+    """小数の環境変数を取得する（不正な値は既定値）"""
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _get_int_env(name, default):
+    """整数の環境変数を取得する（不正な値は既定値）"""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def is_profile_admin():
+    """ログインユーザーがプロファイル管理者かどうか"""
+    admin_users = {u.strip() for u in os.getenv('PROFILE_ADMIN_USERS', '').split(',') if u.strip()}
+    return session.get('user_id') in admin_users
+
+
+def admin_required(f):
+    """プロファイル管理者のみ許可する"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            flash('ログインが必要です。', 'warning')
+            return redirect(url_for('auth.login'))
+        if not is_profile_admin():
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _requested_by_admin():
+    requested = (request.headers.get(ProfileConstants.REQUEST_HEADER) == '1'
+                 or request.args.get(ProfileConstants.QUERY_PARAM) == '1')
+    return requested and is_profile_admin()
+
+
+def _should_profile():
+    if request.endpoint in EXCLUDED_ENDPOINTS:
+        return False
+    if _requested_by_admin():
+        return True
+    rate = _get_float_env('PROFILE_SAMPLE_RATE', ProfileConstants.DEFAULT_SAMPLE_RATE)
+    return rate > 0 and random.random() < rate
+
+
+def _profile_filename(elapsed_ms):
+    endpoint = re.sub(r'[^A-Za-z0-9_.-]', '_', request.endpoint or 'not_found')
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    return f"{timestamp}_{endpoint}_{elapsed_ms}ms{ProfileConstants.FILE_EXTENSION}"
+
+
+def _remove_old_profiles():
+    """保存数の上限を超えたプロファイルを古い順に削除する"""
+    max_files = _get_int_env('PROFILE_MAX_FILES', ProfileConstants.DEFAULT_MAX_FILES)
+    files = sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith(ProfileConstants.FILE_EXTENSION))
+    for name in files[:max(0, len(files) - max_files)]:
+        os.remove(os.path.join(PROFILE_DIR, name))
+
+
+@app.before_request
+def _start_profile():
+    if not _should_profile():
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # 他のプロファイラが動作中（同時リクエストの計測中など）は取得しない
+        return
+    g.profiler = profiler
+    g.profile_start = time.perf_counter()
+
+
+@app.teardown_request
+def _save_profile(exception):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return
+    profiler.disable()
+    try:
+        elapsed_ms = int((time.perf_counter() - g.profile_start) * 1000)
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        filename = _profile_filename(elapsed_ms)
+        profiler.dump_stats(os.path.join(PROFILE_DIR, filename))
+        _remove_old_profiles()
+        log_info(f"プロファイルを保存しました: {filename}")
+    except Exception as e:
+        log_error(f"プロファイルの保存中にエラーが発生しました: {str(e)}")
+
+
+@app.route('/profiles')
+@admin_required
+def profile_list():
+    """保存済みプロファイルの一覧を表示する"""
+    profiles = []
+    if os.path.isdir(PROFILE_DIR):
+        for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+            if not name.endswith(ProfileConstants.FILE_EXTENSION):
+                continue
+            path = os.path.join(PROFILE_DIR, name)
+            profiles.append({
+                'name': name,
+                'created': datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d %H:%M:%S'),
+                'size_kb': round(os.path.getsize(path) / 1024, 1),
+            })
+    return render_template('profile_list.html', profiles=profiles)
+
+
+@app.route('/profiles/<path:filename>')
+@admin_required
+def profile_download(filename):
+    """プロファイルをダウンロードする"""
+    if not filename.endswith(ProfileConstants.FILE_EXTENSION):
+        abort(404)
+    return send_from_directory(PROFILE_DIR, filename, as_attachment=True)
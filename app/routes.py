@@ -1,8 +1,10 @@
 from flask import render_template, request, redirect, url_for, flash, jsonify, current_app, make_response, send_file
+from flask import session as login_session
 from app import app
-from app.constants import DatabaseConstants
-from app.import_csv import import_csv_nonecoat, import_from_barcode
-from app.import_excel import import_excel_hardcoat
+from app.constants import DatabaseConstants, ImportJobConstants, OrderImportConstants
+from app.import_jobs import ImportJobManager
+from app.import_order import (UPLOAD_EXTENSIONS, apply_order_import, get_upload_path,
+                              plan_order_import, remove_upload, save_upload)
 from app.models import BfspMst, PrdDat, log_error, BfspMstModel, BrcpDat, BprdMei, BprdMeiModel, PrdDatModel, BBcdDat
 from app.database import get_db_session
 from sqlalchemy import text, cast, Integer
@@ -10,7 +12,6 @@ from datetime import datetime
 from app.forms import NoncoatStockSearchForm, ShipmentSearchForm, ProcOrderSearchForm, HardcoatStockForm, BrcpSearchForm
 from app.shipment import Shipment
 from app.export_excel import write_to_proc_excel
-from app.export_pdf import shipment_export_pdf, noncoat_stock_export_pdf, hardcoat_stock_export_pdf
 from urllib.parse import quote
 import traceback
 import tempfile
@@ -19,7 +20,6 @@ import shutil
 from app.auth import login_required
 from app.barcode_saver import ShipmentBarcodeSaver
 from app.barcode_generator import BarcodeGenerator
-from werkzeug.utils import secure_filename
         
 
 @app.route('/')
@@ -58,58 +58,23 @@ def import_csv():
                 flash('CSVファイルを選択してください（.csv拡張子のファイル）', 'error')
                 return redirect(request.url)
             
-            # 一時ファイルに保存
-            
-            temp_dir = tempfile.gettempdir()
-            temp_path = os.path.join(temp_dir, file.filename)
-            try:
-                file.save(temp_path)
-            except Exception as e:
-                flash(f'ファイル保存エラー: {str(e)}', 'error')
-                return redirect(request.url)
-            
-            # ファイルサイズを確認
-            file_size = os.path.getsize(temp_path)
+            # ファイルが空でないか確認
+            file.seek(0, 2)
+            file_size = file.tell()
+            file.seek(0)
             if file_size == 0:
-                os.remove(temp_path)
                 flash('ファイルが空です', 'error')
                 return redirect(request.url)
             
             # ヘッダーの有無を取得
             has_header = 'has_header' in request.form
             
-            # CSV取り込み処理
-            try:
-                result = import_csv_nonecoat(temp_path, has_header)
-            except Exception as e:
-                tb = traceback.format_exc()
-                log_error(f"CSV取り込み処理でエラーが発生しました: {str(e)}\n{tb}")
-                flash(f'CSV取り込み処理エラー: {str(e)}', 'error')
-                # 一時ファイルを削除
-                os.remove(temp_path)
-                return redirect(request.url)
-            
-            # 一時ファイルを削除
-            os.remove(temp_path)
-            
-            # 結果を表示
-            if result.get("success", 0) > 0:
-                flash(f"CSV取り込み完了: 合計{result.get('total', 0)}行、"
-                    f"成功{result.get('success', 0)}行、"
-                    f"スキップ{result.get('skipped', 0)}行、重複{result.get('duplicate', 0)}行、エラー{result.get('error', 0)}行", 'success')
-            else:
-                flash(f"CSV取り込み結果: 合計{result.get('total', 0)}行、"
-                    f"成功{result.get('success', 0)}行、"
-                    f"スキップ{result.get('skipped', 0)}行、重複{result.get('duplicate', 0)}行、エラー{result.get('error', 0)}行", 'warning')
-            
-            # エラーがあれば表示 (最大5件まで)
-            if result['errors']:
-                for i, error in enumerate(result['errors'][:5]):
-                    flash(f"{error}", 'error')
-                if len(result['errors']) > 5:
-                    flash(f"その他 {len(result['errors']) - 5} 件のエラーがあります", 'warning')
-            
-            return redirect(request.url)
+            # 取込ジョブを登録し、進捗画面へ
+            job_id = ImportJobManager.submit(
+                ImportJobConstants.KIND_NONCOAT_CSV, file, login_session.get('user_id'),
+                {'has_header': has_header}
+            )
+            return redirect(url_for('import_job.job_status', job_id=job_id))
                 
         except Exception as e:
             tb = traceback.format_exc()
@@ -324,6 +289,8 @@ def noncoat_stock_pdf():
 
         # PDFを生成
         print("PDF生成開始")
+        # reportlabは読み込みが重いため、PDF出力時に読み込む
+        from app.export_pdf import noncoat_stock_export_pdf
         pdf = noncoat_stock_export_pdf(stocks)
         print("PDF生成完了")
 
@@ -400,6 +367,8 @@ def hardcoat_stock_pdf():
 
         # PDFを生成
         print("PDF生成開始")
+        # reportlabは読み込みが重いため、PDF出力時に読み込む
+        from app.export_pdf import hardcoat_stock_export_pdf
         pdf = hardcoat_stock_export_pdf(stocks)
         print("PDF生成完了")
 
@@ -516,10 +485,78 @@ def save_order():
         
         if 'error' in result:
             return jsonify({'error': result['error']}), 500
-        return jsonify({'success': True})
+        return jsonify({'success': True, 'results': result['results']})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/order_import', methods=['GET', 'POST'])
+@login_required
+def order_import():
+    """受注ファイル取込画面（POSTは取込内容の確認）"""
+    if request.method == 'POST':
+        file = request.files.get('file')
+        if not file or file.filename == '':
+            flash('ファイルが選択されていません', 'error')
+            return redirect(request.url)
+        
+        # ファイルの拡張子をチェック
+        if not file.filename.lower().endswith(UPLOAD_EXTENSIONS):
+            flash('CSVまたはExcelファイル（.xlsx）を選択してください', 'error')
+            return redirect(request.url)
+        
+        has_header = 'has_header' in request.form
+        token = save_upload(file)
+        try:
+            plan = plan_order_import(get_upload_path(token), has_header)
+        except Exception as e:
+            remove_upload(token)
+            tb = traceback.format_exc()
+            log_error(f"受注ファイルの確認中にエラーが発生しました: {str(e)}\n{tb}")
+            flash(f'受注ファイルの読み込みエラー: {str(e)}', 'error')
+            return redirect(request.url)
+        
+        return render_template('order_import.html', plan=plan, token=token,
+                               has_header=has_header, filename=file.filename,
+                               action_labels=OrderImportConstants.ACTION_LABELS)
+    
+    return render_template('order_import.html', plan=None)
+
+@app.route('/order_import/apply', methods=['POST'])
+@login_required
+def order_import_apply():
+    """確認済みの受注ファイルを取り込む"""
+    token = request.form.get('token')
+    has_header = request.form.get('has_header') == '1'
+    file_path = get_upload_path(token)
+    if file_path is None:
+        flash('確認済みのファイルが見つかりません。もう一度ファイルを選択してください', 'error')
+        return redirect(url_for('order_import'))
+    
+    try:
+        result = apply_order_import(file_path, has_header)
+    except Exception as e:
+        tb = traceback.format_exc()
+        log_error(f"受注ファイル取込でエラーが発生しました: {str(e)}\n{tb}")
+        flash(f'受注ファイル取込エラー: {str(e)}', 'error')
+        return redirect(url_for('order_import'))
+    finally:
+        remove_upload(token)
+    
+    summary = result['summary']
+    flash(f"受注ファイル取込完了: 受注{result['orders']}件、"
+          f"新規{summary[OrderImportConstants.ACTION_INSERT]}件、変更{summary[OrderImportConstants.ACTION_UPDATE]}件、"
+          f"削除{summary[OrderImportConstants.ACTION_DELETE]}件、エラー{summary[OrderImportConstants.ACTION_ERROR]}件"
+          f"（{result['orders_per_sec']}受注/秒）", 'success' if result['success'] > 0 else 'warning')
+    
+    # エラーがあれば表示 (最大5件まで)
+    if result['errors']:
+        for error in result['errors'][:5]:
+            flash(error, 'error')
+        if len(result['errors']) > 5:
+            flash(f"その他 {len(result['errors']) - 5} 件のエラーがあります", 'warning')
+    
+    return redirect(url_for('order_import'))
+
 @app.route('/shipments', methods=['GET', 'POST'])
 @login_required
 def shipment_list():
@@ -642,6 +679,8 @@ def shipment_pdf():
 
         # PDFを生成
         print("PDF生成開始")
+        # reportlabは読み込みが重いため、PDF出力時に読み込む
+        from app.export_pdf import shipment_export_pdf
         pdf = shipment_export_pdf(
             shipments
         )
@@ -750,7 +789,19 @@ def hardcoat_read_excel_import():
             flash('Excelファイルを選択してください', 'error')
             return redirect(url_for('hardcoat_read_excel'))
         
-        return import_excel_hardcoat(file)
+        # ファイルが空でないか確認
+        file.seek(0, 2)
+        file_size = file.tell()
+        file.seek(0)
+        if file_size == 0:
+            flash('ファイルが空です', 'error')
+            return redirect(url_for('hardcoat_read_excel'))
+        
+        # 取込ジョブを登録し、進捗画面へ
+        job_id = ImportJobManager.submit(
+            ImportJobConstants.KIND_HARDCOAT_EXCEL, file, login_session.get('user_id')
+        )
+        return redirect(url_for('import_job.job_status', job_id=job_id))
             
     except Exception as e:
         tb = traceback.format_exc()
@@ -1106,54 +1157,20 @@ def barcode_import():
             flash('CSVファイルを選択してください', 'error')
             return redirect(request.url)
             
-        # 一時ファイルとして保存
-        temp_dir = tempfile.gettempdir()
-        filename = secure_filename(file.filename)
-        temp_path = os.path.join(temp_dir, filename)
-        file.save(temp_path)
+        has_header = 'hasHeader' in request.form
+        bbcd_kbn = request.form.get('bbcdKbn')
         
-        # CSV取り込み処理
-        try:
-            has_header = 'hasHeader' in request.form
-            bbcd_kbn = request.form.get('bbcdKbn')
-            
-            # 区分の検証
-            if not bbcd_kbn:
-                flash('バーコード区分を選択してください', 'error')
-                os.remove(temp_path)
-                return redirect(request.url)
-            
-            result = import_from_barcode(temp_path, has_header, bbcd_kbn)
-        except Exception as e:
-            tb = traceback.format_exc()
-            log_error(f"CSV取り込み処理でエラーが発生しました: {str(e)}\n{tb}")
-            flash(f'CSV取り込み処理エラー: {str(e)}', 'error')
-            # 一時ファイルを削除
-            os.remove(temp_path)
+        # 区分の検証
+        if not bbcd_kbn:
+            flash('バーコード区分を選択してください', 'error')
             return redirect(request.url)
         
-        # 一時ファイルを削除
-        os.remove(temp_path)
-        
-        # 結果を表示
-        bbcd_kbn_name = {'1': 'BF', '2': '一般', '3': '箱詰', '4': '検品'}.get(bbcd_kbn, '不明')
-        if result.get("success", 0) > 0:
-            flash(f"区分「{bbcd_kbn_name}」のCSV取り込み完了: 合計{result.get('total', 0)}行、"
-                f"成功{result.get('success', 0)}行、"
-                f"スキップ{result.get('skipped', 0)}行、重複{result.get('duplicate', 0)}行、エラー{result.get('error', 0)}行", 'success')
-        else:
-            flash(f"区分「{bbcd_kbn_name}」のCSV取り込み結果: 合計{result.get('total', 0)}行、"
-                f"成功{result.get('success', 0)}行、"
-                f"スキップ{result.get('skipped', 0)}行、重複{result.get('duplicate', 0)}行、エラー{result.get('error', 0)}行", 'warning')
-        
-        # エラーがあれば表示 (最大5件まで)
-        if result['errors']:
-            for i, error in enumerate(result['errors'][:5]):
-                flash(f"{error}", 'error')
-            if len(result['errors']) > 5:
-                flash(f"その他 {len(result['errors']) - 5} 件のエラーがあります", 'warning')
-        
-        return redirect(request.url)
+        # 取込ジョブを登録し、進捗画面へ
+        job_id = ImportJobManager.submit(
+            ImportJobConstants.KIND_BARCODE_CSV, file, login_session.get('user_id'),
+            {'has_header': has_header, 'bbcd_kbn': bbcd_kbn}
+        )
+        return redirect(url_for('import_job.job_status', job_id=job_id))
         
     return render_template('barcode_import.html')
 
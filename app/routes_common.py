@@ -1,18 +1,19 @@
-import os
+import itertools
 import traceback
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, make_response, current_app
-from werkzeug.utils import secure_filename
+from urllib.parse import quote
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, make_response, current_app, session, Response, stream_with_context
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
 from datetime import datetime
 
 from app.auth import login_required
 from app.barcode_saver import ShipmentBarcodeSaver
-from app.import_csv import import_csv_common
+from app.export_stream import stream_csv, stream_xlsx
+from app.http_cache import cache_by_data_version
+from app.import_jobs import ImportJobManager
 from app.models_common import CprcDatModel, CprdDatModel
 from app.models_master import PrdMstModel, CprcMstModel, KbnMstModel, CztrMstModel
-from app.constants import DatabaseConstants, KbnConstants
+from app.constants import DatabaseConstants, ExportConstants, ImportJobConstants, KbnConstants, PdfConstants
 from app.logger_utils import log_error
-from app.export_pdf import process_request_export_pdf, shipment_list_export_pdf
 
 from app.shipment_common import ShipmentCommon
 
@@ -50,40 +51,15 @@ def csv_import_common():
                 error_message = 'ファイルサイズが大きすぎます（10MB以下のファイルを選択してください）。'
                 return render_template('common/csv_import_common.html', error=error_message)
             
-            # CSVインポート処理
-            # ファイルを一時保存
-            temp_dir = os.path.join(os.path.dirname(__file__), 'temp')
-            os.makedirs(temp_dir, exist_ok=True)
+            # ヘッダー行の有無を取得
+            has_header = 'has_header' in request.form
             
-            filename = secure_filename(file.filename)
-            temp_path = os.path.join(temp_dir, filename)
-            file.save(temp_path)
-            
-            try:
-                # ヘッダー行の有無を取得
-                has_header = 'has_header' in request.form
-                
-                # CSV取込処理を実行
-                result = import_csv_common(temp_path, has_header=has_header)
-                
-                success_count = result['success']
-                error_count = result['error']
-                
-                if error_count > 0:
-                    error_message = f'インポート完了: 成功 {success_count}件, 失敗 {error_count}件'
-                    if result['errors']:
-                        error_message += '\n\nエラー詳細:\n' + '\n'.join(result['errors'][:10])
-                else:
-                    flash(f'{success_count}件のデータをインポートしました。', 'success')
-                    return redirect(url_for('common.cprd_dat_list'))
-                    
-            finally:
-                # 一時ファイルを削除
-                try:
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-                except Exception as e:
-                    log_error("一時ファイル削除エラー", e)
+            # 取込ジョブを登録し、進捗画面へ
+            job_id = ImportJobManager.submit(
+                ImportJobConstants.KIND_COMMON_CSV, file, session.get('user_id'),
+                {'has_header': has_header}
+            )
+            return redirect(url_for('import_job.job_status', job_id=job_id))
                     
         except OperationalError as e:
             log_error("データベース接続エラー", e)
@@ -102,6 +78,7 @@ def csv_import_common():
 
 @common_bp.route('/cprd_dat', methods=['GET'])
 @login_required
+@cache_by_data_version('CPRD_DAT', 'CSHK_DAT', 'PRD_MST', 'KBN_MST')
 def cprd_dat_list():
     """入庫データ一覧画面"""
     try:
@@ -415,6 +392,7 @@ def cprd_dat_delete(cpdd_id):
 
 @common_bp.route('/api/get_customer_list', methods=['GET'])
 @login_required
+@cache_by_data_version('CZTR_MST')
 def get_customer_list():
     """得意先リストを取得するAPI"""
     try:
@@ -435,6 +413,7 @@ def get_customer_list():
 
 @common_bp.route('/api/get_cprc_list/<string:prd_id>', methods=['GET'])
 @login_required
+@cache_by_data_version('CPRC_MST')
 def get_cprc_list(prd_id):
     """加工マスタリストを取得するAPI"""
     try:
@@ -668,6 +647,42 @@ def get_shipment_list(cpdd_id):
         error_msg = "予期せぬエラーが発生しました。"
         return jsonify({'success': False, 'error': error_msg})
 
+def _get_batch_ids():
+    """一括取得APIのリクエストからIDのリストを取得する（不正な場合はNone）"""
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or len(ids) > DatabaseConstants.BATCH_API_MAX_IDS:
+        return None
+    try:
+        return [int(i) for i in ids]
+    except (TypeError, ValueError):
+        return None
+
+@common_bp.route('/api/get_shipment_list_batch', methods=['POST'])
+@login_required
+def get_shipment_list_batch():
+    """複数の入庫IDの出荷データ一覧をまとめて取得するAPI
+    
+    リクエスト: {"ids": [入庫ID, ...]}、レスポンスの data は 入庫ID → 出荷データ一覧
+    """
+    try:
+        ids = _get_batch_ids()
+        if ids is None:
+            return jsonify({'success': False, 'error': f'IDのリスト（最大{DatabaseConstants.BATCH_API_MAX_IDS}件）を指定してください。'}), 400
+        return jsonify({'success': True, 'data': ShipmentCommon.get_by_cpdd_ids_with_details(ids)})
+    except OperationalError as e:
+        log_error("データベース接続エラー", e)
+        error_msg = "データベースへの接続に失敗しました。システム管理者に連絡してください。"
+        return jsonify({'success': False, 'error': error_msg})
+    except SQLAlchemyError as e:
+        log_error("SQLエラー", e)
+        error_msg = "データベースの操作中にエラーが発生しました。"
+        return jsonify({'success': False, 'error': error_msg})
+    except Exception as e:
+        log_error("予期せぬエラーが発生しました", e)
+        error_msg = "予期せぬエラーが発生しました。"
+        return jsonify({'success': False, 'error': error_msg})
+
 @common_bp.route('/api/get_zaiko_zan/<int:cpdd_id>', methods=['GET'])
 @login_required
 def get_zaiko_zan(cpdd_id):
@@ -688,6 +703,31 @@ def get_zaiko_zan(cpdd_id):
         error_msg = "予期せぬエラーが発生しました。"
         return jsonify({'success': False, 'error': error_msg})
 
+@common_bp.route('/api/get_zaiko_zan_batch', methods=['POST'])
+@login_required
+def get_zaiko_zan_batch():
+    """複数の入庫IDの在庫残数をまとめて取得するAPI
+    
+    リクエスト: {"ids": [入庫ID, ...]}、レスポンスの data は 入庫ID → 在庫残数
+    """
+    try:
+        ids = _get_batch_ids()
+        if ids is None:
+            return jsonify({'success': False, 'error': f'IDのリスト（最大{DatabaseConstants.BATCH_API_MAX_IDS}件）を指定してください。'}), 400
+        return jsonify({'success': True, 'data': CprdDatModel.get_zaiko_zan_map(ids)})
+    except OperationalError as e:
+        log_error("データベース接続エラー", e)
+        error_msg = "データベースへの接続に失敗しました。システム管理者に連絡してください。"
+        return jsonify({'success': False, 'error': error_msg})
+    except SQLAlchemyError as e:
+        log_error("SQLエラー", e)
+        error_msg = "データベースの操作中にエラーが発生しました。"
+        return jsonify({'success': False, 'error': error_msg})
+    except Exception as e:
+        log_error("予期せぬエラーが発生しました", e)
+        error_msg = "予期せぬエラーが発生しました。"
+        return jsonify({'success': False, 'error': error_msg})
+
 @common_bp.route('/process_request', methods=['GET'])
 @login_required
 def process_request_list():
@@ -701,10 +741,24 @@ def process_request_list():
         cztr_id = request.args.get('cztr_id', '').strip()
         return_status = request.args.get('return_status', '').strip()
         search = request.args.get('search', '').strip()
+        after_dt = request.args.get('after_dt', '').strip()
+        after_id = request.args.get('after_id', '').strip()
         
         # 検索実行フラグ
         is_search_executed = search == '1'
         
+        # 次ページの開始位置（前ページの最終行の加工依頼日・出荷ID。不正な値は先頭から表示）
+        after_dt_obj = None
+        after_id_int = None
+        try:
+            if after_id:
+                after_id_int = int(after_id)
+                if after_dt:
+                    after_dt_obj = datetime.strptime(after_dt, '%Y-%m-%d %H:%M:%S.%f')
+        except ValueError:
+            after_dt_obj = None
+            after_id_int = None
+        
         # 日付の変換処理
         date_from_obj = None
         date_to_obj = None
@@ -752,20 +806,33 @@ def process_request_list():
 
         # データの検索
         process_request_list = []
+        next_page_args = None
         if is_search_executed:
+            # 1件多く取得して次ページの有無を判定する
+            page_size = DatabaseConstants.PROCESS_REQUEST_PAGE_SIZE
             process_request_list = ShipmentCommon.get_process_request_list(
                 date_from=date_from_obj,
                 date_to=date_to_obj,
                 prd_id=prd_id if prd_id else None,
                 prc_id=prc_id_int,
                 cztr_id=cztr_id_int,
-                return_status=return_status_int
+                return_status=return_status_int,
+                limit=page_size + 1,
+                after_dt=after_dt_obj,
+                after_id=after_id_int
             )
-            
-
+            if len(process_request_list) > page_size:
+                process_request_list = process_request_list[:page_size]
+                last = process_request_list[-1]
+                next_page_args = {
+                    'after_dt': last['CSHK_DT_KEY'],
+                    'after_id': last['CSHK_ID'],
+                }
         
         return render_template('common/process_request_list.html', 
                              process_request_list=process_request_list,
+                             next_page_args=next_page_args,
+                             is_paged=after_id_int is not None,
                              prd_list=prd_list,
                              cprc_list=cprc_list,
                              cztr_list=cztr_list,
@@ -1025,6 +1092,31 @@ def get_cprc_dat_list(shk_id):
         error_msg = "予期せぬエラーが発生しました。"
         return jsonify({'success': False, 'error': error_msg})
 
+@common_bp.route('/api/get_cprc_dat_list_batch', methods=['POST'])
+@login_required
+def get_cprc_dat_list_batch():
+    """複数の出荷IDの加工戻りデータ一覧をまとめて取得するAPI
+    
+    リクエスト: {"ids": [出荷ID, ...]}、レスポンスの data は 出荷ID → 加工戻りデータ一覧
+    """
+    try:
+        ids = _get_batch_ids()
+        if ids is None:
+            return jsonify({'success': False, 'error': f'IDのリスト（最大{DatabaseConstants.BATCH_API_MAX_IDS}件）を指定してください。'}), 400
+        return jsonify({'success': True, 'data': CprcDatModel.get_by_shk_ids(ids)})
+    except OperationalError as e:
+        log_error("データベース接続エラー", e)
+        error_msg = "データベースへの接続に失敗しました。システム管理者に連絡してください。"
+        return jsonify({'success': False, 'error': error_msg})
+    except SQLAlchemyError as e:
+        log_error("SQLエラー", e)
+        error_msg = "データベースの操作中にエラーが発生しました。"
+        return jsonify({'success': False, 'error': error_msg})
+    except Exception as e:
+        log_error("予期せぬエラーが発生しました", e)
+        error_msg = "予期せぬエラーが発生しました。"
+        return jsonify({'success': False, 'error': error_msg})
+
 @common_bp.route('/delete_shipment', methods=['POST'])
 @login_required
 def delete_shipment():
@@ -1121,6 +1213,7 @@ def stock_detail(prd_id, rank):
 
 @common_bp.route('/stock_summary', methods=['GET'])
 @login_required
+@cache_by_data_version('CPRD_DAT', 'CSHK_DAT', 'PRD_MST', 'KBN_MST')
 def stock_summary():
     """在庫集計一覧画面（CPDD_PRD_ID,CPDD_RANKで集計）"""
     try:
@@ -1214,6 +1307,7 @@ def stock_summary():
 
 @common_bp.route('/shipment_list', methods=['GET'])
 @login_required
+@cache_by_data_version('CSHK_DAT', 'CPRD_DAT', 'PRD_MST', 'KBN_MST', 'CZTR_MST')
 def shipment_list():
     """出荷一覧画面（CSHK_KBN=0のデータ）"""
     try:
@@ -1338,62 +1432,198 @@ def shipment_list():
                              search_cshk_to='',
                              is_search_executed=False)
 
+def _export_list_response(export_format, columns, rows, file_info):
+    """一覧をCSV・Excelでストリーミング出力するレスポンスを作成する
+
+    Args:
+        export_format (str): 出力形式（ExportConstants.FORMAT_CSV / FORMAT_XLSX）
+        columns (list): 出力列（見出し, 行のキー）のリスト
+        rows (iterable): 行（dict）。DBから順次読み込むジェネレータを渡す
+        file_info (tuple): (ASCIIのファイル名, 日本語のファイル名・シート名)
+    """
+    ascii_name, japanese_name = file_info
+    if export_format == ExportConstants.FORMAT_XLSX:
+        body = stream_xlsx(columns, rows, japanese_name)
+    else:
+        export_format = ExportConstants.FORMAT_CSV
+        body = stream_csv(columns, rows)
+    # 最初のデータを作成してから応答する（検索のエラーを画面に返せるようにする）
+    first_chunk = next(body)
+    
+    date_str = datetime.now().strftime('%Y%m%d')
+    filename = f'{ascii_name}_{date_str}.{export_format}'
+    encoded_filename = quote(f'{japanese_name}_{date_str}.{export_format}')
+    return Response(
+        stream_with_context(itertools.chain([first_chunk], body)),
+        mimetype=ExportConstants.MIMETYPES[export_format],
+        headers={'Content-Disposition': f"attachment; filename={filename}; filename*=UTF-8''{encoded_filename}"}
+    )
+
+def _with_lot_text(shipments):
+    """出荷一覧の行にLOTの表示用文字列（6桁ゼロ埋め、画面と同じ）を付加する"""
+    for shipment in shipments:
+        shipment['CPDD_LOT_TEXT'] = '%06d' % shipment['CPDD_LOT'] if shipment['CPDD_LOT'] else ''
+        yield shipment
+
+@common_bp.route('/shipment_list/export', methods=['GET'])
+@login_required
+def shipment_list_export():
+    """出荷一覧をCSV・Excelで出力する（検索条件は画面と同じ）"""
+    try:
+        cshk_to = request.args.get('cshk_to', '').strip()
+        conditions = {}
+        for name in ['date_from', 'date_to', 'ord_date_from', 'ord_date_to']:
+            value = request.args.get(name, '').strip()
+            conditions[name] = datetime.strptime(value, '%Y-%m-%d') if value else None
+        conditions['cshk_to'] = int(cshk_to) if cshk_to else None
+    except ValueError:
+        flash('検索条件の形式が正しくありません。', 'error')
+        return redirect(url_for('common.shipment_list'))
+    
+    try:
+        return _export_list_response(
+            request.args.get('format', ExportConstants.FORMAT_CSV),
+            ExportConstants.SHIPMENT_LIST_COLUMNS,
+            _with_lot_text(ShipmentCommon.iter_shipment_list(**conditions)),
+            ExportConstants.SHIPMENT_LIST_FILE
+        )
+    except Exception as e:
+        log_error("出荷一覧の出力中にエラーが発生しました", e)
+        flash('出荷一覧の出力中にエラーが発生しました。', 'error')
+        return redirect(url_for('common.shipment_list'))
+
+@common_bp.route('/cprd_dat/export', methods=['GET'])
+@login_required
+def cprd_dat_export():
+    """入庫データ一覧をCSV・Excelで出力する（検索条件は画面と同じ）"""
+    prd_id = request.args.get('prd_id', '').strip()
+    prd_name = request.args.get('prd_name', '').strip()
+    prd_monomer = request.args.get('prd_monomer', '').strip()
+    prd_kbn = request.args.get('prd_kbn', '').strip()
+    lot = request.args.get('lot', '').strip()
+    rank = request.args.get('rank', '').strip()
+    stock_status = request.args.get('stock_status', '').strip()
+    
+    rank_value = int(rank) if rank.isdigit() else None
+    prd_kbn_value = int(prd_kbn) if prd_kbn.isdigit() else None
+    stock_status_value = int(stock_status) if stock_status in ['0', '1'] else None
+    
+    try:
+        if any([prd_id, prd_name, prd_monomer, prd_kbn_value is not None, lot, rank_value is not None, stock_status_value is not None]):
+            # 検索条件が指定された場合（有効なデータのみ）
+            rows = CprdDatModel.iter_with_zaiko_zan(
+                prd_id=prd_id if prd_id else None,
+                prd_name=prd_name if prd_name else None,
+                prd_monomer=prd_monomer if prd_monomer else None,
+                prd_kbn=prd_kbn_value,
+                lot=int(lot) if lot.isdigit() else None,
+                rank=rank_value,
+                stock_status=stock_status_value,
+                flg=0
+            )
+        else:
+            # 検索条件が指定されていない場合はすべて出力（画面と同じ）
+            rows = CprdDatModel.iter_with_zaiko_zan()
+        return _export_list_response(
+            request.args.get('format', ExportConstants.FORMAT_CSV),
+            ExportConstants.CPRD_LIST_COLUMNS,
+            rows,
+            ExportConstants.CPRD_LIST_FILE
+        )
+    except Exception as e:
+        log_error("入庫データ一覧の出力中にエラーが発生しました", e)
+        flash('入庫データ一覧の出力中にエラーが発生しました。', 'error')
+        return redirect(url_for('common.cprd_dat_list'))
+
+@common_bp.route('/stock_summary/export', methods=['GET'])
+@login_required
+def stock_summary_export():
+    """在庫集計一覧をCSV・Excelで出力する（検索条件は画面と同じ）"""
+    prd_id = request.args.get('prd_id', '').strip()
+    rank = request.args.get('rank', '').strip()
+    
+    try:
+        return _export_list_response(
+            request.args.get('format', ExportConstants.FORMAT_CSV),
+            ExportConstants.STOCK_SUMMARY_COLUMNS,
+            CprdDatModel.iter_stock_summary(
+                prd_id=prd_id if prd_id else None,
+                rank=int(rank) if rank.isdigit() else None
+            ),
+            ExportConstants.STOCK_SUMMARY_FILE
+        )
+    except Exception as e:
+        log_error("在庫集計一覧の出力中にエラーが発生しました", e)
+        flash('在庫集計一覧の出力中にエラーが発生しました。', 'error')
+        return redirect(url_for('common.stock_summary'))
+
+def _get_process_request_pdf_conditions():
+    """加工依頼書PDFの検索条件を取得する（HTML画面と同じ条件）
+
+    Returns:
+        tuple: (検索条件のdict, エラーメッセージ。正常時はNone)
+    """
+    date_from = request.args.get('date_from', '').strip()
+    date_to = request.args.get('date_to', '').strip()
+    prd_id = request.args.get('prd_id', '').strip()
+    prc_id = request.args.get('prc_id', '').strip()
+    cztr_id = request.args.get('cztr_id', '').strip()
+    return_status = request.args.get('return_status', '').strip()
+    
+    # 日付の変換処理
+    date_from_obj = None
+    date_to_obj = None
+    try:
+        if date_from:
+            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
+        if date_to:
+            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
+    except ValueError:
+        return None, '日付の形式が正しくありません。'
+    
+    # 加工IDの変換処理
+    prc_id_int = None
+    try:
+        if prc_id:
+            prc_id_int = int(prc_id)
+    except ValueError:
+        return None, '加工IDは数値で入力してください。'
+    
+    # 加工先IDの変換処理
+    cztr_id_int = None
+    try:
+        if cztr_id:
+            cztr_id_int = int(cztr_id)
+    except ValueError:
+        return None, '加工先IDは数値で入力してください。'
+    
+    # 戻り残数の変換処理
+    return_status_int = None
+    if return_status in ['0', '1']:
+        return_status_int = int(return_status)
+    
+    return {
+        'date_from': date_from_obj,
+        'date_to': date_to_obj,
+        'prd_id': prd_id if prd_id else None,
+        'prc_id': prc_id_int,
+        'cztr_id': cztr_id_int,
+        'return_status': return_status_int
+    }, None
+
 @common_bp.route('/process_request_pdf', methods=['GET'])
 @login_required
 def process_request_pdf():
     try:
-        # 検索パラメータの取得（HTML画面と同じ条件）
-        date_from = request.args.get('date_from', '').strip()
-        date_to = request.args.get('date_to', '').strip()
-        prd_id = request.args.get('prd_id', '').strip()
-        prc_id = request.args.get('prc_id', '').strip()
-        cztr_id = request.args.get('cztr_id', '').strip()
-        return_status = request.args.get('return_status', '').strip()
-        
-        # 日付の変換処理
-        date_from_obj = None
-        date_to_obj = None
-        try:
-            if date_from:
-                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-            if date_to:
-                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
-        except ValueError:
-            flash('日付の形式が正しくありません。', 'error')
-            return redirect(url_for('common.process_request_list'))
-        
-        # 加工IDの変換処理
-        prc_id_int = None
-        try:
-            if prc_id:
-                prc_id_int = int(prc_id)
-        except ValueError:
-            flash('加工IDは数値で入力してください。', 'error')
-            return redirect(url_for('common.process_request_list'))
-        
-        # 加工先IDの変換処理
-        cztr_id_int = None
-        try:
-            if cztr_id:
-                cztr_id_int = int(cztr_id)
-        except ValueError:
-            flash('加工先IDは数値で入力してください。', 'error')
+        conditions, error_msg = _get_process_request_pdf_conditions()
+        if error_msg:
+            flash(error_msg, 'error')
             return redirect(url_for('common.process_request_list'))
         
-        # 戻り残数の変換処理
-        return_status_int = None
-        if return_status in ['0', '1']:
-            return_status_int = int(return_status)
-        
         # PDF出力処理をexport_pdf.pyに委譲
-        pdf = process_request_export_pdf(
-            date_from=date_from_obj,
-            date_to=date_to_obj,
-            prd_id=prd_id if prd_id else None,
-            prc_id=prc_id_int,
-            cztr_id=cztr_id_int,
-            return_status=return_status_int
-        )
+        # reportlabは読み込みが重いため、PDF出力時に読み込む
+        from app.export_pdf import process_request_export_pdf
+        pdf = process_request_export_pdf(**conditions)
         
         response = make_response(pdf)
         response.headers['Content-Type'] = 'application/pdf'
@@ -1405,6 +1635,30 @@ def process_request_pdf():
         flash(f'PDF出力中にエラーが発生しました: {str(e)}', 'error')
         return redirect(url_for('common.process_request_list'))
 
+@common_bp.route('/process_request_pdf_zip', methods=['GET'])
+@login_required
+def process_request_pdf_zip():
+    """加工依頼書PDFを加工先ごとに作成し、ZIPで出力する"""
+    try:
+        conditions, error_msg = _get_process_request_pdf_conditions()
+        if error_msg:
+            flash(error_msg, 'error')
+            return redirect(url_for('common.process_request_list'))
+        
+        # reportlabは読み込みが重いため、PDF出力時に読み込む
+        from app.export_pdf import process_request_export_pdf_zip
+        zip_data = process_request_export_pdf_zip(**conditions)
+        
+        response = make_response(zip_data)
+        response.headers['Content-Type'] = 'application/zip'
+        response.headers['Content-Disposition'] = f'attachment; filename={PdfConstants.PROCESS_REQUEST_ZIP_NAME}'
+        return response
+        
+    except Exception as e:
+        log_error("加工依頼書PDF一括出力エラー", e)
+        flash(f'PDF出力中にエラーが発生しました: {str(e)}', 'error')
+        return redirect(url_for('common.process_request_list'))
+
 @common_bp.route('/export_shipment_pdf', methods=['GET'])
 @login_required
 def export_shipment_pdf():
@@ -1458,6 +1712,8 @@ def export_shipment_pdf():
             return redirect(url_for('common.shipment_list'))
 
         # PDF生成（新しい関数を使用）
+        # reportlabは読み込みが重いため、PDF出力時に読み込む
+        from app.export_pdf import shipment_list_export_pdf
         pdf_data = shipment_list_export_pdf(shipment_list)
 
         # PDFファイルとしてダウンロード
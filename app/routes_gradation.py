@@ -1136,13 +1136,32 @@ def processing_matrix():
                              spec_choices=matrix_data['spec_choices'],
                              color_choices=matrix_data['color_choices'],
                              convex_data=matrix_data['convex_data'],
-                             nidec_data=matrix_data['nidec_data'])
+                             nidec_data=matrix_data['nidec_data'],
+                             computed_at=matrix_data['computed_at'])
         
     except Exception as e:
         log_error(f"加工状況マトリックス表示エラー: {str(e)}")
         flash('データの取得中にエラーが発生しました。', 'error')
         return redirect(url_for('index'))
 
+@app.route('/gradation/processing_matrix/refresh', methods=['POST'])
+@login_required
+def refresh_processing_matrix():
+    """加工状況マトリックスを再集計する"""
+    try:
+        Gradation.refresh_processing_matrix()
+        flash('加工状況マトリックスを最新の状態に更新しました。', 'success')
+    except Exception as e:
+        log_error(f"加工状況マトリックス更新エラー: {str(e)}")
+        flash('データの更新中にエラーが発生しました。', 'error')
+    return redirect(url_for('processing_matrix'))
+
+@app.cli.command('refresh-gradation-matrix')
+def refresh_gradation_matrix_command():
+    """加工状況マトリックスを再集計する（タスクスケジューラ/cronからの定期実行用）"""
+    matrix_data = Gradation.refresh_processing_matrix()
+    print(f"加工状況マトリックスを更新しました: {matrix_data['computed_at']}")
+
 @app.route('/gradation/auto_shipping')
 @login_required
 def auto_shipping():
@@ -1215,6 +1234,69 @@ def execute_auto_shipping():
         log_error(f"自動出荷実行エラー: {str(e)}")
         return jsonify({'success': False, 'error': f'システムエラーが発生しました: {str(e)}'}), 500
 
+@app.route('/gradation/execute_auto_shipping_batch', methods=['POST'])
+@login_required
+def execute_auto_shipping_batch():
+    """複数の規格・色をまとめて自動出荷を実行"""
+    try:
+        data = request.get_json() or {}
+        
+        # フォームデータを取得
+        lines = data.get('lines') or []
+        order_date = data.get('order_date')
+        shipping_date = data.get('shipping_date')
+        dry_run = data.get('dry_run', False)
+
+        # バリデーション
+        # "false" 等の文字列を真として扱わないよう、真偽値と 'true'/'1' のみ受け付ける
+        if dry_run in ('true', '1'):
+            dry_run = True
+        elif not isinstance(dry_run, bool):
+            return jsonify({'success': False, 'error': 'dry_run は true または false を指定してください。'}), 400
+        if not lines:
+            return jsonify({'success': False, 'error': '出荷明細を入力してください。'}), 400
+        if not order_date:
+            return jsonify({'success': False, 'error': '手配日を入力してください。'}), 400
+        if not shipping_date:
+            return jsonify({'success': False, 'error': '出荷日を入力してください。'}), 400
+        
+        try:
+            # 明細の数値変換と妥当性チェック
+            parsed_lines = []
+            for line_no, line in enumerate(lines, start=1):
+                if not line.get('spec'):
+                    return jsonify({'success': False, 'error': f'{line_no}行目: 規格を選択してください。'}), 400
+                if not line.get('color'):
+                    return jsonify({'success': False, 'error': f'{line_no}行目: 色を選択してください。'}), 400
+                if not line.get('qty'):
+                    return jsonify({'success': False, 'error': f'{line_no}行目: 数量を入力してください。'}), 400
+                qty = int(line['qty'])
+                if qty <= 0:
+                    return jsonify({'success': False, 'error': f'{line_no}行目: 数量は0より大きい値を入力してください。'}), 400
+                parsed_lines.append({
+                    'spec': int(line['spec']),
+                    'color': int(line['color']),
+                    'qty': qty
+                })
+            
+            # 日付変換
+            order_date = datetime.strptime(order_date, '%Y-%m-%d')
+            shipping_date = datetime.strptime(shipping_date, '%Y-%m-%d')
+            
+            # 一括自動出荷を実行
+            result = Gradation.execute_auto_shipping_batch(parsed_lines, order_date, shipping_date, dry_run)
+            
+            return jsonify(result)
+            
+        except ValueError as e:
+            return jsonify({'success': False, 'error': f'数値変換エラー: {str(e)}'}), 400
+        except Exception as e:
+            return jsonify({'success': False, 'error': f'処理中にエラーが発生しました: {str(e)}'}), 400
+            
+    except Exception as e:
+        log_error(f"一括自動出荷実行エラー: {str(e)}")
+        return jsonify({'success': False, 'error': f'システムエラーが発生しました: {str(e)}'}), 500
+
 @app.route('/gradation/check_available_shipping_qty', methods=['POST'])
 @login_required
 def check_available_shipping_qty():
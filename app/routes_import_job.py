@@ -0,0 +1,47 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, jsonify, send_file, abort
+
+from app.auth import login_required
+from app.constants import ImportJobConstants
+from app.import_jobs import ImportJobManager
+
+import_job_bp = Blueprint('import_job', __name__, url_prefix='/import_jobs')
+
+
+@import_job_bp.route('')
+@login_required
+def job_list():
+    """取込ジョブの履歴を表示"""
+    return render_template('import_job/job_list.html', jobs=ImportJobManager.list_jobs())
+
+
+@import_job_bp.route('/<job_id>')
+@login_required
+def job_status(job_id):
+    """取込ジョブの進捗画面を表示"""
+    job = ImportJobManager.get(job_id)
+    if job is None:
+        flash('指定された取込ジョブが見つかりません。', 'error')
+        return redirect(url_for('import_job.job_list'))
+    return_endpoint = ImportJobConstants.KIND_RETURN_ENDPOINTS.get(job['kind'], 'index')
+    return render_template('import_job/job_status.html', job=job, return_url=url_for(return_endpoint))
+
+
+@import_job_bp.route('/<job_id>/progress')
+@login_required
+def job_progress(job_id):
+    """取込ジョブの進捗を返す（画面からのポーリング用）"""
+    job = ImportJobManager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': '指定された取込ジョブが見つかりません。'}), 404
+    return jsonify({'success': True, 'job': job})
+
+
+@import_job_bp.route('/<job_id>/errors')
+@login_required
+def job_errors(job_id):
+    """取込ジョブのエラー一覧をダウンロード"""
+    path = ImportJobManager.get_errors_path(job_id)
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype='text/plain', as_attachment=True,
+                     download_name=f"import_errors_{job_id}.txt")
@@ -9,9 +9,11 @@ from app.models_master import KbnMstModel, CprcMstModel, CztrMstModel, PrdMstMod
 from app.database import get_db_session
 from app.constants import DatabaseConstants, KbnConstants
 from app.auth import login_required
+from app.http_cache import cache_by_data_version
 
 @app.route('/master/kbn/list')
 @login_required
+@cache_by_data_version('KBN_MST')
 def master_kbn_list():
     """区分マスタ一覧画面を表示"""
     try:
@@ -279,6 +281,7 @@ def api_master_kbn_list(kbn_id):
 
 @app.route('/master/cprc/list')
 @login_required
+@cache_by_data_version('CPRC_MST')
 def master_cprc_list():
     """加工マスタ一覧画面を表示"""
     try:
@@ -653,6 +656,7 @@ def master_cprc_delete(cprc_id):
 
 @app.route('/api/master/cprc/<prd_id>', methods=['GET'])
 @login_required
+@cache_by_data_version('CPRC_MST')
 def api_master_cprc_list(prd_id):
     """加工マスタのAPI（JSON形式で返す）"""
     try:
@@ -663,6 +667,7 @@ def api_master_cprc_list(prd_id):
 
 @app.route('/master/cztr/list')
 @login_required
+@cache_by_data_version('CZTR_MST')
 def master_cztr_list():
     """取引先マスタ一覧画面を表示"""
     try:
@@ -745,6 +750,7 @@ def master_cztr_list():
 
 @app.route('/master/prd/list')
 @login_required
+@cache_by_data_version('PRD_MST')
 def master_prd_list():
     """製品マスタ一覧画面を表示"""
     try:
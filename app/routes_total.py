@@ -2,8 +2,10 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from app import app
 from app.database import get_db_session
 from app.models import log_error
+from app.logger_utils import log_debug
 from app.gradation import Gradation
 from app.auth import login_required
+from app.http_cache import cache_by_data_version
 from sqlalchemy import text
 from datetime import datetime
 from app.models_total import CprgMstModel, CttlMstModel
@@ -52,13 +54,13 @@ def stock_matrix_cttl():
         # 検索条件を取得
         cttl_id = request.args.get('cttl_id', '').strip()
         searched = request.args.get('searched', '').strip()
-        log_error(f"検索条件 - cttl_id: '{cttl_id}', searched: '{searched}'")
+        log_debug(f"検索条件 - cttl_id: '{cttl_id}', searched: '{searched}'")
         
         # 在庫集計グループ一覧を取得
         cttl_groups = CttlMstModel.get_cttl_groups()
-        log_error(f"取得したグループ数: {len(cttl_groups)}")
+        log_debug(f"取得したグループ数: {len(cttl_groups)}")
         for group in cttl_groups:
-            log_error(f"グループ: {group}")
+            log_debug(f"グループ: {group}")
         
         matrix_data = {}
         cttl_details = []
@@ -528,6 +530,7 @@ def cprg_delete(cprg_id, cprg_prd_id, cprg_prc_id):
 
 @total_bp.route('/api/cprg/process_choices/<prd_id>', methods=['GET'])
 @login_required
+@cache_by_data_version('CPRC_MST')
 def api_cprg_process_choices(prd_id):
     """製品IDに紐づく加工IDの選択肢を取得するAPI"""
     try:
@@ -1,6 +1,6 @@
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
-from app.database import get_db_session
+from app.database import get_db_session, in_clause_params, insert_rows
 from app.models import BrcpDat, PrdDat, log_error
 from app.constants import DatabaseConstants
 import traceback
@@ -360,7 +360,15 @@ class Shipment:
     
     @staticmethod
     def save(stock_id, shipments, proc_type = DatabaseConstants.PROC_NON_COAT):
-        """出荷データを保存する"""
+        """出荷データを保存する
+        
+        出荷先ごとの受注残を1回の検索でまとめて取得し、受注の古い順に出荷数を
+        メモリ上で割り当ててから、出荷データの登録と受注・在庫のフラグ更新を
+        まとめて実行する（同じ出荷先の行が複数ある場合も受注残を引き継いで割り当てる）。
+        
+        Returns:
+            dict: success と、割り当て結果の allocations（出荷先・受注ID・数量・受注完了）
+        """
         session = get_db_session()
         try:
             # 在庫情報を取得
@@ -383,121 +391,73 @@ class Shipment:
                 return {'success': False, 'error': '出荷数量が在庫数量を超えています。'}
                 
             try:
-                # 出荷データを登録
+                # 1. 受注に割り当てる出荷先の受注残をまとめて取得
+                direct_to = (str(DatabaseConstants.SHIPMENT_TO_PROCESS), str(DatabaseConstants.ORDER_CMP_MISSING))
+                ship_to_list = sorted({str(shipment['ship_to']) for shipment in shipments
+                                       if str(shipment['ship_to']) not in direct_to})
+                orders_by_ship_to = Shipment._get_open_orders(
+                    session, ship_to_list, stock.BPDD_PRD_ID, proc_type)
+                
+                # 2. 受注の古い順に出荷数を割り当て（受注残はメモリ上で減算）
+                ship_rows = []
+                allocations = []
+                closed_order_ids = []
                 for shipment in shipments:
                     remaining_qty = int(shipment['quantity'])
-                    process = DatabaseConstants.FLG_ACTIVE
-                    ship_to = shipment['ship_to']
+                    ship_to = str(shipment['ship_to'])
                     ship_date = shipment['ship_date']
                     order_date = shipment['order_date']  # 手配日を取得
                     
-                    # 出荷先が加工の場合は出荷データを登録
-                    if ship_to == str(DatabaseConstants.SHIPMENT_TO_PROCESS) or ship_to == str(DatabaseConstants.ORDER_CMP_MISSING) or ship_to == str(DatabaseConstants.SHIPMENT_TO_PROCESS):
-                        # 出荷データを登録
-                        ship_sql = text("""
-                            INSERT INTO BSHK_DAT (
-                                BSHK_TO,
-                                BSHK_PDD_ID,
-                                BSHK_RCP_ID,
-                                BSHK_DT,
-                                BSHK_QTY,
-                                BSHK_FLG,
-                                BSHK_ORD_DT    
-                            ) VALUES (
-                                :ship_to,
-                                :pdd_id,
-                                :rcp_id,
-                                :ship_date,
-                                :qty,
-                                :bshk_flg_initial,
-                                :order_date
-                            )
-                        """)
-                        
-                        session.execute(ship_sql, {
-                            'ship_to': ship_to,
-                            'pdd_id': stock.BPDD_ID,
-                            'rcp_id': 0,
-                            'ship_date': ship_date,
-                            'qty': remaining_qty,
-                            'bshk_flg_initial': DatabaseConstants.BSHK_FLG_NOT_SHIPPED,
-                            'order_date': order_date
-                        })
-                    # 出荷先が1:加工以外の場合は受注データを取得
+                    # 出荷先が加工・欠損の場合は受注に割り当てずに登録
+                    if ship_to in direct_to:
+                        targets = [(0, remaining_qty, False)]
+                        remaining_qty = 0
                     else:
-                        # 対象の受注データを古い順に取得
-                        orders = session.execute(text("""
-                            SELECT 
-                                BRCP_ID,
-                                ISNULL(dbo.Get_ODR_ZAN_Qty_BF(BRCP_ID), 0) as remaining_qty
-                            FROM BRCP_DAT
-                            WHERE BRCP_ORDER_CMP = :ship_to
-                                AND BRCP_PRD_ID = :prd_id
-                                AND BRCP_PROC = :proc_type
-                                AND BRCP_FLG = :brcp_flg_not_shipped
-                                AND ISNULL(dbo.Get_ODR_ZAN_Qty_BF(BRCP_ID), 0) > 0
-                            ORDER BY BRCP_DT
-                        """), {
-                            'ship_to': ship_to,
-                            'prd_id': stock.BPDD_PRD_ID,
-                            'proc_type': proc_type,
-                            'brcp_flg_not_shipped': DatabaseConstants.BRCP_FLG_NOT_SHIPPED
-                        }).fetchall()
-                        
-                        # 受注データに対して出荷数を割り当て
-                        for order in orders:
+                        targets = []
+                        for order in orders_by_ship_to.get(ship_to, []):
                             if remaining_qty <= 0:
                                 break
-                                
-                            ship_qty = min(remaining_qty, order.remaining_qty)
-                            
-                            # 出荷データを登録
-                            ship_sql = text("""
-                                INSERT INTO BSHK_DAT (
-                                    BSHK_TO,
-                                    BSHK_PDD_ID,
-                                    BSHK_RCP_ID,
-                                    BSHK_DT,
-                                    BSHK_QTY,
-                                    BSHK_FLG,
-                                    BSHK_ORD_DT    
-                                ) VALUES (
-                                    :ship_to,
-                                    :pdd_id,
-                                    :rcp_id,
-                                    :ship_date,
-                                    :qty,
-                                    :bshk_flg_initial,
-                                    :order_date
-                                )
-                            """)
-                            
-                            session.execute(ship_sql, {
-                                'ship_to': ship_to,
-                                'pdd_id': stock.BPDD_ID,
-                                'rcp_id': order.BRCP_ID,
-                                'ship_date': ship_date,
-                                'qty': ship_qty,
-                                'bshk_flg_initial': DatabaseConstants.BSHK_FLG_NOT_SHIPPED,
-                                'order_date': order_date
-                            })
-                            
-                            # 出荷残が0以上の場合は受注のフラグを1にする
-                            if remaining_qty >= order.remaining_qty:
-                                BrcpDat.set_flg(order.BRCP_ID, DatabaseConstants.BRCP_FLG_SHIPPED)
-                                
-                            # 出荷残を減算
+                            if order['remaining_qty'] <= 0:
+                                continue
+                            ship_qty = min(remaining_qty, order['remaining_qty'])
+                            order['remaining_qty'] -= ship_qty
                             remaining_qty -= ship_qty
-                                
-                        if remaining_qty > 0:
-                            raise ValueError('受注残より出荷数量が多いです。')
+                            # 受注残がなくなった受注は出荷済にする
+                            closed = order['remaining_qty'] == 0
+                            if closed:
+                                closed_order_ids.append(order['BRCP_ID'])
+                            targets.append((order['BRCP_ID'], ship_qty, closed))
+                        
+                    if remaining_qty > 0:
+                        raise ValueError('受注残より出荷数量が多いです。')
+                    
+                    for rcp_id, ship_qty, closed in targets:
+                        ship_rows.append({
+                            'BSHK_TO': int(ship_to),
+                            'BSHK_PDD_ID': stock.BPDD_ID,
+                            'BSHK_RCP_ID': rcp_id,
+                            'BSHK_DT': ship_date,
+                            'BSHK_QTY': ship_qty,
+                            'BSHK_FLG': DatabaseConstants.BSHK_FLG_NOT_SHIPPED,
+                            'BSHK_ORD_DT': order_date
+                        })
+                        allocations.append({
+                            'ship_to': ship_to,
+                            'rcp_id': rcp_id,
+                            'quantity': ship_qty,
+                            'order_closed': closed
+                        })
+                
+                # 3. 出荷データの登録・フラグ更新をまとめて実行
+                insert_rows(session, 'BSHK_DAT', ship_rows)
+                Shipment._set_orders_shipped(session, closed_order_ids)
                         
                 # 出荷数量が在庫数量と同じ場合は在庫のフラグを1にする
                 if total_qty == stock.stock_qty:
-                    PrdDat.set_flg(stock.BPDD_ID, DatabaseConstants.BPDD_FLG_SHIPPED)
+                    PrdDat.set_flg(stock.BPDD_ID, DatabaseConstants.BPDD_FLG_SHIPPED, session)
                 
                 session.commit()
-                return {'success': True}
+                return {'success': True, 'allocations': allocations}
                 
             except Exception as e:
                 session.rollback()
@@ -507,6 +467,60 @@ class Shipment:
             return {'success': False, 'error': str(e)}
         finally:
             session.close()
+    
+    @staticmethod
+    def _get_open_orders(session, ship_to_list, prd_id, proc_type):
+        """出荷先ごとの受注残（受注日の古い順）を取得する
+        
+        Returns:
+            dict: 出荷先（文字列）→ [{'BRCP_ID', 'remaining_qty'}, ...]
+        """
+        orders_by_ship_to = {}
+        for start in range(0, len(ship_to_list), DatabaseConstants.SQL_IN_CHUNK):
+            chunk = ship_to_list[start:start + DatabaseConstants.SQL_IN_CHUNK]
+            placeholders, params = in_clause_params('ship_to', chunk)
+            params.update({
+                'prd_id': prd_id,
+                'proc_type': proc_type,
+                'brcp_flg_not_shipped': DatabaseConstants.BRCP_FLG_NOT_SHIPPED
+            })
+            # 受注残の関数は派生テーブルで1受注1回だけ評価する
+            orders = session.execute(text(f"""
+                SELECT BRCP_ID, BRCP_ORDER_CMP, remaining_qty
+                FROM (
+                    SELECT 
+                        BRCP_ID,
+                        BRCP_ORDER_CMP,
+                        BRCP_DT,
+                        ISNULL(dbo.Get_ODR_ZAN_Qty_BF(BRCP_ID), 0) as remaining_qty
+                    FROM BRCP_DAT
+                    WHERE BRCP_ORDER_CMP IN ({placeholders})
+                        AND BRCP_PRD_ID = :prd_id
+                        AND BRCP_PROC = :proc_type
+                        AND BRCP_FLG = :brcp_flg_not_shipped
+                ) AS ORD
+                WHERE remaining_qty > 0
+                ORDER BY BRCP_ORDER_CMP, BRCP_DT, BRCP_ID
+            """), params).fetchall()
+            for order in orders:
+                orders_by_ship_to.setdefault(str(int(order.BRCP_ORDER_CMP)), []).append({
+                    'BRCP_ID': order.BRCP_ID,
+                    'remaining_qty': int(order.remaining_qty)
+                })
+        return orders_by_ship_to
+    
+    @staticmethod
+    def _set_orders_shipped(session, order_ids):
+        """受注データのフラグをまとめて出荷済にする"""
+        for start in range(0, len(order_ids), DatabaseConstants.SQL_IN_CHUNK):
+            chunk = order_ids[start:start + DatabaseConstants.SQL_IN_CHUNK]
+            placeholders, params = in_clause_params('id', chunk)
+            params['flg'] = DatabaseConstants.BRCP_FLG_SHIPPED
+            session.execute(text(f"""
+                UPDATE BRCP_DAT 
+                SET BRCP_FLG = :flg 
+                WHERE BRCP_ID IN ({placeholders})
+            """), params)
             
     @staticmethod
     def get_shipment_by_prd_id(prd_id, lot):
@@ -1,7 +1,7 @@
 from decimal import Decimal
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
-from app.database import get_db_session
+from app.database import get_db_session, in_clause_params
 from app.models import BrcpDat, PrdDat, log_error
 from app.constants import DatabaseConstants, KbnConstants
 import traceback
@@ -123,51 +123,63 @@ class ShipmentCommon:
     @staticmethod
     def get_by_cpdd_id_with_details(cpdd_id):
         """指定された入庫IDの出荷データ一覧を詳細情報付きで取得する"""
+        return ShipmentCommon.get_by_cpdd_ids_with_details([cpdd_id])[int(cpdd_id)]
+    
+    @staticmethod
+    def get_by_cpdd_ids_with_details(cpdd_ids):
+        """複数の入庫IDの出荷データ一覧を詳細情報付きでまとめて取得する
+        
+        Args:
+            cpdd_ids (list): 入庫IDのリスト
+        
+        Returns:
+            dict: 入庫ID → 出荷データのリスト（出荷ID降順、データがない入庫IDは空リスト）
+        """
+        shipment_map = {int(cpdd_id): [] for cpdd_id in cpdd_ids}
+        id_list = sorted(shipment_map)
         session = get_db_session()
         try:
-            sql = text("""
-                SELECT 
-                    c.CSHK_ID,
-                    c.CSHK_KBN,
-                    c.CSHK_TO,
-                    c.CSHK_PRC_ID,
-                    c.CSHK_PRD_ID,
-                    c.CSHK_DT,
-                    c.CSHK_ORD_DT,
-                    c.CSHK_PDD_ID,
-                    c.CSHK_RCP_ID,
-                    c.CSHK_QTY,
-                    c.CSHK_FLG,
-                    z.CZTR_NM,
-                    p.CPRC_NM
-                FROM CSHK_DAT c
-                LEFT JOIN CZTR_MST z ON c.CSHK_TO = z.CZTR_ID
-                LEFT JOIN CPRC_MST p ON c.CSHK_PRC_ID = p.CPRC_ID
-                WHERE c.CSHK_PDD_ID = :cpdd_id
-                ORDER BY c.CSHK_ID DESC
-            """)
-            
-            results = session.execute(sql, {'cpdd_id': cpdd_id}).fetchall()
-            
-            result = []
-            for r in results:
-                cshk = {
-                    'CSHK_ID': r.CSHK_ID,
-                    'CSHK_KBN': r.CSHK_KBN,
-                    'CSHK_TO': r.CSHK_TO,
-                    'CSHK_PRC_ID': r.CSHK_PRC_ID,
-                    'CSHK_PRD_ID': r.CSHK_PRD_ID,
-                    'CSHK_DT': r.CSHK_DT.strftime('%Y-%m-%d') if r.CSHK_DT else '',
-                    'CSHK_ORD_DT': r.CSHK_ORD_DT.strftime('%Y-%m-%d') if r.CSHK_ORD_DT else '',
-                    'CSHK_PDD_ID': r.CSHK_PDD_ID,
-                    'CSHK_RCP_ID': r.CSHK_RCP_ID,
-                    'CSHK_QTY': r.CSHK_QTY,
-                    'CSHK_FLG': r.CSHK_FLG,
-                    'CZTR_NM': r.CZTR_NM,
-                    'CPRC_NM': r.CPRC_NM
-                }
-                result.append(cshk)
-            return result
+            for start in range(0, len(id_list), DatabaseConstants.SQL_IN_CHUNK):
+                placeholders, params = in_clause_params('id', id_list[start:start + DatabaseConstants.SQL_IN_CHUNK])
+                results = session.execute(text(f"""
+                    SELECT 
+                        c.CSHK_ID,
+                        c.CSHK_KBN,
+                        c.CSHK_TO,
+                        c.CSHK_PRC_ID,
+                        c.CSHK_PRD_ID,
+                        c.CSHK_DT,
+                        c.CSHK_ORD_DT,
+                        c.CSHK_PDD_ID,
+                        c.CSHK_RCP_ID,
+                        c.CSHK_QTY,
+                        c.CSHK_FLG,
+                        z.CZTR_NM,
+                        p.CPRC_NM
+                    FROM CSHK_DAT c
+                    LEFT JOIN CZTR_MST z ON c.CSHK_TO = z.CZTR_ID
+                    LEFT JOIN CPRC_MST p ON c.CSHK_PRC_ID = p.CPRC_ID
+                    WHERE c.CSHK_PDD_ID IN ({placeholders})
+                    ORDER BY c.CSHK_PDD_ID, c.CSHK_ID DESC
+                """), params).fetchall()
+                
+                for r in results:
+                    shipment_map[int(r.CSHK_PDD_ID)].append({
+                        'CSHK_ID': r.CSHK_ID,
+                        'CSHK_KBN': r.CSHK_KBN,
+                        'CSHK_TO': r.CSHK_TO,
+                        'CSHK_PRC_ID': r.CSHK_PRC_ID,
+                        'CSHK_PRD_ID': r.CSHK_PRD_ID,
+                        'CSHK_DT': r.CSHK_DT.strftime('%Y-%m-%d') if r.CSHK_DT else '',
+                        'CSHK_ORD_DT': r.CSHK_ORD_DT.strftime('%Y-%m-%d') if r.CSHK_ORD_DT else '',
+                        'CSHK_PDD_ID': r.CSHK_PDD_ID,
+                        'CSHK_RCP_ID': r.CSHK_RCP_ID,
+                        'CSHK_QTY': r.CSHK_QTY,
+                        'CSHK_FLG': r.CSHK_FLG,
+                        'CZTR_NM': r.CZTR_NM,
+                        'CPRC_NM': r.CPRC_NM
+                    })
+            return shipment_map
             
         except Exception as e:
             log_error(f"出荷データ詳細一覧の取得中にエラーが発生: {str(e)}")
@@ -365,12 +377,72 @@ class ShipmentCommon:
         finally:
             session.close()
     
+    # 戻り残数（Get_CSHK_PRC_ZAN_Qty と同じ計算を、集計済みの戻り数から求める）
+    PROCESS_REQUEST_ZAN_QTY = "(c.CSHK_QTY - ISNULL(prc.PRC_QTY, 0))"
+
+    @staticmethod
+    def _build_process_request_query(date_from=None, date_to=None, prd_id=None, prc_id=None, cztr_id=None, return_status=None):
+        """加工依頼一覧のFROM句・WHERE句とパラメータを作成する
+
+        戻り数は CPRC_DAT を出荷IDごとに1回だけ集計して結合する（行ごとのスカラー関数呼び出しをしない）
+        """
+        zan_qty = ShipmentCommon.PROCESS_REQUEST_ZAN_QTY
+        sql = """
+                FROM CSHK_DAT c
+                LEFT JOIN (
+                    SELECT CPCD_SHK_ID, SUM(CPCD_QTY) AS PRC_QTY
+                    FROM CPRC_DAT
+                    GROUP BY CPCD_SHK_ID
+                ) prc ON prc.CPCD_SHK_ID = c.CSHK_ID
+                LEFT JOIN CPRD_DAT cprd ON c.CSHK_PDD_ID = cprd.CPDD_ID
+                LEFT JOIN CPRC_MST cm ON c.CSHK_PRC_ID = cm.CPRC_ID
+                LEFT JOIN CZTR_MST cztr ON cm.CPRC_TO = cztr.CZTR_ID
+                WHERE c.CSHK_KBN = :cshk_kbn
+            """
+
+        params = {
+            'cshk_kbn': DatabaseConstants.CSHK_KBN_PROCESS
+        }
+
+        # 検索条件を追加
+        if date_from:
+            sql += " AND c.CSHK_DT >= :date_from"
+            params['date_from'] = date_from
+        if date_to:
+            sql += " AND c.CSHK_DT <= :date_to"
+            params['date_to'] = date_to
+        if prd_id:
+            sql += " AND cprd.CPDD_PRD_ID LIKE :prd_id"
+            params['prd_id'] = f'%{prd_id}%'
+        if prc_id:
+            sql += " AND c.CSHK_PRC_ID = :prc_id"
+            params['prc_id'] = prc_id
+        if cztr_id:
+            sql += " AND cztr.CZTR_ID = :cztr_id"
+            params['cztr_id'] = cztr_id
+
+        # 戻り残数の検索条件を追加
+        if return_status is not None:
+            if return_status == 1:  # 戻り残数あり
+                sql += f" AND {zan_qty} > 0"
+            elif return_status == 0:  # 戻り残数なし
+                sql += f" AND ({zan_qty} = 0 OR {zan_qty} IS NULL)"
+
+        return sql, params
+
     @staticmethod
-    def get_process_request_list(date_from=None, date_to=None, prd_id=None, prc_id=None, cztr_id=None, return_status=None):
-        """加工依頼一覧を取得する（CSHK_KBN=1のデータ）- 画面表示用（CSHK_ID含む）"""
+    def get_process_request_list(date_from=None, date_to=None, prd_id=None, prc_id=None, cztr_id=None, return_status=None,
+                                 limit=None, after_dt=None, after_id=None):
+        """加工依頼一覧を取得する（CSHK_KBN=1のデータ）- 画面表示用（CSHK_ID含む）
+
+        加工依頼日・出荷IDの降順で返す。limit を指定した場合はその件数まで取得し、
+        after_id（と after_dt）を指定した場合はその行より後ろから取得する（キーセット方式のページング）。
+        """
         session = get_db_session()
         try:
-            sql = """
+            from_where, params = ShipmentCommon._build_process_request_query(
+                date_from, date_to, prd_id, prc_id, cztr_id, return_status)
+            sql = f"""
                 SELECT 
                     c.CSHK_ID,
                     c.CSHK_KBN,
@@ -388,44 +460,26 @@ class ShipmentCommon:
                     cztr.CZTR_NM as PRC_TO_NAME,
                     cztr.CZTR_FULL_NM as PRC_TO_FULL_NM,
                     cztr.CZTR_TANTO_NM as PRC_TO_TANTO_NM,
-                    dbo.Get_CSHK_PRC_ZAN_Qty(c.CSHK_ID) as PRC_ZAN_QTY
-                FROM CSHK_DAT c
-                LEFT JOIN CPRD_DAT cprd ON c.CSHK_PDD_ID = cprd.CPDD_ID
-                LEFT JOIN CPRC_MST cm ON c.CSHK_PRC_ID = cm.CPRC_ID
-                LEFT JOIN CZTR_MST cztr ON cm.CPRC_TO = cztr.CZTR_ID
-                WHERE c.CSHK_KBN = :cshk_kbn
+                    {ShipmentCommon.PROCESS_REQUEST_ZAN_QTY} as PRC_ZAN_QTY
+                {from_where}
             """
-            
-            params = {
-                'cshk_kbn': DatabaseConstants.CSHK_KBN_PROCESS
-            }
-            
-            # 検索条件を追加
-            if date_from:
-                sql += " AND c.CSHK_DT >= :date_from"
-                params['date_from'] = date_from
-            if date_to:
-                sql += " AND c.CSHK_DT <= :date_to"
-                params['date_to'] = date_to
-            if prd_id:
-                sql += " AND cprd.CPDD_PRD_ID LIKE :prd_id"
-                params['prd_id'] = f'%{prd_id}%'
-            if prc_id:
-                sql += " AND c.CSHK_PRC_ID = :prc_id"
-                params['prc_id'] = prc_id
-            if cztr_id:
-                sql += " AND cztr.CZTR_ID = :cztr_id"
-                params['cztr_id'] = cztr_id
-            
-            # 戻り残数の検索条件を追加
-            if return_status is not None:
-                if return_status == 1:  # 戻り残数あり
-                    sql += " AND dbo.Get_CSHK_PRC_ZAN_Qty(c.CSHK_ID) > 0"
-                elif return_status == 0:  # 戻り残数なし
-                    sql += " AND (dbo.Get_CSHK_PRC_ZAN_Qty(c.CSHK_ID) = 0 OR dbo.Get_CSHK_PRC_ZAN_Qty(c.CSHK_ID) IS NULL)"
-            
+
+            # 前ページの最終行より後ろの行（降順のため、加工依頼日がNULLの行は最後に並ぶ）
+            if after_id is not None:
+                if after_dt is not None:
+                    sql += """ AND (c.CSHK_DT < :after_dt
+                                    OR (c.CSHK_DT = :after_dt AND c.CSHK_ID < :after_id)
+                                    OR c.CSHK_DT IS NULL)"""
+                    params['after_dt'] = after_dt
+                else:
+                    sql += " AND c.CSHK_DT IS NULL AND c.CSHK_ID < :after_id"
+                params['after_id'] = after_id
+
             # 並び順を設定
             sql += " ORDER BY c.CSHK_DT DESC, c.CSHK_ID DESC"
+            if limit:
+                sql += " OFFSET 0 ROWS FETCH NEXT :limit ROWS ONLY"
+                params['limit'] = int(limit)
             
             results = session.execute(text(sql), params).fetchall()
             
@@ -435,6 +489,8 @@ class ShipmentCommon:
                     'CSHK_ID': r.CSHK_ID,
                     'CSHK_PRD_ID': r.CSHK_PRD_ID,
                     'CSHK_DT': r.CSHK_DT.strftime('%Y-%m-%d') if r.CSHK_DT else '',
+                    # 次ページ取得用のキー（時刻を含めて保持）
+                    'CSHK_DT_KEY': r.CSHK_DT.strftime('%Y-%m-%d %H:%M:%S.%f') if r.CSHK_DT else '',
                     'CSHK_QTY': r.CSHK_QTY,
                     'CSHK_FLG': r.CSHK_FLG,
                     'CPDD_LOT': r.CPDD_LOT,
@@ -457,11 +513,16 @@ class ShipmentCommon:
             session.close()
 
     @staticmethod
-    def get_process_request_list_for_pdf(date_from=None, date_to=None, prd_id=None, prc_id=None, cztr_id=None, return_status=None):
-        """加工依頼一覧を取得する（CSHK_KBN=1のデータ）- PDF出力用（GROUP BY使用）"""
+    def iter_process_request_list_for_pdf(date_from=None, date_to=None, prd_id=None, prc_id=None, cztr_id=None, return_status=None):
+        """加工依頼一覧を1行ずつ返す（CSHK_KBN=1のデータ）- PDF出力用（GROUP BY使用）
+
+        結果を一括で読み込まず、DatabaseConstants.SQL_STREAM_ROWS 行ずつ読み込みながら返す
+        """
         session = get_db_session()
         try:
-            sql = """
+            from_where, params = ShipmentCommon._build_process_request_query(
+                date_from, date_to, prd_id, prc_id, cztr_id, return_status)
+            sql = f"""
                 SELECT 
                     c.CSHK_KBN,
                     c.CSHK_TO,
@@ -475,56 +536,25 @@ class ShipmentCommon:
                     MIN(cprd.CPDD_PRD_ID) as CPDD_PRD_ID,
                     MIN(cm.CPRC_NM) as CPRC_NM,
                     MIN(cm.CPRC_PRD_NM) as CPRC_PRD_NM,
+                    MIN(cztr.CZTR_ID) as CZTR_ID,
                     MIN(cztr.CZTR_NM) as PRC_TO_NAME,
                     MIN(cztr.CZTR_FULL_NM) as PRC_TO_FULL_NM,
                     MIN(cztr.CZTR_TANTO_NM) as PRC_TO_TANTO_NM,
-                    SUM(dbo.Get_CSHK_PRC_ZAN_Qty(c.CSHK_ID)) as PRC_ZAN_QTY
-                FROM CSHK_DAT c
-                LEFT JOIN CPRD_DAT cprd ON c.CSHK_PDD_ID = cprd.CPDD_ID
-                LEFT JOIN CPRC_MST cm ON c.CSHK_PRC_ID = cm.CPRC_ID
-                LEFT JOIN CZTR_MST cztr ON cm.CPRC_TO = cztr.CZTR_ID
-                WHERE c.CSHK_KBN = :cshk_kbn
+                    SUM({ShipmentCommon.PROCESS_REQUEST_ZAN_QTY}) as PRC_ZAN_QTY
+                {from_where}
             """
             
-            params = {
-                'cshk_kbn': DatabaseConstants.CSHK_KBN_PROCESS
-            }
-            
-            # 検索条件を追加
-            if date_from:
-                sql += " AND c.CSHK_DT >= :date_from"
-                params['date_from'] = date_from
-            if date_to:
-                sql += " AND c.CSHK_DT <= :date_to"
-                params['date_to'] = date_to
-            if prd_id:
-                sql += " AND cprd.CPDD_PRD_ID LIKE :prd_id"
-                params['prd_id'] = f'%{prd_id}%'
-            if prc_id:
-                sql += " AND c.CSHK_PRC_ID = :prc_id"
-                params['prc_id'] = prc_id
-            if cztr_id:
-                sql += " AND cztr.CZTR_ID = :cztr_id"
-                params['cztr_id'] = cztr_id
-            
-            # 戻り残数の検索条件を追加
-            if return_status is not None:
-                if return_status == 1:  # 戻り残数あり
-                    sql += " AND dbo.Get_CSHK_PRC_ZAN_Qty(c.CSHK_ID) > 0"
-                elif return_status == 0:  # 戻り残数なし
-                    sql += " AND (dbo.Get_CSHK_PRC_ZAN_Qty(c.CSHK_ID) = 0 OR dbo.Get_CSHK_PRC_ZAN_Qty(c.CSHK_ID) IS NULL)"
-            
             # GROUP BYを検索条件の後に配置
             sql += " GROUP BY c.CSHK_KBN, c.CSHK_TO, c.CSHK_PRC_ID, c.CSHK_PRD_ID, c.CSHK_DT, c.CSHK_ORD_DT, cprd.CPDD_LOT"
             
             # 並び順を設定
             sql += " ORDER BY c.CSHK_DT DESC, c.CSHK_PRD_ID"
             
-            results = session.execute(text(sql), params).fetchall()
+            results = session.execute(
+                text(sql).execution_options(yield_per=DatabaseConstants.SQL_STREAM_ROWS), params)
             
-            result = []
             for r in results:
-                process_request = {
+                yield {
                     'CSHK_PRD_ID': r.CSHK_PRD_ID,
                     'CSHK_DT': r.CSHK_DT.strftime('%Y-%m-%d') if r.CSHK_DT else '',
                     'CSHK_QTY': r.CSHK_QTY,
@@ -534,13 +564,12 @@ class ShipmentCommon:
                     'CPRC_NM': r.CPRC_NM,
                     'CPRC_PRD_NM': r.CPRC_PRD_NM,
                     'PRC_NAME': r.CPRC_NM,  # 画面で使用されている項目名
+                    'CZTR_ID': r.CZTR_ID,
                     'PRC_TO_NAME': r.PRC_TO_NAME,
                     'PRC_TO_FULL_NM': r.PRC_TO_FULL_NM,
                     'PRC_TO_TANTO_NM': r.PRC_TO_TANTO_NM,
                     'PRC_ZAN_QTY': r.PRC_ZAN_QTY or 0
                 }
-                result.append(process_request)
-            return result
             
         except Exception as e:
             log_error(f"加工依頼一覧の取得中にエラーが発生: {str(e)}")
@@ -548,6 +577,12 @@ class ShipmentCommon:
         finally:
             session.close()
 
+    @staticmethod
+    def get_process_request_list_for_pdf(date_from=None, date_to=None, prd_id=None, prc_id=None, cztr_id=None, return_status=None):
+        """加工依頼一覧を取得する（CSHK_KBN=1のデータ）- PDF出力用（GROUP BY使用）"""
+        return list(ShipmentCommon.iter_process_request_list_for_pdf(
+            date_from, date_to, prd_id, prc_id, cztr_id, return_status))
+
     @staticmethod
     def get_by_cshk_id_with_details(cshk_id):
         """指定された出荷IDの出荷データを詳細情報付きで取得する"""
@@ -678,8 +713,8 @@ class ShipmentCommon:
             session.close()
     
     @staticmethod
-    def get_shipment_list(date_from=None, date_to=None, ord_date_from=None, ord_date_to=None, cshk_to=None):
-        """出荷一覧を取得する（CSHK_KBN=0のデータ）"""
+    def iter_shipment_list(date_from=None, date_to=None, ord_date_from=None, ord_date_to=None, cshk_to=None):
+        """出荷一覧を1行ずつ返す（CSHK_KBN=0のデータ、DatabaseConstants.SQL_STREAM_ROWS 行ずつ読み込む）"""
         session = get_db_session()
         try:
             sql = """
@@ -738,9 +773,9 @@ class ShipmentCommon:
             # 並び順を設定
             sql += " ORDER BY c.CSHK_DT DESC, c.CSHK_ID DESC"
             
-            results = session.execute(text(sql), params).fetchall()
+            results = session.execute(
+                text(sql).execution_options(yield_per=DatabaseConstants.SQL_STREAM_ROWS), params)
             
-            result = []
             for r in results:
                 shipment = {
                     'CSHK_ID': r.CSHK_ID,
@@ -763,8 +798,7 @@ class ShipmentCommon:
                     'RANK_NAME': r.RANK_NAME,
                     'SHIPMENT_TO_NAME': r.SHIPMENT_TO_NAME
                 }
-                result.append(shipment)
-            return result
+                yield shipment
             
         except Exception as e:
             log_error(f"出荷一覧の取得中にエラーが発生: {str(e)}")
@@ -772,3 +806,8 @@ class ShipmentCommon:
         finally:
             session.close()
 
+    @staticmethod
+    def get_shipment_list(date_from=None, date_to=None, ord_date_from=None, ord_date_to=None, cshk_to=None):
+        """出荷一覧を取得する（CSHK_KBN=0のデータ）"""
+        return list(ShipmentCommon.iter_shipment_list(date_from, date_to, ord_date_from, ord_date_to, cshk_to))
+
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite によるローカル代替データベース
+
+SQL Server なしでモデルのメソッドを実行・計測するための代替環境。
+環境変数 DB_ENGINE=sqlite のとき app/database.py から利用される。
+
+- スキーマは sql/CREATE_*.sql・sql/IX_*.sql の定義から作成する
+- sql/Get_*.sql のスカラー関数は同じ計算をPython関数としてSQLiteに登録する
+- クエリ中の T-SQL 固有の構文（dbo.、ISNULL、FORMAT、CONVERT、
+  CAST(... AS DATE)、IDENT_CURRENT、SCOPE_IDENTITY、N'...'、
+  OFFSET ... FETCH NEXT ...）は
+  実行直前にSQLiteで解釈できる形へ置き換える
+
+置き換えは本アプリで使用している書き方のみを対象とした簡易的なもので、
+T-SQL全般を変換するものではない。
+"""
+import glob
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+
+from app.logger_utils import log_info
+
+SQL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'sql'))
+# ロック解除を待つ秒数（負荷再現の同時実行で database is locked にしない）
+SQLITE_BUSY_TIMEOUT = 30
+
+# sql/Get_*.sql のスカラー関数と同じ計算（対象行がない場合はNULLを返す）
+UDF_DEFINITIONS = {
+    'Get_Zaiko_Qty_BF': """
+        SELECT BPDD_QTY - (SELECT IFNULL(SUM(BSHK_QTY), 0) FROM BSHK_DAT WHERE BSHK_PDD_ID = :id)
+        FROM BPRD_DAT WHERE BPDD_ID = :id
+    """,
+    'Get_ODR_ZAN_Qty_BF': """
+        SELECT BRCP_QTY - (SELECT IFNULL(SUM(BSHK_QTY), 0) FROM BSHK_DAT WHERE BSHK_RCP_ID = :id)
+        FROM BRCP_DAT WHERE BRCP_ID = :id
+    """,
+    'Get_CPRD_ZAN_Qty': """
+        SELECT CPDD_QTY - (SELECT IFNULL(SUM(CSHK_QTY), 0) FROM CSHK_DAT WHERE CSHK_PDD_ID = :id)
+        FROM CPRD_DAT WHERE CPDD_ID = :id
+    """,
+    'Get_CSHK_PRC_ZAN_Qty': """
+        SELECT CSHK_QTY - (SELECT IFNULL(SUM(CPCD_QTY), 0) FROM CPRC_DAT WHERE CPCD_SHK_ID = :id)
+        FROM CSHK_DAT WHERE CSHK_ID = :id
+    """,
+    'Get_GRD_PRC_ZAN_Qty': """
+        SELECT GPRR_QTY - (SELECT IFNULL(SUM(GPRC_QTY), 0) FROM GPRC_DAT
+                           WHERE GPRC_REQ_ID = :id AND GPRC_REQ_TO = 1)
+        FROM GPRR_DAT WHERE GPRR_ID = :id
+    """,
+    'Get_GRD_SHK_ZAN_Qty': """
+        SELECT IFNULL(GPRC_PASS_QTY, 0) - (SELECT IFNULL(SUM(GSHK_QTY), 0) FROM GSHK_DAT WHERE GSHK_STC_ID = :id)
+        FROM GPRC_DAT WHERE GPRC_ID = :id
+    """,
+    'Get_GSHK_GPRC_Diff': """
+        SELECT GSHK_QTY - (SELECT IFNULL(SUM(GPRC_QTY), 0) FROM GPRC_DAT WHERE GPRC_SHK_ID = :id)
+        FROM GSHK_DAT WHERE GSHK_ID = :id
+    """,
+}
+
+# FORMAT() の書式指定（.NET形式）と strftime の対応
+_DOTNET_FORMAT_TOKENS = [
+    ('yyyy', '%Y'), ('yy', '%y'), ('MM', '%m'), ('dd', '%d'),
+    ('HH', '%H'), ('mm', '%M'), ('ss', '%S'),
+]
+_DOTNET_FORMAT_PATTERN = re.compile('|'.join(token for token, _ in _DOTNET_FORMAT_TOKENS))
+
+# 実行時のT-SQL置き換え規則（上から順に適用）
+_SIMPLE_EXPR = r"[\w.:]+"
+_TSQL_REWRITES = [
+    (re.compile(r"\bdbo\.", re.IGNORECASE), ''),
+    (re.compile(r"\bISNULL\s*\(", re.IGNORECASE), 'IFNULL('),
+    (re.compile(r"\bFORMAT\s*\(", re.IGNORECASE), 'TSQL_FORMAT('),
+    (re.compile(r"\bSCOPE_IDENTITY\s*\(\s*\)", re.IGNORECASE), 'last_insert_rowid()'),
+    (re.compile(r"\bIDENT_CURRENT\s*\(\s*'(\w+)'\s*\)", re.IGNORECASE),
+     r"COALESCE((SELECT seq FROM sqlite_sequence WHERE name = '\1'), 1)"),
+    (re.compile(rf"\bCONVERT\s*\(\s*date\s*,\s*({_SIMPLE_EXPR})\s*\)", re.IGNORECASE), r'date(\1)'),
+    (re.compile(rf"\bCONVERT\s*\(\s*N?VARCHAR\s*\(\s*(\d+)\s*\)\s*,\s*({_SIMPLE_EXPR})\s*(?:,\s*\d+\s*)?\)", re.IGNORECASE),
+     r'substr(CAST(\2 AS TEXT), 1, \1)'),
+    (re.compile(rf"\bCAST\s*\(\s*({_SIMPLE_EXPR})\s+AS\s+DATE\s*\)", re.IGNORECASE), r'date(\1)'),
+    (re.compile(r"(?<![\w'])N'"), "'"),
+    # 件数はバインド変数（?）のこともあるため、順序が変わらない LIMIT 開始位置, 件数 の形にする
+    (re.compile(r"\bOFFSET\s+([\w?]+)\s+ROWS\s+FETCH\s+NEXT\s+([\w?]+)\s+ROWS\s+ONLY", re.IGNORECASE),
+     r'LIMIT \1, \2'),
+]
+
+
+@lru_cache(maxsize=1024)
+def translate_tsql(statement):
+    """T-SQL固有の構文をSQLiteで実行できる形に置き換える"""
+    for pattern, replacement in _TSQL_REWRITES:
+        statement = pattern.sub(replacement, statement)
+    return statement
+
+
+def _tsql_format(value, fmt):
+    """FORMAT(日付, 書式) の代替（.NET形式の日付書式のみ対応）"""
+    if value is None or fmt is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    if not isinstance(value, (date, datetime)):
+        return str(value)
+    strftime_format = _DOTNET_FORMAT_PATTERN.sub(
+        lambda m: dict(_DOTNET_FORMAT_TOKENS)[m.group(0)], fmt
+    )
+    return value.strftime(strftime_format)
+
+
+def _convert_datetime(raw):
+    """datetime2 列の値を datetime に戻す"""
+    text_value = raw.decode('utf-8')
+    try:
+        return datetime.fromisoformat(text_value)
+    except ValueError:
+        return text_value
+
+
+def _adapt_decimal(value):
+    """Decimal をSQLiteに保存できる数値に変換する"""
+    return int(value) if value == value.to_integral_value() else float(value)
+
+
+sqlite3.register_adapter(Decimal, _adapt_decimal)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('datetime2', _convert_datetime)
+
+
+def _register_functions(dbapi_connection):
+    """スカラー関数とT-SQL関数の代替をSQLite接続に登録する"""
+    def make_udf(sql):
+        def udf(key):
+            if key is None:
+                return None
+            row = dbapi_connection.execute(sql, {'id': key}).fetchone()
+            return row[0] if row else None
+        return udf
+
+    for name, sql in UDF_DEFINITIONS.items():
+        dbapi_connection.create_function(name, 1, make_udf(sql), deterministic=False)
+    dbapi_connection.create_function('TSQL_FORMAT', 2, _tsql_format, deterministic=True)
+
+
+def translate_ddl(script):
+    """sql/ 配下のDDLをSQLite用に変換し、文のリストを返す
+
+    - identity(1,1) の列は INTEGER PRIMARY KEY AUTOINCREMENT にする
+    - ALTER TABLE は CREATE TABLE に反映済みの列追加・削除のため実行しない
+    - CREATE は IF NOT EXISTS を付け、既存のファイルDBにも再実行できるようにする
+    """
+    script = re.sub(r'/\*.*?\*/', '', script, flags=re.DOTALL)
+    script = re.sub(r'--[^\n]*', '', script)
+
+    statements = []
+    for statement in script.split(';'):
+        statement = statement.strip()
+        if not statement:
+            continue
+        lowered = statement.lower()
+        if lowered.startswith('alter table'):
+            continue
+        drop_index = re.match(r'drop\s+index\s+(\w+)\s+on\s+\w+', statement, re.IGNORECASE)
+        if drop_index:
+            statements.append(f"DROP INDEX IF EXISTS {drop_index.group(1)}")
+            continue
+        if lowered.startswith('create table'):
+            identity = re.search(
+                r'(\w+)\s+decimal\(\d+\)\s*(?:NOT NULL\s*)?identity\(\s*1\s*,\s*1\s*\)',
+                statement, re.IGNORECASE
+            )
+            if identity:
+                column = identity.group(1)
+                statement = statement.replace(identity.group(0), f"{column} INTEGER PRIMARY KEY AUTOINCREMENT")
+                statement = re.sub(rf',\s*PRIMARY KEY\s*\(\s*{column}\s*\)', '', statement, flags=re.IGNORECASE)
+            statement = re.sub(r',\s*\)\s*$', '\n)', statement)
+            statement = re.sub(r'^create\s+table', 'CREATE TABLE IF NOT EXISTS', statement, flags=re.IGNORECASE)
+        elif re.match(r'create\s+(unique\s+)?index', lowered):
+            statement = re.sub(r'^create\s+(unique\s+)?index', lambda m: f"CREATE {'UNIQUE ' if m.group(1) else ''}INDEX IF NOT EXISTS",
+                               statement, flags=re.IGNORECASE)
+        statements.append(statement)
+    return statements
+
+
+def schema_exists(dbapi_connection):
+    """テーブル作成済みのDBかどうか"""
+    row = dbapi_connection.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchone()
+    return row[0] > 0
+
+
+def create_schema(dbapi_connection, sql_dir=SQL_DIR):
+    """sql/CREATE_*.sql・sql/IX_*.sql からテーブルとインデックスを作成する
+
+    IX_*.sql は作成したインデックスを削除する文も含むため、新規のDBにのみ実行する
+    （データ投入済みのDBに再実行すると一意インデックスの作成に失敗する）。
+    """
+    paths = sorted(glob.glob(os.path.join(sql_dir, 'CREATE_*.sql'))) + \
+        sorted(glob.glob(os.path.join(sql_dir, 'IX_*.sql')))
+    for path in paths:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            for statement in translate_ddl(f.read()):
+                dbapi_connection.execute(statement)
+    dbapi_connection.commit()
+    log_info(f"SQLiteスキーマを作成しました: {len(paths)}ファイル ({sql_dir})")
+
+
+def create_sqlite_engine(path=':memory:', echo=False):
+    """SQL Server の代替となるSQLiteエンジンを作成する
+
+    Args:
+        path (str): データベースファイルのパス（':memory:' でインメモリ）
+        echo (bool): 実行SQLを出力するかどうか
+
+    Returns:
+        Engine: スキーマ作成・関数登録済みのエンジン
+    """
+    connect_args = {'detect_types': sqlite3.PARSE_DECLTYPES, 'check_same_thread': False,
+                    'timeout': SQLITE_BUSY_TIMEOUT}
+    if path == ':memory:':
+        # インメモリDBは接続ごとに別のDBになるため、1接続を全体で共有する
+        engine = create_engine('sqlite://', echo=echo, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(f"sqlite:///{path}", echo=echo, connect_args=connect_args)
+
+    schema_created = []
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        _register_functions(dbapi_connection)
+        if not schema_created:
+            if not schema_exists(dbapi_connection):
+                create_schema(dbapi_connection)
+            schema_created.append(True)
+
+    @event.listens_for(engine, 'before_cursor_execute', retval=True)
+    def on_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        return translate_tsql(statement), parameters
+
+    return engine
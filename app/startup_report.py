@@ -0,0 +1,102 @@
+import os
+import re
+import subprocess
+import sys
+
+import click
+
+from app import app
+
+# 起動時に読み込まれていないことを確認する重いライブラリ
+HEAVY_MODULES = ['pandas', 'reportlab', 'openpyxl', 'xlsxwriter']
+
+# 子プロセスで app を読み込み、読み込み済みの重いライブラリと最大RSSを出力する
+_CHILD_SCRIPT = """
+import sys
+import {module}
+heavy = [name for name in {heavy!r} if name in sys.modules]
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024
+except ImportError:
+    rss = -1
+print('HEAVY=' + ','.join(heavy))
+print('RSS_KB=' + str(rss))
+"""
+
+_IMPORTTIME_PATTERN = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure_startup(module='app'):
+    """別プロセスで python -X importtime を実行し、起動時の読み込み状況を計測する
+
+    Args:
+        module (str): 読み込むモジュール名
+
+    Returns:
+        dict: total_ms（全体の読み込み時間）, imports（モジュールごとの計測結果）,
+              heavy_modules（読み込まれた重いライブラリ）, rss_kb（最大RSS、取得不可の場合None）
+    """
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         _CHILD_SCRIPT.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=project_root,
+        capture_output=True,
+        text=True,
+        encoding='utf-8',
+        errors='replace'
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{module} の読み込みに失敗しました:\n{completed.stderr[-2000:]}")
+
+    imports = []
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_PATTERN.match(line)
+        if not match:
+            continue
+        imports.append({
+            'module': match.group(4),
+            'self_us': int(match.group(1)),
+            'cumulative_us': int(match.group(2)),
+            'depth': (len(match.group(3)) - 1) // 2
+        })
+
+    result = {
+        # トップレベル（depth=0）の累積時間の合計が全体の読み込み時間
+        'total_ms': sum(i['cumulative_us'] for i in imports if i['depth'] == 0) / 1000,
+        'imports': imports,
+        'heavy_modules': [],
+        'rss_kb': None
+    }
+    for line in completed.stdout.splitlines():
+        if line.startswith('HEAVY='):
+            result['heavy_modules'] = [m for m in line[len('HEAVY='):].split(',') if m]
+        elif line.startswith('RSS_KB='):
+            rss = int(line[len('RSS_KB='):])
+            result['rss_kb'] = rss if rss >= 0 else None
+    return result
+
+
+@app.cli.command('startup-report')
+@click.option('--top', default=20, show_default=True, help='表示するモジュール数')
+@click.option('--module', default='app', show_default=True, help='計測対象のモジュール')
+def startup_report_command(top, module):
+    """起動時のモジュール読み込み時間とメモリ使用量を表示する"""
+    result = measure_startup(module)
+
+    print(f"読み込み時間合計: {result['total_ms']:.1f} ms")
+    if result['rss_kb'] is not None:
+        print(f"最大RSS: {result['rss_kb'] / 1024:.1f} MB")
+    if result['heavy_modules']:
+        print(f"起動時に読み込まれた重いライブラリ: {', '.join(result['heavy_modules'])}")
+    else:
+        print("起動時に読み込まれた重いライブラリ: なし")
+
+    print(f"\n累積読み込み時間の上位{top}件:")
+    print(f"{'累積(ms)':>10} {'自身(ms)':>10}  モジュール")
+    ranked = sorted(result['imports'], key=lambda i: i['cumulative_us'], reverse=True)
+    for item in ranked[:top]:
+        print(f"{item['cumulative_us'] / 1000:>10.1f} {item['self_us'] / 1000:>10.1f}  {item['module']}")
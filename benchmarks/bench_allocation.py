@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""自動出荷（在庫引当）処理のベンチマーク"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app.constants import DatabaseConstants
+from app.database import get_db_session
+
+
+def _first(sql, params=None):
+    session = get_db_session()
+    try:
+        return session.execute(text(sql), params or {}).first()
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope='module')
+def hardcoat_target():
+    """ハードコート在庫が最も多い規格"""
+    row = _first("""
+        SELECT BFSP.BFSP_BASE, BFSP.BFSP_ADP, BFSP.BFSP_LR, BFSP.BFSP_CLR,
+               SUM(BPRD.BPDD_QTY) AS TOTAL_QTY
+        FROM BPRD_DAT BPRD
+        INNER JOIN BFSP_MST BFSP ON BPRD.BPDD_PRD_ID = BFSP.BFSP_PRD_ID
+        WHERE BPRD.BPDD_PROC = :proc AND BPRD.BPDD_FLG = :flg
+        GROUP BY BFSP.BFSP_BASE, BFSP.BFSP_ADP, BFSP.BFSP_LR, BFSP.BFSP_CLR
+        ORDER BY TOTAL_QTY DESC
+    """, {'proc': DatabaseConstants.PROC_HARD_COAT, 'flg': DatabaseConstants.BPDD_FLG_NOT_SHIPPED})
+    if not row:
+        pytest.skip('ハードコート在庫がありません')
+    return row
+
+
+@pytest.fixture(scope='module')
+def gradation_target():
+    """ニデック戻り在庫が最も多い規格・色"""
+    row = _first("""
+        SELECT GPRR.GPRR_SPEC, GPRR.GPRR_COLOR, SUM(GPRC.GPRC_PASS_QTY) AS TOTAL_QTY
+        FROM GPRC_DAT GPRC
+        INNER JOIN GPRR_DAT GPRR ON GPRC.GPRC_REQ_ID = GPRR.GPRR_ID
+        WHERE GPRC.GPRC_REQ_TO = :req_to AND GPRC.GPRC_STS = 1
+        GROUP BY GPRR.GPRR_SPEC, GPRR.GPRR_COLOR
+        ORDER BY TOTAL_QTY DESC
+    """, {'req_to': DatabaseConstants.GPRR_REQ_TO_NIDEC})
+    if not row:
+        pytest.skip('ニデック戻り在庫がありません')
+    return row
+
+
+def bench_auto_shipping_hardcoat(bench_run, hardcoat_target):
+    from app.shipment import Shipment
+
+    today = datetime.now().strftime('%Y-%m-%d')
+    bench_run(
+        Shipment.auto_shipping_hardcoat,
+        hardcoat_target.BFSP_BASE, hardcoat_target.BFSP_ADP, hardcoat_target.BFSP_LR, hardcoat_target.BFSP_CLR,
+        DatabaseConstants.ORDER_CMP_COLUMBUS, today, today, 5,
+        rounds=5
+    )
+
+
+def bench_execute_auto_shipping(bench_run, gradation_target):
+    from app.gradation import Gradation
+
+    today = datetime.now().strftime('%Y-%m-%d')
+    bench_run(
+        Gradation.execute_auto_shipping,
+        gradation_target.GPRR_SPEC, gradation_target.GPRR_COLOR, 5, today, today,
+        rounds=5
+    )
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""帳票出力（PDF・加工手配Excel）のベンチマーク
+
+出力対象データの検索は計測に含めず、帳票の生成処理のみを計測する。
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.constants import DatabaseConstants
+from app.database import get_db_session
+
+
+def _query(sql, params=None):
+    session = get_db_session()
+    try:
+        return session.execute(text(sql), params or {}).fetchall()
+    finally:
+        session.close()
+
+
+def _latest_date(sql):
+    """最新日付（文字列で返る場合も datetime に揃える）"""
+    value = _query(sql)[0][0]
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value
+
+
+def bench_shipment_export_pdf(bench_run):
+    from app.export_pdf import shipment_export_pdf
+    from app.shipment import Shipment
+
+    shipments = Shipment.search()
+    if not shipments:
+        pytest.skip('出荷データがありません')
+    bench_run(shipment_export_pdf, shipments, rounds=3)
+
+
+def bench_noncoat_stock_export_pdf(bench_run):
+    from app.export_pdf import noncoat_stock_export_pdf
+    from app.models import PrdDat
+
+    stocks = PrdDat.search_noncoat_stock()
+    if not stocks:
+        pytest.skip('ノンコート在庫がありません')
+    bench_run(noncoat_stock_export_pdf, stocks, rounds=3)
+
+
+def bench_hardcoat_stock_export_pdf(bench_run):
+    from app.export_pdf import hardcoat_stock_export_pdf
+    from app.models import PrdDat
+
+    stocks = PrdDat.search_hardcoat_stock()
+    if not stocks:
+        pytest.skip('ハードコート在庫がありません')
+    bench_run(hardcoat_stock_export_pdf, stocks, rounds=3)
+
+
+def bench_process_request_export_pdf(bench_run):
+    from app.export_pdf import process_request_export_pdf
+
+    # 加工依頼書は取引先単位で出力するため、加工出荷が最も多い加工会社を対象にする
+    rows = _query("""
+        SELECT CSHK_TO, COUNT(*) AS CNT FROM CSHK_DAT
+        WHERE CSHK_KBN = :kbn GROUP BY CSHK_TO ORDER BY CNT DESC
+    """, {'kbn': DatabaseConstants.CSHK_KBN_PROCESS})
+    if not rows:
+        pytest.skip('加工出荷データがありません')
+    latest = _latest_date("SELECT MAX(CSHK_DT) FROM CSHK_DAT")
+    bench_run(process_request_export_pdf, date_from=latest - timedelta(days=90), date_to=latest,
+              cztr_id=int(rows[0].CSHK_TO), rounds=3)
+
+
+def bench_shipment_list_export_pdf(bench_run):
+    from app.export_pdf import shipment_list_export_pdf
+    from app.shipment_common import ShipmentCommon
+
+    latest = _latest_date("SELECT MAX(CSHK_DT) FROM CSHK_DAT")
+    shipments = ShipmentCommon.get_shipment_list(date_from=latest - timedelta(days=30), date_to=latest)
+    if not shipments:
+        pytest.skip('出荷データがありません')
+    bench_run(shipment_list_export_pdf, shipments, rounds=3)
+
+
+def bench_write_to_proc_excel(bench_run, tmp_path):
+    from app.export_excel import write_to_proc_excel
+    from app.shipment import Shipment
+
+    # 加工宛の出荷が最も多い出荷日を対象にする
+    rows = _query("""
+        SELECT BSHK_DT, COUNT(*) AS CNT FROM BSHK_DAT
+        WHERE BSHK_TO = :to AND BSHK_FLG = :flg
+        GROUP BY BSHK_DT ORDER BY CNT DESC
+    """, {'to': DatabaseConstants.SHIPMENT_TO_PROCESS, 'flg': DatabaseConstants.BSHK_FLG_NOT_SHIPPED})
+    if not rows:
+        pytest.skip('加工宛の出荷データがありません')
+    shipment_date = rows[0].BSHK_DT
+    if isinstance(shipment_date, str):
+        shipment_date = datetime.fromisoformat(shipment_date)
+    orders = Shipment.get_by_dt_CT(shipment_date)
+    bench_run(write_to_proc_excel, shipment_date, orders, str(tmp_path), rounds=3)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""取込処理（ノンコートCSV・一般CSV・ハードコートExcel）のベンチマーク"""
+
+import csv
+import itertools
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app.constants import CsvConstants, DatabaseConstants, ExcelConstants
+from app.database import get_db_session
+
+ROWS_PER_FILE = 500
+_lot_sequence = itertools.count(1)
+
+
+def _query(sql, params=None):
+    session = get_db_session()
+    try:
+        return session.execute(text(sql), params or {}).fetchall()
+    finally:
+        session.close()
+
+
+def _next_lot():
+    """既存データと重複しないLOT（6桁）を払い出す（毎回新規登録の経路を計測する）"""
+    return 900000 + next(_lot_sequence) % 100000
+
+
+def _write_csv(path, rows):
+    with open(path, 'w', encoding='cp932', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+
+@pytest.fixture(scope='module')
+def bf_products():
+    return [r.BFSP_PRD_ID for r in _query("SELECT BFSP_PRD_ID FROM BFSP_MST ORDER BY BFSP_SORT")]
+
+
+@pytest.fixture(scope='module')
+def common_products():
+    return [r.PRD_ID for r in _query("SELECT PRD_ID FROM PRD_MST WHERE PRD_KBN = :kbn ORDER BY PRD_ID",
+                                     {'kbn': DatabaseConstants.PRD_KBN_PRD})]
+
+
+def bench_import_csv_nonecoat(bench_run, tmp_path, bf_products):
+    from app.import_csv import import_csv_nonecoat
+
+    def setup():
+        lot = _next_lot()
+        rows = []
+        for i in range(ROWS_PER_FILE):
+            row = [''] * (CsvConstants.CSV_NON_COAT_COLUMN_COUNT + 1)
+            row[0] = f"{bf_products[i % len(bf_products)]}{lot:06d}-{i // len(bf_products) + 1:02d}-01"
+            row[74] = str(10 + i % 50)
+            rows.append(row)
+        path = os.path.join(tmp_path, f"nonecoat_{lot}.csv")
+        _write_csv(path, rows)
+        return (path,), {}
+
+    result = bench_run(import_csv_nonecoat, setup=setup, rounds=3)
+    assert result['total'] == ROWS_PER_FILE
+
+
+def bench_import_csv_common(bench_run, tmp_path, common_products):
+    from app.import_csv import import_csv_common
+
+    def setup():
+        lot = _next_lot()
+        rows = []
+        for i in range(ROWS_PER_FILE):
+            row = [''] * (CsvConstants.CSV_NON_COAT_COLUMN_COUNT + 1)
+            row[0] = f"{common_products[i % len(common_products)]}{lot:06d}-{i // len(common_products) + 1}-0"
+            row[74] = str(10 + i % 50)
+            row[75] = str(i % 5)
+            rows.append(row)
+        path = os.path.join(tmp_path, f"common_{lot}.csv")
+        _write_csv(path, rows)
+        return (path,), {}
+
+    result = bench_run(import_csv_common, setup=setup, rounds=3)
+    assert result['total'] == ROWS_PER_FILE
+
+
+def bench_import_excel_hardcoat(bench_run, tmp_path):
+    import openpyxl
+    from app.import_excel import import_excel_hardcoat_file
+
+    specs = _query("SELECT BFSP_BASE, BFSP_ADP, BFSP_LR, BFSP_CLR FROM BFSP_MST ORDER BY BFSP_SORT")
+
+    def build_workbook():
+        lot = _next_lot()
+        wb = openpyxl.Workbook()
+        wb.active.title = ExcelConstants.TEMPLATE_SHEET_NAME
+        sheet = None
+        for i in range(ROWS_PER_FILE):
+            if i % ExcelConstants.MAX_ROWS_PER_SHEET == 0:
+                sheet = wb.create_sheet(f"S{i // ExcelConstants.MAX_ROWS_PER_SHEET + 1}")
+            row = ExcelConstants.WRITE_START_ROW + i % ExcelConstants.MAX_ROWS_PER_SHEET
+            spec = specs[i % len(specs)]
+            sheet[f'{ExcelConstants.COLUMN_BASKET_NO}{row}'] = i + 1
+            sheet[f'{ExcelConstants.COLUMN_BASE}{row}'] = int(spec.BFSP_BASE)
+            sheet[f'{ExcelConstants.COLUMN_ADP}{row}'] = int(spec.BFSP_ADP)
+            sheet[f'{ExcelConstants.COLUMN_LR}{row}'] = spec.BFSP_LR
+            sheet[f'{ExcelConstants.COLUMN_COLOR}{row}'] = spec.BFSP_CLR
+            sheet[f'{ExcelConstants.COLUMN_COAT_DATE}{row}'] = datetime(2025, 1, 1)
+            sheet[f'{ExcelConstants.COLUMN_PASS_QTY}{row}'] = 10 + i % 50
+            sheet[f'{ExcelConstants.COLUMN_LOT}{row}'] = lot + i // len(specs)
+        path = os.path.join(tmp_path, f"hardcoat_{lot}.xlsx")
+        wb.save(path)
+        return (path,), {}
+
+    result = bench_run(import_excel_hardcoat_file, setup=build_workbook, rounds=3)
+    assert result['total'] == ROWS_PER_FILE
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""受注集計・加工集計・在庫集計マトリックスのベンチマーク"""
+
+import pytest
+from sqlalchemy import text
+
+from app.database import get_db_session
+
+
+def _first_value(sql):
+    session = get_db_session()
+    try:
+        return session.execute(text(sql)).scalar()
+    finally:
+        session.close()
+
+
+def bench_get_order_summary(bench_run):
+    from app.models import BrcpDat
+
+    bench_run(BrcpDat.get_order_summary)
+
+
+def bench_get_processing_matrix_data(bench_run):
+    from app.models_total import CprgMstModel
+
+    cprg_id = _first_value("SELECT MIN(CPRG_ID) FROM CPRG_MST")
+    if cprg_id is None:
+        pytest.skip('加工集計グループがありません')
+    bench_run(CprgMstModel.get_processing_matrix_data, cprg_id)
+
+
+def bench_get_stock_matrix_data(bench_run):
+    from app.models_total import CttlMstModel
+
+    cttl_id = _first_value("SELECT MIN(CTTL_ID) FROM CTTL_MST")
+    if cttl_id is None:
+        pytest.skip('在庫集計グループがありません')
+    bench_run(CttlMstModel.get_stock_matrix_data, cttl_id)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+性能ベンチマークの共通設定
+
+generate_test_data.py で生成したデータ（SQLite代替DB）に対して、
+取込・自動出荷・集計マトリックス・帳票出力の処理時間とメモリ使用量を計測する。
+結果は pytest-benchmark のJSONとして benchmarks/baselines に保存し、
+過去の実行結果と比較して性能の劣化を検出する。
+
+使用例（リポジトリのルートで実行）:
+    # 基準値の保存（規模ごとに保存名を分ける）
+    pytest benchmarks --bench-scale 1 --benchmark-save=scale1
+    pytest benchmarks --bench-scale 10 --benchmark-save=scale10
+
+    # 直前に保存した基準値と比較（平均が10%以上悪化したら失敗）
+    pytest benchmarks --bench-scale 10 --benchmark-compare --benchmark-compare-fail=mean:10%
+
+生成データは benchmarks/.data に規模ごとにキャッシュし、計測は毎回
+その複製に対して行う（取込・自動出荷でデータが変わっても次回に影響しない）。
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tracemalloc
+
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+DATA_DIR = os.path.join(BENCH_DIR, '.data')
+
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('bench', 'ベンチマークデータ')
+    group.addoption('--bench-scale', type=float, default=1.0, help='生成データの倍率（現行規模=1）')
+    group.addoption('--bench-years', type=float, default=1.0, help='生成データの年数')
+    group.addoption('--bench-seed', type=int, default=42, help='生成データの乱数シード')
+    group.addoption('--bench-regenerate', action='store_true', help='キャッシュ済みの生成データを作り直す')
+
+
+def pytest_configure(config):
+    """生成データを用意し、app を読み込む前に接続先をSQLite代替DBへ切り替える"""
+    scale = config.getoption('--bench-scale')
+    years = config.getoption('--bench-years')
+    seed = config.getoption('--bench-seed')
+    os.makedirs(DATA_DIR, exist_ok=True)
+    pristine_path = os.path.join(DATA_DIR, f"bench_seed{seed}_years{years:g}_scale{scale:g}.sqlite3")
+    working_path = os.path.join(DATA_DIR, 'bench_work.sqlite3')
+
+    if config.getoption('--bench-regenerate') and os.path.exists(pristine_path):
+        os.remove(pristine_path)
+    if not os.path.exists(pristine_path):
+        # app.database はインポート時に接続先が決まるため、生成は別プロセスで行う
+        env = dict(os.environ, DB_ENGINE='sqlite', DB_SQLITE_PATH=pristine_path, LOG_LEVEL='warning')
+        subprocess.run(
+            [sys.executable, os.path.join(PROJECT_ROOT, 'generate_test_data.py'),
+             '--seed', str(seed), '--years', str(years), '--scale', str(scale)],
+            cwd=PROJECT_ROOT, env=env, check=True
+        )
+    shutil.copyfile(pristine_path, working_path)
+
+    os.environ['DB_ENGINE'] = 'sqlite'
+    os.environ['DB_SQLITE_PATH'] = working_path
+    os.environ['LOG_LEVEL'] = 'warning'
+    os.environ.setdefault('PROC_EXCEL_PATH', os.path.join(PROJECT_ROOT, 'EXCEL', 'ハードコート指図.xlsx'))
+    config.bench_params = {'scale': scale, 'years': years, 'seed': seed}
+
+
+def peak_memory_kb(func, *args, **kwargs):
+    """関数を1回実行し、Pythonヒープの最大使用量（KB）を返す"""
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture
+def bench_run(benchmark, request):
+    """処理時間を計測し、最大メモリ使用量と生成データの規模を結果に記録する
+
+    Args（返却する関数の引数）:
+        func: 計測対象の関数
+        *args / **kwargs: 関数の引数
+        setup: 各回の実行前に呼ぶ関数（(args, kwargs) を返す。データを変更する処理用）
+        rounds: 計測回数
+    """
+    def run(func, *args, setup=None, rounds=5, **kwargs):
+        benchmark.extra_info.update(request.config.bench_params)
+        if setup is not None:
+            result = benchmark.pedantic(func, setup=setup, rounds=rounds)
+            memory_args, memory_kwargs = setup()
+        else:
+            result = benchmark.pedantic(func, args=args, kwargs=kwargs, rounds=rounds)
+            memory_args, memory_kwargs = args, kwargs
+        benchmark.extra_info['peak_memory_kb'] = peak_memory_kb(func, *memory_args, **memory_kwargs)
+        return result
+    return run
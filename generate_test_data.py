@@ -0,0 +1,623 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能検証用の大量テストデータ生成スクリプト
+
+BF（BFSP_MST/BPRD_DAT/BPRD_MEI/BRCP_DAT/BSHK_DAT）、一般（PRD_MST/CZTR_MST/
+CPRC_MST/CPRD_DAT/CSHK_DAT/CPRC_DAT）、グラデーション（GPRR/GPRC/GSHK）、
+集計マスタ（CPRG_MST/CTTL_MST）と区分マスタ・ログインユーザーを生成し、
+設定されているデータベース（.env の DB_ENGINE / DB_*）へ一括登録する。
+
+同じシード・年数・倍率・終了日であれば常に同じデータを生成する。
+製品は一部の製品に出荷が集中するロングテール分布で選び、
+1ロットから複数回に分けて出荷されるようにしている。
+
+使用例:
+    python generate_test_data.py --years 3 --scale 10 --clear
+    DB_ENGINE=sqlite DB_SQLITE_PATH=bench.sqlite3 python generate_test_data.py --scale 1
+"""
+
+import os
+import sys
+import math
+import random
+import argparse
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+# プロジェクトのルートディレクトリをパスに追加
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from app.constants import DatabaseConstants, KbnConstants
+
+# ログ設定
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# 倍率1・1年あたりの件数（現行運用規模の目安）
+BASE_VOLUME = {
+    'bf_products': 48,          # BFSP_MST
+    'bf_lots': 1500,            # BPRD_DAT / 年
+    'bf_orders': 1200,          # BRCP_DAT / 年
+    'products': 80,             # PRD_MST（加工前）
+    'customers': 8,             # CZTR_MST（得意先）
+    'process_companies': 5,     # CZTR_MST（加工会社）
+    'cprd_lots': 3000,          # CPRD_DAT / 年
+    'grad_specs': 6,            # 区分 GSPEC
+    'grad_colors': 12,          # 区分 GCOLOR
+    'gprr_requests': 400,       # GPRR_DAT / 年
+}
+
+DEFAULT_END_DATE = '2025-12-31'
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_USER_ID = 'bench'
+DEFAULT_USER_PASSWORD = 'bench'
+
+# 子テーブルから順に削除する
+CLEAR_ORDER = [
+    'GSHK_DAT', 'GPRC_DAT', 'GPRR_DAT',
+    'CPRC_DAT', 'CSHK_DAT', 'CPRD_DAT', 'CPRG_MST', 'CTTL_MST', 'CPRC_MST', 'CTPD_MST',
+    'BSHK_DAT', 'BRCP_DAT', 'BPRD_MEI', 'BPRD_DAT', 'BFSP_MST',
+    'PRD_MST', 'CZTR_MST', 'KBN_MST',
+]
+
+# IDENTITY列（SQL Serverでは明示的なID登録にIDENTITY_INSERTが必要）
+IDENTITY_COLUMNS = {
+    'BPRD_DAT': 'BPDD_ID', 'BPRD_MEI': 'BPDM_ID', 'BRCP_DAT': 'BRCP_ID', 'BSHK_DAT': 'BSHK_ID',
+    'CPRC_MST': 'CPRC_ID', 'CPRD_DAT': 'CPDD_ID', 'CSHK_DAT': 'CSHK_ID', 'CPRC_DAT': 'CPCD_ID',
+    'GPRR_DAT': 'GPRR_ID', 'GPRC_DAT': 'GPRC_ID', 'GSHK_DAT': 'GSHK_ID',
+}
+
+
+class DataGenerator:
+    """シード固定のテストデータ生成クラス
+
+    生成したデータは tables（テーブル名 → 行のリスト）に保持し、
+    bulk_load() で一括登録する。IDは既存データの最大値の次から採番する。
+    """
+
+    def __init__(self, seed=42, years=1, scale=1.0, end_date=DEFAULT_END_DATE, id_offsets=None):
+        self.rng = random.Random(seed)
+        self.years = years
+        self.scale = scale
+        self.end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        self.start_date = self.end_date - timedelta(days=int(365 * years))
+        self.tables = {}
+        self._next_ids = dict(id_offsets or {})
+
+    # ------------------------------------------------------------------
+    # 共通処理
+    # ------------------------------------------------------------------
+    def _count(self, key, per_year=True):
+        """倍率・年数を反映した件数（マスタは倍率の平方根で増やす）"""
+        base = BASE_VOLUME[key]
+        if per_year:
+            return max(1, int(base * self.scale * self.years))
+        return max(1, int(base * math.sqrt(self.scale)))
+
+    def _next_id(self, table):
+        """テーブルの次のIDを払い出す"""
+        next_id = self._next_ids.get(table, 0) + 1
+        self._next_ids[table] = next_id
+        return next_id
+
+    def _add(self, table, row):
+        """生成した行を追加する"""
+        self.tables.setdefault(table, []).append(row)
+        return row
+
+    def _long_tail_weights(self, n, exponent=1.1):
+        """上位の製品に偏るロングテール（Zipf型）の重み"""
+        return [1.0 / ((rank + 1) ** exponent) for rank in range(n)]
+
+    def _random_date(self, start=None, end=None):
+        """期間内のランダムな日付（未来日は生成しない）"""
+        start = start or self.start_date
+        end = min(end or self.end_date, self.end_date)
+        if end <= start:
+            return start
+        return start + timedelta(days=self.rng.randint(0, (end - start).days))
+
+    def _qty(self, low, high, mode=None):
+        """三角分布の数量（小口が多い分布）"""
+        return int(self.rng.triangular(low, high, mode if mode is not None else low))
+
+    def _split(self, total, parts):
+        """数量を parts 個に分割する（各1以上）"""
+        parts = max(1, min(parts, total))
+        cuts = sorted(self.rng.sample(range(1, total), parts - 1)) if parts > 1 else []
+        bounds = [0] + cuts + [total]
+        return [bounds[i + 1] - bounds[i] for i in range(parts)]
+
+    @staticmethod
+    def _to_datetime(value):
+        return datetime.combine(value, datetime.min.time())
+
+    # ------------------------------------------------------------------
+    # マスタ
+    # ------------------------------------------------------------------
+    def generate_masters(self):
+        """区分・取引先・製品・加工・集計グループのマスタを生成する"""
+        rng = self.rng
+
+        # 区分マスタ
+        for no, name in enumerate([KbnConstants.RANK_NAME_A, KbnConstants.RANK_NAME_B,
+                                   KbnConstants.RANK_NAME_C, KbnConstants.RANK_NAME_D], start=1):
+            self._add('KBN_MST', {'KBN_ID': KbnConstants.KBN_ID_RANK, 'KBN_NO': no, 'KBN_NM': name,
+                                  'KBN_FLG': KbnConstants.KBN_FLG_ACTIVE})
+        for no in range(1, BASE_VOLUME['grad_specs'] + 1):
+            self._add('KBN_MST', {'KBN_ID': KbnConstants.KBN_ID_GSPEC, 'KBN_NO': no, 'KBN_NM': f"規格{no:02d}",
+                                  'KBN_FLG': KbnConstants.KBN_FLG_ACTIVE})
+        for no in range(1, BASE_VOLUME['grad_colors'] + 1):
+            self._add('KBN_MST', {'KBN_ID': KbnConstants.KBN_ID_GCOLOR, 'KBN_NO': no, 'KBN_NM': f"色{no:02d}",
+                                  'KBN_FLG': KbnConstants.KBN_FLG_ACTIVE})
+
+        # 取引先マスタ（得意先・加工会社）
+        self.customer_ids = []
+        self.process_company_ids = []
+        for i in range(self._count('customers', per_year=False)):
+            cztr_id = 100 + i
+            self.customer_ids.append(cztr_id)
+            self._add('CZTR_MST', {'CZTR_ID': cztr_id, 'CZTR_NM': f"得意先{i + 1:02d}",
+                                   'CZTR_FULL_NM': f"株式会社得意先{i + 1:02d}", 'CZTR_TANTO_NM': None,
+                                   'CZTR_KBN': DatabaseConstants.CZTR_KBN_CUSTOMER,
+                                   'CZTR_FLG': DatabaseConstants.FLG_ACTIVE,
+                                   'CZTR_TYP': DatabaseConstants.CZTR_TYPE_COMMON})
+        for i in range(self._count('process_companies', per_year=False)):
+            cztr_id = 200 + i
+            self.process_company_ids.append(cztr_id)
+            self._add('CZTR_MST', {'CZTR_ID': cztr_id, 'CZTR_NM': f"加工会社{i + 1:02d}",
+                                   'CZTR_FULL_NM': f"株式会社加工会社{i + 1:02d}", 'CZTR_TANTO_NM': f"担当{i + 1:02d}",
+                                   'CZTR_KBN': DatabaseConstants.CZTR_KBN_PROCESS_COMPANY,
+                                   'CZTR_FLG': DatabaseConstants.FLG_ACTIVE,
+                                   'CZTR_TYP': DatabaseConstants.CZTR_TYPE_COMMON})
+
+        # BF規格マスタ
+        self.bf_products = []
+        for i in range(self._count('bf_products', per_year=False)):
+            prd_id = f"B{i + 1:03d}"
+            self.bf_products.append(prd_id)
+            self._add('BFSP_MST', {'BFSP_PRD_ID': prd_id, 'BFSP_MONO': rng.randint(1, 3),
+                                   'BFSP_BASE': rng.randint(0, 8), 'BFSP_ADP': rng.choice(range(100, 325, 25)),
+                                   'BFSP_LR': rng.choice(['L', 'R']), 'BFSP_CLR': f"{rng.randint(1, 5):02d}",
+                                   'BFSP_SORT': i + 1, 'BFSP_S_NC': None, 'BFSP_S_HC': None,
+                                   'BFSP_Y_BCD': None, 'BFSP_Y_GTIN': None})
+        self.bf_weights = self._long_tail_weights(len(self.bf_products))
+
+        # 製品マスタ（加工前・加工後）と加工マスタ
+        self.products = []
+        self.processes = {}  # 加工前製品ID → [(加工ID, 加工後製品ID, 加工会社ID)]
+        for i in range(self._count('products', per_year=False)):
+            prd_id = f"P{i + 1:04d}"
+            self.products.append(prd_id)
+            self._add('PRD_MST', {'PRD_ID': prd_id, 'PRD_MONOMER': f"MONO{i % 7 + 1}", 'PRD_NAME': f"製品{i + 1:04d}",
+                                  'PRD_LOWER_DIE': None, 'PRD_UPPER_DIE': None, 'PRD_FILM_COLOR': None,
+                                  'PRD_KBN': DatabaseConstants.PRD_KBN_PRD, 'PRD_FLG': DatabaseConstants.FLG_ACTIVE,
+                                  'PRD_DSP_NM': f"製品{i + 1:04d} 表示名"})
+            # 約半数の製品に1〜2種類の加工を設定する
+            if rng.random() < 0.5:
+                for p in range(rng.randint(1, 2)):
+                    af_prd_id = f"Q{i + 1:03d}{p}"
+                    cprc_id = self._next_id('CPRC_MST')
+                    company = rng.choice(self.process_company_ids)
+                    self._add('PRD_MST', {'PRD_ID': af_prd_id, 'PRD_MONOMER': f"MONO{i % 7 + 1}",
+                                          'PRD_NAME': f"加工品{i + 1:04d}-{p}", 'PRD_LOWER_DIE': None,
+                                          'PRD_UPPER_DIE': None, 'PRD_FILM_COLOR': None,
+                                          'PRD_KBN': DatabaseConstants.PRD_KBN_PROC,
+                                          'PRD_FLG': DatabaseConstants.FLG_ACTIVE,
+                                          'PRD_DSP_NM': f"加工品{i + 1:04d}-{p} 表示名"})
+                    self._add('CPRC_MST', {'CPRC_ID': cprc_id, 'CPRC_NM': f"加工{cprc_id:03d}",
+                                           'CPRC_PRD_NM': f"製品{i + 1:04d}", 'CPRC_TO': company,
+                                           'CPRC_TIME': rng.randint(3, 20), 'CPRC_FLG': DatabaseConstants.FLG_ACTIVE,
+                                           'CPRC_PRD_ID': prd_id, 'CPRC_AF_PRD_ID': af_prd_id})
+                    self.processes.setdefault(prd_id, []).append((cprc_id, af_prd_id, company))
+        self.product_weights = self._long_tail_weights(len(self.products))
+
+        # 加工集計グループ・在庫集計グループ（グループごとに行列のマトリックスを構成する）
+        for g in range(1, 4):
+            cprg_id = f"G{g:02d}"
+            for n, (prd_id, procs) in enumerate(list(self.processes.items())[(g - 1) * 8:g * 8]):
+                cprc_id, af_prd_id, _ = procs[0]
+                self._add('CPRG_MST', {'CPRG_ID': cprg_id, 'CPRG_PRD_ID': prd_id, 'CPRG_PRC_ID': cprc_id,
+                                       'CPRG_G_NM': f"加工集計{g}", 'CPRG_COL_NM': f"列{n % 4 + 1}",
+                                       'CPRG_ROW_NM': f"行{n // 4 + 1}", 'CPRG_AF_PRD_ID': af_prd_id,
+                                       'CPRG_COL_KEY': n % 4 + 1, 'CPRG_ROW_KEY': n // 4 + 1})
+            for n, prd_id in enumerate(self.products[(g - 1) * 12:g * 12]):
+                self._add('CTTL_MST', {'CTTL_ID': g, 'CTTL_PRD_ID': prd_id, 'CTTL_G_NM': f"在庫集計{g}",
+                                       'CTTL_COL_NM': f"列{n % 4 + 1}", 'CTTL_ROW_NM': f"行{n // 4 + 1}",
+                                       'CTTL_COL_KEY': n % 4 + 1, 'CTTL_ROW_KEY': n // 4 + 1})
+
+    # ------------------------------------------------------------------
+    # BF（製造・受注・出荷）
+    # ------------------------------------------------------------------
+    def generate_bf(self):
+        """BFの製造ロット・受注・出荷を生成する"""
+        rng = self.rng
+        lots = {}  # (製品ID, 加工区分) → [[製造ID, 残数, 製造日]]
+
+        for _ in range(self._count('bf_lots')):
+            prd_id = rng.choices(self.bf_products, weights=self.bf_weights)[0]
+            proc = DatabaseConstants.PROC_HARD_COAT if rng.random() < 0.3 else DatabaseConstants.PROC_NON_COAT
+            made = self._random_date()
+            qty = self._qty(20, 2000, 200)
+            bpdd_id = self._next_id('BPRD_DAT')
+            crt = int((made + timedelta(days=rng.randint(1, 5))).strftime('%y%m%d')) \
+                if proc == DatabaseConstants.PROC_HARD_COAT else None
+            lot_no = int(made.strftime('%y%m%d'))
+            self._add('BPRD_DAT', {'BPDD_ID': bpdd_id, 'BPDD_PROC': proc, 'BPDD_PRD_ID': prd_id,
+                                   'BPDD_LOT': lot_no, 'BPDD_QTY': qty,
+                                   'BPDD_FLG': DatabaseConstants.BPDD_FLG_NOT_SHIPPED, 'BPDD_CRT': crt})
+            lots.setdefault((prd_id, proc), []).append([bpdd_id, qty, made])
+
+        # 製造明細（製品ID・LOT・分割番号で一意）
+        split_no = {}
+        for lot in self.tables.get('BPRD_DAT', []):
+            for qty in self._split(lot['BPDD_QTY'], rng.randint(1, 3)):
+                key = (lot['BPDD_PRD_ID'], lot['BPDD_LOT'])
+                split_no[key] = split_no.get(key, 0) + 1
+                self._add('BPRD_MEI', {'BPDM_ID': self._next_id('BPRD_MEI'), 'BPDM_PRD_ID': key[0],
+                                       'BPDM_LOT': key[1], 'BPDM_NO': split_no[key], 'BPDM_QTY': qty})
+
+        for pool in lots.values():
+            pool.sort(key=lambda lot: lot[2])
+        bpdd_rows = {row['BPDD_ID']: row for row in self.tables.get('BPRD_DAT', [])}
+
+        # 受注と先入れ先出しの出荷（1受注が複数ロットにまたがる）
+        order_cmps = [DatabaseConstants.ORDER_CMP_COLUMBUS, DatabaseConstants.ORDER_CMP_DALLAS,
+                      DatabaseConstants.ORDER_CMP_YOUNGER, DatabaseConstants.ORDER_CMP_YOUNGER_EU]
+        orders = []
+        for n in range(self._count('bf_orders')):
+            orders.append((self._random_date(), n))
+        orders.sort()
+        recent = self.end_date - timedelta(days=30)
+        for order_date, n in orders:
+            prd_id = rng.choices(self.bf_products, weights=self.bf_weights)[0]
+            proc = DatabaseConstants.PROC_HARD_COAT if rng.random() < 0.3 else DatabaseConstants.PROC_NON_COAT
+            qty = self._qty(10, 500, 30)
+            brcp_id = self._next_id('BRCP_DAT')
+            order = self._add('BRCP_DAT', {'BRCP_ID': brcp_id, 'BRCP_DT': self._to_datetime(order_date),
+                                           'BRCP_PRD_ID': prd_id, 'BRCP_PROC': proc,
+                                           'BRCP_ORDER_CMP': rng.choices(order_cmps, weights=[50, 20, 25, 5])[0],
+                                           'BRCP_ORDER_NO': 1000000 + n, 'BRCP_QTY': qty,
+                                           'BRCP_FLG': DatabaseConstants.BRCP_FLG_NOT_SHIPPED})
+            # 直近の受注の一部は未出荷のまま残す
+            if order_date > recent and rng.random() < 0.5:
+                continue
+            remaining = qty
+            for lot in lots.get((prd_id, proc), []):
+                if remaining <= 0:
+                    break
+                if lot[1] <= 0 or lot[2] > order_date:
+                    continue
+                ship_qty = min(lot[1], remaining)
+                lot[1] -= ship_qty
+                remaining -= ship_qty
+                ship_date = min(order_date + timedelta(days=rng.randint(0, 7)), self.end_date)
+                self._add('BSHK_DAT', {'BSHK_ID': self._next_id('BSHK_DAT'), 'BSHK_TO': order['BRCP_ORDER_CMP'],
+                                       'BSHK_PDD_ID': lot[0], 'BSHK_RCP_ID': brcp_id,
+                                       'BSHK_DT': self._to_datetime(ship_date),
+                                       'BSHK_QTY': ship_qty,
+                                       'BSHK_FLG': rng.choice([DatabaseConstants.BSHK_FLG_SHIPPED,
+                                                               DatabaseConstants.BSHK_FLG_DELIVERED,
+                                                               DatabaseConstants.BSHK_FLG_INVOICED]),
+                                       'BSHK_ORD_DT': self._to_datetime(order_date)})
+                if lot[1] == 0:
+                    bpdd_rows[lot[0]]['BPDD_FLG'] = DatabaseConstants.BPDD_FLG_SHIPPED
+            if remaining == 0:
+                order['BRCP_FLG'] = DatabaseConstants.BRCP_FLG_SHIPPED
+
+        # 直近のノンコート在庫の一部をハードコート加工宛に出荷する（加工手配Excelの対象）
+        process_from = self.end_date - timedelta(days=60)
+        for (prd_id, proc), pool in lots.items():
+            if proc != DatabaseConstants.PROC_NON_COAT:
+                continue
+            for lot in pool:
+                if lot[2] < process_from or lot[1] <= 0 or rng.random() > 0.3:
+                    continue
+                ship_qty = max(1, lot[1] // 2)
+                lot[1] -= ship_qty
+                ship_date = min(lot[2] + timedelta(days=rng.randint(1, 5)), self.end_date)
+                self._add('BSHK_DAT', {'BSHK_ID': self._next_id('BSHK_DAT'),
+                                       'BSHK_TO': DatabaseConstants.SHIPMENT_TO_PROCESS,
+                                       'BSHK_PDD_ID': lot[0], 'BSHK_RCP_ID': None,
+                                       'BSHK_DT': self._to_datetime(ship_date), 'BSHK_QTY': ship_qty,
+                                       'BSHK_FLG': DatabaseConstants.BSHK_FLG_NOT_SHIPPED,
+                                       'BSHK_ORD_DT': self._to_datetime(lot[2])})
+
+    # ------------------------------------------------------------------
+    # 一般（製造・出荷・加工戻り）
+    # ------------------------------------------------------------------
+    def _add_cprd_lot(self, prd_id, made, qty, pcd_id=None):
+        """CPRD_DATのロットを追加する"""
+        return self._add('CPRD_DAT', {'CPDD_ID': self._next_id('CPRD_DAT'), 'CPDD_PRD_ID': prd_id,
+                                      'CPDD_LOT': int(made.strftime('%y%m%d')),
+                                      'CPDD_SPRIT1': self.rng.randint(1, 20), 'CPDD_SPRIT2': self.rng.randint(0, 9),
+                                      'CPDD_RANK': self.rng.choices([1, 2, 3, 4], weights=[60, 25, 10, 5])[0],
+                                      'CPDD_QTY': qty, 'CPDD_FLG': DatabaseConstants.FLG_ACTIVE,
+                                      'CPDD_PCD_ID': pcd_id})
+
+    def _add_cshk(self, lot, kbn, to, qty, ship_date, prc_id=None):
+        """CSHK_DATの出荷を追加する"""
+        return self._add('CSHK_DAT', {'CSHK_ID': self._next_id('CSHK_DAT'), 'CSHK_KBN': kbn, 'CSHK_TO': to,
+                                      'CSHK_PRC_ID': prc_id, 'CSHK_PRD_ID': lot['CPDD_PRD_ID'],
+                                      'CSHK_DT': self._to_datetime(ship_date),
+                                      'CSHK_ORD_DT': self._to_datetime(ship_date - timedelta(days=self.rng.randint(0, 3))),
+                                      'CSHK_PDD_ID': lot['CPDD_ID'], 'CSHK_RCP_ID': None, 'CSHK_QTY': qty,
+                                      'CSHK_FLG': DatabaseConstants.FLG_ACTIVE})
+
+    def generate_common(self):
+        """一般製品の製造ロット・出荷（得意先/加工/欠損）・加工戻りを生成する"""
+        rng = self.rng
+        for _ in range(self._count('cprd_lots')):
+            prd_id = rng.choices(self.products, weights=self.product_weights)[0]
+            made = self._random_date()
+            lot = self._add_cprd_lot(prd_id, made, self._qty(50, 3000, 300))
+
+            # 1ロットを幾何分布の回数に分けて出荷し、一部は在庫として残す
+            shipments = 1
+            while shipments < 30 and rng.random() < 0.8:
+                shipments += 1
+            shipped_total = int(lot['CPDD_QTY'] * rng.uniform(0.5, 1.0))
+            if shipped_total < 1:
+                continue
+            ship_date = made
+            for qty in self._split(shipped_total, shipments):
+                ship_date = ship_date + timedelta(days=rng.randint(0, 10))
+                if ship_date > self.end_date:
+                    break
+                roll = rng.random()
+                procs = self.processes.get(prd_id)
+                if procs and roll < 0.25:
+                    cprc_id, af_prd_id, company = rng.choice(procs)
+                    cshk = self._add_cshk(lot, DatabaseConstants.CSHK_KBN_PROCESS, company, qty, ship_date, cprc_id)
+                    self._generate_process_return(cshk, af_prd_id, ship_date)
+                elif roll < 0.28:
+                    self._add_cshk(lot, DatabaseConstants.CSHK_KBN_LOSS, DatabaseConstants.ORDER_CMP_MISSING,
+                                   qty, ship_date)
+                else:
+                    self._add_cshk(lot, DatabaseConstants.CSHK_KBN_SHIPMENT, rng.choice(self.customer_ids),
+                                   qty, ship_date)
+
+    def _generate_process_return(self, cshk, af_prd_id, ship_date):
+        """加工出荷に対する戻り（CPRC_DAT）と加工後ロット（CPRD_DAT）を生成する"""
+        rng = self.rng
+        return_date = ship_date + timedelta(days=rng.randint(7, 30))
+        # 終了日時点で戻っていない加工は未戻りのまま残す
+        if return_date > self.end_date:
+            return
+        returned = int(cshk['CSHK_QTY'] * rng.uniform(0.8, 1.0))
+        if returned < 1:
+            return
+        for qty in self._split(returned, rng.randint(1, 2)):
+            ret_ng = self._qty(0, max(1, qty // 20))
+            ins_ng = self._qty(0, max(1, qty // 20))
+            pass_qty = max(0, qty - ret_ng - ins_ng)
+            cpcd_id = self._next_id('CPRC_DAT')
+            self._add('CPRC_DAT', {'CPCD_ID': cpcd_id, 'CPCD_SHK_ID': cshk['CSHK_ID'],
+                                   'CPCD_DATE': self._to_datetime(return_date), 'CPCD_QTY': qty,
+                                   'CPCD_RET_NG_QTY': ret_ng, 'CPCD_INS_NG_QTY': ins_ng,
+                                   'CPCD_PASS_QTY': pass_qty})
+            if pass_qty > 0:
+                af_lot = self._add_cprd_lot(af_prd_id, return_date, pass_qty, pcd_id=cpcd_id)
+                # 加工後ロットの一部を得意先へ出荷する
+                if rng.random() < 0.6:
+                    ship_date = min(return_date + timedelta(days=rng.randint(0, 14)), self.end_date)
+                    self._add_cshk(af_lot, DatabaseConstants.CSHK_KBN_SHIPMENT, rng.choice(self.customer_ids),
+                                   max(1, int(pass_qty * rng.uniform(0.3, 1.0))), ship_date)
+            return_date = min(return_date + timedelta(days=rng.randint(1, 5)), self.end_date)
+
+    # ------------------------------------------------------------------
+    # グラデーション（依頼・コンベックス戻り・ニデック出庫/戻り・最終出荷）
+    # ------------------------------------------------------------------
+    def generate_gradation(self):
+        """グラデーションの依頼から最終出荷までを生成する"""
+        rng = self.rng
+        keys = [(s, c) for s in range(1, BASE_VOLUME['grad_specs'] + 1)
+                for c in range(1, BASE_VOLUME['grad_colors'] + 1)]
+        key_weights = self._long_tail_weights(len(keys), exponent=0.8)
+        used = set()
+
+        for _ in range(self._count('gprr_requests')):
+            spec, color = rng.choices(keys, weights=key_weights)[0]
+            req_date = self._random_date()
+            # 規格・色・依頼先・依頼日で一意
+            while (spec, color, req_date) in used:
+                req_date = req_date - timedelta(days=1)
+            used.add((spec, color, req_date))
+            gprr_id = self._next_id('GPRR_DAT')
+            qty = self._qty(50, 300, 100)
+            self._add('GPRR_DAT', {'GPRR_ID': gprr_id, 'GPRR_SPEC': spec, 'GPRR_COLOR': color,
+                                   'GPRR_REQ_TO': DatabaseConstants.GPRR_REQ_TO_CONVEX,
+                                   'GPRR_REQ_DATE': self._to_datetime(req_date), 'GPRR_QTY': qty})
+
+            # コンベックス戻り（検品済みは在庫になる）
+            return_date = req_date + timedelta(days=rng.randint(7, 21))
+            if return_date > self.end_date:
+                continue
+            for ret_qty in self._split(int(qty * rng.uniform(0.7, 1.0)), rng.randint(1, 3)):
+                stock = self._add_gprc(gprr_id, DatabaseConstants.GPRR_REQ_TO_CONVEX, return_date, ret_qty, None)
+                if stock['GPRC_STS'] == 1:
+                    self._generate_nidec_flow(gprr_id, stock, return_date)
+                return_date = min(return_date + timedelta(days=rng.randint(1, 7)), self.end_date)
+
+    def _add_gprc(self, gprr_id, req_to, return_date, qty, shk_id):
+        """GPRC_DATの戻りを追加する（終了日から2週間以内は検品前）"""
+        ng = self._qty(0, max(1, qty // 15))
+        sts = 0 if return_date > self.end_date - timedelta(days=14) else 1
+        return self._add('GPRC_DAT', {'GPRC_ID': self._next_id('GPRC_DAT'), 'GPRC_REQ_ID': gprr_id,
+                                      'GPRC_REQ_TO': req_to, 'GPRC_DATE': self._to_datetime(return_date),
+                                      'GPRC_QTY': qty, 'GPRC_RET_NG_QTY': ng, 'GPRC_INS_NG_QTY': 0,
+                                      'GPRC_SHK_ID': shk_id, 'GPRC_PASS_QTY': max(0, qty - ng),
+                                      'GPRC_STS': sts})
+
+    def _add_gshk(self, gprr_id, stc_id, to, ship_date, qty):
+        """GSHK_DATの出庫・出荷を追加する"""
+        return self._add('GSHK_DAT', {'GSHK_ID': self._next_id('GSHK_DAT'), 'GSHK_STC_ID': stc_id,
+                                      'GSHK_TO': to, 'GSHK_DT': self._to_datetime(ship_date),
+                                      'GSHK_ORD_DT': self._to_datetime(ship_date), 'GSHK_QTY': qty,
+                                      'GSHK_FLG': 0, 'GSHK_REQ_ID': gprr_id})
+
+    def _generate_nidec_flow(self, gprr_id, stock, stock_date):
+        """コンベックス在庫からニデック出庫・ニデック戻り・最終出荷を生成する"""
+        rng = self.rng
+        available = stock['GPRC_PASS_QTY']
+        ship_date = stock_date
+        while available > 0 and rng.random() < 0.85:
+            ship_date = ship_date + timedelta(days=rng.randint(1, 14))
+            if ship_date > self.end_date:
+                return
+            qty = min(available, self._qty(5, 80, 20))
+            available -= qty
+            gshk = self._add_gshk(gprr_id, stock['GPRC_ID'], DatabaseConstants.GSHK_TO_NIDEC, ship_date, qty)
+
+            return_date = ship_date + timedelta(days=rng.randint(5, 15))
+            if return_date > self.end_date:
+                continue
+            nidec = self._add_gprc(gprr_id, DatabaseConstants.GPRR_REQ_TO_NIDEC, return_date,
+                                   int(qty * rng.uniform(0.85, 1.0)) or qty, gshk['GSHK_ID'])
+            if nidec['GPRC_STS'] != 1:
+                continue
+            # ニデック在庫から最終出荷（複数回に分割）
+            final_total = int(nidec['GPRC_PASS_QTY'] * rng.uniform(0.4, 1.0))
+            final_date = return_date
+            for final_qty in self._split(final_total, rng.randint(1, 4)) if final_total > 0 else []:
+                final_date = final_date + timedelta(days=rng.randint(1, 10))
+                if final_date > self.end_date:
+                    break
+                self._add_gshk(gprr_id, nidec['GPRC_ID'], DatabaseConstants.GSHK_TO_CONVEX, final_date, final_qty)
+
+    # ------------------------------------------------------------------
+    def generate(self):
+        """全テーブルのデータを生成する"""
+        self.generate_masters()
+        self.generate_bf()
+        self.generate_common()
+        self.generate_gradation()
+        return self.tables
+
+
+def get_id_offsets(conn):
+    """既存データのID最大値を取得する（追加登録時の採番開始位置）"""
+    offsets = {}
+    for table, column in IDENTITY_COLUMNS.items():
+        offsets[table] = int(conn.execute(text(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")).scalar() or 0)
+    return offsets
+
+
+def clear_tables(conn):
+    """生成対象のテーブルを全件削除する"""
+    for table in CLEAR_ORDER:
+        conn.execute(text(f"DELETE FROM {table}"))
+        logger.info(f"{table} を削除しました")
+
+
+def _existing_keys(conn, table, columns):
+    """マスタの既存キーを取得する（重複登録を避けるため）"""
+    rows = conn.execute(text(f"SELECT {', '.join(columns)} FROM {table}")).fetchall()
+    return {tuple(str(v) for v in row) for row in rows}
+
+
+# 主キーが業務キーのマスタ（既存キーと重複する行は登録しない）
+MASTER_KEYS = {
+    'KBN_MST': ['KBN_ID', 'KBN_NO'],
+    'CZTR_MST': ['CZTR_ID'],
+    'BFSP_MST': ['BFSP_PRD_ID'],
+    'PRD_MST': ['PRD_ID'],
+    'CPRG_MST': ['CPRG_ID', 'CPRG_PRD_ID', 'CPRG_PRC_ID'],
+    'CTTL_MST': ['CTTL_ID', 'CTTL_PRD_ID'],
+}
+
+# 親テーブルから順に登録する
+LOAD_ORDER = list(reversed(CLEAR_ORDER))
+
+
+def bulk_load(conn, tables, batch_size=DEFAULT_BATCH_SIZE):
+    """生成データを executemany で一括登録する"""
+    is_mssql = conn.dialect.name == 'mssql'
+    for table in LOAD_ORDER:
+        rows = tables.get(table)
+        if not rows:
+            continue
+        if table in MASTER_KEYS:
+            keys = MASTER_KEYS[table]
+            existing = _existing_keys(conn, table, keys)
+            rows = [r for r in rows if tuple(str(r[k]) for k in keys) not in existing]
+            if not rows:
+                continue
+        columns = list(rows[0].keys())
+        sql = text(f"INSERT INTO {table} ({', '.join(columns)}) "
+                   f"VALUES ({', '.join(':' + c for c in columns)})")
+        identity = is_mssql and table in IDENTITY_COLUMNS
+        if identity:
+            conn.execute(text(f"SET IDENTITY_INSERT {table} ON"))
+        try:
+            for start in range(0, len(rows), batch_size):
+                conn.execute(sql, rows[start:start + batch_size])
+        finally:
+            if identity:
+                conn.execute(text(f"SET IDENTITY_INSERT {table} OFF"))
+        logger.info(f"{table}: {len(rows)}件登録")
+
+
+def create_login_user(conn, user_id=DEFAULT_USER_ID, password=DEFAULT_USER_PASSWORD):
+    """負荷試験・ベンチマーク用のログインユーザーを作成する"""
+    from werkzeug.security import generate_password_hash
+    conn.execute(text("DELETE FROM USER_MST WHERE USER_ID = :user_id"), {'user_id': user_id})
+    conn.execute(text("""
+        INSERT INTO USER_MST (USER_ID, USER_NM, USER_PW, USER_FLG)
+        VALUES (:user_id, :user_nm, :user_pw, 0)
+    """), {'user_id': user_id, 'user_nm': 'ベンチマーク', 'user_pw': generate_password_hash(password)})
+
+
+def generate(seed=42, years=1, scale=1.0, end_date=DEFAULT_END_DATE, clear=False,
+             batch_size=DEFAULT_BATCH_SIZE, with_user=True):
+    """テストデータを生成して設定中のデータベースに登録する
+
+    Returns:
+        dict: テーブル名 → 登録件数
+    """
+    with engine.begin() as conn:
+        if clear:
+            clear_tables(conn)
+        generator = DataGenerator(seed=seed, years=years, scale=scale, end_date=end_date,
+                                  id_offsets=get_id_offsets(conn))
+        tables = generator.generate()
+        bulk_load(conn, tables, batch_size=batch_size)
+        if with_user:
+            create_login_user(conn)
+    return {table: len(rows) for table, rows in tables.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='性能検証用の大量テストデータを生成して登録する')
+    parser.add_argument('--seed', type=int, default=42, help='乱数シード')
+    parser.add_argument('--years', type=float, default=1, help='生成する年数')
+    parser.add_argument('--scale', type=float, default=1.0, help='現行規模に対する倍率（例: 10）')
+    parser.add_argument('--end-date', default=DEFAULT_END_DATE, help='データの最終日（YYYY-MM-DD）')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='一括登録の件数')
+    parser.add_argument('--clear', action='store_true', help='登録前に対象テーブルを全件削除する')
+    parser.add_argument('--no-user', action='store_true', help=f"ログインユーザー（{DEFAULT_USER_ID}）を作成しない")
+    args = parser.parse_args()
+
+    try:
+        print("=== テストデータ生成 ===")
+        started = datetime.now()
+        counts = generate(seed=args.seed, years=args.years, scale=args.scale, end_date=args.end_date,
+                          clear=args.clear, batch_size=args.batch_size, with_user=not args.no_user)
+        for table in LOAD_ORDER:
+            if table in counts:
+                print(f"  {table:<10} {counts[table]:>10,}件")
+        print(f"\n✅ 生成が完了しました（{(datetime.now() - started).total_seconds():.1f}秒）")
+    except Exception as e:
+        logger.error(f"テストデータ生成でエラーが発生: {str(e)}")
+        print(f"\n❌ テストデータ生成でエラーが発生しました: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+グラデーション在庫残数SQL部品の整合性検証スクリプト
+
+app/gradation_balance.py の派生テーブル（GROUP BY結合）が、
+SQL Serverのスカラー関数 Get_GRD_PRC_ZAN_Qty / Get_GRD_SHK_ZAN_Qty /
+Get_GSHK_GPRC_Diff と同じ値を返すことを確認する。
+
+ランダムなGPRR/GPRC/GSHKデータをSQLite（インメモリ）に投入し、
+スカラー関数のロジックをPythonで再現した参照実装と突き合わせる。
+SQL Serverへの接続は不要。
+
+使い方:
+    python gradation_parity_check.py [--seed 1] [--rounds 20] [--gprr 200]
+"""
+
+import os
+import sys
+import random
+import sqlite3
+import argparse
+import importlib.util
+from datetime import datetime, timedelta
+
+# app パッケージの __init__ はFlaskアプリとDB接続を初期化するため、
+# SQL部品のモジュールファイルだけを直接読み込む
+_balance_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'gradation_balance.py')
+_spec = importlib.util.spec_from_file_location('gradation_balance', _balance_path)
+gradation_balance = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(gradation_balance)
+
+GRD_PRC_ZAN_SQL = gradation_balance.GRD_PRC_ZAN_SQL
+GRD_SHK_ZAN_SQL = gradation_balance.GRD_SHK_ZAN_SQL
+GRD_FINAL_SHK_ZAN_SQL = gradation_balance.GRD_FINAL_SHK_ZAN_SQL
+GSHK_GPRC_DIFF_SQL = gradation_balance.GSHK_GPRC_DIFF_SQL
+join_grd_prc_zan = gradation_balance.join_grd_prc_zan
+join_grd_shk_zan = gradation_balance.join_grd_shk_zan
+join_gshk_gprc_diff = gradation_balance.join_gshk_gprc_diff
+
+SCHEMA = """
+    CREATE TABLE GPRR_DAT (
+        GPRR_ID INTEGER PRIMARY KEY,
+        GPRR_SPEC NUMERIC, GPRR_COLOR NUMERIC, GPRR_REQ_TO NUMERIC,
+        GPRR_REQ_DATE TEXT, GPRR_QTY NUMERIC
+    );
+    CREATE TABLE GPRC_DAT (
+        GPRC_ID INTEGER PRIMARY KEY,
+        GPRC_REQ_ID NUMERIC, GPRC_REQ_TO NUMERIC, GPRC_DATE TEXT,
+        GPRC_QTY NUMERIC, GPRC_RET_NG_QTY NUMERIC, GPRC_INS_NG_QTY NUMERIC,
+        GPRC_SHK_ID NUMERIC, GPRC_PASS_QTY NUMERIC, GPRC_STS NUMERIC
+    );
+    CREATE TABLE GSHK_DAT (
+        GSHK_ID INTEGER PRIMARY KEY,
+        GSHK_STC_ID NUMERIC, GSHK_TO NUMERIC, GSHK_DT TEXT, GSHK_ORD_DT TEXT,
+        GSHK_QTY NUMERIC, GSHK_FLG NUMERIC, GSHK_REQ_ID NUMERIC
+    );
+"""
+
+
+# =============================================================================
+# 参照実装（sql/Get_*.sql のロジックをそのまま再現）
+# =============================================================================
+def ref_grd_prc_zan_qty(data, gprr_id):
+    """Get_GRD_PRC_ZAN_Qty: GPRR_QTY - SUM(GPRC_QTY WHERE GPRC_REQ_TO = 1)"""
+    gprr = data['gprr'].get(gprr_id)
+    gprr_qty = gprr['GPRR_QTY'] if gprr else None
+    gprc_sum = sum(r['GPRC_QTY'] or 0 for r in data['gprc'].values()
+                   if r['GPRC_REQ_ID'] == gprr_id and r['GPRC_REQ_TO'] == 1)
+    return None if gprr_qty is None else gprr_qty - gprc_sum
+
+
+def ref_grd_shk_zan_qty(data, gprc_id):
+    """Get_GRD_SHK_ZAN_Qty: ISNULL(GPRC_PASS_QTY, 0) - SUM(GSHK_QTY WHERE GSHK_STC_ID = GPRC_ID)"""
+    gprc = data['gprc'].get(gprc_id)
+    if gprc is None:
+        return None
+    gshk_sum = sum(r['GSHK_QTY'] or 0 for r in data['gshk'].values() if r['GSHK_STC_ID'] == gprc_id)
+    return (gprc['GPRC_PASS_QTY'] or 0) - gshk_sum
+
+
+def ref_grd_final_shk_zan_qty(data, gprc_id):
+    """get_nidec_available_qty: max(0, 合格数 - SUM(GSHK_QTY WHERE GSHK_TO = 3))"""
+    gprc = data['gprc'].get(gprc_id)
+    if gprc is None:
+        return None
+    gshk_sum = sum(r['GSHK_QTY'] or 0 for r in data['gshk'].values()
+                   if r['GSHK_STC_ID'] == gprc_id and r['GSHK_TO'] == 3)
+    return max(0, (gprc['GPRC_PASS_QTY'] or 0) - gshk_sum)
+
+
+def ref_gshk_gprc_diff(data, gshk_id):
+    """Get_GSHK_GPRC_Diff: GSHK_QTY - SUM(GPRC_QTY WHERE GPRC_SHK_ID = GSHK_ID)"""
+    gshk = data['gshk'].get(gshk_id)
+    gshk_qty = gshk['GSHK_QTY'] if gshk else None
+    gprc_sum = sum(r['GPRC_QTY'] or 0 for r in data['gprc'].values() if r['GPRC_SHK_ID'] == gshk_id)
+    return None if gshk_qty is None else gshk_qty - gprc_sum
+
+
+# =============================================================================
+# テストデータ生成
+# =============================================================================
+def maybe_null(rng, value, rate=0.05):
+    """一定確率でNULLを返す（NULL時の挙動も検証するため）"""
+    return None if rng.random() < rate else value
+
+
+def seed_data(conn, rng, gprr_count):
+    """ランダムなGPRR/GPRC/GSHKデータを投入し、参照実装用の辞書を返す"""
+    data = {'gprr': {}, 'gprc': {}, 'gshk': {}}
+    base_date = datetime(2024, 1, 1)
+
+    for gprr_id in range(1, gprr_count + 1):
+        data['gprr'][gprr_id] = {
+            'GPRR_ID': gprr_id,
+            'GPRR_SPEC': rng.randint(1, 4),
+            'GPRR_COLOR': rng.randint(1, 5),
+            'GPRR_REQ_TO': rng.choice([1, 1, 1, 2]),
+            'GPRR_REQ_DATE': (base_date + timedelta(days=rng.randint(0, 365))).isoformat(),
+            'GPRR_QTY': maybe_null(rng, rng.randint(10, 500), 0.02)
+        }
+
+    gshk_id = 0
+    gprc_id = 0
+    for gprr in data['gprr'].values():
+        # コンベックス戻り（GPRC_REQ_TO=1）
+        for _ in range(rng.randint(0, 4)):
+            gprc_id += 1
+            qty = rng.randint(1, 150)
+            data['gprc'][gprc_id] = {
+                'GPRC_ID': gprc_id, 'GPRC_REQ_ID': gprr['GPRR_ID'], 'GPRC_REQ_TO': 1,
+                'GPRC_DATE': gprr['GPRR_REQ_DATE'], 'GPRC_QTY': maybe_null(rng, qty),
+                'GPRC_RET_NG_QTY': 0, 'GPRC_INS_NG_QTY': 0, 'GPRC_SHK_ID': None,
+                'GPRC_PASS_QTY': maybe_null(rng, rng.randint(0, qty), 0.15),
+                'GPRC_STS': rng.choice([0, 1])
+            }
+            # ニデック出庫（GSHK_TO=2）とニデック戻り（GPRC_REQ_TO=2）
+            for _ in range(rng.randint(0, 3)):
+                gshk_id += 1
+                shk_qty = rng.randint(1, 80)
+                data['gshk'][gshk_id] = {
+                    'GSHK_ID': gshk_id, 'GSHK_STC_ID': gprc_id, 'GSHK_TO': 2,
+                    'GSHK_DT': gprr['GPRR_REQ_DATE'], 'GSHK_ORD_DT': gprr['GPRR_REQ_DATE'],
+                    'GSHK_QTY': maybe_null(rng, shk_qty), 'GSHK_FLG': 0, 'GSHK_REQ_ID': gprr['GPRR_ID']
+                }
+                for _ in range(rng.randint(0, 2)):
+                    gprc_id += 1
+                    nidec_qty = rng.randint(1, 60)
+                    data['gprc'][gprc_id] = {
+                        'GPRC_ID': gprc_id, 'GPRC_REQ_ID': gprr['GPRR_ID'], 'GPRC_REQ_TO': 2,
+                        'GPRC_DATE': gprr['GPRR_REQ_DATE'], 'GPRC_QTY': maybe_null(rng, nidec_qty),
+                        'GPRC_RET_NG_QTY': 0, 'GPRC_INS_NG_QTY': 0, 'GPRC_SHK_ID': gshk_id,
+                        'GPRC_PASS_QTY': maybe_null(rng, rng.randint(0, nidec_qty), 0.15),
+                        'GPRC_STS': rng.choice([0, 1])
+                    }
+                    # 最終出荷（GSHK_TO=3）
+                    for _ in range(rng.randint(0, 3)):
+                        gshk_id += 1
+                        data['gshk'][gshk_id] = {
+                            'GSHK_ID': gshk_id, 'GSHK_STC_ID': gprc_id, 'GSHK_TO': 3,
+                            'GSHK_DT': gprr['GPRR_REQ_DATE'], 'GSHK_ORD_DT': gprr['GPRR_REQ_DATE'],
+                            'GSHK_QTY': maybe_null(rng, rng.randint(1, 40)), 'GSHK_FLG': 0,
+                            'GSHK_REQ_ID': gprr['GPRR_ID']
+                        }
+
+    # 存在しない在庫IDを参照する出庫（孤児データ）
+    for _ in range(max(1, gprr_count // 50)):
+        gshk_id += 1
+        data['gshk'][gshk_id] = {
+            'GSHK_ID': gshk_id, 'GSHK_STC_ID': gprc_id + rng.randint(1, 100), 'GSHK_TO': rng.choice([2, 3]),
+            'GSHK_DT': None, 'GSHK_ORD_DT': None, 'GSHK_QTY': rng.randint(1, 10), 'GSHK_FLG': 0,
+            'GSHK_REQ_ID': None
+        }
+
+    for table, rows in (('GPRR_DAT', data['gprr']), ('GPRC_DAT', data['gprc']), ('GSHK_DAT', data['gshk'])):
+        rows = list(rows.values())
+        if not rows:
+            continue
+        columns = list(rows[0].keys())
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+            [tuple(r[c] for c in columns) for r in rows]
+        )
+    return data
+
+
+# =============================================================================
+# 検証
+# =============================================================================
+def to_number(value):
+    """SQLiteの戻り値を比較用の整数に揃える"""
+    return None if value is None else int(value)
+
+
+def check_fragment(conn, data, fragment, key_column, value_column, ref_func, ids):
+    """派生テーブル単体の値を参照実装と比較する"""
+    errors = []
+    rows = conn.execute(f"SELECT {key_column}, {value_column} FROM ({fragment}) F").fetchall()
+    actual = {int(r[0]): to_number(r[1]) for r in rows}
+    for target_id in ids:
+        expected = ref_func(data, target_id)
+        if actual.get(target_id) != expected:
+            errors.append(f"{key_column}={target_id}: 期待値={expected}, 実際={actual.get(target_id)}")
+    return errors
+
+
+def check_composed(conn, data):
+    """他テーブルへ結合・WHERE句で絞り込んだ場合の結果を参照実装と比較する"""
+    errors = []
+
+    # 加工残数 > 0 の依頼一覧（get_gprr_list 相当）
+    actual = {r[0] for r in conn.execute(f"""
+        SELECT GPRR_DAT.GPRR_ID FROM GPRR_DAT
+        {join_grd_prc_zan('GPRR_DAT.GPRR_ID')}
+        WHERE GPRR_REQ_TO = 1 AND PRC_ZAN.ZAN_QTY > 0
+    """)}
+    expected = {i for i, r in data['gprr'].items()
+                if r['GPRR_REQ_TO'] == 1 and (ref_grd_prc_zan_qty(data, i) or 0) > 0}
+    if actual != expected:
+        errors.append(f"加工残数>0の依頼一覧が一致しません: 差分={sorted(actual ^ expected)[:10]}")
+
+    # 規格・色別の在庫合計（get_available_shipping_qty / 自動出荷 相当）
+    actual = {(int(r[0]), int(r[1])): int(r[2]) for r in conn.execute(f"""
+        SELECT GPRR_SPEC, GPRR_COLOR, SUM(SHK_ZAN.ZAN_QTY)
+        FROM GPRC_DAT
+        {join_grd_shk_zan('GPRC_DAT.GPRC_ID')}
+        LEFT JOIN GPRR_DAT ON GPRC_REQ_ID = GPRR_ID
+        WHERE GPRC_REQ_TO = 2 AND GPRC_STS = 1 AND SHK_ZAN.ZAN_QTY > 0
+        GROUP BY GPRR_SPEC, GPRR_COLOR
+    """)}
+    expected = {}
+    for i, r in data['gprc'].items():
+        zan = ref_grd_shk_zan_qty(data, i)
+        if r['GPRC_REQ_TO'] == 2 and r['GPRC_STS'] == 1 and zan > 0:
+            gprr = data['gprr'][r['GPRC_REQ_ID']]
+            key = (gprr['GPRR_SPEC'], gprr['GPRR_COLOR'])
+            expected[key] = expected.get(key, 0) + zan
+    if actual != expected:
+        errors.append("規格・色別の出荷可能数が一致しません")
+
+    # 未戻り差分 > 0 の出庫一覧（get_gshk_list 相当）
+    actual = {r[0] for r in conn.execute(f"""
+        SELECT GSHK.GSHK_ID FROM GSHK_DAT GSHK
+        {join_gshk_gprc_diff('GSHK.GSHK_ID')}
+        WHERE GSHK.GSHK_TO = 2 AND GSHK_DIFF.DIFF_QTY > 0
+    """)}
+    expected = {i for i, r in data['gshk'].items()
+                if r['GSHK_TO'] == 2 and (ref_gshk_gprc_diff(data, i) or 0) > 0}
+    if actual != expected:
+        errors.append(f"未戻り出庫一覧が一致しません: 差分={sorted(actual ^ expected)[:10]}")
+
+    return errors
+
+
+def run_round(seed, gprr_count):
+    """1回分の検証を実行し、不一致の内容を返す"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.executescript(SCHEMA)
+        data = seed_data(conn, rng, gprr_count)
+
+        # 存在しないIDも含めて検証する
+        gprr_ids = list(data['gprr']) + [gprr_count + 1]
+        gprc_ids = list(data['gprc'])
+        gshk_ids = list(data['gshk'])
+
+        errors = []
+        errors += check_fragment(conn, data, GRD_PRC_ZAN_SQL, 'GPRR_ID', 'ZAN_QTY', ref_grd_prc_zan_qty, gprr_ids)
+        errors += check_fragment(conn, data, GRD_SHK_ZAN_SQL, 'GPRC_ID', 'ZAN_QTY', ref_grd_shk_zan_qty, gprc_ids)
+        errors += check_fragment(conn, data, GRD_FINAL_SHK_ZAN_SQL, 'GPRC_ID', 'ZAN_QTY', ref_grd_final_shk_zan_qty, gprc_ids)
+        errors += check_fragment(conn, data, GSHK_GPRC_DIFF_SQL, 'GSHK_ID', 'DIFF_QTY', ref_gshk_gprc_diff, gshk_ids)
+        errors += check_composed(conn, data)
+        return errors, (len(data['gprr']), len(data['gprc']), len(data['gshk']))
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='グラデーション在庫残数SQL部品の整合性検証')
+    parser.add_argument('--seed', type=int, default=1, help='乱数シード（開始値）')
+    parser.add_argument('--rounds', type=int, default=20, help='検証回数')
+    parser.add_argument('--gprr', type=int, default=200, help='1回あたりのGPRR件数')
+    args = parser.parse_args()
+
+    failed = 0
+    for i in range(args.rounds):
+        seed = args.seed + i
+        errors, counts = run_round(seed, args.gprr)
+        status = 'OK' if not errors else 'NG'
+        print(f"[{status}] seed={seed} GPRR={counts[0]} GPRC={counts[1]} GSHK={counts[2]}")
+        for error in errors[:20]:
+            print(f"    {error}")
+        if errors:
+            failed += 1
+
+    print(f"\n検証完了: {args.rounds - failed}/{args.rounds} 件一致")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""gunicorn の設定（メトリクスを全ワーカーで共有する）
+
+使用例:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+import shutil
+
+# ワーカーが記録したメトリクスを共有するディレクトリ（ワーカー起動前に設定する）
+# app パッケージを読み込むと prometheus_client が環境変数の設定前に単一プロセス用の
+# 記録方式で初期化されるため、ここでは app.* をインポートしない
+multiproc_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prometheus_multiproc')
+)
+
+
+def on_starting(server):
+    """前回起動時のメトリクスを削除する"""
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """終了したワーカーの処理中リクエスト数を集計から外す"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,6 +1,8 @@
 #!/home/xs332906/hopnic-bfzaiko.net/public_html/new_venv/bin/python
 # -*- coding: utf-8 -*-
-print ("Content-Type: text/html\n\n")
-from wsgiref.handlers import CGIHandler
-from run import app
-CGIHandler().run(app)
\ No newline at end of file
+# 加工依頼書の一括出力で起動する子プロセスもこのスクリプトを読み込むため、直接実行時のみ処理する
+if __name__ == '__main__':
+    print ("Content-Type: text/html\n\n")
+    from wsgiref.handlers import CGIHandler
+    from run import app
+    CGIHandler().run(app)
\ No newline at end of file
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+主要画面・保存APIの負荷再現スクリプト
+
+generate_test_data.py で生成したデータ（SQLite代替DB）に対して、ログイン済みの
+仮想ユーザーを同時実行数ごとに並行で動かし、実運用に近い画面・APIの組み合わせを
+WSGI（Flaskテストクライアント）経由で繰り返し呼び出す。
+同時実行数ごとに、レイテンシの分位点・スループット・1リクエストあたりのSQL発行数・
+受信サイズ・304 Not Modified の件数を出力する。
+
+使用例:
+    python load_replay.py --scale 1 --concurrency 1,2,4,8 --duration 30
+    python load_replay.py --requests 200 --concurrency 4 --output result.json
+    python load_replay.py --requests 200 --concurrency 4 --accept-encoding gzip --revalidate
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import threading
+import subprocess
+from collections import defaultdict
+
+# プロジェクトのルートディレクトリをパスに追加
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PROJECT_ROOT)
+
+DATA_DIR = os.path.join(PROJECT_ROOT, 'benchmarks', '.data')
+
+# ログ設定
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# 呼び出す画面・APIと重み（画面参照が中心で、保存APIは一部）
+ROUTE_MIX = [
+    ('index', 10),
+    ('cprd_dat_search', 15),
+    ('noncoat_stock', 15),
+    ('shipments', 15),
+    ('stock_summary', 10),
+    ('customer_list_api', 5),
+    ('processing_matrix_cprg', 10),
+    ('orders_save', 8),
+    ('shipping_save', 7),
+    ('hardcoat_check_stock', 6),
+    ('hardcoat_auto_shipping_save', 4),
+]
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def prepare_database(args):
+    """生成データを用意し、計測用の複製を作成する（app のインポート前に呼ぶ）"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    pristine_path = os.path.join(
+        DATA_DIR, f"bench_seed{args.seed}_years{args.years:g}_scale{args.scale:g}.sqlite3")
+    working_path = os.path.join(DATA_DIR, 'load_replay_work.sqlite3')
+
+    if args.regenerate and os.path.exists(pristine_path):
+        os.remove(pristine_path)
+    if not os.path.exists(pristine_path):
+        print(f"テストデータを生成しています: {pristine_path}")
+        # app.database はインポート時に接続先が決まるため、生成は別プロセスで行う
+        env = dict(os.environ, DB_ENGINE='sqlite', DB_SQLITE_PATH=pristine_path, LOG_LEVEL='warning')
+        subprocess.run(
+            [sys.executable, os.path.join(PROJECT_ROOT, 'generate_test_data.py'),
+             '--seed', str(args.seed), '--years', str(args.years), '--scale', str(args.scale)],
+            cwd=PROJECT_ROOT, env=env, check=True
+        )
+    shutil.copyfile(pristine_path, working_path)
+
+    os.environ['DB_ENGINE'] = 'sqlite'
+    os.environ['DB_SQLITE_PATH'] = working_path
+    os.environ['LOG_LEVEL'] = 'warning'
+
+
+class StatementCounter:
+    """スレッドごとにSQLの発行数を数える"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+
+def load_targets():
+    """保存APIに渡す対象データ（在庫・製品・規格）を取得する"""
+    from sqlalchemy import text
+    from app.constants import DatabaseConstants
+    from app.database import get_db_session
+
+    session = get_db_session()
+    try:
+        stock_ids = [r.BPDD_ID for r in session.execute(text("""
+            SELECT BPDD_ID FROM BPRD_DAT
+            WHERE BPDD_PROC = :proc AND BPDD_FLG = :flg
+            ORDER BY BPDD_ID DESC
+        """), {'proc': DatabaseConstants.PROC_NON_COAT, 'flg': DatabaseConstants.BPDD_FLG_NOT_SHIPPED}).fetchall()[:500]]
+        product_ids = [r.BFSP_PRD_ID for r in session.execute(text(
+            "SELECT BFSP_PRD_ID FROM BFSP_MST ORDER BY BFSP_SORT")).fetchall()]
+        hardcoat_specs = session.execute(text("""
+            SELECT DISTINCT BFSP.BFSP_BASE, BFSP.BFSP_ADP, BFSP.BFSP_LR, BFSP.BFSP_CLR
+            FROM BPRD_DAT BPRD
+            INNER JOIN BFSP_MST BFSP ON BPRD.BPDD_PRD_ID = BFSP.BFSP_PRD_ID
+            WHERE BPRD.BPDD_PROC = :proc AND BPRD.BPDD_FLG = :flg
+        """), {'proc': DatabaseConstants.PROC_HARD_COAT, 'flg': DatabaseConstants.BPDD_FLG_NOT_SHIPPED}).fetchall()
+        return {
+            'stock_ids': stock_ids,
+            'product_ids': product_ids,
+            'hardcoat_specs': [tuple(str(v) for v in spec) for spec in hardcoat_specs],
+        }
+    finally:
+        session.close()
+
+
+def build_request(name, rnd, targets, user_no):
+    """ルート名から (メソッド, URL, 送信内容) を組み立てる"""
+    from app.constants import DatabaseConstants
+
+    today = time.strftime('%Y-%m-%d')
+    if name == 'index':
+        return 'GET', '/', {}
+    if name == 'cprd_dat_search':
+        return 'GET', '/common/cprd_dat?search=1', {}
+    if name == 'noncoat_stock':
+        return 'GET', '/noncoat-stock', {}
+    if name == 'shipments':
+        return 'GET', '/shipments', {}
+    if name == 'stock_summary':
+        return 'GET', '/common/stock_summary', {}
+    if name == 'customer_list_api':
+        return 'GET', '/common/api/get_customer_list', {}
+    if name == 'processing_matrix_cprg':
+        return 'GET', '/total/processing_matrix_cprg', {}
+    if name == 'orders_save':
+        products = rnd.sample(targets['product_ids'], min(5, len(targets['product_ids'])))
+        return 'POST', '/api/orders/save', {'json': {
+            'orderDate': today,
+            'customerOrderNo': f"LOAD{user_no:03d}{rnd.randint(0, 999):03d}",
+            'process': DatabaseConstants.PROC_NON_COAT,
+            'shipTo': DatabaseConstants.ORDER_CMP_COLUMBUS,
+            'details': [{'BRCP_PRD_ID': prd_id, 'BRCP_QTY': rnd.randint(1, 20)} for prd_id in products],
+        }}
+    if name == 'shipping_save':
+        stock_id = rnd.choice(targets['stock_ids'])
+        return 'POST', f'/shipping/save/{stock_id}', {'json': {'shipments': [{
+            'quantity': 1,
+            'ship_to': str(DatabaseConstants.SHIPMENT_TO_PROCESS),
+            'ship_date': today,
+            'order_date': today,
+        }]}}
+    base, adp, lr, clr = rnd.choice(targets['hardcoat_specs'])
+    form = {'base': base, 'adp': adp, 'lr': lr, 'clr': clr}
+    if name == 'hardcoat_check_stock':
+        return 'POST', '/hardcoat_check_stock', {'data': form}
+    form.update({
+        'ship_to': str(DatabaseConstants.ORDER_CMP_COLUMBUS),
+        'order_date': today,
+        'ship_date': today,
+        'quantity': '1',
+    })
+    return 'POST', '/hardcoat_auto_shipping_save', {'data': form}
+
+
+def available_mix(targets):
+    """対象データがない保存APIを除いたルート構成を返す"""
+    unavailable = set()
+    if not targets['stock_ids']:
+        unavailable.add('shipping_save')
+    if not targets['product_ids']:
+        unavailable.add('orders_save')
+    if not targets['hardcoat_specs']:
+        unavailable.update({'hardcoat_check_stock', 'hardcoat_auto_shipping_save'})
+    return [(name, weight) for name, weight in ROUTE_MIX if name not in unavailable]
+
+
+def virtual_user(app, counter, user_no, args, targets, mix, deadline, budget, results):
+    """1仮想ユーザー分のリクエストを発行する"""
+    rnd = random.Random(args.seed * 1000 + user_no)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    client = app.test_client()
+    response = client.post('/auth/login', data={'user_id': args.user_id, 'password': args.password})
+    if response.status_code != 302:
+        raise RuntimeError(f"ログインに失敗しました（ユーザー: {args.user_id}）")
+    # ログイン時のメッセージを表示する画面を先に開く（以降の画面を条件付きGETの対象にする）
+    client.get('/')
+
+    # ブラウザと同様に、URLごとに前回のETagを送って再検証する
+    etags = {}
+    while time.perf_counter() < deadline and budget.take():
+        name = rnd.choices(names, weights)[0]
+        method, url, kwargs = build_request(name, rnd, targets, user_no)
+        headers = {}
+        if args.accept_encoding:
+            headers['Accept-Encoding'] = args.accept_encoding
+        if args.revalidate and method == 'GET' and url in etags:
+            headers['If-None-Match'] = etags[url]
+        counter.reset()
+        start = time.perf_counter()
+        size = 0
+        not_modified = False
+        try:
+            response = client.open(url, method=method, headers=headers, **kwargs)
+            size = len(response.data)
+            not_modified = response.status_code == 304
+            error = response.status_code >= 400
+            if response.headers.get('ETag'):
+                etags[url] = response.headers['ETag']
+            if not error and response.is_json:
+                data = response.data
+                if response.headers.get('Content-Encoding') == 'gzip':
+                    data = gzip.decompress(data)
+                try:
+                    body = json.loads(data)
+                except ValueError:
+                    body = None
+                error = isinstance(body, dict) and ('error' in body or body.get('success') is False)
+        except Exception as e:
+            logger.warning(f"{name} でエラーが発生しました: {str(e)}")
+            error = True
+        results.append((name, time.perf_counter() - start, counter.count, error, size, not_modified))
+
+
+class RequestBudget:
+    """全仮想ユーザーで共有するリクエスト数の上限（None は無制限）"""
+
+    def __init__(self, total):
+        self._remaining = total
+        self._lock = threading.Lock()
+
+    def take(self):
+        if self._remaining is None:
+            return True
+        with self._lock:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+            return True
+
+
+def percentile(sorted_values, pct):
+    """最近傍法による分位点"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(results, elapsed):
+    """計測結果をルート別・全体で集計する"""
+    groups = defaultdict(list)
+    for row in results:
+        groups[row[0]].append(row)
+        groups['(全体)'].append(row)
+
+    summary = {}
+    for name, rows in groups.items():
+        latencies = sorted(row[1] * 1000 for row in rows)
+        summary[name] = {
+            'requests': len(rows),
+            'errors': sum(1 for row in rows if row[3]),
+            'throughput_rps': round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            **{f"p{pct}_ms": round(percentile(latencies, pct), 2) for pct in PERCENTILES},
+            'statements_per_request': round(sum(row[2] for row in rows) / len(rows), 1),
+            'kb_per_request': round(sum(row[4] for row in rows) / len(rows) / 1024, 1),
+            'not_modified': sum(1 for row in rows if row[5]),
+        }
+    return summary
+
+
+def run_level(app, counter, concurrency, args, targets, mix):
+    """指定した同時実行数で負荷をかける"""
+    results = []
+    budget = RequestBudget(args.requests)
+    deadline = time.perf_counter() + (args.duration if args.requests is None else float('inf'))
+    threads = [
+        threading.Thread(target=virtual_user,
+                         args=(app, counter, user_no, args, targets, mix, deadline, budget, results))
+        for user_no in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(results, time.perf_counter() - start)
+
+
+def print_summary(concurrency, summary):
+    print(f"\n--- 同時実行数 {concurrency} ---")
+    header = f"{'ルート':<28}{'件数':>7}{'エラー':>7}{'req/s':>9}{'平均ms':>9}" + \
+        ''.join(f"{'p' + str(pct):>9}" for pct in PERCENTILES) + f"{'SQL/件':>9}{'KB/件':>9}{'304':>7}"
+    print(header)
+    for name in sorted(summary, key=lambda n: (n == '(全体)', n)):
+        s = summary[name]
+        print(f"{name:<28}{s['requests']:>7}{s['errors']:>7}{s['throughput_rps']:>9}{s['mean_ms']:>9}"
+              + ''.join(f"{s[f'p{pct}_ms']:>9}" for pct in PERCENTILES)
+              + f"{s['statements_per_request']:>9}{s['kb_per_request']:>9}{s['not_modified']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='主要画面・保存APIの負荷再現')
+    parser.add_argument('--scale', type=float, default=1.0, help='生成データの倍率（現行規模=1）')
+    parser.add_argument('--years', type=float, default=1.0, help='生成データの年数')
+    parser.add_argument('--seed', type=int, default=42, help='生成データ・リクエスト順序の乱数シード')
+    parser.add_argument('--regenerate', action='store_true', help='キャッシュ済みの生成データを作り直す')
+    parser.add_argument('--concurrency', default='1,2,4,8', help='同時実行数（カンマ区切りで段階指定）')
+    parser.add_argument('--duration', type=float, default=30.0, help='同時実行数ごとの計測秒数')
+    parser.add_argument('--requests', type=int, help='同時実行数ごとのリクエスト数（指定時は秒数より優先）')
+    parser.add_argument('--user-id', default='bench', help='ログインユーザーID')
+    parser.add_argument('--password', default='bench', help='ログインパスワード')
+    parser.add_argument('--output', help='結果を保存するJSONファイル')
+    parser.add_argument('--accept-encoding', default='', help='送信する Accept-Encoding（例: gzip。空は圧縮なし）')
+    parser.add_argument('--revalidate', action='store_true', help='前回のETagを送って条件付きGETで再検証する')
+    args = parser.parse_args()
+
+    print("=== 負荷再現を開始します ===")
+    try:
+        levels = [int(v) for v in args.concurrency.split(',') if v.strip()]
+        prepare_database(args)
+
+        from app import app
+        from app.database import engine
+
+        app.config['WTF_CSRF_ENABLED'] = False
+        counter = StatementCounter(engine)
+        targets = load_targets()
+        mix = available_mix(targets)
+
+        report = {'params': vars(args), 'levels': {}}
+        for concurrency in levels:
+            summary = run_level(app, counter, concurrency, args, targets, mix)
+            report['levels'][str(concurrency)] = summary
+            print_summary(concurrency, summary)
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"\n結果を保存しました: {args.output}")
+
+        print("\n✅ 負荷再現が完了しました")
+    except Exception as e:
+        logger.error(f"負荷再現中にエラーが発生しました: {str(e)}")
+        print(f"❌ 負荷再現に失敗しました: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""加工依頼書PDFの作成（app パッケージに依存しない）
+
+加工依頼書の一括出力では、このモジュールの render_process_request_pdf を
+プロセスプール（spawn）の各プロセスで実行する。app パッケージを読み込むと
+DB接続・ルート登録・ログ出力スレッドの起動まで行われるため、ここでは
+reportlab 以外を読み込まない（DBの読み込み・採番は app.export_pdf で行う）。
+"""
+
+import os
+import platform
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Table, TableStyle, SimpleDocTemplate, Paragraph, Spacer, PageBreak
+
+
+def get_japanese_font():
+    """プラットフォームに応じて日本語フォントを取得する"""
+    system = platform.system()
+    
+    # フォント候補リスト（日本語対応のもののみ）
+    font_candidates = []
+    
+    if system == "Windows":
+        font_candidates = [
+            ('C:\\Windows\\Fonts\\msgothic.ttc', 'MSGothic'),
+            ('C:\\Windows\\Fonts\\msgothic.ttf', 'MSGothic'),
+            ('C:\\Windows\\Fonts\\yugothic.ttf', 'YuGothic'),
+            ('C:\\Windows\\Fonts\\yugothib.ttf', 'YuGothic'),
+            ('C:\\Windows\\Fonts\\meiryo.ttc', 'Meiryo'),
+        ]
+    elif system == "Darwin":  # macOS
+        font_candidates = [
+            ('/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc', 'HiraginoSans'),
+            ('/Library/Fonts/ヒラギノ角ゴ ProN W3.otf', 'HiraginoSans'),
+            ('/System/Library/Fonts/Arial Unicode MS.ttf', 'ArialUnicodeMS'),
+        ]
+    else:  # Linux and others
+        font_candidates = [
+            # Noto CJK フォント（日本語対応）
+            ('/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc', 'NotoSansCJK'),
+            ('/usr/share/fonts/truetype/noto-cjk/NotoSansCJK-Regular.ttc', 'NotoSansCJK'),
+            ('/usr/share/fonts/opentype/noto/NotoSerifCJK-Regular.ttc', 'NotoSerifCJK'),
+            # IPAフォント（日本語対応）- インストール済み
+            ('/usr/share/fonts/truetype/fonts-japanese-gothic.ttf', 'IPAGothic'),
+            ('/usr/share/fonts/opentype/ipafont-gothic/ipag.ttf', 'IPAGothic'),
+            ('/usr/share/fonts/opentype/ipafont-mincho/ipam.ttf', 'IPAMincho'),
+            # その他の日本語フォント候補
+            ('/usr/share/fonts/truetype/vlgothic/VL-Gothic-Regular.ttf', 'VLGothic'),
+        ]
+    
+    # フォントファイルの存在確認と登録
+    for font_path, font_name in font_candidates:
+        if os.path.exists(font_path):
+            try:
+                pdfmetrics.registerFont(TTFont(font_name, font_path))
+                print(f"日本語フォントを登録しました: {font_name} ({font_path})")
+                return font_name
+            except Exception as e:
+                print(f"フォント登録に失敗: {font_name} - {str(e)}")
+                continue
+    
+    # 日本語フォントが見つからない場合はエラーを発生
+    error_msg = f"日本語対応フォントが見つかりません。プラットフォーム: {system}"
+    print(error_msg)
+    
+    if system == "Linux":
+        print("以下のコマンドで日本語フォントをインストールしてください:")
+        print("Ubuntu/Debian: sudo apt-get install fonts-noto-cjk fonts-ipafont-gothic")
+        print("CentOS/RHEL: sudo yum install google-noto-cjk-fonts ipa-gothic-fonts")
+        print("または: sudo dnf install google-noto-cjk-fonts ipa-gothic-fonts")
+    
+    raise Exception(f"日本語対応フォントが利用できません。適切なフォントをインストールしてください。({system})")
+
+def render_process_request_pdf(details, header_info, doc_number):
+    """加工依頼書PDFを作成する（一括出力ではプロセスプールの各プロセスで実行される）
+
+    Args:
+        details (list): 明細（_process_request_detail の形式）
+        header_info (dict): 取引先情報（_process_request_header_info の形式）
+        doc_number (str): ドキュメント番号
+
+    Returns:
+        bytes: PDFの内容
+    """
+    font_name = get_japanese_font()
+    # --- 見た目重視の寸法調整 ---
+    PAGE_WIDTH = 210 * mm
+    LEFT_MARGIN = 15 * mm
+    RIGHT_MARGIN = 15 * mm
+    TOP_MARGIN = 15 * mm
+    BOTTOM_MARGIN = 15 * mm
+    TABLE_WIDTH = PAGE_WIDTH - LEFT_MARGIN - RIGHT_MARGIN  # 約180mm
+    # 列幅（品名, LOT, 数量, 加工内容）
+    col_widths = [70*mm, 30*mm, 25*mm, 55*mm]
+    row_height = 10*mm
+    # --- PDFドキュメント設定（ヘッダー・フッター付き） ---
+    buffer = BytesIO()
+    
+    # 通常のPDFドキュメント設定（ページテンプレートなし）
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=RIGHT_MARGIN/mm,
+        leftMargin=LEFT_MARGIN/mm,
+        topMargin=TOP_MARGIN/mm,
+        bottomMargin=BOTTOM_MARGIN/mm
+    )
+    
+    styles = getSampleStyleSheet()
+    elements = []
+    # ページング機能付き明細テーブル
+    headers = ['品名', '', '数量', '加工内容']
+    col_widths = [80*mm, 20*mm, 30*mm, 50*mm]
+    row_height = 12*mm
+    max_rows_per_page = 16  # 1ページあたりの最大行数（ヘッダー行含む）
+    
+    # データを行ごとに分割
+    all_data_rows = []
+    for d in details:
+        row = [
+            Paragraph(str(d.get('CPRC_PRD_NM', '')), ParagraphStyle(name='TableCell', fontName=font_name, fontSize=11)),
+            Paragraph(str(d.get('CPDD_LOT', '')), ParagraphStyle(name='TableCell', fontName=font_name, fontSize=11)),
+            Paragraph(str(d.get('CSHK_QTY', '')), ParagraphStyle(name='TableCell', fontName=font_name, fontSize=11, alignment=2)),
+            Paragraph(str(d.get('CPRC_NM', '')), ParagraphStyle(name='TableCell', fontName=font_name, fontSize=11)),
+        ]
+        all_data_rows.append(row)
+    
+    # 合計計算
+    total_qty = sum(int(d.get('CSHK_QTY', 0) or 0) for d in details)
+    
+    # ページ分割処理（各ページにヘッダー・フッターを手動追加）
+    current_page = 1
+    total_pages = (len(all_data_rows) + max_rows_per_page - 1) // max_rows_per_page  # 切り上げ
+    
+    for page_start in range(0, len(all_data_rows), max_rows_per_page - 1):  # ヘッダー行を除く
+        page_end = min(page_start + max_rows_per_page - 1, len(all_data_rows))
+        page_data = all_data_rows[page_start:page_end]
+        
+        # 全ページにヘッダーを追加
+        # ヘッダーテーブル（会社名とNo.）
+        cztr_full_nm = header_info.get('CZTR_FULL_NM', '')
+        cztr_tanto_nm = header_info.get('CZTR_TANTO_NM', '')
+        if cztr_tanto_nm:
+            cztr_full_nm = cztr_full_nm + ' 御中' + ' ' + cztr_tanto_nm + '様'
+        else:
+            cztr_full_nm = cztr_full_nm + ' 御中'
+        
+        company_table = Table([
+            [Paragraph(f"{cztr_full_nm}", ParagraphStyle(name='Header1', fontName=font_name, fontSize=14, alignment=1))]
+        ], colWidths=[80*mm], hAlign='LEFT')
+        company_table.setStyle(TableStyle([
+            ('LINEBELOW', (0,0), (0,0), 0.7, colors.black),
+            ('BOTTOMPADDING', (0,0), (0,0), 2*mm),
+            ('LEFTPADDING', (0,0), (0,0), 0),
+            ('RIGHTPADDING', (0,0), (0,0), 0),
+        ]))
+        
+        no_table = Table([
+            [Paragraph("No.", ParagraphStyle(name='Header1', fontName=font_name, fontSize=12, alignment=0)),
+             Paragraph(doc_number, ParagraphStyle(name='Header1', fontName=font_name, fontSize=12, alignment=0))]
+        ], colWidths=[10*mm, 40*mm], hAlign='RIGHT')
+        no_table.setStyle(TableStyle([
+            ('LINEBELOW', (0,0), (1,0), 0.7, colors.black),
+            ('BOTTOMPADDING', (0,0), (1,0), 0.5*mm),
+            ('LEFTPADDING', (0,0), (1,0), 0),
+            ('RIGHTPADDING', (0,0), (1,0), 0),
+        ]))
+        
+        header_table = Table([
+            [company_table, no_table]
+        ], colWidths=[120*mm, 60*mm])
+        header_table.setStyle(TableStyle([
+            ('ALIGN', (0,0), (0,0), 'LEFT'),
+            ('ALIGN', (1,0), (1,0), 'RIGHT'),
+            ('LEFTPADDING', (0,0), (1,0), 0),
+            ('RIGHTPADDING', (0,0), (1,0), 0),
+            ('TOPPADDING', (0,0), (1,0), 0),
+            ('BOTTOMPADDING', (0,0), (1,0), 0),
+        ]))
+        
+        elements.append(header_table)
+        elements.append(Spacer(1, 5*mm))
+        
+        # タイトル
+        elements.append(Table([
+            [Paragraph('加　工　依　頼　書', ParagraphStyle(name='Title', fontName=font_name, fontSize=18, alignment=1, leading=22))]
+        ], colWidths=[70*mm], style=TableStyle([
+            ('ALIGN', (0,0), (0,0), 'CENTER'),
+            ('LINEBELOW', (0,0), (0,0), 1, colors.black),
+            ('BOTTOMPADDING', (0,0), (0,0), 2*mm),
+        ])))
+        elements.append(Spacer(1, 15*mm))
+        
+        # ヘッダー行を追加
+        table_data = [[Paragraph(h, ParagraphStyle(name='TableHeader', fontName=font_name, fontSize=12, alignment=1)) for h in headers]]
+        table_data.extend(page_data)
+        
+        # 最後のページまたは16行未満の場合は空行を追加
+        if len(table_data) < max_rows_per_page:
+            empty_rows_needed = max_rows_per_page - len(table_data) - 1  # 合計行分を引く
+            for _ in range(empty_rows_needed):
+                table_data.append(['', '', '', ''])
+            
+            # 合計行を追加
+            table_data.append([
+                Paragraph('合計', ParagraphStyle(name='TotalLabel', fontName=font_name, fontSize=12, alignment=2)),
+                '',
+                Paragraph(str(total_qty), ParagraphStyle(name='TotalValue', fontName=font_name, fontSize=12, alignment=2)),
+                ''
+            ])
+        
+        # テーブルを作成
+        table = Table(table_data, colWidths=col_widths, rowHeights=[row_height]*len(table_data), repeatRows=1)
+        table.setStyle(TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.7, colors.black),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 2*mm),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 2*mm),
+            ('TOPPADDING', (0, 0), (-1, -1), 1*mm),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 1*mm),
+        ]))
+        
+        elements.append(table)
+        
+        # フッター部分（各ページに追加）
+        elements.append(Spacer(1, 2*mm))
+        elements.append(Paragraph('備考：', ParagraphStyle(name='Biko', fontName=font_name, fontSize=12, alignment=0, spaceAfter=2*mm)))
+        elements.append(Spacer(1, 8*mm))
+        elements.append(Paragraph('株式会社　ホプニック研究所', ParagraphStyle(name='Footer', fontName=font_name, fontSize=13, alignment=1)))
+        
+        # ページ番号（右下）
+        page_text = f"ページ {current_page} / {total_pages}"
+        elements.append(Paragraph(page_text, ParagraphStyle(name='PageNumber', fontName=font_name, fontSize=8, alignment=2)))
+        
+        # ページ分割（最後のページ以外）
+        if current_page < total_pages:
+            elements.append(PageBreak())
+        
+        current_page += 1
+    doc.build(elements)
+    # バッファの内容を取得
+    pdf = buffer.getvalue()
+    buffer.close()
+    return pdf